@@ -0,0 +1,33 @@
+"""Index messages by WhatsApp id and link them to campaigns
+
+Revision ID: 002
+Revises: 001
+Create Date: 2024-02-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('messages', sa.Column('campaign_id', postgresql.UUID(as_uuid=True), nullable=True))
+    op.create_foreign_key(
+        'messages_campaign_id_fkey', 'messages', 'campaigns',
+        ['campaign_id'], ['id'], ondelete='SET NULL'
+    )
+    op.create_index('ix_messages_campaign_id', 'messages', ['campaign_id'])
+    op.create_index('ix_messages_whatsapp_message_id', 'messages', ['whatsapp_message_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_whatsapp_message_id', table_name='messages')
+    op.drop_index('ix_messages_campaign_id', table_name='messages')
+    op.drop_constraint('messages_campaign_id_fkey', 'messages', type_='foreignkey')
+    op.drop_column('messages', 'campaign_id')
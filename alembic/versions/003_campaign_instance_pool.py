@@ -0,0 +1,23 @@
+"""Let campaigns spread sending over a pool of instances
+
+Revision ID: 003
+Revises: 002
+Create Date: 2024-02-08 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('campaigns', sa.Column('instance_pool', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('campaigns', 'instance_pool')
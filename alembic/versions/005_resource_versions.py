@@ -0,0 +1,83 @@
+"""Per-user resource version counters for ETags
+
+Revision ID: 005
+Revises: 004
+Create Date: 2024-02-22 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+# Table -> resource name whose version every write to it bumps
+VERSIONED_TABLES = {
+    'whatsapp_instances': 'instances',
+    'campaigns': 'campaigns',
+    'groups': 'groups',
+    'finance_entries': 'finances',
+    'conversations': 'conversations',
+}
+
+
+def upgrade() -> None:
+    op.create_table('resource_versions',
+    sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('resource', sa.String(length=32), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'resource')
+    )
+
+    # Statement-level triggers, so any write (ORM, bulk UPDATE, COPY) bumps the
+    # version once per affected user, in the writer's transaction. Users are
+    # locked in id order to avoid deadlocks between multi-user statements.
+    op.execute("""
+    CREATE FUNCTION bump_resource_version() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO resource_versions (user_id, resource, version)
+            SELECT DISTINCT user_id, TG_ARGV[0], 1 FROM new_rows ORDER BY user_id
+            ON CONFLICT (user_id, resource) DO UPDATE SET version = resource_versions.version + 1;
+        ELSIF TG_OP = 'UPDATE' THEN
+            INSERT INTO resource_versions (user_id, resource, version)
+            SELECT user_id, TG_ARGV[0], 1 FROM (SELECT user_id FROM new_rows UNION SELECT user_id FROM old_rows) AS users
+            ORDER BY user_id
+            ON CONFLICT (user_id, resource) DO UPDATE SET version = resource_versions.version + 1;
+        ELSE
+            INSERT INTO resource_versions (user_id, resource, version)
+            SELECT DISTINCT user_id, TG_ARGV[0], 1 FROM old_rows
+            WHERE EXISTS (SELECT 1 FROM users WHERE users.id = old_rows.user_id)
+            ORDER BY user_id
+            ON CONFLICT (user_id, resource) DO UPDATE SET version = resource_versions.version + 1;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """)
+    for table, resource in VERSIONED_TABLES.items():
+        op.execute(f"""
+        CREATE TRIGGER {table}_version_insert AFTER INSERT ON {table}
+        REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION bump_resource_version('{resource}')
+        """)
+        op.execute(f"""
+        CREATE TRIGGER {table}_version_update AFTER UPDATE ON {table}
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION bump_resource_version('{resource}')
+        """)
+        op.execute(f"""
+        CREATE TRIGGER {table}_version_delete AFTER DELETE ON {table}
+        REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION bump_resource_version('{resource}')
+        """)
+
+
+def downgrade() -> None:
+    for table in VERSIONED_TABLES:
+        for event in ('insert', 'update', 'delete'):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_version_{event} ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS bump_resource_version()")
+    op.drop_table('resource_versions')
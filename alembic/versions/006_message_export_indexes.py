@@ -0,0 +1,28 @@
+"""Keyset indexes for message exports
+
+Exports walk messages in (timestamp, id) order; these let Postgres read them
+in index order instead of sorting a user's whole history first.
+
+Revision ID: 006
+Revises: 005
+Create Date: 2024-03-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_messages_timestamp_id', 'messages', ['timestamp', 'id'])
+    op.create_index('ix_messages_instance_timestamp_id', 'messages', ['instance_id', 'timestamp', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_instance_timestamp_id', table_name='messages')
+    op.drop_index('ix_messages_timestamp_id', table_name='messages')
@@ -0,0 +1,26 @@
+"""Room for group JIDs in contacts.phone
+
+Group chats are stored as a contact addressed by the group JID
+("120363025246125486@g.us"), which is longer than any phone number.
+
+Revision ID: 007
+Revises: 006
+Create Date: 2024-03-22 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.alter_column('contacts', 'phone', type_=sa.String(length=64), existing_type=sa.String(length=20), existing_nullable=False)
+
+
+def downgrade() -> None:
+    op.alter_column('contacts', 'phone', type_=sa.String(length=20), existing_type=sa.String(length=64), existing_nullable=False)
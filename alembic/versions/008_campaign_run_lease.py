@@ -0,0 +1,31 @@
+"""Campaign run leases
+
+A campaign is sent by at most one worker: the one whose run_owner is set
+and whose run_heartbeat_at is recent. run_generation tells runs apart, so
+a stop aimed at one run can't end the next.
+
+Revision ID: 008
+Revises: 007
+Create Date: 2024-03-29 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('campaigns', sa.Column('run_owner', sa.String(length=64), nullable=True))
+    op.add_column('campaigns', sa.Column('run_generation', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('campaigns', sa.Column('run_heartbeat_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('campaigns', 'run_heartbeat_at')
+    op.drop_column('campaigns', 'run_generation')
+    op.drop_column('campaigns', 'run_owner')
@@ -0,0 +1,41 @@
+"""Stop versioning conversations
+
+Every inbound message and receipt writes conversations, and the trigger
+from 005 made each of those writes upsert the user's resource_versions row,
+holding its lock until commit: one user's deliveries queued behind each
+other. The dashboard, the only reader, now validates on the conversation
+totals themselves.
+
+Revision ID: 009
+Revises: 008
+Create Date: 2024-04-05 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    for event in ('insert', 'update', 'delete'):
+        op.execute(f"DROP TRIGGER IF EXISTS conversations_version_{event} ON conversations")
+    op.execute("DELETE FROM resource_versions WHERE resource = 'conversations'")
+
+
+def downgrade() -> None:
+    op.execute("""
+    CREATE TRIGGER conversations_version_insert AFTER INSERT ON conversations
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION bump_resource_version('conversations')
+    """)
+    op.execute("""
+    CREATE TRIGGER conversations_version_update AFTER UPDATE ON conversations
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION bump_resource_version('conversations')
+    """)
+    op.execute("""
+    CREATE TRIGGER conversations_version_delete AFTER DELETE ON conversations
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION bump_resource_version('conversations')
+    """)
@@ -4,11 +4,10 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 from config import settings
-from database import get_db
 from models import User
+from storage.interface import Storage
+from storage.provider import get_storage
 import schemas
 
 # Password hashing
@@ -33,21 +32,32 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
-async def get_user_by_username(db: AsyncSession, username: str) -> Optional[User]:
-    result = await db.execute(select(User).filter(User.username == username))
-    return result.scalar_one_or_none()
+async def get_user_by_username(storage: Storage, username: str) -> Optional[User]:
+    return await storage.users.get_by_username(username)
 
-async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[User]:
-    user = await get_user_by_username(db, username)
+async def authenticate_user(storage: Storage, username: str, password: str) -> Optional[User]:
+    user = await get_user_by_username(storage, username)
     if not user:
         return None
     if not verify_password(password, user.password_hash):
         return None
     return user
 
+async def get_user_from_token(storage: Storage, token: str) -> Optional[User]:
+    try:
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        username: str = payload.get("sub")
+        if username is None:
+            return None
+        token_data = schemas.TokenData(username=username)
+    except JWTError:
+        return None
+    
+    return await get_user_by_username(storage, username=token_data.username)
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -55,16 +65,7 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(credentials.credentials, settings.secret_key, algorithms=[settings.algorithm])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = schemas.TokenData(username=username)
-    except JWTError:
-        raise credentials_exception
-    
-    user = await get_user_by_username(db, username=token_data.username)
+    user = await get_user_from_token(storage, credentials.credentials)
     if user is None:
         raise credentials_exception
     return user
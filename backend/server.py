@@ -6,21 +6,36 @@ WhatsApp Bot Management System - Backend Server
 import sys
 import os
 from pathlib import Path
-from fastapi import FastAPI, Request, HTTPException, Depends
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, Request, HTTPException, Depends, Query
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
+import base64
+import json
 import logging
-from datetime import datetime
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, List, Optional, Tuple
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Shared modules (storage, structured logging, compression, static assets) live in the project root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from services.structured_logging import configure_logging, CorrelationIdMiddleware
+from services.compression import CompressionMiddleware
+from services.static_assets import StaticAssets, HashedStaticFiles
+from services.phone_normalizer import normalize_phone
+from services.user_service import UserService
+from storage.interface import Storage
+from storage.provider import get_backend, get_storage
+import models
+import schemas
+
+# Configure logging: JSON records written by a background thread
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Create FastAPI app
@@ -41,40 +56,116 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip/brotli for responses of 1 KiB and more
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.environ.get("COMPRESSION_MIN_SIZE", "1024")))
+
+# Request IDs on every log record and response
+app.add_middleware(CorrelationIdMiddleware)
+
 # Security
 security = HTTPBearer()
 
-# Database configuration for Emergent platform (using MongoDB for now)
-try:
-    from motor.motor_asyncio import AsyncIOMotorClient
-    
-    # Use MongoDB from Emergent platform
-    MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-    DB_NAME = os.environ.get('DB_NAME', 'whatsapp_bot')
-    
-    client = AsyncIOMotorClient(MONGO_URL)
-    db = client[DB_NAME]
-    
-    logger.info(f"Connected to MongoDB: {DB_NAME}")
-    
-except Exception as e:
-    logger.error(f"Database connection error: {e}")
-    # Fallback to in-memory storage for development
-    db = None
+# Data lives in the same storage layer as main.py (storage/): STORAGE_BACKEND
+# selects postgres, mongo or memory. Everything here belongs to the demo user.
+DEMO_USERNAME = "admin"
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+class InvalidCursor(ValueError):
+    pass
+
+@app.on_event("startup")
+async def start_storage():
+    """Connect the backend and create its indexes"""
+    await get_backend().start()
+
+@app.on_event("shutdown")
+async def close_storage():
+    await get_backend().close()
+
+@app.exception_handler(InvalidCursor)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+async def get_owner(storage: Storage = Depends(get_storage)) -> models.User:
+    """The demo user, created on first use"""
+    owner = await storage.users.get_by_username(DEMO_USERNAME)
+    if owner is None:
+        owner = await storage.users.add(
+            name="Administrator",
+            username=DEMO_USERNAME,
+            password_hash="!",  # no password login: see /api/auth/login
+            role=models.UserRole.ADMIN
+        )
+        await storage.commit()
+    return owner
+
+def encode_cursor(key: Tuple[str, str]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).rstrip(b"=").decode()
+
+def decode_cursor(token: str) -> Tuple[str, str]:
+    try:
+        value, item_id = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return str(value), str(item_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+
+def paginated(
+    response: Response,
+    items: List[Any],
+    sort_value: Callable[[Any], datetime],
+    limit: int,
+    cursor: Optional[str],
+    serialize: Callable[[Any], dict]
+):
+    """One page, newest first on (sort value, id); the next page's cursor goes in a header"""
+    def key(item) -> Tuple[str, str]:
+        value = sort_value(item)
+        return (value.isoformat() if value else "", str(item.id))
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    items = sorted(items, key=key, reverse=True)
+    if cursor:
+        after = decode_cursor(cursor)
+        items = [item for item in items if key(item) < after]
+    page = items[:limit]
+    if len(items) > limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(key(page[-1]))
+    return [serialize(item) for item in page]
+
+def dump(schema):
+    return lambda entity: schema.model_validate(entity).model_dump(mode="json")
+
+def parse_date(value: Optional[str], default: datetime) -> datetime:
+    if not value:
+        return default
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {value}")
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def parse_id(value: Optional[str], field: str) -> uuid.UUID:
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {field}: {value}")
 
 # Resolve project directories regardless of the current working directory
 BASE_DIR = Path(__file__).resolve().parent.parent
 TEMPLATES_DIR = BASE_DIR / "templates"
 STATIC_DIR = BASE_DIR / "static"
 
-# Templates and static files
+# Templates and static files (content-hashed URLs)
+static_assets = StaticAssets(STATIC_DIR)
 templates = None
 if TEMPLATES_DIR.exists():
     templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+    templates.env.globals["static_url"] = static_assets.url
 
 # Serve static files if they exist
 if STATIC_DIR.exists():
-    app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
+    app.mount("/static", HashedStaticFiles(assets=static_assets), name="static")
 
 # API Routes
 @app.get("/api/health")
@@ -123,152 +214,217 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     }
 
 # Dashboard endpoints
-@app.get("/api/dashboard/stats")
-async def get_dashboard_stats():
+@app.get("/api/dashboard/stats", response_model=schemas.DashboardStats)
+async def get_dashboard_stats(owner: models.User = Depends(get_owner), storage: Storage = Depends(get_storage)):
     """Get dashboard statistics"""
-    return {
-        "total_instances": 2,
-        "active_instances": 1,
-        "total_messages": 156,
-        "messages_today": 23,
-        "total_campaigns": 5,
-        "active_campaigns": 2,
-        "total_revenue": 1250.00,
-        "monthly_revenue": 340.00
-    }
+    return await UserService.get_dashboard_stats(storage, owner.id)
 
 # WhatsApp instances endpoints
 @app.get("/api/instances")
-async def get_instances():
-    """Get WhatsApp instances"""
-    return [
-        {
-            "id": "1",
-            "name": "Instância Principal",
-            "phone": "+55 11 99999-9999",
-            "status": "connected",
-            "qr_code": None,
-            "created_at": "2024-01-15T10:30:00Z"
-        },
-        {
-            "id": "2", 
-            "name": "Instância Suporte",
-            "phone": "+55 11 88888-8888",
-            "status": "disconnected",
-            "qr_code": "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg==",
-            "created_at": "2024-01-16T14:20:00Z"
-        }
-    ]
+async def get_instances(
+    response: Response,
+    status: Optional[models.InstanceStatus] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    owner: models.User = Depends(get_owner),
+    storage: Storage = Depends(get_storage)
+):
+    """Get WhatsApp instances, newest first"""
+    instances = await storage.instances.list_for_user(owner.id)
+    if status:
+        instances = [instance for instance in instances if instance.status == status]
+    return paginated(
+        response, instances, lambda instance: instance.created_at, limit, cursor,
+        dump(schemas.WhatsAppInstanceResponse)
+    )
 
-@app.post("/api/instances")
-async def create_instance(instance_data: dict):
+@app.post("/api/instances", response_model=schemas.WhatsAppInstanceResponse)
+async def create_instance(
+    instance_data: dict,
+    owner: models.User = Depends(get_owner),
+    storage: Storage = Depends(get_storage)
+):
     """Create new WhatsApp instance"""
-    return {
-        "id": "3",
-        "name": instance_data.get("name", "Nova Instância"),
-        "phone": None,
-        "status": "connecting",
-        "qr_code": "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg==",
-        "created_at": datetime.now().isoformat()
-    }
+    instance = await storage.instances.add(
+        user_id=owner.id,
+        name=instance_data.get("name") or "Nova Instância",
+        session_id=f"demo_{uuid.uuid4().hex}",
+        status=models.InstanceStatus.PENDING
+    )
+    await storage.commit()
+    return instance
 
 # Messages endpoints
 @app.get("/api/messages")
-async def get_messages():
-    """Get messages"""
-    return [
-        {
-            "id": "1",
-            "instance_id": "1",
-            "contact_name": "João Silva",
-            "contact_phone": "+55 11 77777-7777",
-            "message": "Olá! Gostaria de saber mais sobre os produtos.",
-            "type": "received",
-            "timestamp": "2024-01-17T09:15:00Z"
-        },
-        {
-            "id": "2",
-            "instance_id": "1", 
-            "contact_name": "Maria Santos",
-            "contact_phone": "+55 11 66666-6666",
-            "message": "Obrigado pelo atendimento!",
-            "type": "received",
-            "timestamp": "2024-01-17T08:30:00Z"
+async def get_messages(
+    response: Response,
+    instance_id: Optional[str] = None,
+    contact_phone: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    owner: models.User = Depends(get_owner),
+    storage: Storage = Depends(get_storage)
+):
+    """Get messages, newest first"""
+    instance = parse_id(instance_id, "instance_id") if instance_id else None
+    phone = normalize_phone(contact_phone) if contact_phone else None
+    messages, contacts = [], {}
+    for conversation in await storage.conversations.list_for_user(owner.id, instance):
+        if phone and conversation.contact.phone != phone:
+            continue
+        for message in conversation.messages:
+            messages.append(message)
+            contacts[message.id] = conversation.contact
+
+    def serialize(message):
+        contact = contacts[message.id]
+        return {
+            **schemas.MessageResponse.model_validate(message).model_dump(mode="json"),
+            "contact_phone": contact.phone,
+            "contact_name": contact.name,
         }
-    ]
 
-@app.post("/api/messages/send")
-async def send_message(message_data: dict):
-    """Send message"""
-    return {
-        "id": "3",
-        "instance_id": message_data.get("instance_id"),
-        "contact_phone": message_data.get("to"),
-        "message": message_data.get("message"),
-        "type": "sent",
-        "status": "sent",
-        "timestamp": datetime.now().isoformat()
-    }
+    return paginated(response, messages, lambda message: message.timestamp, limit, cursor, serialize)
+
+@app.post("/api/messages/send", response_model=schemas.MessageResponse)
+async def send_message(
+    message_data: dict,
+    owner: models.User = Depends(get_owner),
+    storage: Storage = Depends(get_storage)
+):
+    """Record an outgoing message (the demo server doesn't reach WhatsApp)"""
+    instance = await storage.instances.get(parse_id(message_data.get("instance_id"), "instance_id"), owner.id)
+    if instance is None:
+        raise HTTPException(status_code=404, detail="Instance not found")
+    phone = normalize_phone(message_data.get("to"))
+    if phone is None:
+        raise HTTPException(status_code=400, detail=f"Invalid phone: {message_data.get('to')}")
+
+    now = datetime.now(timezone.utc)
+    conversation_ids = await storage.conversations.get_or_create_for_phones(owner.id, instance.id, [phone])
+    message = await storage.messages.add(
+        conversation_id=conversation_ids[phone],
+        instance_id=instance.id,
+        content=message_data.get("message") or "",
+        is_from_me=True,
+        status=models.MessageStatus.SENT,
+        timestamp=now
+    )
+    await storage.conversations.record_activity(conversation_ids[phone], at=now)
+    await storage.commit()
+    return message
 
 # Campaigns endpoints
 @app.get("/api/campaigns")
-async def get_campaigns():
-    """Get campaigns"""
-    return [
-        {
-            "id": "1",
-            "name": "Promoção Verão 2024",
-            "message": "🌞 Aproveite nossa promoção de verão! Descontos de até 50%",
-            "status": "active",
-            "sent_count": 120,
-            "total_contacts": 150,
-            "created_at": "2024-01-10T14:00:00Z"
-        },
-        {
-            "id": "2",
-            "name": "Lançamento Produto",
-            "message": "🚀 Conheça nosso novo produto! Acesse nosso site.",
-            "status": "completed",
-            "sent_count": 85,
-            "total_contacts": 85,
-            "created_at": "2024-01-05T10:00:00Z"
-        }
-    ]
+async def get_campaigns(
+    response: Response,
+    status: Optional[models.CampaignStatus] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    owner: models.User = Depends(get_owner),
+    storage: Storage = Depends(get_storage)
+):
+    """Get campaigns, newest first"""
+    campaigns = await storage.campaigns.list_for_user(owner.id)
+    if status:
+        campaigns = [campaign for campaign in campaigns if campaign.status == status]
+    return paginated(
+        response, campaigns, lambda campaign: campaign.created_at, limit, cursor, dump(schemas.CampaignResponse)
+    )
 
-@app.post("/api/campaigns")
-async def create_campaign(campaign_data: dict):
+@app.post("/api/campaigns", response_model=schemas.CampaignResponse)
+async def create_campaign(
+    campaign_data: dict,
+    owner: models.User = Depends(get_owner),
+    storage: Storage = Depends(get_storage)
+):
     """Create new campaign"""
-    return {
-        "id": "3",
-        "name": campaign_data.get("name"),
-        "message": campaign_data.get("message"),
-        "status": "draft",
-        "sent_count": 0,
-        "total_contacts": 0,
-        "created_at": datetime.now().isoformat()
-    }
+    instance = await storage.instances.get(parse_id(campaign_data.get("instance_id"), "instance_id"), owner.id)
+    if instance is None:
+        raise HTTPException(status_code=404, detail="Instance not found")
+    contacts = [phone for phone in map(normalize_phone, campaign_data.get("contacts") or []) if phone]
+    campaign = await storage.campaigns.add(
+        user_id=owner.id,
+        instance_id=instance.id,
+        name=campaign_data.get("name") or "Nova Campanha",
+        message_template=campaign_data.get("message") or "",
+        target_contacts=list(dict.fromkeys(contacts)),
+        status=models.CampaignStatus.DRAFT
+    )
+    await storage.commit()
+    return campaign
 
 # Finance endpoints
 @app.get("/api/finances")
-async def get_finances():
-    """Get financial data"""
+async def get_finances(
+    response: Response,
+    type: Optional[str] = None,
+    category: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    owner: models.User = Depends(get_owner),
+    storage: Storage = Depends(get_storage)
+):
+    """Get financial entries, most recent date first"""
+    entries = await storage.finances.list_for_user(owner.id, entry_type=type if type in ("income", "expense") else None)
+    if category:
+        entries = [entry for entry in entries if entry.category == category]
+    return paginated(response, entries, lambda entry: entry.date, limit, cursor, dump(schemas.FinanceEntryResponse))
+
+@app.post("/api/finances", response_model=schemas.FinanceEntryResponse)
+async def create_finance_entry(
+    entry_data: dict,
+    owner: models.User = Depends(get_owner),
+    storage: Storage = Depends(get_storage)
+):
+    """Create a financial entry"""
+    entry_type = entry_data.get("type", "income")
+    if entry_type not in ("income", "expense"):
+        raise HTTPException(status_code=400, detail=f"Invalid type: {entry_type}")
+    entry = await storage.finances.add(
+        user_id=owner.id,
+        description=entry_data.get("description") or "",
+        amount=float(entry_data.get("amount", 0)),
+        entry_type=entry_type,
+        date=parse_date(entry_data.get("date"), datetime.now(timezone.utc)),
+        category=entry_data.get("category")
+    )
+    await storage.commit()
+    return entry
+
+@app.get("/api/finances/summary")
+async def get_finance_summary(
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to"),
+    owner: models.User = Depends(get_owner),
+    storage: Storage = Depends(get_storage)
+):
+    """Income, expenses and balance per month (current year by default)"""
+    now = datetime.now(timezone.utc)
+    start_date = parse_date(start, datetime(now.year, 1, 1, tzinfo=timezone.utc))
+    end_date = parse_date(end, datetime(now.year + 1, 1, 1, tzinfo=timezone.utc))
+
+    months = {}
+    for entry in await storage.finances.list_for_user(owner.id):
+        date = entry.date if entry.date.tzinfo else entry.date.replace(tzinfo=timezone.utc)
+        if not start_date <= date < end_date:
+            continue
+        month = months.setdefault(f"{date:%Y-%m}", {"income": 0.0, "expenses": 0.0, "entries": 0, "categories": {}})
+        category = month["categories"].setdefault(entry.category, {"category": entry.category, "income": 0.0, "expenses": 0.0})
+        column = "income" if entry.entry_type == "income" else "expenses"
+        month[column] += abs(entry.amount) if column == "expenses" else entry.amount
+        category[column] += abs(entry.amount) if column == "expenses" else entry.amount
+        month["entries"] += 1
     return [
         {
-            "id": "1",
-            "description": "Assinatura Mensal",
-            "amount": 99.90,
-            "type": "income",
-            "date": "2024-01-15",
-            "category": "subscription"
-        },
-        {
-            "id": "2",
-            "description": "Mensagens SMS",
-            "amount": -25.50,
-            "type": "expense", 
-            "date": "2024-01-14",
-            "category": "messaging"
+            "month": name,
+            "income": month["income"],
+            "expenses": month["expenses"],
+            "balance": month["income"] - month["expenses"],
+            "entries": month["entries"],
+            "categories": list(month["categories"].values()),
         }
+        for name, month in sorted(months.items())
     ]
 
 # Frontend route
@@ -280,7 +436,7 @@ async def read_root(request: Request):
             return templates.TemplateResponse("index.html", {"request": request})
         raise RuntimeError("Templates directory not available")
     except Exception as e:
-        logger.error(f"Error rendering template: {e}")
+        logger.error("Error rendering template: %s", e)
         # Fallback HTML interface
         return HTMLResponse("""
         <!DOCTYPE html>
@@ -1,6 +1,6 @@
 const express = require('express');
 const cors = require('cors');
-const { makeWASocket, DisconnectReason, useMultiFileAuthState, makeInMemoryStore } = require('@whiskeysockets/baileys');
+const { makeWASocket, DisconnectReason, useMultiFileAuthState, makeInMemoryStore, downloadMediaMessage } = require('@whiskeysockets/baileys');
 const QRCode = require('qrcode');
 const axios = require('axios');
 const fs = require('fs-extra');
@@ -23,11 +23,29 @@ const logger = pino({ level: 'info' });
 const connections = new Map();
 const qrCodes = new Map();
 
+// W3C trace context of the backend call that sent each message, so its
+// receipts can be reported in the same trace (oldest entries evicted first)
+const MAX_MESSAGE_TRACES = 10000;
+const messageTraces = new Map();
+
+function rememberTrace(messageId, traceparent) {
+    if (!traceparent) return;
+    messageTraces.set(messageId, traceparent);
+    if (messageTraces.size > MAX_MESSAGE_TRACES) {
+        messageTraces.delete(messageTraces.keys().next().value);
+    }
+}
+
+// Webhook request options: continue the backend's trace when there is one
+function traceHeaders(traceparent) {
+    return traceparent ? { headers: { traceparent } } : {};
+}
+
 // Ensure sessions directory exists
 fs.ensureDirSync(SESSION_PATH);
 
 // Create WhatsApp connection
-async function createConnection(sessionId, webhookUrl = null) {
+async function createConnection(sessionId, webhookUrl = null, traceparent = null) {
     try {
         const sessionPath = path.join(SESSION_PATH, sessionId);
         await fs.ensureDir(sessionPath);
@@ -46,6 +64,7 @@ async function createConnection(sessionId, webhookUrl = null) {
         connections.set(sessionId, {
             socket: sock,
             webhookUrl,
+            traceparent,
             status: 'connecting',
             phone: null,
             lastSeen: new Date(),
@@ -67,7 +86,8 @@ async function createConnection(sessionId, webhookUrl = null) {
                                 type: 'qr_code',
                                 sessionId,
                                 qrCode,
-                            });
+                                traceparent,
+                            }, traceHeaders(traceparent));
                         } catch (error) {
                             logger.error('Failed to send QR webhook:', error.message);
                         }
@@ -79,10 +99,27 @@ async function createConnection(sessionId, webhookUrl = null) {
 
             if (connection === 'close') {
                 const shouldReconnect = (lastDisconnect?.error)?.output?.statusCode !== DisconnectReason.loggedOut;
+
+                const conn = connections.get(sessionId);
+                if (conn) conn.status = 'disconnected';
+
+                // Notify backend so campaigns stop routing through this number
+                if (webhookUrl) {
+                    try {
+                        await axios.post(webhookUrl, {
+                            type: 'disconnected',
+                            sessionId,
+                            willReconnect: shouldReconnect,
+                            traceparent,
+                        }, traceHeaders(traceparent));
+                    } catch (error) {
+                        logger.error('Failed to send disconnection webhook:', error.message);
+                    }
+                }
                 
                 if (shouldReconnect) {
                     logger.info(`Reconnecting session ${sessionId}...`);
-                    setTimeout(() => createConnection(sessionId, webhookUrl), 3000);
+                    setTimeout(() => createConnection(sessionId, webhookUrl, traceparent), 3000);
                 } else {
                     logger.info(`Session ${sessionId} logged out`);
                     connections.delete(sessionId);
@@ -107,7 +144,8 @@ async function createConnection(sessionId, webhookUrl = null) {
                             type: 'connected',
                             sessionId,
                             phone: sock.user?.id?.split('@')[0] || sock.user?.id,
-                        });
+                            traceparent,
+                        }, traceHeaders(traceparent));
                     } catch (error) {
                         logger.error('Failed to send connection webhook:', error);
                     }
@@ -126,6 +164,13 @@ async function createConnection(sessionId, webhookUrl = null) {
             const conn = connections.get(sessionId);
             if (conn && conn.webhookUrl) {
                 try {
+                    const messageType = getMessageType(message);
+                    const media = MEDIA_TYPES.includes(messageType)
+                        ? message.message[`${messageType}Message`]
+                        : null;
+                    // Media is streamed to the backend first and referenced by URL
+                    const mediaUrl = media ? await forwardMedia(sock, message, media, conn.webhookUrl) : null;
+
                     await axios.post(conn.webhookUrl, {
                         type: 'message',
                         sessionId,
@@ -133,9 +178,11 @@ async function createConnection(sessionId, webhookUrl = null) {
                             id: message.key.id,
                             from: message.key.remoteJid,
                             content: message.message?.conversation || 
-                                    message.message?.extendedTextMessage?.text || '',
+                                    message.message?.extendedTextMessage?.text ||
+                                    media?.caption || '',
                             timestamp: message.messageTimestamp,
-                            messageType: getMessageType(message),
+                            messageType,
+                            mediaUrl,
                         }
                     });
                 } catch (error) {
@@ -144,6 +191,34 @@ async function createConnection(sessionId, webhookUrl = null) {
             }
         });
 
+        // Forward delivery/read receipts for messages we sent
+        sock.ev.on('messages.update', async (updates) => {
+            const conn = connections.get(sessionId);
+            if (!conn || !conn.webhookUrl) return;
+
+            const receipts = updates
+                .filter(({ key, update }) => key.fromMe && update.status !== undefined)
+                .map(({ key, update }) => ({
+                    id: key.id,
+                    to: key.remoteJid,
+                    status: getReceiptStatus(update.status),
+                    traceparent: messageTraces.get(key.id),
+                }))
+                .filter((receipt) => receipt.status);
+
+            if (receipts.length === 0) return;
+
+            try {
+                await axios.post(conn.webhookUrl, {
+                    type: 'receipts',
+                    sessionId,
+                    receipts,
+                });
+            } catch (error) {
+                logger.error('Failed to send receipts webhook:', error.message);
+            }
+        });
+
         return sock;
     } catch (error) {
         logger.error(`Failed to create connection for ${sessionId}:`, error);
@@ -151,6 +226,50 @@ async function createConnection(sessionId, webhookUrl = null) {
     }
 }
 
+const MEDIA_TYPES = ['image', 'video', 'audio', 'document'];
+
+// Pipe an incoming message's media from WhatsApp to the backend without
+// holding it in memory; returns the backend's URL for it (null on failure)
+async function forwardMedia(sock, message, media, webhookUrl) {
+    try {
+        const stream = await downloadMediaMessage(
+            message,
+            'stream',
+            {},
+            { logger, reuploadRequest: sock.updateMediaMessage }
+        );
+        const headers = { 'Content-Type': media.mimetype || 'application/octet-stream' };
+        if (media.fileLength) {
+            headers['Content-Length'] = String(media.fileLength);
+        }
+        const response = await axios.post(`${webhookUrl}/media`, stream, {
+            headers,
+            maxBodyLength: Infinity,
+            maxContentLength: Infinity,
+        });
+        return response.data.url;
+    } catch (error) {
+        logger.error('Failed to forward media:', error.message);
+        return null;
+    }
+}
+
+// Baileys message content for a media send; Baileys fetches `url` itself
+function mediaContent(messageType, { mediaUrl, mimetype, fileName, message }) {
+    const media = { url: mediaUrl };
+    switch (messageType) {
+        case 'image':
+        case 'video':
+            return { [messageType]: media, mimetype, caption: message || undefined };
+        case 'audio':
+            return { audio: media, mimetype };
+        case 'document':
+            return { document: media, mimetype, fileName, caption: message || undefined };
+        default:
+            return null;
+    }
+}
+
 // Get message type
 function getMessageType(message) {
     if (message.message?.conversation) return 'text';
@@ -162,10 +281,22 @@ function getMessageType(message) {
     return 'unknown';
 }
 
+// Map proto.WebMessageInfo.Status to the backend's receipt statuses
+function getReceiptStatus(status) {
+    switch (status) {
+        case 0: return 'failed';     // ERROR
+        case 3: return 'delivered';  // DELIVERY_ACK
+        case 4:                      // READ
+        case 5: return 'read';       // PLAYED
+        default: return null;        // PENDING / SERVER_ACK carry no news
+    }
+}
+
 // Routes
 app.post('/create-session', async (req, res) => {
     try {
         const { sessionId, webhookUrl } = req.body;
+        const traceparent = req.get('traceparent') || null;
         
         if (!sessionId) {
             return res.status(400).json({ error: 'sessionId is required' });
@@ -175,7 +306,7 @@ app.post('/create-session', async (req, res) => {
             return res.status(400).json({ error: 'Session already exists' });
         }
 
-        await createConnection(sessionId, webhookUrl);
+        await createConnection(sessionId, webhookUrl, traceparent);
 
         res.json({
             success: true,
@@ -217,7 +348,7 @@ app.get('/status/:sessionId', (req, res) => {
 
 app.post('/send-message', async (req, res) => {
     try {
-        const { sessionId, to, message, messageType = 'text' } = req.body;
+        const { sessionId, to, message, messageType = 'text', mediaUrl } = req.body;
         
         const connection = connections.get(sessionId);
         if (!connection || connection.status !== 'connected') {
@@ -231,10 +362,22 @@ app.post('/send-message', async (req, res) => {
             case 'text':
                 result = await connection.socket.sendMessage(jid, { text: message });
                 break;
+            case 'image':
+            case 'video':
+            case 'audio':
+            case 'document':
+                // Media comes by reference (a backend URL), never inline in the JSON body
+                if (!mediaUrl) {
+                    return res.status(400).json({ error: 'mediaUrl is required for media messages' });
+                }
+                result = await connection.socket.sendMessage(jid, mediaContent(messageType, req.body));
+                break;
             default:
                 return res.status(400).json({ error: 'Unsupported message type' });
         }
 
+        rememberTrace(result.key.id, req.get('traceparent'));
+
         res.json({
             success: true,
             messageId: result.key.id,
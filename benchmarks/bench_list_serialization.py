@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Benchmark: CPU per 1,000 rows on list endpoints, ORM + pydantic vs fast path
+
+Calls the real endpoint functions (get_campaigns, get_finance_entries,
+get_groups, get_conversations) for the seeded user with the most rows, once
+with ``fast_list_responses`` off (ORM objects, response_model validation,
+stdlib json) and once with it on (row tuples, orjson), and reports process
+CPU time per 1,000 rows including the response encoding. Needs a database
+seeded with scripts/seed_data.py.
+
+``--synthetic`` skips the database: it builds transient ORM objects and the
+equivalent row tuples in memory and measures validation + encoding only.
+
+    python benchmarks/bench_list_serialization.py --repeat 5
+    python benchmarks/bench_list_serialization.py --synthetic --rows 10000
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import select, func, desc
+
+from config import settings
+from database import AsyncSessionLocal
+from storage.postgres import PostgresStorage
+from services.fast_json import FastJSONResponse, row_columns
+from routers import campaigns, finances, groups, messages
+import models
+import schemas
+
+ENDPOINTS = {
+    "get_campaigns": (campaigns.get_campaigns, models.Campaign, schemas.CampaignResponse, {"validators": {}}),
+    "get_finance_entries": (
+        finances.get_finance_entries, models.FinanceEntry, schemas.FinanceEntryResponse,
+        {"year": None, "month": None, "entry_type": None, "validators": {}}
+    ),
+    "get_groups": (groups.get_groups, models.Group, schemas.GroupResponse, {"validators": {}}),
+    "get_conversations": (messages.get_conversations, models.Conversation, schemas.ConversationResponse, {"instance_id": None}),
+}
+
+async def encode_orm(objects, schema) -> bytes:
+    """What FastAPI does with a returned ORM list and a response_model"""
+    field = create_response_field(name="response", type_=List[schema])
+    content = await serialize_response(field=field, response_content=objects, is_coroutine=True)
+    return JSONResponse(content).body
+
+async def busiest_user(model):
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(model.user_id, func.count()).group_by(model.user_id).order_by(desc(func.count())).limit(1)
+        )
+        row = result.first()
+        return (row[0], row[1]) if row else (None, 0)
+
+async def measure(endpoint, schema, kwargs, user, fast: bool, repeat: int):
+    settings.fast_list_responses = fast
+    cpu = 0.0
+    size = 0
+    for _ in range(repeat):
+        # A fresh session per call, like a request
+        async with AsyncSessionLocal() as db:
+            started = time.process_time()
+            response = await endpoint(current_user=user, storage=PostgresStorage(db), **kwargs)
+            body = response.body if isinstance(response, FastJSONResponse) else await encode_orm(response, schema)
+            cpu += time.process_time() - started
+            size = len(body)
+    return cpu / repeat, size
+
+async def run_database(repeat: int):
+    results = {}
+    for name, (endpoint, model, schema, kwargs) in ENDPOINTS.items():
+        user_id, rows = await busiest_user(model)
+        if not rows:
+            continue
+        user = SimpleNamespace(id=user_id)
+        await measure(endpoint, schema, kwargs, user, False, 1)  # warm up caches and the pool
+        orm_cpu, orm_size = await measure(endpoint, schema, kwargs, user, False, repeat)
+        fast_cpu, fast_size = await measure(endpoint, schema, kwargs, user, True, repeat)
+        results[name] = report(rows, orm_cpu, fast_cpu, orm_size, fast_size)
+    return results
+
+def report(rows, orm_cpu, fast_cpu, orm_size, fast_size):
+    return {
+        "rows": rows,
+        "orm_cpu_ms_per_1000_rows": round(orm_cpu / rows * 1e6, 2),
+        "fast_cpu_ms_per_1000_rows": round(fast_cpu / rows * 1e6, 2),
+        "speedup": round(orm_cpu / fast_cpu, 1) if fast_cpu else None,
+        "orm_bytes": orm_size,
+        "fast_bytes": fast_size,
+    }
+
+def synthetic_campaign(index: int, now: datetime):
+    return dict(
+        id=uuid.uuid4(), user_id=uuid.uuid4(), instance_id=uuid.uuid4(), instance_pool=[str(uuid.uuid4())],
+        name=f"Campanha {index}", description="Promoção de fim de semana", message_template="Olá {nome}!",
+        target_contacts=[f"55119{index:08d}", f"55219{index:08d}"], status=models.CampaignStatus.COMPLETED,
+        scheduled_at=None, sent_count=index, delivered_count=index, failed_count=0,
+        created_at=now - timedelta(minutes=index)
+    )
+
+async def run_synthetic(rows: int, repeat: int):
+    now = datetime.now(timezone.utc)
+    values = [synthetic_campaign(index, now) for index in range(rows)]
+    keys = [column.key for column in row_columns(models.Campaign, schemas.CampaignResponse)]
+    tuples = [tuple(value[key] for key in keys) for value in values]
+
+    orm_cpu = fast_cpu = 0.0
+    for _ in range(repeat):
+        started = time.process_time()
+        objects = [models.Campaign(**value) for value in values]
+        orm_body = await encode_orm(objects, schemas.CampaignResponse)
+        orm_cpu += time.process_time() - started
+
+        started = time.process_time()
+        fast_body = FastJSONResponse([dict(zip(keys, row)) for row in tuples]).body
+        fast_cpu += time.process_time() - started
+    return {"campaigns (synthetic)": report(rows, orm_cpu / repeat, fast_cpu / repeat, len(orm_body), len(fast_body))}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--synthetic", action="store_true", help="in-memory rows, no database")
+    parser.add_argument("--rows", type=int, default=10000, help="rows for --synthetic")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        results = asyncio.run(run_synthetic(args.rows, args.repeat))
+    else:
+        results = asyncio.run(run_database(args.repeat))
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
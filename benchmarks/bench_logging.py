@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cost of a log call on the event loop, synchronous vs queued
+
+Emits webhook-style records from a coroutine, once through a plain
+StreamHandler and once through services/structured_logging.py, into a sink
+that takes ``--write-ms`` per write (a slow pipe or a busy log collector).
+Prints per-call latency percentiles as JSON.
+
+    python benchmarks/bench_logging.py --records 20000 --write-ms 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services import structured_logging
+from services.structured_logging import JSONFormatter, bind_instance, configure_logging, shutdown_logging
+
+class SlowSink:
+    """File-like object whose writes block for a fixed time"""
+
+    def __init__(self, write_ms: float):
+        self.delay = write_ms / 1000
+        self.lines = 0
+
+    def write(self, text: str):
+        time.sleep(self.delay)
+        self.lines += 1
+
+    def flush(self):
+        pass
+
+async def emit(records: int):
+    logger = logging.getLogger("routers.webhooks")
+    bind_instance("0b7c5a52-3f4e-4f7a-9d7e-1c2b3a4d5e6f")
+    latencies = []
+    for index in range(records):
+        started = time.perf_counter()
+        logger.info("Processed incoming message", extra={"conversation_id": index})
+        latencies.append(time.perf_counter() - started)
+        if index % 100 == 0:
+            await asyncio.sleep(0)
+    return latencies
+
+def summarize(latencies):
+    ordered = sorted(latencies)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1e6, 1)
+    return {"p50_us": pick(0.50), "p99_us": pick(0.99), "max_us": round(ordered[-1] * 1e6, 1),
+            "total_ms": round(sum(latencies) * 1000, 1)}
+
+def run_sync(records: int, write_ms: float):
+    sink = SlowSink(write_ms)
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(JSONFormatter())
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(logging.INFO)
+    return summarize(asyncio.run(emit(records)))
+
+def run_queued(records: int, write_ms: float):
+    sink = SlowSink(write_ms)
+    configure_logging(level="INFO", json_format=True, sampling={})
+    structured_logging._listener.handlers[0].setStream(sink)
+    result = summarize(asyncio.run(emit(records)))
+    started = time.perf_counter()
+    shutdown_logging()
+    result["drain_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    result["written"] = sink.lines
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--write-ms", type=float, default=0.05)
+    args = parser.parse_args()
+
+    print(json.dumps({
+        "records": args.records,
+        "write_ms": args.write_ms,
+        "sync": run_sync(args.records, args.write_ms),
+        "queued": run_queued(args.records, args.write_ms),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
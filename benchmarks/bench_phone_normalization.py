@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: normalize 1M phone numbers in mixed formats
+
+Compares the array-at-a-time normalizer with a per-string regex loop and
+prints the results as JSON.
+
+    python benchmarks/bench_phone_normalization.py --count 1000000
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services.phone_normalizer import normalize_phones
+
+FORMATS = [
+    lambda ddd, n: f"+55 ({ddd}) 9{n[:4]}-{n[4:]}",
+    lambda ddd, n: f"0{ddd} 9{n[:4]} {n[4:]}",
+    lambda ddd, n: f"{ddd}9{n}",
+    lambda ddd, n: f"55{ddd}9{n}@s.whatsapp.net",
+    lambda ddd, n: f"0055{ddd}9{n}",
+    lambda ddd, n: f"({ddd}) {n[:4]}-{n[4:]}",
+    lambda ddd, n: "invalid",
+]
+
+def generate(count: int, seed: int):
+    rng = random.Random(seed)
+    phones = []
+    for _ in range(count):
+        ddd = str(rng.randint(11, 99))
+        number = f"{rng.randint(0, 99999999):08d}"
+        phones.append(rng.choice(FORMATS)(ddd, number))
+    return phones
+
+NON_DIGITS = re.compile(r"\D")
+
+def normalize_loop(phones, country_code="55"):
+    """Reference implementation: one regex call per number"""
+    results = []
+    for phone in phones:
+        phone = phone.split("@")[0].split(":")[0]
+        plus = phone.lstrip().startswith("+")
+        digits = NON_DIGITS.sub("", phone)
+        if not plus and digits.startswith("00"):
+            digits, plus = digits[2:], True
+        elif not plus and digits.startswith("0"):
+            digits = digits[1:]
+        if not plus and len(digits) <= 11:
+            digits = country_code + digits
+        results.append(digits if 8 <= len(digits) <= 15 and not digits.startswith("0") else None)
+    return results
+
+def timed(func, phones, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(phones)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    phones = generate(args.count, args.seed)
+    vectorized = timed(normalize_phones, phones, args.repeat)
+    loop = timed(normalize_loop, phones, args.repeat)
+
+    print(json.dumps({
+        "benchmark": "phone_normalization",
+        "count": args.count,
+        "vectorized_seconds": round(vectorized, 4),
+        "loop_seconds": round(loop, 4),
+        "vectorized_numbers_per_second": round(args.count / vectorized),
+        "speedup": round(loop / vectorized, 2),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
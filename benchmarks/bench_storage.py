@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the storage backends against each other on one workload
+
+Runs the same sequence of repository calls (conversation fan-out, message
+inserts, unread counters, conversation listing, receipts, export) against
+every backend that is reachable from here and prints wall time per
+operation, so the backend can be picked per deployment. The in-memory
+backend always runs; Postgres (DATABASE_URL, migrated) and MongoDB
+(MONGO_URL) are skipped when they can't be reached. Creates and removes its
+own rows.
+
+    python benchmarks/bench_storage.py --conversations 500 --messages 20
+    python benchmarks/bench_storage.py --backends memory,mongo
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from uuid import uuid4
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config import settings
+from storage.provider import BACKENDS
+import models
+import schemas
+
+def make_backend(name: str):
+    if name == "postgres":
+        from storage.postgres import PostgresBackend
+        return PostgresBackend()
+    if name == "mongo":
+        from storage.mongo import MongoBackend
+        return MongoBackend(settings.mongo_url, settings.mongo_db_name)
+    from storage.memory import MemoryBackend
+    return MemoryBackend()
+
+class Timings(dict):
+    @asynccontextmanager
+    async def measure(self, operation: str):
+        started = time.perf_counter()
+        yield
+        self[operation] = round((time.perf_counter() - started) * 1000, 1)
+
+async def workload(backend, conversations: int, messages: int, timings: Timings):
+    suffix = uuid4().hex[:8]
+    phones = [f"5511{suffix[:4]}{index:05d}" for index in range(conversations)]
+    base = datetime.now(timezone.utc) - timedelta(days=1)
+
+    async with backend.session() as storage:
+        user = await storage.users.add(name="Storage bench", username=f"bench_{suffix}", password_hash="-")
+        instance = await storage.instances.add(user_id=user.id, name="Storage bench", session_id=f"bench_{suffix}")
+        await storage.commit()
+
+    try:
+        async with timings.measure("get_or_create_for_phones"), backend.session() as storage:
+            resolved = await storage.conversations.get_or_create_for_phones(user.id, instance.id, phones)
+            await storage.commit()
+
+        rows = [
+            {
+                "conversation_id": conversation_id,
+                "instance_id": instance.id,
+                "whatsapp_message_id": f"{suffix}-{phone}-{index}",
+                "content": "Olá!",
+                "message_type": "text",
+                "is_from_me": index % 2 == 0,
+                "status": models.MessageStatus.SENT,
+                "timestamp": base + timedelta(seconds=index),
+            }
+            for phone, conversation_id in resolved.items()
+            for index in range(messages)
+        ]
+        async with timings.measure("messages.add_many"), backend.session() as storage:
+            await storage.messages.add_many(rows)
+            await storage.commit()
+
+        async with timings.measure("record_activity_many"), backend.session() as storage:
+            await storage.conversations.record_activity_many(
+                [(conversation_id, messages // 2, base + timedelta(seconds=messages)) for conversation_id in resolved.values()]
+            )
+            await storage.commit()
+
+        async with timings.measure("record_activity x100"), backend.session() as storage:
+            first = next(iter(resolved.values()))
+            for index in range(100):
+                await storage.conversations.record_activity(first, unread=1, at=base + timedelta(seconds=index))
+            await storage.commit()
+
+        async with timings.measure("conversations.list_for_user"), backend.session() as storage:
+            listed = await storage.conversations.list_for_user(user.id)
+
+        async with timings.measure("conversations.list_rows"), backend.session() as storage:
+            await storage.conversations.list_rows(schemas.ConversationResponse, user.id)
+
+        async with timings.measure("conversations.get x100"), backend.session() as storage:
+            for conversation in listed[:100]:
+                await storage.conversations.get(conversation.id, user.id, with_messages=True)
+
+        async with timings.measure("unread_total"), backend.session() as storage:
+            unread = await storage.conversations.unread_total(user.id)
+
+        receipts = {row["whatsapp_message_id"]: models.MessageStatus.DELIVERED for row in rows[::2]}
+        async with timings.measure("messages.apply_receipts"), backend.session() as storage:
+            matched, _ = await storage.messages.apply_receipts(receipts)
+            await storage.commit()
+
+        exported = 0
+        async with timings.measure("messages.export_page"), backend.session() as storage:
+            after = None
+            while page := await storage.messages.export_page(user.id, None, None, None, after, 1000):
+                exported += len(page)
+                after = (page[-1]["timestamp"], page[-1]["id"])
+
+        checks = {
+            "conversations": len(listed) == conversations,
+            "unread_total": unread == conversations * (messages // 2) + 100,
+            "receipts_matched": len(matched) == len(receipts),
+            "exported": exported == len(rows),
+        }
+    finally:
+        async with backend.session() as storage:
+            await storage.users.delete(await storage.users.get(user.id))
+            for phone in phones:
+                contact = await storage.contacts.get_by_phone(phone)
+                if contact is not None:
+                    await storage.contacts.delete(contact)
+            await storage.commit()
+    return checks
+
+async def run(name: str, conversations: int, messages: int):
+    backend = make_backend(name)
+    try:
+        await asyncio.wait_for(backend.start(), timeout=10)
+    except Exception as e:
+        return {"skipped": f"{type(e).__name__}: {e}"}
+    timings = Timings()
+    try:
+        checks = await workload(backend, conversations, messages, timings)
+    finally:
+        await backend.close()
+    return {"ms": dict(timings), "total_ms": round(sum(timings.values()), 1), "checks": checks}
+
+async def main(backends, conversations: int, messages: int):
+    results = {}
+    for name in backends:
+        try:
+            results[name] = await run(name, conversations, messages)
+        except ImportError as e:
+            results[name] = {"skipped": f"driver not installed: {e.name}"}
+    print(json.dumps(results, indent=2))
+    if any(not all(result.get("checks", {}).values()) for result in results.values()):
+        print("A backend returned unexpected results")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--conversations", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=20, help="messages per conversation")
+    args = parser.parse_args()
+    asyncio.run(main(args.backends.split(","), args.conversations, args.messages))
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark: event loop lag while thumbnails render, inline vs process pool
+
+Stores ``--images`` distinct photos in a temporary media store, then renders
+their thumbnails twice while a timer task measures how late the event loop
+runs it: once inline on the loop (what an endpoint calling Pillow directly
+would do) and once through ``services.thumbnails`` with all requests at
+once, so the backlog limit and ``thumbnail_wait`` apply. Reports wall time,
+loop lag and how many requests got the placeholder, as JSON.
+
+    python benchmarks/bench_thumbnails.py --images 40 --size 3000x2000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+TICK = 0.01
+
+async def measure_lag(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - started - TICK)
+
+def photo(width: int, height: int, seed: int) -> bytes:
+    """A noisy JPEG, so the encoder and decoder do real work"""
+    from PIL import Image
+
+    rng = random.Random(seed)
+    small = Image.frombytes("RGB", (64, 48), bytes(rng.getrandbits(8) for _ in range(64 * 48 * 3)))
+    buffer = BytesIO()
+    small.resize((width, height), Image.Resampling.BICUBIC).save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+def lag_summary(lags: list) -> dict:
+    lags = sorted(lags) or [0.0]
+    return {
+        "p50_ms": round(lags[len(lags) // 2] * 1000, 2),
+        "p99_ms": round(lags[min(len(lags) - 1, int(len(lags) * 0.99))] * 1000, 2),
+        "max_ms": round(lags[-1] * 1000, 2),
+    }
+
+async def timed(run) -> dict:
+    stop, lags = asyncio.Event(), []
+    ticker = asyncio.create_task(measure_lag(stop, lags))
+    await asyncio.sleep(TICK)
+    started = time.perf_counter()
+    result = await run()
+    duration = time.perf_counter() - started
+    stop.set()
+    await ticker
+    return {"duration_s": round(duration, 3), "loop_lag": lag_summary(lags), **result}
+
+async def run_benchmark(args) -> dict:
+    from config import settings
+    from services.image_resize import render_thumbnail
+    from services.media_store import media_store
+    from services.thumbnails import thumbnailer
+
+    async def chunks(data: bytes):
+        yield data
+
+    blobs = []
+    for seed in range(args.images):
+        blobs.append(await media_store.save(chunks(photo(args.width, args.height, seed)), "image/jpeg"))
+
+    async def inline():
+        for blob in blobs:
+            render_thumbnail(
+                str(media_store.path(blob.sha256)), str(thumbnailer.path(blob.sha256)) + ".inline",
+                settings.thumbnail_size, settings.thumbnail_quality, settings.thumbnail_max_pixels
+            )
+        return {"placeholders": 0}
+
+    async def pool():
+        # Start the pool processes outside the measurement
+        await asyncio.wrap_future(thumbnailer._executor().submit(int))
+        paths = await asyncio.gather(*(thumbnailer.get(blob) for blob in blobs))
+        placeholders = sum(path is None for path in paths)
+        # Let the renders already queued finish
+        while thumbnailer.depth:
+            await asyncio.sleep(TICK)
+        return {"placeholders": placeholders}
+
+    try:
+        return {
+            "benchmark": "thumbnails",
+            "images": args.images,
+            "source": f"{args.width}x{args.height}",
+            "workers": settings.thumbnail_workers,
+            "max_pending": settings.thumbnail_max_pending,
+            "wait_s": settings.thumbnail_wait,
+            "inline": await timed(inline),
+            "pool": await timed(pool),
+        }
+    finally:
+        await thumbnailer.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--images", type=int, default=40)
+    parser.add_argument("--size", default="3000x2000", help="source image WIDTHxHEIGHT")
+    args = parser.parse_args()
+    args.width, args.height = (int(value) for value in args.size.lower().split("x"))
+
+    # A throwaway store; must be set before config is imported
+    os.environ["MEDIA_DIR"] = tempfile.mkdtemp(prefix="bench-thumbnails-")
+    print(json.dumps(asyncio.run(run_benchmark(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
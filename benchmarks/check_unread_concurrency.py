@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Concurrency check: no lost unread_count increments
+
+Fires many concurrent "incoming message" updates at one conversation, each
+in its own session and transaction, the way parallel webhook requests do.
+The atomic UPDATE must end at exactly the number of messages sent; the old
+read-modify-write on the ORM object is run too for comparison.
+
+Needs a migrated database (DATABASE_URL). Creates and removes its own rows.
+
+    python benchmarks/check_unread_concurrency.py --messages 500 --concurrency 10
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from uuid import uuid4
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import select, delete
+
+from database import AsyncSessionLocal, engine
+from storage.postgres import PostgresStorage
+import models
+
+async def create_conversation(db) -> models.Conversation:
+    suffix = uuid4().hex[:8]
+    user = models.User(name="Concurrency check", username=f"concurrency_{suffix}", password_hash="-")
+    db.add(user)
+    await db.flush()
+    instance = models.WhatsAppInstance(user_id=user.id, name="Concurrency check", session_id=f"concurrency_{suffix}")
+    contact = models.Contact(phone=f"999{suffix[:8]}")
+    db.add_all([instance, contact])
+    await db.flush()
+    conversation = models.Conversation(
+        user_id=user.id,
+        instance_id=instance.id,
+        contact_id=contact.id,
+        unread_count=0
+    )
+    db.add(conversation)
+    await db.commit()
+    return conversation
+
+async def remove_conversation(db, conversation: models.Conversation):
+    await db.execute(delete(models.Conversation).where(models.Conversation.id == conversation.id))
+    await db.execute(delete(models.Contact).where(models.Contact.id == conversation.contact_id))
+    await db.execute(delete(models.WhatsAppInstance).where(models.WhatsAppInstance.id == conversation.instance_id))
+    await db.execute(delete(models.User).where(models.User.id == conversation.user_id))
+    await db.commit()
+
+async def read_counter(conversation_id):
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(models.Conversation.unread_count, models.Conversation.last_message_at)
+            .filter(models.Conversation.id == conversation_id)
+        )
+        return result.one()
+
+async def atomic_update(conversation_id, at: datetime):
+    async with AsyncSessionLocal() as db:
+        storage = PostgresStorage(db)
+        await storage.conversations.record_activity(conversation_id, unread=1, at=at)
+        await storage.commit()
+
+async def atomic_batch(conversation_ids, at: datetime):
+    # A batch holding several messages for each conversation
+    async with AsyncSessionLocal() as db:
+        storage = PostgresStorage(db)
+        await storage.conversations.record_activity_many(
+            [(conversation_id, 1, at) for conversation_id in conversation_ids for _ in range(3)]
+        )
+        await storage.commit()
+
+async def read_modify_write(conversation_id, at: datetime):
+    # What the webhook used to do
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(models.Conversation).filter(models.Conversation.id == conversation_id)
+        )
+        conversation = result.scalar_one()
+        await asyncio.sleep(0)
+        conversation.unread_count += 1
+        conversation.last_message_at = at
+        await db.commit()
+
+async def run_concurrently(make_update, count: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    base = datetime.now(timezone.utc)
+
+    async def one(i):
+        async with semaphore:
+            # Message times arrive out of order; the newest must win
+            await make_update(base + timedelta(seconds=(i * 7919) % count))
+
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return base + timedelta(seconds=count - 1)
+
+async def main(messages: int, concurrency: int):
+    async with AsyncSessionLocal() as db:
+        conversations = [await create_conversation(db) for _ in range(4)]
+
+    try:
+        atomic, other, naive, extra = conversations
+        results = {}
+
+        newest = await run_concurrently(lambda at: atomic_update(atomic.id, at), messages, concurrency)
+        unread, last_message_at = await read_counter(atomic.id)
+        results["atomic_update"] = {
+            "expected": messages, "unread_count": unread,
+            "last_message_at_is_newest": last_message_at == newest
+        }
+
+        await run_concurrently(lambda at: atomic_batch([other.id, extra.id], at), messages, concurrency)
+        results["atomic_batch"] = {
+            "expected": messages * 3,
+            "unread_count": [(await read_counter(c.id))[0] for c in (other, extra)]
+        }
+
+        await run_concurrently(lambda at: read_modify_write(naive.id, at), messages, concurrency)
+        results["read_modify_write"] = {"expected": messages, "unread_count": (await read_counter(naive.id))[0]}
+
+        print(json.dumps(results, indent=2, default=str))
+        ok = (
+            results["atomic_update"]["unread_count"] == messages
+            and results["atomic_update"]["last_message_at_is_newest"]
+            and results["atomic_batch"]["unread_count"] == [messages * 3] * 2
+        )
+    finally:
+        async with AsyncSessionLocal() as db:
+            for conversation in conversations:
+                await remove_conversation(db, conversation)
+        await engine.dispose()
+
+    if not ok:
+        print("Lost updates detected in the atomic path")
+        sys.exit(1)
+    print("No lost updates")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.messages, args.concurrency))
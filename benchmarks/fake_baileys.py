@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Baileys HTTP API
+
+Implements the endpoints WhatsAppService calls (create-session, qr-code,
+status, send-message, session delete, sessions) with configurable latency
+and error injection, and plays the WhatsApp side of the conversation:
+sessions connect shortly after creation (qr_code + connected webhooks)
+and sent messages are acknowledged with delivery receipts.
+
+Webhook URLs handed over by the backend point at the production host, so
+their scheme/host/port are replaced with ``--webhook-base``.
+
+    python -m benchmarks.fake_baileys --port 3001 --latency-ms 40 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import random
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# 1x1 PNG, enough for the UI and the webhook handler
+QR_CODE = (
+    "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk"
+    "+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+)
+
+@dataclass
+class FakeConfig:
+    latency_ms: float = 20.0
+    jitter_ms: float = 10.0
+    error_rate: float = 0.0
+    webhook_base: Optional[str] = None
+    connect_delay: float = 0.2
+    receipt_delay: float = 0.5
+    receipt_rate: float = 1.0  # share of sent messages that get a delivery receipt
+    seed: Optional[int] = None
+
+class FakeBaileys:
+    """In-memory sessions plus the counters the benchmark reports"""
+
+    def __init__(self, config: FakeConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"requests": 0, "injected_errors": 0, "messages_sent": 0, "webhooks_sent": 0, "webhook_errors": 0,
+                      "media_bytes": 0}
+        self.client: Optional[httpx.AsyncClient] = None
+        self._tasks = set()
+
+    def webhook_url(self, url: Optional[str]) -> Optional[str]:
+        if not url or not self.config.webhook_base:
+            return url
+        parts = urlsplit(url)
+        return self.config.webhook_base.rstrip("/") + parts.path
+
+    async def delay(self):
+        latency = self.config.latency_ms + self.random.uniform(-self.config.jitter_ms, self.config.jitter_ms)
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+
+    def should_fail(self) -> bool:
+        if self.config.error_rate > 0 and self.random.random() < self.config.error_rate:
+            self.stats["injected_errors"] += 1
+            return True
+        return False
+
+    def spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def post_webhook(self, session_id: str, payload: Dict[str, Any], traceparent: Optional[str] = None):
+        session = self.sessions.get(session_id)
+        if not session or not session["webhook_url"]:
+            return
+        # Like the real service: continue the backend's trace, in the header and the payload
+        headers = {"traceparent": traceparent} if traceparent else {}
+        try:
+            response = await self.client.post(
+                session["webhook_url"],
+                json={**payload, "sessionId": session_id, "traceparent": traceparent},
+                headers=headers
+            )
+            response.raise_for_status()
+            self.stats["webhooks_sent"] += 1
+        except httpx.HTTPError:
+            self.stats["webhook_errors"] += 1
+
+    async def connect(self, session_id: str):
+        await asyncio.sleep(self.config.connect_delay)
+        traceparent = self.sessions.get(session_id, {}).get("traceparent")
+        await self.post_webhook(session_id, {"type": "qr_code", "qrCode": QR_CODE}, traceparent)
+        await asyncio.sleep(self.config.connect_delay)
+        session = self.sessions.get(session_id)
+        if session:
+            session["status"] = "connected"
+            session["phone"] = "5511" + "".join(self.random.choice("0123456789") for _ in range(9))
+            await self.post_webhook(session_id, {"type": "connected", "phone": session["phone"]}, traceparent)
+
+    async def acknowledge(self, session_id: str, message_id: str, to: str, traceparent: Optional[str]):
+        await asyncio.sleep(self.config.receipt_delay)
+        await self.post_webhook(session_id, {
+            "type": "receipts",
+            "receipts": [{
+                "id": message_id, "to": f"{to}@s.whatsapp.net", "status": "delivered", "traceparent": traceparent
+            }]
+        })
+
+def create_app(config: FakeConfig) -> FastAPI:
+    fake = FakeBaileys(config)
+    app = FastAPI(title="Fake Baileys")
+    app.state.fake = fake
+
+    @app.on_event("startup")
+    async def open_client():
+        fake.client = httpx.AsyncClient(timeout=30.0)
+
+    @app.on_event("shutdown")
+    async def close_client():
+        await fake.client.aclose()
+
+    @app.middleware("http")
+    async def inject_faults(request: Request, call_next):
+        if request.url.path in ("/health", "/stats"):
+            return await call_next(request)
+        fake.stats["requests"] += 1
+        await fake.delay()
+        if fake.should_fail():
+            return JSONResponse({"error": "Injected failure"}, status_code=500)
+        return await call_next(request)
+
+    @app.post("/create-session")
+    async def create_session(request: Request):
+        data = await request.json()
+        session_id = data.get("sessionId")
+        if not session_id:
+            return JSONResponse({"error": "sessionId is required"}, status_code=400)
+        if session_id in fake.sessions:
+            return JSONResponse({"error": "Session already exists"}, status_code=400)
+
+        fake.sessions[session_id] = {
+            "status": "connecting",
+            "phone": None,
+            "webhook_url": fake.webhook_url(data.get("webhookUrl")),
+            "traceparent": request.headers.get("traceparent")
+        }
+        fake.spawn(fake.connect(session_id))
+        return {"success": True, "message": "Session created successfully", "sessionId": session_id}
+
+    @app.get("/qr-code/{session_id}")
+    async def get_qr_code(session_id: str):
+        session = fake.sessions.get(session_id)
+        if not session or session["status"] == "connected":
+            return JSONResponse({"error": "QR code not found or session already connected"}, status_code=404)
+        return {"qrCode": QR_CODE}
+
+    @app.get("/status/{session_id}")
+    async def get_status(session_id: str):
+        session = fake.sessions.get(session_id)
+        if not session:
+            return JSONResponse({"error": "Session not found"}, status_code=404)
+        return {"sessionId": session_id, "status": session["status"], "phone": session["phone"]}
+
+    @app.post("/send-message")
+    async def send_message(request: Request):
+        data = await request.json()
+        session = fake.sessions.get(data.get("sessionId"))
+        if not session or session["status"] != "connected":
+            return JSONResponse({"error": "Session not connected"}, status_code=400)
+
+        if data.get("mediaUrl"):
+            # Like Baileys, fetch media by reference before "sending" it
+            try:
+                async with fake.client.stream("GET", fake.webhook_url(data["mediaUrl"])) as response:
+                    response.raise_for_status()
+                    async for chunk in response.aiter_bytes():
+                        fake.stats["media_bytes"] += len(chunk)
+            except httpx.HTTPError:
+                return JSONResponse({"error": "Failed to fetch media"}, status_code=500)
+
+        message_id = uuid.uuid4().hex[:20].upper()
+        fake.stats["messages_sent"] += 1
+        if fake.random.random() < config.receipt_rate:
+            fake.spawn(fake.acknowledge(
+                data["sessionId"], message_id, str(data.get("to", "")).split("@")[0],
+                request.headers.get("traceparent")
+            ))
+        return {"success": True, "messageId": message_id}
+
+    @app.delete("/session/{session_id}")
+    async def delete_session(session_id: str):
+        fake.sessions.pop(session_id, None)
+        return {"success": True, "message": "Session deleted successfully"}
+
+    @app.get("/sessions")
+    async def list_sessions():
+        return {"sessions": [
+            {"sessionId": session_id, "status": session["status"], "phone": session["phone"]}
+            for session_id, session in fake.sessions.items()
+        ]}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/stats")
+    async def stats():
+        return fake.stats
+
+    return app
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="mean latency added to every call")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="uniform jitter around the mean")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls answered with HTTP 500")
+    parser.add_argument("--receipt-delay", type=float, default=0.5, help="seconds until a sent message is delivered")
+    parser.add_argument("--receipt-rate", type=float, default=1.0, help="share of sent messages that get a receipt")
+    parser.add_argument("--seed", type=int, default=None)
+
+def config_from_args(args, webhook_base: Optional[str]) -> FakeConfig:
+    return FakeConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        webhook_base=webhook_base,
+        receipt_delay=args.receipt_delay,
+        receipt_rate=args.receipt_rate,
+        seed=args.seed
+    )
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake Baileys HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3001)
+    parser.add_argument("--webhook-base", default="http://127.0.0.1:8000",
+                        help="where webhooks go, replacing the host in the backend's webhook URLs")
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(config_from_args(args, args.webhook_base)), host=args.host, port=args.port, log_level="warning")
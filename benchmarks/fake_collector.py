@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for an OTLP/HTTP trace collector
+
+Accepts OTLP/JSON export requests on ``/v1/traces`` (what services/tracing.py
+sends with ``TRACING_EXPORTER=otlp``), appends them to a file in the same
+format as the file exporter, and summarizes what it received:
+
+    python -m benchmarks.fake_collector --port 4318 --output traces.jsonl
+    curl localhost:4318/traces            # span counts and slowest traces
+    curl localhost:4318/traces/<trace id> # one trace as an indented tree
+"""
+
+import argparse
+import json
+from collections import defaultdict
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+def create_app(output: str) -> FastAPI:
+    app = FastAPI(title="Fake OTLP collector")
+    traces: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+
+    @app.post("/v1/traces")
+    async def receive(request: Request):
+        body = await request.body()
+        export = json.loads(body)
+        for resource_spans in export.get("resourceSpans", []):
+            for scope_spans in resource_spans.get("scopeSpans", []):
+                for span in scope_spans.get("spans", []):
+                    traces[span["traceId"]].append(span)
+        with open(output, "ab") as f:
+            f.write(body + b"\n")
+        return {"partialSuccess": {}}
+
+    @app.get("/traces")
+    async def summary():
+        durations = {
+            trace_id: (max(int(s["endTimeUnixNano"]) for s in spans) - min(int(s["startTimeUnixNano"]) for s in spans)) / 1e6
+            for trace_id, spans in traces.items()
+        }
+        slowest = sorted(durations.items(), key=lambda item: -item[1])[:10]
+        return {
+            "traces": len(traces),
+            "spans": sum(len(spans) for spans in traces.values()),
+            "slowest": [{"trace_id": trace_id, "duration_ms": round(ms, 2)} for trace_id, ms in slowest],
+        }
+
+    @app.get("/traces/{trace_id}")
+    async def tree(trace_id: str):
+        spans = traces.get(trace_id)
+        if not spans:
+            return JSONResponse({"error": "Trace not found"}, status_code=404)
+        children = defaultdict(list)
+        ids = {span["spanId"] for span in spans}
+        for span in sorted(spans, key=lambda s: int(s["startTimeUnixNano"])):
+            parent = span.get("parentSpanId")
+            children[parent if parent in ids else None].append(span)
+
+        lines = []
+        def render(span, depth):
+            ms = (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+            lines.append(f"{'  ' * depth}{span['name']}  {ms:.2f}ms")
+            for child in children[span["spanId"]]:
+                render(child, depth + 1)
+        for root in children[None]:
+            render(root, 0)
+        return PlainTextResponse("\n".join(lines) + "\n")
+
+    return app
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake OTLP/HTTP trace collector")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--output", default="traces.jsonl")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.output), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,181 @@
+"""
+Load scenarios driven against a running backend
+
+Every scenario returns a JSON-serializable dict. Request-driven scenarios
+report throughput and latency percentiles; DB statement counts come from
+the backend's /metrics endpoint, diffed around each scenario.
+"""
+
+import asyncio
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+_STATEMENT_COUNT = re.compile(r'^db_statement_duration_seconds_count\{operation="(\w+)"\} ([0-9.e+]+)$', re.MULTILINE)
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+@dataclass
+class BenchContext:
+    client: httpx.AsyncClient
+    headers: Dict[str, str]
+    instance_ids: List[str]
+    rng: random.Random
+    phones: List[str] = field(default_factory=list)
+
+async def statement_counts(client: httpx.AsyncClient) -> Dict[str, float]:
+    response = await client.get("/metrics")
+    if response.status_code != 200:
+        return {}
+    return {operation: float(count) for operation, count in _STATEMENT_COUNT.findall(response.text)}
+
+async def with_statement_counts(ctx: BenchContext, scenario: Awaitable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Run a scenario and attach how many SQL statements the backend executed meanwhile"""
+    before = await statement_counts(ctx.client)
+    result = await scenario
+    after = await statement_counts(ctx.client)
+    statements = {operation: int(after[operation] - before.get(operation, 0)) for operation in after}
+    statements = {operation: count for operation, count in statements.items() if count}
+    result["db_statements"] = {"total": sum(statements.values()), "by_operation": statements}
+    if result.get("requests"):
+        result["db_statements"]["per_request"] = round(result["db_statements"]["total"] / result["requests"], 2)
+    return result
+
+async def drive(
+    total: int,
+    concurrency: int,
+    make_request: Callable[[int], Awaitable[httpx.Response]]
+) -> Dict[str, Any]:
+    """Issue ``total`` requests from ``concurrency`` workers and summarize latencies"""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                response = await make_request(i)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(total / duration, 1) if duration else 0.0,
+        "errors": errors,
+        "statuses": statuses,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99": round(percentile(latencies, 0.99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        },
+    }
+
+async def webhook_storm(ctx: BenchContext, total: int, concurrency: int) -> Dict[str, Any]:
+    """Inbound messages from many contacts hitting the webhook at once"""
+    async def send(i: int) -> httpx.Response:
+        instance_id = ctx.instance_ids[i % len(ctx.instance_ids)]
+        return await ctx.client.post(f"/api/webhook/whatsapp/{instance_id}", json={
+            "type": "message",
+            "sessionId": "bench",
+            "message": {
+                "id": uuid.uuid4().hex[:20].upper(),
+                "from": f"{ctx.rng.choice(ctx.phones)}@s.whatsapp.net",
+                "content": f"benchmark message {i}",
+                "timestamp": int(time.time()),
+                "messageType": "text",
+            }
+        })
+
+    return await drive(total, concurrency, send)
+
+async def dashboard_polling(ctx: BenchContext, total: int, concurrency: int) -> Dict[str, Any]:
+    """Many open dashboards refreshing stats and the instance list"""
+    paths = ["/api/dashboard/stats", "/api/instances/"]
+
+    async def poll(i: int) -> httpx.Response:
+        return await ctx.client.get(paths[i % len(paths)], headers=ctx.headers)
+
+    return await drive(total, concurrency, poll)
+
+async def bulk_sends(ctx: BenchContext, total: int, concurrency: int) -> Dict[str, Any]:
+    """Operators sending one-off messages through the API"""
+    response = await ctx.client.get(
+        "/api/messages/conversations",
+        params={"instance_id": ctx.instance_ids[0]},
+        headers=ctx.headers
+    )
+    response.raise_for_status()
+    conversation_ids = [c["id"] for c in response.json()]
+    if not conversation_ids:
+        return {"skipped": "no conversations; run webhook_storm first"}
+
+    async def send(i: int) -> httpx.Response:
+        return await ctx.client.post("/api/messages/send", headers=ctx.headers, json={
+            "conversation_id": conversation_ids[i % len(conversation_ids)],
+            "content": f"benchmark reply {i}",
+            "message_type": "text",
+        })
+
+    return await drive(total, concurrency, send)
+
+async def campaign_run(ctx: BenchContext, recipients: int, timeout: float) -> Dict[str, Any]:
+    """One campaign spread over every instance, timed from start to completion"""
+    targets = ctx.rng.sample(ctx.phones, min(recipients, len(ctx.phones)))
+    response = await ctx.client.post("/api/campaigns/", headers=ctx.headers, json={
+        "name": f"bench-{uuid.uuid4().hex[:8]}",
+        "message_template": "Benchmark campaign",
+        "target_contacts": targets,
+        "instance_id": ctx.instance_ids[0],
+        "instance_pool": ctx.instance_ids,
+    })
+    response.raise_for_status()
+    campaign_id = response.json()["id"]
+
+    started = time.perf_counter()
+    response = await ctx.client.post(f"/api/campaigns/{campaign_id}/start", headers=ctx.headers)
+    response.raise_for_status()
+
+    campaign: Optional[Dict[str, Any]] = None
+    polls = 0
+    while time.perf_counter() - started < timeout:
+        await asyncio.sleep(0.25)
+        polls += 1
+        campaign = (await ctx.client.get(f"/api/campaigns/{campaign_id}", headers=ctx.headers)).json()
+        if campaign["status"] == "completed":
+            break
+    duration = time.perf_counter() - started
+
+    sent = campaign["sent_count"] if campaign else 0
+    return {
+        "recipients": len(targets),
+        "instances": len(ctx.instance_ids),
+        "completed": bool(campaign and campaign["status"] == "completed"),
+        "duration_s": round(duration, 3),
+        "sent": sent,
+        "failed": campaign["failed_count"] if campaign else 0,
+        "delivered": campaign["delivered_count"] if campaign else 0,
+        "throughput_msgs_per_s": round(sent / duration, 1) if duration else 0.0,
+        "status_polls": polls,
+    }
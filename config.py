@@ -2,14 +2,102 @@ from pydantic_settings import BaseSettings
 from typing import Optional
 
 class Settings(BaseSettings):
-    database_url: str
+    database_url: str = ""  # not needed with STORAGE_BACKEND=memory
     redis_url: str
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     baileys_api_url: str = "http://localhost:3001"
+    baileys_max_connections: int = 100  # pooled HTTP connections to the Baileys API
     frontend_url: str = "http://localhost:8000"
-    
+    default_country_code: str = "55"  # prepended to phone numbers written without one
+
+    # Campaign execution
+    campaign_batch_size: int = 50
+    campaign_send_interval: float = 1.0  # seconds between sends on one instance
+    campaign_progress_interval: float = 1.0  # max push frequency of progress streams
+    campaign_lease_ttl: float = 60.0  # a run whose worker stopped renewing its lease this long may be taken over
+    campaign_persist_attempts: int = 5  # tries to store a sent batch (backoff from 0.5s) before the run stops
+
+    # Delivery/read receipt ingestion
+    receipt_batch_size: int = 500
+    receipt_flush_interval: float = 1.0
+    receipt_retry_window: float = 120.0  # keep retrying receipts for messages not stored yet
+
+    # WebSocket push
+    ws_queue_size: int = 256  # events buffered per connection before the client is dropped
+    ws_unread_debounce: float = 0.5  # unread changes of one user are pushed together, one total query each
+
+    # Cross-worker event bus: "memory" (single worker), "redis" or "postgres"
+    event_bus_backend: str = "memory"
+    event_bus_channel: str = "whatsapp_events"
+    event_bus_batch_size: int = 100
+    event_bus_flush_interval: float = 0.05
+    event_bus_reconnect_delay: float = 0.5  # first retry after a lost connection, doubled up to the max
+    event_bus_reconnect_max: float = 30.0
+
+    # Per-request SQL profiling (opt-in): "X-SQL-Profile: 1" header or sampling
+    sql_profile_allow_header: bool = False  # anyone can send the header: development/staging only
+    sql_profile_sample_rate: float = 0.0
+    sql_profile_repeat_threshold: int = 3  # executions of one statement shape flagged as N+1
+
+    # Multi-process server (supervisor.py)
+    workers: int = 0  # 0 = one per CPU
+    worker_heartbeat_interval: float = 1.0
+    worker_health_timeout: float = 30.0  # restart a worker whose event loop stalled this long
+    worker_startup_timeout: float = 60.0
+    worker_graceful_timeout: float = 30.0  # time to finish in-flight requests on stop/reload
+
+    # Background jobs that run on exactly one worker (Postgres advisory lock)
+    singleton_jobs_enabled: bool = True
+    singleton_lock_retry: float = 5.0  # how often standby workers try to take over
+    singleton_lease_ttl: float = 30.0  # Mongo only: a leader silent this long is replaced
+    campaign_schedule_interval: float = 30.0  # how often due scheduled campaigns are started
+
+    # Logging: records are queued and written by a background thread
+    log_level: str = "INFO"
+    log_json: bool = True  # one JSON object per line; False for human-readable text
+    log_sampling: str = ""  # share of DEBUG/INFO lines kept per logger, e.g. "routers.webhooks=0.01"
+
+    # Distributed tracing (routes, SQL statements, Baileys calls); off unless an exporter is set
+    tracing_exporter: str = ""  # "file" (OTLP/JSON lines) or "otlp" (OTLP/HTTP collector)
+    tracing_sample_rate: float = 0.01  # share of new traces kept; incoming traceparent decides otherwise
+    tracing_file: str = "traces.jsonl"
+    tracing_otlp_endpoint: str = "http://localhost:4318/v1/traces"
+    tracing_service_name: str = "whatsapp-bot-api"
+
+    # List endpoints: build responses from row tuples and encode with orjson
+    # instead of ORM objects + pydantic validation (services/fast_json.py)
+    fast_list_responses: bool = False
+
+    # Response compression (services/compression.py); brotli is used when installed
+    compression_min_size: int = 1024  # bytes; smaller bodies aren't worth the CPU
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+
+    # Message history exports (GET /api/exports/messages)
+    export_max_concurrent: int = 2  # per worker; further exports get 429
+    export_rows_per_second: int = 5000  # per export; 0 = unthrottled
+    export_batch_size: int = 500  # rows per keyset page, each read in its own short transaction
+
+    # Storage backend behind routers and services (storage/): "postgres", "mongo" or "memory"
+    storage_backend: str = "postgres"
+    mongo_url: str = "mongodb://localhost:27017"
+    mongo_db_name: str = "whatsapp_bot"
+
+    # Media files (services/media_store.py), stored once per content hash
+    media_dir: str = "media"
+    media_max_bytes: int = 64 * 1024 * 1024  # per upload
+    media_base_url: str = ""  # how the Baileys service reaches /api/media; defaults to frontend_url
+
+    # Image thumbnails (services/thumbnails.py), rendered in a process pool
+    thumbnail_size: int = 320  # longest side, pixels
+    thumbnail_quality: int = 80  # JPEG quality
+    thumbnail_workers: int = 2  # processes per API worker
+    thumbnail_max_pending: int = 32  # renders queued or running; beyond this a placeholder is served
+    thumbnail_wait: float = 2.0  # seconds a request waits for a render before getting the placeholder
+    thumbnail_max_pixels: int = 50_000_000  # larger source images are never decoded
+
     class Config:
         env_file = ".env"
 
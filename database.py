@@ -1,29 +1,102 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from config import settings
-import asyncpg
+from services.metrics import (
+    DB_STATEMENT_DURATION, DB_POOL_SIZE, DB_POOL_CHECKED_OUT, DB_POOL_OVERFLOW,
+    gauge_function, statement_operation
+)
+from services.sql_profiler import record_statement
+from services.tracing import tracer, KIND_CLIENT
+import asyncio
+import time
+from functools import lru_cache
+from typing import Optional
+
+Base = declarative_base()
 
 # Convert postgresql:// to postgresql+asyncpg:// for async
 ASYNC_DATABASE_URL = settings.database_url.replace("postgresql://", "postgresql+asyncpg://")
 
-# Async engine for main operations
-engine = create_async_engine(ASYNC_DATABASE_URL, echo=True)
-AsyncSessionLocal = sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
-)
+@lru_cache(maxsize=1)
+def get_engine():
+    """Async engine for main operations, created on first use.
 
-# Sync engine for Alembic migrations
-sync_engine = create_engine(settings.database_url)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
+    Only the Postgres storage backend (and scripts) need it, so the app can
+    run on the in-memory backend without a database or DATABASE_URL.
+    """
+    if not settings.database_url:
+        raise RuntimeError("DATABASE_URL is not set")
+    engine = create_async_engine(ASYNC_DATABASE_URL, echo=True)
 
-Base = declarative_base()
+    # Statement timings and pool usage for /metrics and the SQL profiler
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+        context._statement_started = time.perf_counter()
+        # Only traced when the statement runs inside a sampled request or job
+        context._span = span = tracer.start_child(f"db {statement_operation(statement)}", KIND_CLIENT)
+        if span is not None:
+            span.set_attribute("db.system", "postgresql")
+            span.set_attribute("db.statement", statement[:1000])
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _record_statement_time(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._statement_started
+        DB_STATEMENT_DURATION.labels(statement_operation(statement)).observe(elapsed)
+        record_statement(statement, elapsed)
+        tracer.end_span(context._span)
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def _record_statement_error(exception_context):
+        span = getattr(exception_context.execution_context, "_span", None)
+        if span is not None:
+            span.set_error(exception_context.original_exception)
+            tracer.end_span(span)
+
+    gauge_function(DB_POOL_SIZE, lambda: engine.pool.size())
+    gauge_function(DB_POOL_CHECKED_OUT, lambda: engine.pool.checkedout())
+    gauge_function(DB_POOL_OVERFLOW, lambda: max(0, engine.pool.overflow()))
+    return engine
+
+@lru_cache(maxsize=1)
+def get_session_factory():
+    return sessionmaker(get_engine(), class_=AsyncSession, expire_on_commit=False)
+
+@lru_cache(maxsize=1)
+def get_sync_engine():
+    """Sync engine for Alembic migrations"""
+    return create_engine(settings.database_url)
+
+@lru_cache(maxsize=1)
+def get_sync_session_factory():
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_sync_engine())
+
+LAZY = {
+    "engine": get_engine,
+    "AsyncSessionLocal": get_session_factory,
+    "sync_engine": get_sync_engine,
+    "SessionLocal": get_sync_session_factory,
+}
+
+def __getattr__(name: str):
+    # ``from database import engine, AsyncSessionLocal`` keeps working
+    if name in LAZY:
+        return LAZY[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+async def warm_pool(connections: Optional[int] = None):
+    """Open the pool's connections up front so the first requests don't pay for it"""
+    engine = get_engine()
+    connections = connections or engine.pool.size()
+    opened = await asyncio.gather(*(engine.connect() for _ in range(connections)))
+    for connection in opened:
+        await connection.close()
 
 # Dependency for getting DB session
 async def get_db():
-    async with AsyncSessionLocal() as session:
+    async with get_session_factory()() as session:
         try:
             yield session
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
@@ -309,68 +309,10 @@ def start_services():
 
 # FastAPI App (importado quando necessário)
 def create_app():
-    """Cria aplicação FastAPI"""
+    """Cria aplicação FastAPI (a mesma de server.py, sem verificações de instalação)"""
     try:
-        from fastapi import FastAPI, Request
-        from fastapi.staticfiles import StaticFiles
-        from fastapi.templating import Jinja2Templates
-        from fastapi.middleware.cors import CORSMiddleware
-        from fastapi.responses import HTMLResponse
-        
-        # Import routers
-        from routers import auth, dashboard, instances, messages, campaigns, finances, groups, webhooks
-        
-        # Create FastAPI app
-        app = FastAPI(
-            title="WhatsApp Bot Management System",
-            description="Sistema completo de gestão de bots WhatsApp",
-            version="1.0.0",
-            docs_url="/api/docs",
-            redoc_url="/api/redoc"
-        )
-        
-        # CORS middleware
-        app.add_middleware(
-            CORSMiddleware,
-            allow_origins=["*"],
-            allow_credentials=True,
-            allow_methods=["*"],
-            allow_headers=["*"],
-        )
-        
-        # Include routers
-        app.include_router(auth.router)
-        app.include_router(dashboard.router)
-        app.include_router(instances.router)
-        app.include_router(messages.router)
-        app.include_router(campaigns.router)
-        app.include_router(finances.router)
-        app.include_router(groups.router)
-        app.include_router(webhooks.router)
-        
-        # Static files and templates
-        templates = Jinja2Templates(directory="templates")
-        
-        # Serve static files
-        if os.path.exists("static"):
-            app.mount("/static", StaticFiles(directory="static"), name="static")
-        
-        @app.get("/", response_class=HTMLResponse)
-        async def read_root(request: Request):
-            """Serve the main application"""
-            return templates.TemplateResponse("index.html", {"request": request})
-        
-        @app.get("/health")
-        async def health_check():
-            """Health check endpoint"""
-            return {
-                "status": "healthy",
-                "service": "whatsapp-bot-api",
-                "version": "1.0.0",
-                "domain": "78.46.250.112"
-            }
-        
-        return app
+        from server import create_app as create_server_app
+        return create_server_app()
         
     except ImportError as e:
         print_status(f"❌ Erro importando módulos: {e}", "ERROR")
@@ -411,6 +353,8 @@ app = None
 
 if __name__ == "__main__":
     main()
-else:
-    # Se importado como módulo, criar app
+elif __name__ != "__mp_main__":
+    # Se importado como módulo, criar app. Processos filhos criados por spawn
+    # (pool de miniaturas, workers do uvicorn) reimportam este arquivo como
+    # __mp_main__ e não precisam da aplicação.
     app = create_app()
\ No newline at end of file
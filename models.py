@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON, Float, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Boolean, Text, ForeignKey, JSON, Float, Enum, UniqueConstraint, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -75,7 +75,7 @@ class Contact(Base):
     __tablename__ = "contacts"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    phone = Column(String(20), nullable=False)
+    phone = Column(String(64), nullable=False)  # E.164 digits, or a group JID
     name = Column(String(100), nullable=True)
     profile_picture = Column(String(500), nullable=True)
     is_business = Column(Boolean, default=False)
@@ -114,7 +114,8 @@ class Message(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     conversation_id = Column(UUID(as_uuid=True), ForeignKey("conversations.id"), nullable=False)
     instance_id = Column(UUID(as_uuid=True), ForeignKey("whatsapp_instances.id"), nullable=False)
-    whatsapp_message_id = Column(String(100), nullable=True)
+    whatsapp_message_id = Column(String(100), nullable=True, index=True)
+    campaign_id = Column(UUID(as_uuid=True), ForeignKey("campaigns.id", ondelete="SET NULL"), nullable=True, index=True)
     content = Column(Text, nullable=False)
     message_type = Column(String(20), default="text")  # text, image, document, audio, video
     media_url = Column(String(500), nullable=True)
@@ -126,6 +127,12 @@ class Message(Base):
     # Relationships
     conversation = relationship("Conversation", back_populates="messages")
     instance = relationship("WhatsAppInstance", back_populates="messages")
+    
+    # Keyset order of message exports (migration 006)
+    __table_args__ = (
+        Index("ix_messages_timestamp_id", "timestamp", "id"),
+        Index("ix_messages_instance_timestamp_id", "instance_id", "timestamp", "id"),
+    )
 
 class Campaign(Base):
     __tablename__ = "campaigns"
@@ -133,6 +140,7 @@ class Campaign(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     instance_id = Column(UUID(as_uuid=True), ForeignKey("whatsapp_instances.id"), nullable=False)
+    instance_pool = Column(JSON, default=list)  # Extra instance IDs to spread sending over
     name = Column(String(100), nullable=False)
     description = Column(Text, nullable=True)
     message_template = Column(Text, nullable=False)
@@ -142,6 +150,10 @@ class Campaign(Base):
     sent_count = Column(Integer, default=0)
     delivered_count = Column(Integer, default=0)
     failed_count = Column(Integer, default=0)
+    # Lease of the worker sending the campaign (services/campaign_engine.py)
+    run_owner = Column(String(64), nullable=True)
+    run_generation = Column(Integer, default=0)  # bumped on every new run
+    run_heartbeat_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -178,5 +190,27 @@ class Group(Base):
     # Relationships
     user = relationship("User", back_populates="groups")
 
+class SuppressionEntry(Base):
+    __tablename__ = "suppressions"
+    __table_args__ = (UniqueConstraint("user_id", "phone", name="uq_suppressions_user_phone"),)
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    phone = Column(String(20), nullable=False)
+    reason = Column(String(20), nullable=False, default="manual")  # manual, opt_out, blocked
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    user = relationship("User", back_populates="suppressions")
+
+class ResourceVersion(Base):
+    """Bumped by database triggers on every write to a user's resources (migration 005)"""
+    __tablename__ = "resource_versions"
+    
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    resource = Column(String(32), primary_key=True)  # instances, campaigns, groups, finances, conversations
+    version = Column(BigInteger, nullable=False, default=0)
+
 # Add groups relationship to User
-User.groups = relationship("Group", back_populates="user", cascade="all, delete-orphan")
\ No newline at end of file
+User.groups = relationship("Group", back_populates="user", cascade="all, delete-orphan")
+User.suppressions = relationship("SuppressionEntry", back_populates="user", cascade="all, delete-orphan")
\ No newline at end of file
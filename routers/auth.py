@@ -1,9 +1,9 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
+from storage.interface import Storage
+from storage.provider import get_storage
 from auth import authenticate_user, create_access_token, get_current_active_user
 from services.user_service import UserService
 from config import settings
@@ -14,10 +14,10 @@ router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 @router.post("/login", response_model=schemas.Token)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Login and get access token"""
-    user = await authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(storage, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -35,11 +35,11 @@ async def login(
 @router.post("/register", response_model=schemas.UserResponse)
 async def register(
     user_data: schemas.UserCreate,
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Register a new user"""
     try:
-        user = await UserService.create_user(db, user_data)
+        user = await UserService.create_user(storage, user_data)
         return user
     except ValueError as e:
         raise HTTPException(
@@ -58,10 +58,10 @@ async def get_current_user_info(
 async def update_current_user(
     user_update: schemas.UserUpdate,
     current_user: schemas.UserResponse = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Update current user information"""
-    updated_user = await UserService.update_user(db, current_user.id, user_update)
+    updated_user = await UserService.update_user(storage, current_user.id, user_update)
     if not updated_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
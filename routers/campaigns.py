@@ -1,88 +1,105 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.responses import StreamingResponse
+from typing import Dict, List
 from uuid import UUID
+import asyncio
 
-from database import get_db
+from storage.interface import Storage
+from storage.provider import get_storage
 from auth import get_current_active_user
+from config import settings
+from services.campaign_engine import campaign_engine, progress_hub
+from services.event_bus import event_bus
+from services.phone_normalizer import normalize_phone_list
+from services.fast_json import FastJSONResponse
+from services.resource_versions import conditional_get
 import schemas
 import models
 
+# Comment line sent to idle progress streams so proxies keep them open
+SSE_KEEPALIVE_SECONDS = 15
+
+async def get_pool_instances(
+    storage: Storage,
+    user_id: UUID,
+    instance_ids: List[UUID]
+) -> List[models.WhatsAppInstance]:
+    """Load the given instances, raising 404 unless all belong to the user"""
+    instance_ids = list(dict.fromkeys(instance_ids))
+    if not instance_ids:
+        return []
+    instances = await storage.instances.get_many(instance_ids, user_id)
+    if len(instances) != len(instance_ids):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="WhatsApp instance not found"
+        )
+    return instances
+
+def normalize_target_contacts(phones: List[str]) -> List[str]:
+    """Canonicalize and de-duplicate recipients, rejecting unparseable numbers"""
+    normalized, invalid = normalize_phone_list(phones)
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{len(invalid)} invalid phone number(s): {', '.join(invalid[:10])}"
+        )
+    return normalized
+
 router = APIRouter(prefix="/api/campaigns", tags=["Campaigns"])
 
 @router.post("/", response_model=schemas.CampaignResponse)
 async def create_campaign(
     campaign_data: schemas.CampaignCreate,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Create a new campaign"""
     # Verify instance belongs to user
-    result = await db.execute(
-        select(models.WhatsAppInstance)
-        .filter(
-            and_(
-                models.WhatsAppInstance.id == campaign_data.instance_id,
-                models.WhatsAppInstance.user_id == current_user.id
-            )
-        )
-    )
-    instance = result.scalar_one_or_none()
+    instance = await storage.instances.get(campaign_data.instance_id, current_user.id)
     if not instance:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="WhatsApp instance not found"
         )
     
-    campaign = models.Campaign(
+    await get_pool_instances(storage, current_user.id, campaign_data.instance_pool)
+    
+    campaign = await storage.campaigns.add(
         user_id=current_user.id,
         instance_id=campaign_data.instance_id,
+        instance_pool=[str(i) for i in dict.fromkeys(campaign_data.instance_pool)],
         name=campaign_data.name,
         description=campaign_data.description,
         message_template=campaign_data.message_template,
-        target_contacts=campaign_data.target_contacts,
+        target_contacts=normalize_target_contacts(campaign_data.target_contacts),
         scheduled_at=campaign_data.scheduled_at,
         status=models.CampaignStatus.DRAFT
     )
-    
-    db.add(campaign)
-    await db.commit()
-    await db.refresh(campaign)
+    await storage.commit()
     
     return campaign
 
 @router.get("/", response_model=List[schemas.CampaignResponse])
 async def get_campaigns(
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage),
+    validators: Dict[str, str] = Depends(conditional_get("campaigns"))
 ):
     """Get all campaigns for current user"""
-    result = await db.execute(
-        select(models.Campaign)
-        .filter(models.Campaign.user_id == current_user.id)
-        .order_by(models.Campaign.created_at.desc())
-    )
-    return result.scalars().all()
+    if settings.fast_list_responses:
+        rows = await storage.campaigns.list_rows(schemas.CampaignResponse, current_user.id)
+        return FastJSONResponse(rows, headers=validators)
+    return await storage.campaigns.list_for_user(current_user.id)
 
 @router.get("/{campaign_id}", response_model=schemas.CampaignResponse)
 async def get_campaign(
     campaign_id: UUID,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Get specific campaign"""
-    result = await db.execute(
-        select(models.Campaign)
-        .filter(
-            and_(
-                models.Campaign.id == campaign_id,
-                models.Campaign.user_id == current_user.id
-            )
-        )
-    )
-    
-    campaign = result.scalar_one_or_none()
+    campaign = await storage.campaigns.get(campaign_id, current_user.id)
     if not campaign:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -96,20 +113,10 @@ async def update_campaign(
     campaign_id: UUID,
     campaign_data: schemas.CampaignUpdate,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Update campaign"""
-    result = await db.execute(
-        select(models.Campaign)
-        .filter(
-            and_(
-                models.Campaign.id == campaign_id,
-                models.Campaign.user_id == current_user.id
-            )
-        )
-    )
-    
-    campaign = result.scalar_one_or_none()
+    campaign = await storage.campaigns.get(campaign_id, current_user.id)
     if not campaign:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -117,19 +124,23 @@ async def update_campaign(
         )
     
     # Update fields if provided
+    changes = {}
     if campaign_data.name is not None:
-        campaign.name = campaign_data.name
+        changes["name"] = campaign_data.name
     if campaign_data.description is not None:
-        campaign.description = campaign_data.description
+        changes["description"] = campaign_data.description
     if campaign_data.message_template is not None:
-        campaign.message_template = campaign_data.message_template
+        changes["message_template"] = campaign_data.message_template
     if campaign_data.target_contacts is not None:
-        campaign.target_contacts = campaign_data.target_contacts
+        changes["target_contacts"] = normalize_target_contacts(campaign_data.target_contacts)
+    if campaign_data.instance_pool is not None:
+        await get_pool_instances(storage, current_user.id, campaign_data.instance_pool)
+        changes["instance_pool"] = [str(i) for i in dict.fromkeys(campaign_data.instance_pool)]
     if campaign_data.scheduled_at is not None:
-        campaign.scheduled_at = campaign_data.scheduled_at
+        changes["scheduled_at"] = campaign_data.scheduled_at
     
-    await db.commit()
-    await db.refresh(campaign)
+    campaign = await storage.campaigns.update(campaign, **changes)
+    await storage.commit()
     
     return campaign
 
@@ -137,28 +148,21 @@ async def update_campaign(
 async def delete_campaign(
     campaign_id: UUID,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Delete campaign"""
-    result = await db.execute(
-        select(models.Campaign)
-        .filter(
-            and_(
-                models.Campaign.id == campaign_id,
-                models.Campaign.user_id == current_user.id
-            )
-        )
-    )
-    
-    campaign = result.scalar_one_or_none()
+    campaign = await storage.campaigns.get(campaign_id, current_user.id)
     if not campaign:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Campaign not found"
         )
     
-    await db.delete(campaign)
-    await db.commit()
+    # Stop a run here right away; one on another worker by event
+    campaign_engine.stop(campaign.id)
+    event_bus.publish("campaign.stop", {"campaign_id": campaign.id, "generation": campaign.run_generation})
+    await storage.campaigns.delete(campaign)
+    await storage.commit()
     
     return {"message": "Campaign deleted successfully"}
 
@@ -166,37 +170,48 @@ async def delete_campaign(
 async def start_campaign(
     campaign_id: UUID,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Start/activate a campaign"""
-    result = await db.execute(
-        select(models.Campaign)
-        .filter(
-            and_(
-                models.Campaign.id == campaign_id,
-                models.Campaign.user_id == current_user.id
-            )
-        )
-    )
-    
-    campaign = result.scalar_one_or_none()
+    campaign = await storage.campaigns.get(campaign_id, current_user.id)
     if not campaign:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Campaign not found"
         )
     
-    if campaign.status == models.CampaignStatus.ACTIVE:
+    # An ACTIVE campaign without a run (e.g. after a restart) may be resumed
+    if campaign.status == models.CampaignStatus.ACTIVE and campaign_engine.get_run(campaign.id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Campaign is already active"
         )
     
-    campaign.status = models.CampaignStatus.ACTIVE
-    await db.commit()
+    instances = await get_pool_instances(
+        storage,
+        current_user.id,
+        [campaign.instance_id] + [UUID(str(i)) for i in campaign.instance_pool or []]
+    )
+    if campaign.instance_pool:
+        # A pool only sends through the instances that are connected right now
+        instances = [i for i in instances if i.status == models.InstanceStatus.ACTIVE]
+        if not instances:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No active WhatsApp instance in the campaign pool"
+            )
     
-    # TODO: Implement campaign execution logic
-    # This would typically involve a background task or celery job
+    # Marks it ACTIVE, unless another worker's run still holds it
+    if await campaign_engine.start(campaign, instances) is None:
+        if campaign.status == models.CampaignStatus.ACTIVE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Campaign is already active"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Campaign is still stopping on another worker, try again shortly"
+        )
     
     return {"message": "Campaign started successfully"}
 
@@ -204,27 +219,97 @@ async def start_campaign(
 async def pause_campaign(
     campaign_id: UUID,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Pause a campaign"""
-    result = await db.execute(
-        select(models.Campaign)
-        .filter(
-            and_(
-                models.Campaign.id == campaign_id,
-                models.Campaign.user_id == current_user.id
-            )
+    campaign = await storage.campaigns.get(campaign_id, current_user.id)
+    if not campaign:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Campaign not found"
         )
-    )
     
-    campaign = result.scalar_one_or_none()
+    await storage.campaigns.update(campaign, status=models.CampaignStatus.PAUSED)
+    await storage.commit()
+    
+    # Stop a run here right away; one on another worker by event (or at
+    # its next lease renewal, which sees the campaign is PAUSED)
+    campaign_engine.stop(campaign.id)
+    event_bus.publish("campaign.stop", {"campaign_id": campaign.id, "generation": campaign.run_generation})
+    
+    return {"message": "Campaign paused successfully"}
+
+@router.get("/{campaign_id}/progress")
+async def stream_campaign_progress(
+    campaign_id: UUID,
+    request: Request,
+    current_user: models.User = Depends(get_current_active_user),
+    storage: Storage = Depends(get_storage)
+):
+    """Stream live campaign progress as Server-Sent Events"""
+    campaign = await storage.campaigns.get(campaign_id, current_user.id)
     if not campaign:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Campaign not found"
         )
     
-    campaign.status = models.CampaignStatus.PAUSED
-    await db.commit()
+    # Counters come from the engine from here on; the storage session is
+    # released before the stream starts.
+    
+    # An active campaign that isn't running here runs on another worker
+    running_here = campaign_engine.get_run(campaign_id) is not None
+    remote = campaign.status == models.CampaignStatus.ACTIVE and not running_here
+    
+    def format_event(progress: schemas.CampaignProgress) -> str:
+        return f"event: progress\ndata: {progress.model_dump_json()}\n\n"
+    
+    def persisted_progress(running: bool) -> schemas.CampaignProgress:
+        return schemas.CampaignProgress(
+            campaign_id=campaign.id,
+            total=len(campaign.target_contacts or []),
+            sent=campaign.sent_count or 0,
+            delivered=campaign.delivered_count or 0,
+            failed=campaign.failed_count or 0,
+            running=running,
+            finished=campaign.status == models.CampaignStatus.COMPLETED
+        )
+    
+    async def event_stream():
+        # Subscribed here, so the finally below always pairs with it
+        queue = progress_hub.subscribe(campaign_id, remote=remote)
+        if queue is None:
+            # Not running: send the persisted counters once and end the stream
+            yield format_event(persisted_progress(running=False))
+            return
+        
+        try:
+            if remote:
+                # Last persisted counters until the owning worker's first snapshot
+                yield format_event(persisted_progress(running=True))
+            
+            loop = asyncio.get_running_loop()
+            last_snapshot = loop.time()
+            while not await request.is_disconnected():
+                try:
+                    snapshot = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Running runs publish at least every third of the lease TTL; an
+                    # ACTIVE campaign silent for a whole TTL has no live run anywhere
+                    if loop.time() - last_snapshot >= settings.campaign_lease_ttl:
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                
+                last_snapshot = loop.time()
+                yield format_event(schemas.CampaignProgress(**snapshot))
+                if not snapshot["running"]:
+                    break
+        finally:
+            progress_hub.unsubscribe(campaign_id, queue)
     
-    return {"message": "Campaign paused successfully"}
\ No newline at end of file
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
\ No newline at end of file
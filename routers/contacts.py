@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends
+from storage.interface import Storage
+from storage.provider import get_storage
+from auth import get_current_active_user
+from services.phone_normalizer import normalize_phones
+import schemas
+import models
+
+router = APIRouter(prefix="/api/contacts", tags=["Contacts"])
+
+@router.post("/import", response_model=schemas.ContactImportResult)
+async def import_contacts(
+    import_data: schemas.ContactImportRequest,
+    current_user: models.User = Depends(get_current_active_user),
+    storage: Storage = Depends(get_storage)
+):
+    """Bulk import contacts, merging numbers that only differ in formatting"""
+    phones = normalize_phones([c.phone for c in import_data.contacts])
+
+    # Last entry wins when the same number appears more than once
+    contacts = {}
+    invalid = []
+    for contact, phone in zip(import_data.contacts, phones):
+        if phone is None:
+            invalid.append(contact.phone)
+        else:
+            contacts[phone] = contact
+
+    existing = await storage.contacts.existing_phones(list(contacts))
+
+    new_contacts = [
+        {
+            "phone": phone,
+            "name": contact.name or phone,
+            "is_business": contact.is_business,
+            "contact_metadata": contact.metadata or {}
+        }
+        for phone, contact in contacts.items() if phone not in existing
+    ]
+    if new_contacts:
+        await storage.contacts.add_many(new_contacts)
+        await storage.commit()
+
+    return schemas.ContactImportResult(
+        imported=len(new_contacts),
+        existing=len(existing),
+        invalid=invalid
+    )
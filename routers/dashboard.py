@@ -1,18 +1,28 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict
+from uuid import UUID
 
-from database import get_db
+from storage.interface import Storage
+from storage.provider import get_storage
 from auth import get_current_active_user
 from services.user_service import UserService
+from services.resource_versions import conditional_get
 import schemas
 import models
 
 router = APIRouter(prefix="/api/dashboard", tags=["Dashboard"])
 
+async def conversation_totals(storage: Storage, user_id: UUID) -> str:
+    # Exactly the conversation figures the stats show
+    conversations, unread = await storage.conversations.totals(user_id)
+    return f"conversations={conversations},unread={unread}"
+
 @router.get("/stats", response_model=schemas.DashboardStats)
 async def get_dashboard_stats(
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage),
+    # The stats count instances, conversations (unread) and campaigns
+    validators: Dict[str, str] = Depends(conditional_get("instances", "campaigns", state=conversation_totals))
 ):
     """Get dashboard statistics for current user"""
-    return await UserService.get_dashboard_stats(db, current_user.id)
\ No newline at end of file
+    return await UserService.get_dashboard_stats(storage, current_user.id)
\ No newline at end of file
@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import Literal, Optional
+from uuid import UUID
+
+from auth import get_current_active_user
+from services.message_export import MessageExport, InvalidCursor, export_slots
+import models
+
+router = APIRouter(prefix="/api/exports", tags=["Exports"])
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+class ExportResponse(StreamingResponse):
+    """Holds an export slot until the response ends, however it ends.
+
+    Released here rather than in the body generator, which never runs (so
+    never reaches its finally) when the client is gone before the first chunk.
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            export_slots.release()
+
+@router.get("/messages")
+async def export_messages(
+    instance_id: Optional[UUID] = None,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    format: Literal["ndjson", "csv"] = "ndjson",
+    cursor: Optional[str] = None,
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Stream the user's messages, oldest first; pass a row's ``cursor`` to resume after it"""
+    export = MessageExport(current_user.id, instance_id, start, end)
+    try:
+        after = export.resume_position(cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if not export_slots.try_acquire():
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many exports running, try again shortly",
+            headers={"Retry-After": "30"}
+        )
+
+    rows = export.ndjson_stream(after) if format == "ndjson" else export.csv_stream(after)
+    filename = f"messages-{datetime.utcnow():%Y%m%d-%H%M%S}.{format}"
+    return ExportResponse(
+        rows,
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
+            "X-Accel-Buffering": "no",
+        }
+    )
@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, extract
-from typing import List, Optional
+from typing import Dict, List, Optional
 from uuid import UUID
 from datetime import datetime
 
-from database import get_db
+from storage.interface import Storage
+from storage.provider import get_storage
 from auth import get_current_active_user
+from config import settings
+from services.fast_json import FastJSONResponse
+from services.resource_versions import conditional_get
 import schemas
 import models
 
@@ -16,10 +18,10 @@ router = APIRouter(prefix="/api/finances", tags=["Finances"])
 async def create_finance_entry(
     entry_data: schemas.FinanceEntryCreate,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Create a new finance entry"""
-    entry = models.FinanceEntry(
+    entry = await storage.finances.add(
         user_id=current_user.id,
         description=entry_data.description,
         category=entry_data.category,
@@ -27,10 +29,7 @@ async def create_finance_entry(
         entry_type=entry_data.entry_type,
         date=entry_data.date
     )
-    
-    db.add(entry)
-    await db.commit()
-    await db.refresh(entry)
+    await storage.commit()
     
     return entry
 
@@ -40,45 +39,28 @@ async def get_finance_entries(
     month: Optional[int] = None,
     entry_type: Optional[str] = None,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage),
+    validators: Dict[str, str] = Depends(conditional_get("finances"))
 ):
     """Get finance entries with optional filters"""
-    query = select(models.FinanceEntry).filter(
-        models.FinanceEntry.user_id == current_user.id
-    )
-    
-    if year:
-        query = query.filter(extract('year', models.FinanceEntry.date) == year)
-    
-    if month:
-        query = query.filter(extract('month', models.FinanceEntry.date) == month)
+    if entry_type not in ['income', 'expense']:
+        entry_type = None
     
-    if entry_type and entry_type in ['income', 'expense']:
-        query = query.filter(models.FinanceEntry.entry_type == entry_type)
-    
-    query = query.order_by(models.FinanceEntry.date.desc())
-    
-    result = await db.execute(query)
-    return result.scalars().all()
+    if settings.fast_list_responses:
+        rows = await storage.finances.list_rows(
+            schemas.FinanceEntryResponse, current_user.id, year, month, entry_type
+        )
+        return FastJSONResponse(rows, headers=validators)
+    return await storage.finances.list_for_user(current_user.id, year, month, entry_type)
 
 @router.get("/{entry_id}", response_model=schemas.FinanceEntryResponse)
 async def get_finance_entry(
     entry_id: UUID,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Get specific finance entry"""
-    result = await db.execute(
-        select(models.FinanceEntry)
-        .filter(
-            and_(
-                models.FinanceEntry.id == entry_id,
-                models.FinanceEntry.user_id == current_user.id
-            )
-        )
-    )
-    
-    entry = result.scalar_one_or_none()
+    entry = await storage.finances.get(entry_id, current_user.id)
     if not entry:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -92,34 +74,25 @@ async def update_finance_entry(
     entry_id: UUID,
     entry_data: schemas.FinanceEntryCreate,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Update finance entry"""
-    result = await db.execute(
-        select(models.FinanceEntry)
-        .filter(
-            and_(
-                models.FinanceEntry.id == entry_id,
-                models.FinanceEntry.user_id == current_user.id
-            )
-        )
-    )
-    
-    entry = result.scalar_one_or_none()
+    entry = await storage.finances.get(entry_id, current_user.id)
     if not entry:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Finance entry not found"
         )
     
-    entry.description = entry_data.description
-    entry.category = entry_data.category
-    entry.amount = entry_data.amount
-    entry.entry_type = entry_data.entry_type
-    entry.date = entry_data.date
-    
-    await db.commit()
-    await db.refresh(entry)
+    entry = await storage.finances.update(
+        entry,
+        description=entry_data.description,
+        category=entry_data.category,
+        amount=entry_data.amount,
+        entry_type=entry_data.entry_type,
+        date=entry_data.date
+    )
+    await storage.commit()
     
     return entry
 
@@ -127,28 +100,18 @@ async def update_finance_entry(
 async def delete_finance_entry(
     entry_id: UUID,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Delete finance entry"""
-    result = await db.execute(
-        select(models.FinanceEntry)
-        .filter(
-            and_(
-                models.FinanceEntry.id == entry_id,
-                models.FinanceEntry.user_id == current_user.id
-            )
-        )
-    )
-    
-    entry = result.scalar_one_or_none()
+    entry = await storage.finances.get(entry_id, current_user.id)
     if not entry:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Finance entry not found"
         )
     
-    await db.delete(entry)
-    await db.commit()
+    await storage.finances.delete(entry)
+    await storage.commit()
     
     return {"message": "Finance entry deleted successfully"}
 
@@ -157,21 +120,10 @@ async def get_monthly_summary(
     year: int,
     month: int,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Get monthly financial summary"""
-    result = await db.execute(
-        select(models.FinanceEntry)
-        .filter(
-            and_(
-                models.FinanceEntry.user_id == current_user.id,
-                extract('year', models.FinanceEntry.date) == year,
-                extract('month', models.FinanceEntry.date) == month
-            )
-        )
-    )
-    
-    entries = result.scalars().all()
+    entries = await storage.finances.list_for_user(current_user.id, year, month)
     
     total_income = sum(e.amount for e in entries if e.entry_type == 'income')
     total_expenses = sum(e.amount for e in entries if e.entry_type == 'expense')
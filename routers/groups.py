@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from typing import List
+from typing import Dict, List
 from uuid import UUID
 
-from database import get_db
+from storage.interface import Storage
+from storage.provider import get_storage
 from auth import get_current_active_user
+from config import settings
+from services.fast_json import FastJSONResponse
+from services.resource_versions import conditional_get
 import schemas
 import models
 
@@ -15,53 +17,39 @@ router = APIRouter(prefix="/api/groups", tags=["Groups"])
 async def create_group(
     group_data: schemas.GroupCreate,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Create a new contact group"""
-    group = models.Group(
+    group = await storage.groups.add(
         user_id=current_user.id,
         name=group_data.name,
         description=group_data.description,
         contacts=group_data.contacts
     )
-    
-    db.add(group)
-    await db.commit()
-    await db.refresh(group)
+    await storage.commit()
     
     return group
 
 @router.get("/", response_model=List[schemas.GroupResponse])
 async def get_groups(
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage),
+    validators: Dict[str, str] = Depends(conditional_get("groups"))
 ):
     """Get all groups for current user"""
-    result = await db.execute(
-        select(models.Group)
-        .filter(models.Group.user_id == current_user.id)
-        .order_by(models.Group.created_at.desc())
-    )
-    return result.scalars().all()
+    if settings.fast_list_responses:
+        rows = await storage.groups.list_rows(schemas.GroupResponse, current_user.id)
+        return FastJSONResponse(rows, headers=validators)
+    return await storage.groups.list_for_user(current_user.id)
 
 @router.get("/{group_id}", response_model=schemas.GroupResponse)
 async def get_group(
     group_id: UUID,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Get specific group"""
-    result = await db.execute(
-        select(models.Group)
-        .filter(
-            and_(
-                models.Group.id == group_id,
-                models.Group.user_id == current_user.id
-            )
-        )
-    )
-    
-    group = result.scalar_one_or_none()
+    group = await storage.groups.get(group_id, current_user.id)
     if not group:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -75,20 +63,10 @@ async def update_group(
     group_id: UUID,
     group_data: schemas.GroupUpdate,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Update group"""
-    result = await db.execute(
-        select(models.Group)
-        .filter(
-            and_(
-                models.Group.id == group_id,
-                models.Group.user_id == current_user.id
-            )
-        )
-    )
-    
-    group = result.scalar_one_or_none()
+    group = await storage.groups.get(group_id, current_user.id)
     if not group:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -96,15 +74,16 @@ async def update_group(
         )
     
     # Update fields if provided
+    changes = {}
     if group_data.name is not None:
-        group.name = group_data.name
+        changes["name"] = group_data.name
     if group_data.description is not None:
-        group.description = group_data.description
+        changes["description"] = group_data.description
     if group_data.contacts is not None:
-        group.contacts = group_data.contacts
+        changes["contacts"] = group_data.contacts
     
-    await db.commit()
-    await db.refresh(group)
+    group = await storage.groups.update(group, **changes)
+    await storage.commit()
     
     return group
 
@@ -112,27 +91,17 @@ async def update_group(
 async def delete_group(
     group_id: UUID,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Delete group"""
-    result = await db.execute(
-        select(models.Group)
-        .filter(
-            and_(
-                models.Group.id == group_id,
-                models.Group.user_id == current_user.id
-            )
-        )
-    )
-    
-    group = result.scalar_one_or_none()
+    group = await storage.groups.get(group_id, current_user.id)
     if not group:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Group not found"
         )
     
-    await db.delete(group)
-    await db.commit()
+    await storage.groups.delete(group)
+    await storage.commit()
     
     return {"message": "Group deleted successfully"}
\ No newline at end of file
@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import Dict, List
 from uuid import UUID
 
-from database import get_db
+from storage.interface import Storage
+from storage.provider import get_storage
 from auth import get_current_active_user
 from services.instance_service import InstanceService
+from services.resource_versions import conditional_get
 import schemas
 import models
 
@@ -15,11 +16,11 @@ router = APIRouter(prefix="/api/instances", tags=["WhatsApp Instances"])
 async def create_instance(
     instance_data: schemas.WhatsAppInstanceCreate,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Create a new WhatsApp instance"""
     try:
-        instance = await InstanceService.create_instance(db, current_user.id, instance_data)
+        instance = await InstanceService.create_instance(storage, current_user.id, instance_data)
         return instance
     except Exception as e:
         raise HTTPException(
@@ -30,19 +31,20 @@ async def create_instance(
 @router.get("/", response_model=List[schemas.WhatsAppInstanceResponse])
 async def get_instances(
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage),
+    validators: Dict[str, str] = Depends(conditional_get("instances"))
 ):
     """Get all instances for current user"""
-    return await InstanceService.get_user_instances(db, current_user.id)
+    return await InstanceService.get_user_instances(storage, current_user.id)
 
 @router.get("/{instance_id}", response_model=schemas.WhatsAppInstanceResponse)
 async def get_instance(
     instance_id: UUID,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Get specific instance"""
-    instance = await InstanceService.get_instance_by_id(db, instance_id, current_user.id)
+    instance = await InstanceService.get_instance_by_id(storage, instance_id, current_user.id)
     if not instance:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -55,10 +57,10 @@ async def update_instance(
     instance_id: UUID,
     instance_data: schemas.WhatsAppInstanceUpdate,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Update instance"""
-    instance = await InstanceService.update_instance(db, instance_id, current_user.id, instance_data)
+    instance = await InstanceService.update_instance(storage, instance_id, current_user.id, instance_data)
     if not instance:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -70,10 +72,10 @@ async def update_instance(
 async def delete_instance(
     instance_id: UUID,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Delete instance"""
-    success = await InstanceService.delete_instance(db, instance_id, current_user.id)
+    success = await InstanceService.delete_instance(storage, instance_id, current_user.id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -85,17 +87,17 @@ async def delete_instance(
 async def get_qr_code(
     instance_id: UUID,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Get QR code for instance connection"""
-    instance = await InstanceService.get_instance_by_id(db, instance_id, current_user.id)
+    instance = await InstanceService.get_instance_by_id(storage, instance_id, current_user.id)
     if not instance:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Instance not found"
         )
     
-    qr_code = await InstanceService.get_qr_code(db, instance_id, current_user.id)
+    qr_code = await InstanceService.get_qr_code(storage, instance_id, current_user.id)
     if not qr_code:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -112,10 +114,10 @@ async def get_qr_code(
 async def sync_instance_status(
     instance_id: UUID,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Sync instance status with WhatsApp service"""
-    instance = await InstanceService.sync_instance_status(db, instance_id, current_user.id)
+    instance = await InstanceService.sync_instance_status(storage, instance_id, current_user.id)
     if not instance:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
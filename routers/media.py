@@ -0,0 +1,122 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from auth import get_current_active_user
+from services.media_store import (
+    media_store, clean_content_type, parse_range, DEFAULT_CONTENT_TYPE, InvalidContentType, MediaTooLarge,
+    RangeNotSatisfiable
+)
+from services.thumbnails import thumbnailer, PLACEHOLDER, PLACEHOLDER_TYPE
+import schemas
+import models
+
+router = APIRouter(prefix="/api/media", tags=["Media"])
+
+# The URL is the content hash, so what it points to never changes
+CACHE_CONTROL = "private, max-age=31536000, immutable"
+# Seconds before a client should ask again for a thumbnail that wasn't ready
+THUMBNAIL_RETRY_AFTER = "2"
+# On every response: the browser must not guess a type, and a blob opened as
+# a page gets no script, plugins or same-origin access
+SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "Content-Security-Policy": "default-src 'none'; media-src 'self'; img-src 'self'; sandbox",
+}
+
+async def store_request_body(request: Request) -> schemas.MediaResponse:
+    """Stream a raw request body into the media store"""
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > media_store.max_bytes:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Media too large")
+    # Checked before anything is read; the type decides how the blob is served
+    try:
+        content_type = clean_content_type(request.headers.get("content-type"))
+    except InvalidContentType as e:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e))
+    try:
+        blob = await media_store.save(request.stream(), content_type)
+    except MediaTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    thumbnailer.prefetch(blob)
+    return schemas.MediaResponse(
+        sha256=blob.sha256, size=blob.size, content_type=blob.content_type,
+        message_type=blob.message_type, url=blob.url
+    )
+
+@router.post("/", response_model=schemas.MediaResponse)
+async def upload_media(
+    request: Request,
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Upload a file as the raw request body (its Content-Type is kept); use ``url`` as a message's media_url"""
+    return await store_request_body(request)
+
+@router.api_route("/{sha256}", methods=["GET", "HEAD"])
+async def download_media(sha256: str, request: Request):
+    """Stream a stored file; supports single ``Range`` requests and ETag revalidation.
+
+    Only ``INLINE_CONTENT_TYPES`` keep their type; anything else is sent as
+    an ``application/octet-stream`` attachment.
+    """
+    blob = media_store.stat(sha256)
+    if blob is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Media not found")
+
+    etag = f'"{blob.sha256}"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Accept-Ranges": "bytes", **SECURITY_HEADERS}
+    media_type = blob.content_type
+    if not blob.inline:
+        media_type = DEFAULT_CONTENT_TYPE
+        headers["Content-Disposition"] = f'attachment; filename="{blob.sha256}"'
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    byte_range = None
+    # If-Range with another validator means the client's partial copy is stale: send it all
+    if request.headers.get("if-range", etag) == etag:
+        try:
+            byte_range = parse_range(request.headers.get("range"), blob.size)
+        except RangeNotSatisfiable:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={**headers, "Content-Range": f"bytes */{blob.size}"}
+            )
+
+    first, last = byte_range or (0, blob.size - 1)
+    headers["Content-Length"] = str(last - first + 1)
+    status_code = status.HTTP_200_OK
+    if byte_range is not None:
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {first}-{last}/{blob.size}"
+
+    if request.method == "HEAD" or blob.size == 0:
+        return Response(status_code=status_code, headers=headers, media_type=media_type)
+    return StreamingResponse(
+        media_store.read(blob.sha256, first, last),
+        status_code=status_code,
+        headers=headers,
+        media_type=media_type
+    )
+
+@router.get("/{sha256}/thumbnail")
+async def get_thumbnail(sha256: str, request: Request):
+    """A small JPEG preview of an image, or a placeholder while it is being rendered"""
+    blob = media_store.stat(sha256)
+    if blob is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Media not found")
+
+    etag = f'"{blob.sha256}-thumbnail"'
+    cached = {"ETag": etag, "Cache-Control": CACHE_CONTROL, **SECURITY_HEADERS}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cached)
+
+    path = await thumbnailer.get(blob)
+    if path is not None:
+        return FileResponse(path, media_type="image/jpeg", headers=cached)
+    if thumbnailer.is_final(blob):
+        return Response(PLACEHOLDER, media_type=PLACEHOLDER_TYPE, headers=cached)
+    return Response(
+        PLACEHOLDER,
+        media_type=PLACEHOLDER_TYPE,
+        headers={"Cache-Control": "no-store", "Retry-After": THUMBNAIL_RETRY_AFTER, **SECURITY_HEADERS}
+    )
@@ -1,13 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, desc, func
-from sqlalchemy.orm import selectinload
 from typing import List, Optional
 from uuid import UUID
 
-from database import get_db
+from storage.interface import Storage, utcnow
+from storage.provider import get_storage
 from auth import get_current_active_user
+from config import settings
 from services.whatsapp_service import whatsapp_service
+from services.media_store import media_store, thumbnail_url
+from services.event_bus import event_bus
+from services.tracing import tracer
+from services.fast_json import FastJSONResponse
 import schemas
 import models
 
@@ -17,47 +20,26 @@ router = APIRouter(prefix="/api/messages", tags=["Messages"])
 async def get_conversations(
     instance_id: Optional[UUID] = None,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Get all conversations for current user"""
-    query = (
-        select(models.Conversation)
-        .options(
-            selectinload(models.Conversation.contact),
-            selectinload(models.Conversation.messages)
-        )
-        .filter(models.Conversation.user_id == current_user.id)
-        .order_by(desc(models.Conversation.last_message_at))
-    )
-    
-    if instance_id:
-        query = query.filter(models.Conversation.instance_id == instance_id)
-    
-    result = await db.execute(query)
-    return result.scalars().all()
+    if settings.fast_list_responses:
+        rows = await storage.conversations.list_rows(schemas.ConversationResponse, current_user.id, instance_id)
+        # Computed on the schema, so not among the selected columns
+        for row in rows:
+            for message in row["messages"]:
+                message["thumbnail_url"] = thumbnail_url(message.get("media_url"), message.get("message_type"))
+        return FastJSONResponse(rows)
+    return await storage.conversations.list_for_user(current_user.id, instance_id)
 
 @router.get("/conversations/{conversation_id}", response_model=schemas.ConversationResponse)
 async def get_conversation(
     conversation_id: UUID,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Get specific conversation with messages"""
-    result = await db.execute(
-        select(models.Conversation)
-        .options(
-            selectinload(models.Conversation.contact),
-            selectinload(models.Conversation.messages)
-        )
-        .filter(
-            and_(
-                models.Conversation.id == conversation_id,
-                models.Conversation.user_id == current_user.id
-            )
-        )
-    )
-    
-    conversation = result.scalar_one_or_none()
+    conversation = await storage.conversations.get(conversation_id, current_user.id, with_messages=True)
     if not conversation:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -70,20 +52,11 @@ async def get_conversation(
 async def send_message(
     message_data: schemas.MessageCreate,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Send a message"""
     # Get conversation
-    result = await db.execute(
-        select(models.Conversation)
-        .filter(
-            and_(
-                models.Conversation.id == message_data.conversation_id,
-                models.Conversation.user_id == current_user.id
-            )
-        )
-    )
-    conversation = result.scalar_one_or_none()
+    conversation = await storage.conversations.get(message_data.conversation_id, current_user.id)
     if not conversation:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -91,11 +64,7 @@ async def send_message(
         )
     
     # Get instance
-    result = await db.execute(
-        select(models.WhatsAppInstance)
-        .filter(models.WhatsAppInstance.id == conversation.instance_id)
-    )
-    instance = result.scalar_one_or_none()
+    instance = await storage.instances.get(conversation.instance_id)
     if not instance:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -103,46 +72,52 @@ async def send_message(
         )
     
     # Get contact
-    result = await db.execute(
-        select(models.Contact)
-        .filter(models.Contact.id == conversation.contact_id)
-    )
-    contact = result.scalar_one_or_none()
+    contact = await storage.contacts.get(conversation.contact_id)
     if not contact:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Contact not found"
         )
     
+    # Media goes out by reference: Baileys downloads it from /api/media
+    media = None
+    if message_data.message_type != "text":
+        sha256 = media_store.parse_url(message_data.media_url)
+        media = media_store.stat(sha256) if sha256 else None
+        if media is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="media_url must be the url of an upload (POST /api/media/)"
+            )
+    
     try:
         # Send message via WhatsApp
         result = await whatsapp_service.send_message(
             instance.session_id,
             contact.phone,
             message_data.content,
-            message_data.message_type
+            message_data.message_type,
+            media=media
         )
         
         # Create message record
-        message = models.Message(
+        message = await storage.messages.add(
             conversation_id=conversation.id,
             instance_id=instance.id,
             whatsapp_message_id=result.get('messageId') if result else None,
             content=message_data.content,
             message_type=message_data.message_type,
-            media_url=message_data.media_url,
+            media_url=media.url if media else message_data.media_url,
             is_from_me=True,
             status=models.MessageStatus.SENT,
-            timestamp=func.now()
+            timestamp=utcnow()
         )
         
-        db.add(message)
-        
         # Update conversation
-        conversation.last_message_at = func.now()
+        await storage.conversations.record_activity(conversation.id, at=message.timestamp)
         
-        await db.commit()
-        await db.refresh(message)
+        with tracer.span("db commit"):
+            await storage.commit()
         
         return message
         
@@ -156,28 +131,24 @@ async def send_message(
 async def mark_conversation_read(
     conversation_id: UUID,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Mark conversation as read"""
-    result = await db.execute(
-        select(models.Conversation)
-        .filter(
-            and_(
-                models.Conversation.id == conversation_id,
-                models.Conversation.user_id == current_user.id
-            )
-        )
-    )
-    
-    conversation = result.scalar_one_or_none()
+    conversation = await storage.conversations.get(conversation_id, current_user.id)
     if not conversation:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Conversation not found"
         )
     
-    conversation.unread_count = 0
-    await db.commit()
+    await storage.conversations.update(conversation, unread_count=0)
+    await storage.commit()
+    
+    event_bus.publish("conversation.unread", {
+        "user_id": current_user.id,
+        "conversation_id": conversation.id,
+        "unread_count": 0
+    })
     
     return {"message": "Conversation marked as read"}
 
@@ -185,27 +156,17 @@ async def mark_conversation_read(
 async def delete_conversation(
     conversation_id: UUID,
     current_user: models.User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Delete conversation"""
-    result = await db.execute(
-        select(models.Conversation)
-        .filter(
-            and_(
-                models.Conversation.id == conversation_id,
-                models.Conversation.user_id == current_user.id
-            )
-        )
-    )
-    
-    conversation = result.scalar_one_or_none()
+    conversation = await storage.conversations.get(conversation_id, current_user.id)
     if not conversation:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Conversation not found"
         )
     
-    await db.delete(conversation)
-    await db.commit()
+    await storage.conversations.delete(conversation)
+    await storage.commit()
     
     return {"message": "Conversation deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends
+from typing import List
+
+from storage.interface import Storage
+from storage.provider import get_storage
+from auth import get_current_active_user
+from services.suppression_service import suppression_registry
+from services.phone_normalizer import normalize_phone_list
+import schemas
+import models
+
+router = APIRouter(prefix="/api/suppressions", tags=["Suppressions"])
+
+@router.get("/", response_model=List[schemas.SuppressionResponse])
+async def get_suppressions(
+    skip: int = 0,
+    limit: int = 100,
+    current_user: models.User = Depends(get_current_active_user),
+    storage: Storage = Depends(get_storage)
+):
+    """List suppressed numbers for current user"""
+    return await storage.suppressions.list_for_user(current_user.id, skip, min(limit, 1000))
+
+@router.post("/bulk", response_model=schemas.SuppressionBulkResult)
+async def add_suppressions(
+    request_data: schemas.SuppressionBulkRequest,
+    current_user: models.User = Depends(get_current_active_user),
+    storage: Storage = Depends(get_storage)
+):
+    """Add numbers to the suppression list"""
+    phones, _ = normalize_phone_list(request_data.phones)
+    added = await suppression_registry.add(storage, current_user.id, phones, request_data.reason)
+    return schemas.SuppressionBulkResult(requested=len(request_data.phones), affected=added)
+
+@router.delete("/bulk", response_model=schemas.SuppressionBulkResult)
+async def remove_suppressions(
+    request_data: schemas.SuppressionBulkDelete,
+    current_user: models.User = Depends(get_current_active_user),
+    storage: Storage = Depends(get_storage)
+):
+    """Remove numbers from the suppression list"""
+    phones, _ = normalize_phone_list(request_data.phones)
+    removed = await suppression_registry.remove(storage, current_user.id, phones)
+    return schemas.SuppressionBulkResult(requested=len(request_data.phones), affected=removed)
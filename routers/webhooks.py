@@ -1,40 +1,50 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
 from uuid import UUID
 from datetime import datetime
 import logging
 
-from database import get_db
+from storage.interface import Storage, utcnow
+from storage.provider import get_storage, open_storage
+from routers.media import store_request_body
+from services.media_store import media_store
 from services.instance_service import InstanceService
+from services.receipt_service import receipt_batcher
+from services.suppression_service import suppression_registry, is_opt_out
+from services.phone_normalizer import normalize_phone, is_group_jid
+from services.event_bus import event_bus
+from services.structured_logging import bind_instance
+from services.tracing import tracer
+import schemas
 import models
 
 router = APIRouter(prefix="/api/webhook", tags=["Webhooks"])
 logger = logging.getLogger(__name__)
 
+# Events carry a preview only; the full message is one API call away
+MESSAGE_PREVIEW_LENGTH = 500
+
 @router.post("/whatsapp/{instance_id}")
 async def whatsapp_webhook(
     instance_id: UUID,
     request: Request,
-    db: AsyncSession = Depends(get_db)
+    storage: Storage = Depends(get_storage)
 ):
     """Handle WhatsApp webhooks from Baileys service"""
+    # Every log line below carries instance_id (and the request's request_id)
+    bind_instance(instance_id)
     try:
         data = await request.json()
         webhook_type = data.get('type')
         session_id = data.get('sessionId')
         
-        logger.info(f"Received webhook: {webhook_type} for instance {instance_id}")
+        # One line per event: DEBUG so it can be sampled (LOG_SAMPLING=routers.webhooks=0.01)
+        logger.debug("Received webhook: %s", webhook_type, extra={"webhook_type": webhook_type})
         
         # Get instance
-        result = await db.execute(
-            select(models.WhatsAppInstance)
-            .filter(models.WhatsAppInstance.id == instance_id)
-        )
-        instance = result.scalar_one_or_none()
+        instance = await storage.instances.get(instance_id)
         
         if not instance:
-            logger.error(f"Instance {instance_id} not found")
+            logger.error("Instance not found")
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Instance not found"
@@ -44,103 +54,165 @@ async def whatsapp_webhook(
             # Update QR code
             qr_code = data.get('qrCode')
             if qr_code:
-                instance.qr_code = qr_code
-                instance.status = models.InstanceStatus.PENDING
-                await db.commit()
-                logger.info(f"Updated QR code for instance {instance_id}")
+                await storage.instances.update(instance, qr_code=qr_code, status=models.InstanceStatus.PENDING)
+                await storage.commit()
+                event_bus.publish("instance.status", {
+                    "user_id": instance.user_id,
+                    "instance_id": instance_id,
+                    "status": "qr_code"
+                })
+                logger.info("Updated QR code")
         
         elif webhook_type == 'connected':
             # Update connection status
             phone = data.get('phone')
-            instance.status = models.InstanceStatus.ACTIVE
-            instance.last_seen = func.now()
-            instance.qr_code = None  # Clear QR code
+            changes = {
+                "status": models.InstanceStatus.ACTIVE,
+                "last_seen": utcnow(),
+                "qr_code": None  # Clear QR code
+            }
             
             if phone:
-                instance.phone = phone
+                changes["phone"] = phone
             
-            await db.commit()
-            logger.info(f"Instance {instance_id} connected with phone {phone}")
+            instance = await storage.instances.update(instance, **changes)
+            await storage.commit()
+            event_bus.publish("instance.status", {
+                "user_id": instance.user_id,
+                "instance_id": instance_id,
+                "status": "connected",
+                "phone": instance.phone
+            })
+            logger.info("Instance connected with phone %s", phone)
         
         elif webhook_type == 'message':
             # Handle incoming message
             message_data = data.get('message', {})
             
             # Find or create contact
-            phone = message_data.get('from', '').replace('@s.whatsapp.net', '')
+            sender = message_data.get('from') or ''
+            is_group = is_group_jid(sender)
+            # Groups are kept under their JID, which replies are sent to. Other
+            # JIDs are always international, so no default country code
+            phone = sender if is_group else normalize_phone(sender, default_country_code=None)
             if not phone:
                 logger.warning("No phone number in message webhook")
                 return {"status": "ignored"}
             
             # Find existing contact
-            result = await db.execute(
-                select(models.Contact)
-                .filter(models.Contact.phone == phone)
-            )
-            contact = result.scalar_one_or_none()
+            contact = await storage.contacts.get_by_phone(phone)
             
             if not contact:
                 # Create new contact
-                contact = models.Contact(
+                contact = await storage.contacts.add(
                     phone=phone,
                     name=phone  # Default name is phone number
                 )
-                db.add(contact)
-                await db.flush()  # Get contact ID
             
             # Find or create conversation
-            result = await db.execute(
-                select(models.Conversation)
-                .filter(
-                    models.Conversation.instance_id == instance_id,
-                    models.Conversation.contact_id == contact.id
-                )
-            )
-            conversation = result.scalar_one_or_none()
+            conversation = await storage.conversations.find(instance_id, contact.id)
             
             if not conversation:
                 # Create new conversation
-                conversation = models.Conversation(
+                conversation = await storage.conversations.add(
                     user_id=instance.user_id,
                     instance_id=instance_id,
                     contact_id=contact.id,
-                    is_group=False
+                    is_group=is_group
                 )
-                db.add(conversation)
-                await db.flush()  # Get conversation ID
             
+            # Media was streamed to /media first; the message only references it
+            sha256 = media_store.parse_url(message_data.get('mediaUrl'))
+            blob = media_store.stat(sha256) if sha256 else None
+
             # Create message
-            message = models.Message(
+            message = await storage.messages.add(
                 conversation_id=conversation.id,
                 instance_id=instance_id,
                 whatsapp_message_id=message_data.get('id'),
                 content=message_data.get('content', ''),
                 message_type=message_data.get('messageType', 'text'),
+                media_url=blob.url if blob else None,
                 is_from_me=False,
                 status=models.MessageStatus.DELIVERED,
                 timestamp=datetime.fromtimestamp(message_data.get('timestamp', 0))
             )
-            db.add(message)
             
-            # Update conversation
-            conversation.unread_count += 1
-            conversation.last_message_at = func.now()
+            # Atomic increment, so concurrent deliveries can't lose updates
+            unread_count = await storage.conversations.record_activity(conversation.id, unread=1)
             
-            await db.commit()
-            logger.info(f"Processed incoming message for instance {instance_id}")
+            await storage.commit()
+            
+            event_bus.publish("message.received", {
+                "user_id": instance.user_id,
+                "instance_id": instance_id,
+                "conversation_id": conversation.id,
+                "message_id": message.id,
+                "from": phone,
+                "contact_name": contact.name,
+                "content": message.content[:MESSAGE_PREVIEW_LENGTH],
+                "message_type": message.message_type,
+                "media_url": message.media_url,
+                "timestamp": message.timestamp
+            })
+            event_bus.publish("conversation.unread", {
+                "user_id": instance.user_id,
+                "conversation_id": conversation.id,
+                "unread_count": unread_count
+            })
+            
+            # "STOP"-style replies opt the sender out of future campaigns
+            if not is_group and is_opt_out(message.content):
+                await suppression_registry.add(storage, instance.user_id, [phone], reason="opt_out")
+                logger.info("Suppressed %s after opt-out reply", phone)
+            
+            logger.debug("Processed incoming message", extra={"conversation_id": conversation.id})
+        
+        elif webhook_type == 'receipts':
+            # Delivery/read receipts are applied in batches by the receipt batcher
+            receipts = data.get('receipts', [])
+            # Receipts for traced sends carry the send's traceparent: close the loop in that trace
+            webhook_span = tracer.current_span
+            for receipt in receipts:
+                if not receipt.get('traceparent'):
+                    continue
+                span = tracer.start_span(f"whatsapp receipt {receipt.get('status')}", parent=receipt['traceparent'])
+                if span is not None:
+                    span.set_attribute("messaging.message_id", str(receipt.get('id')))
+                    if webhook_span is not None:
+                        span.set_attribute("webhook.trace_id", webhook_span.trace_id)
+                    tracer.end_span(span)
+            accepted = receipt_batcher.enqueue(receipts)
+            logger.debug("Queued %d receipts", accepted, extra={"receipts": accepted})
+            return {"status": "queued", "accepted": accepted}
         
         elif webhook_type == 'disconnected':
             # Handle disconnection
-            instance.status = models.InstanceStatus.OFFLINE
-            instance.last_seen = func.now()
-            await db.commit()
-            logger.info(f"Instance {instance_id} disconnected")
+            await storage.instances.update(instance, status=models.InstanceStatus.OFFLINE, last_seen=utcnow())
+            await storage.commit()
+            event_bus.publish("instance.status", {
+                "user_id": instance.user_id,
+                "instance_id": instance_id,
+                "status": "disconnected"
+            })
+            logger.info("Instance disconnected")
         
         return {"status": "processed"}
         
-    except Exception as e:
-        logger.error(f"Webhook processing error: {e}")
+    except Exception:
+        logger.exception("Webhook processing error")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to process webhook"
-        )
\ No newline at end of file
+        )
+
+@router.post("/whatsapp/{instance_id}/media", response_model=schemas.MediaResponse)
+async def whatsapp_media(instance_id: UUID, request: Request):
+    """Media of an incoming message, streamed by the Baileys service ahead of its message webhook"""
+    bind_instance(instance_id)
+    # Not a request-long session: the upload can take a while
+    async with open_storage() as storage:
+        instance = await storage.instances.get(instance_id)
+    if not instance:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Instance not found")
+    return await store_request_body(request)
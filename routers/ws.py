@@ -0,0 +1,36 @@
+from fastapi import APIRouter, WebSocket, status
+from typing import Optional
+import logging
+
+from storage.provider import open_storage
+from auth import get_user_from_token
+from services.realtime import realtime_hub
+
+router = APIRouter(tags=["Realtime"])
+logger = logging.getLogger(__name__)
+
+@router.websocket("/ws")
+async def realtime_events(websocket: WebSocket, token: Optional[str] = None):
+    """Push message, QR, connection and unread-count events to the UI.
+
+    Browsers can't set headers on WebSocket requests, so the access token
+    comes as the ``token`` query parameter.
+    """
+    # Short-lived session: a long-running socket must not pin a pool connection
+    user = None
+    if token:
+        async with open_storage() as storage:
+            user = await get_user_from_token(storage, token)
+
+    if user is None or not user.is_active:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    connection = realtime_hub.connect(user.id, websocket)
+    logger.info(f"WebSocket connected for user {user.id}")
+    try:
+        await connection.serve()
+    finally:
+        realtime_hub.disconnect(user.id, connection)
+        logger.info(f"WebSocket disconnected for user {user.id}")
@@ -1,8 +1,9 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import AliasChoices, BaseModel, EmailStr, Field, computed_field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from uuid import UUID
 from models import UserRole, InstanceStatus, MessageStatus, CampaignStatus
+from services.media_store import thumbnail_url
 
 # User Schemas
 class UserBase(BaseModel):
@@ -68,12 +69,22 @@ class ContactCreate(ContactBase):
 
 class ContactResponse(ContactBase):
     id: UUID
+    # The model attribute is contact_metadata (``metadata`` is SQLAlchemy's table registry)
+    metadata: Optional[Dict[str, Any]] = Field({}, validation_alias=AliasChoices("contact_metadata", "metadata"))
     profile_picture: Optional[str] = None
     created_at: datetime
     
     class Config:
         from_attributes = True
 
+class ContactImportRequest(BaseModel):
+    contacts: List[ContactCreate] = Field(..., min_length=1)
+
+class ContactImportResult(BaseModel):
+    imported: int
+    existing: int
+    invalid: List[str] = []
+
 # Message Schemas
 class MessageBase(BaseModel):
     content: str
@@ -93,10 +104,23 @@ class MessageResponse(MessageBase):
     status: MessageStatus
     timestamp: datetime
     created_at: datetime
+
+    @computed_field
+    @property
+    def thumbnail_url(self) -> Optional[str]:
+        return thumbnail_url(self.media_url, self.message_type)
     
     class Config:
         from_attributes = True
 
+# Media Schemas
+class MediaResponse(BaseModel):
+    sha256: str
+    size: int
+    content_type: str
+    message_type: str
+    url: str
+
 # Conversation Schemas
 class ConversationBase(BaseModel):
     is_group: bool = False
@@ -132,6 +156,7 @@ class CampaignBase(BaseModel):
 
 class CampaignCreate(CampaignBase):
     instance_id: UUID
+    instance_pool: List[UUID] = []
     scheduled_at: Optional[datetime] = None
 
 class CampaignUpdate(BaseModel):
@@ -139,12 +164,14 @@ class CampaignUpdate(BaseModel):
     description: Optional[str] = None
     message_template: Optional[str] = Field(None, min_length=1)
     target_contacts: Optional[List[str]] = None
+    instance_pool: Optional[List[UUID]] = None
     scheduled_at: Optional[datetime] = None
 
 class CampaignResponse(CampaignBase):
     id: UUID
     user_id: UUID
     instance_id: UUID
+    instance_pool: Optional[List[UUID]] = None
     status: CampaignStatus
     scheduled_at: Optional[datetime] = None
     sent_count: int
@@ -155,12 +182,31 @@ class CampaignResponse(CampaignBase):
     class Config:
         from_attributes = True
 
+class InstanceProgress(BaseModel):
+    instance_id: UUID
+    active: bool
+    sent: int
+    failed: int
+    throughput: float = 0.0  # messages per second
+
+class CampaignProgress(BaseModel):
+    campaign_id: UUID
+    total: int
+    sent: int
+    delivered: int
+    failed: int
+    throughput: float = 0.0  # messages per second
+    suppressed: int = 0  # recipients skipped because of the suppression list
+    running: bool
+    finished: bool
+    instances: List[InstanceProgress] = []
+
 # Finance Schemas
 class FinanceEntryBase(BaseModel):
     description: str = Field(..., min_length=1, max_length=200)
     category: Optional[str] = Field(None, max_length=50)
     amount: float
-    entry_type: str = Field(..., regex="^(income|expense)$")
+    entry_type: str = Field(..., pattern="^(income|expense)$")
     date: datetime
 
 class FinanceEntryCreate(FinanceEntryBase):
@@ -196,6 +242,27 @@ class GroupResponse(GroupBase):
     class Config:
         from_attributes = True
 
+# Suppression Schemas
+class SuppressionBulkRequest(BaseModel):
+    phones: List[str] = Field(..., min_length=1)
+    reason: str = Field("manual", pattern="^(manual|opt_out|blocked)$")
+
+class SuppressionBulkDelete(BaseModel):
+    phones: List[str] = Field(..., min_length=1)
+
+class SuppressionBulkResult(BaseModel):
+    requested: int
+    affected: int
+
+class SuppressionResponse(BaseModel):
+    id: UUID
+    phone: str
+    reason: str
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
 # Auth Schemas
 class Token(BaseModel):
     access_token: str
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Precompress static files
+
+Writes app.js.gz (and app.js.br when the brotli package is installed) next to
+every compressible file under static/, at maximum compression. The server
+sends these as-is to clients that accept them instead of compressing on
+every request. Run after changing static files (the Docker image does).
+"""
+
+import gzip
+import mimetypes
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services.compression import COMPRESSIBLE_TYPES, brotli
+from services.static_assets import PRECOMPRESSED
+
+MINIMUM_SIZE = 1024
+
+def compress_directory(directory: Path):
+    for path in sorted(directory.rglob("*")):
+        if not path.is_file() or path.suffix in PRECOMPRESSED.values():
+            continue
+        content_type = mimetypes.guess_type(path.name)[0] or ""
+        data = path.read_bytes()
+        if not content_type.startswith(COMPRESSIBLE_TYPES) or len(data) < MINIMUM_SIZE:
+            continue
+
+        variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants[".br"] = brotli.compress(data, quality=11)
+        for suffix, compressed in variants.items():
+            target = path.with_name(path.name + suffix)
+            # Only worth serving if it's actually smaller
+            if len(compressed) < len(data):
+                target.write_bytes(compressed)
+                print(f"{target.relative_to(directory)}: {len(data)} -> {len(compressed)} bytes")
+            elif target.exists():
+                target.unlink()
+
+if __name__ == "__main__":
+    compress_directory(Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).parent.parent / "static")
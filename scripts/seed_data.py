@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator for large tenants
+Usage: python scripts/seed_data.py [--messages 10000000] [--seed 42] [--truncate]
+
+Loads users, instances, contacts, conversations, messages, campaigns, groups
+and finance entries with COPY (asyncpg copy_records_to_table). Sizes are
+skewed the way production is: a few users own most instances, a few
+instances most conversations, a few conversations most messages, and
+recent days are busier than old ones. The same seed and sizes always
+produce the same rows.
+
+All seeded users share the password printed at the end.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import asyncpg
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from auth import get_password_hash
+from config import settings
+
+PASSWORD = "seed1234"
+# Rows per COPY; part of the deterministic output, so not configurable
+CHUNK_SIZE = 50_000
+MESSAGE_STREAM = 1
+
+TABLES = [
+    "messages", "conversations", "campaigns", "groups", "finance_entries",
+    "suppressions", "contacts", "whatsapp_instances", "users",
+]
+
+MESSAGE_COLUMNS = [
+    "id", "conversation_id", "instance_id", "whatsapp_message_id", "campaign_id", "content",
+    "message_type", "media_url", "is_from_me", "status", "timestamp", "created_at",
+]
+
+FIRST_NAMES = ["Ana", "Bruno", "Carla", "Diego", "Eduarda", "Felipe", "Gabriela", "Henrique",
+               "Isabela", "João", "Larissa", "Marcos", "Natália", "Otávio", "Paula", "Rafael"]
+LAST_NAMES = ["Silva", "Santos", "Oliveira", "Souza", "Lima", "Pereira", "Costa", "Almeida"]
+PHRASES = [
+    "Olá, tudo bem?", "Qual o valor?", "Obrigado!", "Pode me enviar o catálogo?",
+    "Ainda tem disponível?", "Vou verificar e te retorno.", "Pedido confirmado.",
+    "Qual o prazo de entrega?", "Bom dia!", "Segue o comprovante.", "Pode ser amanhã?",
+    "Perfeito, combinado.", "Tem outras cores?", "Aceita cartão?", "Já foi enviado.",
+    "Preciso de ajuda com meu pedido.",
+]
+MESSAGE_TYPES = np.array(["text", "image", "document", "audio", "video"], dtype=object)
+MESSAGE_TYPE_WEIGHTS = [0.88, 0.06, 0.02, 0.03, 0.01]
+OUTGOING_STATUSES = np.array(["SENT", "DELIVERED", "READ", "FAILED"], dtype=object)
+OUTGOING_STATUS_WEIGHTS = [0.1, 0.35, 0.52, 0.03]
+CAMPAIGN_STATUSES = ["DRAFT", "SCHEDULED", "ACTIVE", "PAUSED", "COMPLETED"]
+CAMPAIGN_STATUS_WEIGHTS = [0.1, 0.05, 0.05, 0.1, 0.7]
+FINANCE_CATEGORIES = ["vendas", "serviços", "marketing", "fornecedores", "impostos", "salários"]
+
+def zipf_weights(rng: np.random.Generator, n: int, skew: float) -> np.ndarray:
+    """Zipf-like weights in random order, so the heavy hitters aren't always the first rows"""
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+def allocate(rng: np.random.Generator, total: int, owners: int, skew: float, minimum: int = 0) -> np.ndarray:
+    """Owner index for each of ``total`` children, grouped by owner"""
+    counts = rng.multinomial(total - minimum * owners, zipf_weights(rng, owners, skew)) + minimum
+    return np.repeat(np.arange(owners), counts)
+
+def make_uuids(rng: np.random.Generator, n: int) -> list:
+    raw = rng.bytes(16 * n)
+    return [uuid.UUID(bytes=raw[i:i + 16], version=4) for i in range(0, 16 * n, 16)]
+
+def make_times(rng: np.random.Generator, n: int, start: float, until: float) -> np.ndarray:
+    """Epoch seconds between start and until, denser towards until"""
+    return start + (until - start) * rng.power(3.0, n)
+
+def to_datetimes(epochs: np.ndarray) -> list:
+    return [datetime.fromtimestamp(epoch, timezone.utc) for epoch in epochs.tolist()]
+
+def person_names(rng: np.random.Generator, n: int) -> list:
+    first = rng.integers(0, len(FIRST_NAMES), n)
+    last = rng.integers(0, len(LAST_NAMES), n)
+    return [f"{FIRST_NAMES[f]} {LAST_NAMES[l]}" for f, l in zip(first.tolist(), last.tolist())]
+
+def phone_number(index: int, offset: int) -> str:
+    # 7919 is coprime with 10**8, so numbers stay unique below 100M contacts
+    return f"55{11 + index % 89}9{(index * 7919 + offset) % 100_000_000:08d}"
+
+class Dataset:
+    """Everything except messages, plus the lookup arrays the message chunks need"""
+
+    def __init__(self, args):
+        self.args = args
+        self.rng = np.random.default_rng(args.seed)
+        self.until = args.until.timestamp()
+        self.start = self.until - args.days * 86400
+
+    def build(self):
+        args, rng = self.args, self.rng
+
+        # Users
+        self.user_ids = make_uuids(rng, args.users)
+        password_hash = get_password_hash(PASSWORD)
+        user_created = to_datetimes(rng.uniform(self.start, self.start + 86400, args.users))
+        self.users = [
+            (user_id, name, f"seed{args.seed}_user{i:05d}", password_hash, "USER", True, created)
+            for i, (user_id, name, created) in enumerate(zip(self.user_ids, person_names(rng, args.users), user_created))
+        ]
+
+        # Instances: every user gets one, the rest follow the skew
+        instance_user = allocate(rng, args.instances, args.users, args.skew, minimum=1)
+        self.instance_ids = make_uuids(rng, args.instances)
+        statuses = rng.choice(["ACTIVE", "OFFLINE", "ERROR"], args.instances, p=[0.85, 0.12, 0.03])
+        last_seen = to_datetimes(make_times(rng, args.instances, self.until - 86400, self.until))
+        self.instances = [
+            (
+                instance_id, self.user_ids[u], f"Instance {i}", phone_number(i, 13), f"seed{args.seed}_{i}",
+                status, "{}", seen, self.users[u][-1]
+            )
+            for i, (instance_id, u, status, seen) in enumerate(
+                zip(self.instance_ids, instance_user.tolist(), statuses.tolist(), last_seen)
+            )
+        ]
+        self.user_instances = [[] for _ in range(args.users)]
+        for i, u in enumerate(instance_user.tolist()):
+            self.user_instances[u].append(i)
+
+        # Contacts
+        self.contact_ids = make_uuids(rng, args.contacts)
+        business = rng.random(args.contacts) < 0.05
+        contact_created = to_datetimes(make_times(rng, args.contacts, self.start, self.until))
+        self.contacts = [
+            (contact_id, phone_number(i, 1), name, bool(is_business), "{}", created)
+            for i, (contact_id, name, is_business, created) in enumerate(
+                zip(self.contact_ids, person_names(rng, args.contacts), business.tolist(), contact_created)
+            )
+        ]
+
+        # Conversations: consecutive contacts per instance, starting at a random offset
+        conversation_instance = allocate(rng, args.conversations, args.instances, args.skew)
+        first_of_instance = np.searchsorted(conversation_instance, np.arange(args.instances))
+        position = np.arange(args.conversations) - first_of_instance[conversation_instance]
+        offsets = rng.integers(0, args.contacts, args.instances)
+        conversation_contact = (offsets[conversation_instance] + position) % args.contacts
+        self.conversation_user = instance_user[conversation_instance]
+        self.conversation_ids = np.array(make_uuids(rng, args.conversations), dtype=object)
+        self.conversation_instance_ids = np.array(self.instance_ids, dtype=object)[conversation_instance]
+        unread = np.where(rng.random(args.conversations) < 0.2, rng.geometric(0.3, args.conversations), 0)
+        archived = rng.random(args.conversations) < 0.1
+        conversation_created = to_datetimes(make_times(rng, args.conversations, self.start, self.until))
+        self.conversations = [
+            (conversation_id, self.user_ids[u], instance_id, self.contact_ids[c], False, int(n), bool(a), "{}", created)
+            for conversation_id, u, instance_id, c, n, a, created in zip(
+                self.conversation_ids.tolist(), self.conversation_user.tolist(),
+                self.conversation_instance_ids.tolist(), conversation_contact.tolist(),
+                unread.tolist(), archived.tolist(), conversation_created
+            )
+        ]
+        # Messages pick conversations by inverse CDF over skewed weights
+        self.conversation_cdf = np.cumsum(zipf_weights(rng, args.conversations, args.skew))
+        self.conversation_cdf[-1] = 1.0
+
+        self._build_campaigns()
+        self._build_groups()
+        self._build_finances()
+
+    def _build_campaigns(self):
+        args, rng = self.args, self.rng
+        campaign_user = allocate(rng, args.campaigns, args.users, args.skew)
+        self.campaign_ids = make_uuids(rng, args.campaigns)
+        self.user_campaign_start = np.searchsorted(campaign_user, np.arange(args.users))
+        self.user_campaign_count = np.bincount(campaign_user, minlength=args.users)
+        # Trailing None is what messages outside campaigns point at
+        self.campaign_lookup = np.array(self.campaign_ids + [None], dtype=object)
+
+        sizes = np.clip(rng.lognormal(5.0, 1.0, args.campaigns), 5, 5000).astype(int)
+        statuses = rng.choice(CAMPAIGN_STATUSES, args.campaigns, p=CAMPAIGN_STATUS_WEIGHTS)
+        created = to_datetimes(make_times(rng, args.campaigns, self.start, self.until))
+        self.campaigns = []
+        for campaign_id, u, size, status, created_at in zip(
+            self.campaign_ids, campaign_user.tolist(), sizes.tolist(), statuses.tolist(), created
+        ):
+            instances = self.user_instances[u]
+            instance_id = self.instance_ids[instances[int(rng.integers(0, len(instances)))]]
+            targets = [phone_number(int(c), 1) for c in rng.integers(0, args.contacts, size)]
+            processed = size if status == "COMPLETED" else size // 2 if status in ("ACTIVE", "PAUSED") else 0
+            failed = int(rng.binomial(processed, 0.03))
+            sent = processed - failed
+            delivered = int(rng.binomial(sent, 0.92))
+            self.campaigns.append((
+                campaign_id, self.user_ids[u], instance_id, "[]", f"Campaign {len(self.campaigns)}",
+                "Olá {nome}, temos novidades para você!", json.dumps(targets), status,
+                sent, delivered, failed, created_at
+            ))
+
+    def _build_groups(self):
+        args, rng = self.args, self.rng
+        group_user = allocate(rng, args.groups, args.users, args.skew)
+        sizes = np.clip(rng.lognormal(3.0, 1.0, args.groups), 1, 1000).astype(int)
+        created = to_datetimes(make_times(rng, args.groups, self.start, self.until))
+        self.groups = [
+            (
+                group_id, self.user_ids[u], f"Group {i}",
+                json.dumps([str(self.contact_ids[c]) for c in rng.integers(0, args.contacts, size).tolist()]),
+                created_at
+            )
+            for i, (group_id, u, size, created_at) in enumerate(
+                zip(make_uuids(rng, args.groups), group_user.tolist(), sizes.tolist(), created)
+            )
+        ]
+
+    def _build_finances(self):
+        args, rng = self.args, self.rng
+        finance_user = allocate(rng, args.finances, args.users, args.skew)
+        income = rng.random(args.finances) < 0.4
+        amounts = np.round(rng.lognormal(5.0, 1.2, args.finances), 2)
+        categories = rng.integers(0, len(FINANCE_CATEGORIES), args.finances)
+        dates = to_datetimes(make_times(rng, args.finances, self.start, self.until))
+        self.finances = [
+            (
+                entry_id, self.user_ids[u], f"Lançamento {i}", FINANCE_CATEGORIES[c], amount,
+                "income" if is_income else "expense", date, date
+            )
+            for i, (entry_id, u, is_income, amount, c, date) in enumerate(zip(
+                make_uuids(rng, args.finances), finance_user.tolist(), income.tolist(),
+                amounts.tolist(), categories.tolist(), dates
+            ))
+        ]
+
+    def message_chunk(self, index: int, size: int) -> list:
+        """Rows for one COPY; seeded per chunk so chunks can be built in any order"""
+        rng = np.random.default_rng([self.args.seed, MESSAGE_STREAM, index])
+        conversation = np.searchsorted(self.conversation_cdf, rng.random(size), side="right")
+        from_me = rng.random(size) < 0.45
+
+        statuses = OUTGOING_STATUSES[rng.choice(len(OUTGOING_STATUSES), size, p=OUTGOING_STATUS_WEIGHTS)]
+        statuses = np.where(from_me, statuses, np.where(rng.random(size) < 0.8, "READ", "DELIVERED"))
+        types = MESSAGE_TYPES[rng.choice(len(MESSAGE_TYPES), size, p=MESSAGE_TYPE_WEIGHTS)]
+
+        # A fifth of outgoing messages belong to one of the user's campaigns
+        user = self.conversation_user[conversation]
+        counts = self.user_campaign_count[user]
+        in_campaign = from_me & (counts > 0) & (rng.random(size) < 0.2)
+        picked = self.user_campaign_start[user] + (rng.random(size) * np.maximum(counts, 1)).astype(int)
+        campaigns = self.campaign_lookup[np.where(in_campaign, picked, len(self.campaign_ids))]
+
+        phrases = rng.integers(0, len(PHRASES), size).tolist()
+        raw_ids = rng.bytes(10 * size).hex().upper()
+        timestamps = to_datetimes(make_times(rng, size, self.start, self.until))
+        ids = make_uuids(rng, size)
+
+        return [
+            (
+                ids[i], conversation_id, instance_id, raw_ids[20 * i:20 * i + 20], campaign_id,
+                PHRASES[phrase], message_type,
+                None if message_type == "text" else f"https://media.example.com/{ids[i]}",
+                is_from_me, status, timestamp, timestamp
+            )
+            for i, (conversation_id, instance_id, campaign_id, phrase, message_type, is_from_me, status, timestamp)
+            in enumerate(zip(
+                self.conversation_ids[conversation].tolist(), self.conversation_instance_ids[conversation].tolist(),
+                campaigns.tolist(), phrases, types.tolist(), from_me.tolist(), statuses.tolist(), timestamps
+            ))
+        ]
+
+async def copy_table(conn, table: str, columns: list, records: list):
+    started = time.perf_counter()
+    for offset in range(0, len(records), CHUNK_SIZE):
+        await conn.copy_records_to_table(table, records=records[offset:offset + CHUNK_SIZE], columns=columns)
+    print(f"   {table}: {len(records):,} rows in {time.perf_counter() - started:.1f}s")
+
+async def copy_messages(dataset: Dataset, dsn: str, jobs: int):
+    """Build chunks in a worker thread while ``jobs`` connections COPY the previous ones"""
+    total = dataset.args.messages
+    chunks = [(i, min(CHUNK_SIZE, total - i * CHUNK_SIZE)) for i in range((total + CHUNK_SIZE - 1) // CHUNK_SIZE)]
+    queue: asyncio.Queue = asyncio.Queue(maxsize=jobs * 2)
+    loaded = 0
+    started = time.perf_counter()
+
+    async def producer():
+        for index, size in chunks:
+            await queue.put(await asyncio.to_thread(dataset.message_chunk, index, size))
+        for _ in range(jobs):
+            await queue.put(None)
+
+    async def consumer():
+        nonlocal loaded
+        conn = await asyncpg.connect(dsn)
+        try:
+            await conn.execute("SET synchronous_commit = off")
+            while (records := await queue.get()) is not None:
+                await conn.copy_records_to_table("messages", records=records, columns=MESSAGE_COLUMNS)
+                loaded += len(records)
+                elapsed = time.perf_counter() - started
+                print(f"\r   messages: {loaded:,}/{total:,} ({loaded / elapsed:,.0f} rows/s)", end="", flush=True)
+        finally:
+            await conn.close()
+
+    await asyncio.gather(producer(), *(consumer() for _ in range(jobs)))
+    print(f"\n   messages: {total:,} rows in {time.perf_counter() - started:.1f}s")
+
+async def seed(args):
+    print(f"🌱 Generating dataset (seed {args.seed})...")
+    started = time.perf_counter()
+    dataset = Dataset(args)
+    dataset.build()
+    print(f"   built in {time.perf_counter() - started:.1f}s")
+
+    conn = await asyncpg.connect(args.database_url)
+    try:
+        if args.truncate:
+            print("🧹 Truncating tables...")
+            await conn.execute(f"TRUNCATE {', '.join(TABLES)} CASCADE")
+
+        print("📥 Loading with COPY...")
+        await conn.execute("SET synchronous_commit = off")
+        await copy_table(conn, "users", ["id", "name", "username", "password_hash", "role", "is_active", "created_at"], dataset.users)
+        await copy_table(conn, "whatsapp_instances", [
+            "id", "user_id", "name", "phone", "session_id", "status", "settings", "last_seen", "created_at"
+        ], dataset.instances)
+        await copy_table(conn, "contacts", ["id", "phone", "name", "is_business", "contact_metadata", "created_at"], dataset.contacts)
+        await copy_table(conn, "conversations", [
+            "id", "user_id", "instance_id", "contact_id", "is_group", "unread_count", "archived",
+            "conversation_metadata", "created_at"
+        ], dataset.conversations)
+        await copy_table(conn, "campaigns", [
+            "id", "user_id", "instance_id", "instance_pool", "name", "message_template", "target_contacts",
+            "status", "sent_count", "delivered_count", "failed_count", "created_at"
+        ], dataset.campaigns)
+        await copy_table(conn, "groups", ["id", "user_id", "name", "contacts", "created_at"], dataset.groups)
+        await copy_table(conn, "finance_entries", [
+            "id", "user_id", "description", "category", "amount", "entry_type", "date", "created_at"
+        ], dataset.finances)
+
+        await copy_messages(dataset, args.database_url, args.jobs)
+
+        print("🔧 Updating conversation activity and statistics...")
+        await conn.execute("""
+            UPDATE conversations c SET last_message_at = m.last_message_at
+            FROM (SELECT conversation_id, max(timestamp) AS last_message_at FROM messages GROUP BY conversation_id) m
+            WHERE c.id = m.conversation_id
+        """)
+        await conn.execute(f"ANALYZE {', '.join(TABLES)}")
+    finally:
+        await conn.close()
+
+    print(f"🎉 Seeded in {time.perf_counter() - started:.1f}s")
+    print(f"   Users: seed{args.seed}_user00000 ... seed{args.seed}_user{args.users - 1:05d}")
+    print(f"   Password: {PASSWORD}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load a synthetic dataset with COPY")
+    parser.add_argument("--database-url", default=settings.database_url)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--instances", type=int, default=200)
+    parser.add_argument("--contacts", type=int, default=200_000)
+    parser.add_argument("--conversations", type=int, default=500_000)
+    parser.add_argument("--messages", type=int, default=10_000_000)
+    parser.add_argument("--campaigns", type=int, default=2_000)
+    parser.add_argument("--groups", type=int, default=1_000)
+    parser.add_argument("--finances", type=int, default=50_000)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for how rows spread over owners")
+    parser.add_argument("--days", type=int, default=365, help="history length")
+    parser.add_argument("--until", type=datetime.fromisoformat, default=datetime(2025, 1, 1, tzinfo=timezone.utc),
+                        help="newest timestamp (ISO date); fixed so output is reproducible")
+    parser.add_argument("--jobs", type=int, default=4, help="parallel COPY connections for messages")
+    parser.add_argument("--truncate", action="store_true", help="empty all application tables first")
+    args = parser.parse_args()
+
+    if args.instances < args.users:
+        parser.error("--instances must be at least --users (every user gets an instance)")
+    if args.until.tzinfo is None:
+        args.until = args.until.replace(tzinfo=timezone.utc)
+    return args
+
+if __name__ == "__main__":
+    asyncio.run(seed(parse_args()))
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+WhatsApp Bot Management System - production server
+
+Builds the API without the dependency/service checks and auto-installer
+that main.py runs on every start. Use it for deploys and restarts:
+
+    uvicorn server:create_app --factory --host 0.0.0.0 --port 8000
+    python server.py
+
+Router modules are imported one by one while the app is built, the DB pool
+and the Baileys client are warmed up during lifespan startup, and the time
+spent in each phase is logged and exported as ``startup_phase_seconds``.
+Requests are traced when ``TRACING_EXPORTER`` is set (services/tracing.py).
+Responses are compressed (services/compression.py) and static files are
+served under content-hashed URLs (services/static_assets.py).
+"""
+
+import time
+
+_module_started = time.perf_counter()
+
+import importlib
+import logging
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import HTMLResponse, Response
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+ROUTERS = (
+    "auth", "dashboard", "instances", "messages", "campaigns", "finances",
+    "groups", "webhooks", "suppressions", "contacts", "exports", "media", "ws",
+)
+
+_framework_imported = time.perf_counter()
+
+class StartupTimer:
+    """Wall-clock time of each startup phase"""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {"framework_imports": _framework_imported - _module_started}
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    def report(self):
+        from services.metrics import STARTUP_PHASE_SECONDS
+
+        total = time.perf_counter() - _module_started
+        for name, seconds in self.phases.items():
+            STARTUP_PHASE_SECONDS.labels(name).set(seconds)
+        STARTUP_PHASE_SECONDS.labels("total").set(total)
+
+        phases = {name: seconds for name, seconds in self.phases.items() if not name.startswith("router.")}
+        routers = sorted(
+            ((name, seconds) for name, seconds in self.phases.items() if name.startswith("router.")),
+            key=lambda item: -item[1]
+        )
+        breakdown = ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in phases.items())
+        slowest = ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in routers[:3])
+        logger.info(f"Ready in {total * 1000:.0f}ms ({breakdown}; slowest {slowest})")
+
+@lru_cache(maxsize=1)
+def get_templates():
+    """Jinja2 is only needed for the UI page, so load it on the first visit"""
+    from fastapi.templating import Jinja2Templates
+    templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
+    templates.env.globals["static_url"] = get_static_assets().url
+    return templates
+
+@lru_cache(maxsize=1)
+def get_static_assets():
+    """Content hashes of the files under static/, computed once per process"""
+    from services.static_assets import StaticAssets
+    return StaticAssets(BASE_DIR / "static")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from storage.provider import get_backend
+    from services.whatsapp_service import whatsapp_service
+    from services.event_bus import event_bus
+    from services.metrics import loop_lag_monitor
+    from services.campaign_engine import campaign_engine
+    from services.receipt_service import receipt_batcher
+    from services.singleton_jobs import singleton_jobs
+    from services.tracing import tracer
+    from services.thumbnails import thumbnailer
+
+    timer: StartupTimer = app.state.startup_timer
+    storage_backend = get_backend()
+    with timer.phase("storage"):
+        try:
+            await storage_backend.start()
+        except Exception as e:
+            logger.error(f"Could not start the {storage_backend.name} storage backend: {e}")
+    with timer.phase("whatsapp_client"):
+        await whatsapp_service.start()
+    with timer.phase("background_work"):
+        tracer.start()
+        await event_bus.start()
+        loop_lag_monitor.start()
+        singleton_jobs.start()
+    timer.report()
+
+    yield
+
+    await singleton_jobs.stop()
+    # Persist campaign counters and pending receipts before exiting
+    await campaign_engine.shutdown()
+    await receipt_batcher.shutdown()
+    await event_bus.close()
+    await loop_lag_monitor.stop()
+    await whatsapp_service.close()
+    await thumbnailer.close()
+    await storage_backend.close()
+    tracer.shutdown()
+
+def create_app() -> FastAPI:
+    """Build the FastAPI application"""
+    from config import settings
+    from services.structured_logging import configure_logging, parse_sampling, CorrelationIdMiddleware
+
+    timer = StartupTimer()
+    configure_logging(settings.log_level, settings.log_json, parse_sampling(settings.log_sampling))
+
+    with timer.phase("app"):
+        app = FastAPI(
+            title="WhatsApp Bot Management System",
+            description="Sistema completo de gestão de bots WhatsApp",
+            version="1.0.0",
+            docs_url="/api/docs",
+            redoc_url="/api/redoc",
+            lifespan=lifespan
+        )
+        app.state.startup_timer = timer
+
+        app.add_middleware(
+            CORSMiddleware,
+            allow_origins=["*"],
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+        )
+
+    with timer.phase("routers"):
+        for name in ROUTERS:
+            with timer.phase(f"router.{name}"):
+                module = importlib.import_module(f"routers.{name}")
+                app.include_router(module.router)
+
+    # Opt-in per-request SQL profiling (X-SQL-Profile header or sampling)
+    from services.sql_profiler import SQLProfilerMiddleware
+    app.add_middleware(SQLProfilerMiddleware)
+
+    # gzip/brotli above a size threshold; inside the metrics and tracing layers
+    from services.compression import CompressionMiddleware
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_min_size,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality
+    )
+
+    # Per-route latency histograms for /metrics
+    from services.metrics import MetricsMiddleware, render_metrics
+    app.add_middleware(MetricsMiddleware)
+
+    # Server span per request; DB statements and Baileys calls become its children
+    from services.tracing import TracingMiddleware
+    app.add_middleware(TracingMiddleware)
+
+    # Outermost: request IDs for every log record, including the ones above
+    app.add_middleware(CorrelationIdMiddleware)
+
+    static_dir = BASE_DIR / "static"
+    if static_dir.exists():
+        from services.static_assets import HashedStaticFiles
+        app.mount("/static", HashedStaticFiles(assets=get_static_assets()), name="static")
+
+    @app.get("/", response_class=HTMLResponse)
+    async def read_root(request: Request):
+        """Serve the main application"""
+        return get_templates().TemplateResponse("index.html", {"request": request})
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus metrics"""
+        body, content_type = render_metrics()
+        return Response(content=body, media_type=content_type)
+
+    @app.get("/health")
+    async def health_check():
+        """Health check endpoint"""
+        return {
+            "status": "healthy",
+            "service": "whatsapp-bot-api",
+            "version": "1.0.0",
+            "domain": "78.46.250.112"
+        }
+
+    return app
+
+if __name__ == "__main__":
+    import os
+    import uvicorn
+
+    # Logging is set up by create_app (services/structured_logging.py)
+    uvicorn.run(
+        "server:create_app",
+        factory=True,
+        host=os.environ.get("HOST", "0.0.0.0"),
+        port=int(os.environ.get("PORT", "8000")),
+        log_level="info",
+        log_config=None
+    )
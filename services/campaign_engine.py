@@ -0,0 +1,605 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List, Set, Tuple
+from uuid import UUID
+
+from config import settings
+from services.whatsapp_service import whatsapp_service
+from services.dispatcher import InstanceDispatcher
+from services.suppression_service import suppression_registry
+from services.event_bus import event_bus
+from services.singleton_jobs import singleton_jobs
+from storage.interface import Storage, utcnow
+from storage.provider import open_storage
+import models
+
+logger = logging.getLogger(__name__)
+
+# (phone, instance id, WhatsApp message id or None if the send failed)
+Outcome = Tuple[str, UUID, Optional[str]]
+
+# This worker, as recorded in the run leases it holds
+WORKER_ID = f"{socket.gethostname()[:32]}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+class RateMeter:
+    """Exponentially smoothed per-second rate of a growing counter"""
+
+    def __init__(self, value: int = 0):
+        self._last_value = value
+        self._last_time = time.monotonic()
+        self._primed = False
+        self.rate = 0.0
+
+    def update(self, value: int) -> float:
+        now = time.monotonic()
+        elapsed = now - self._last_time
+        if elapsed > 0:
+            rate = (value - self._last_value) / elapsed
+            self.rate = 0.5 * self.rate + 0.5 * rate if self._primed else rate
+            self._primed = True
+        self._last_value, self._last_time = value, now
+        return self.rate
+
+class CampaignRun:
+    """In-memory state of a campaign that is currently being sent"""
+
+    def __init__(
+        self,
+        campaign_id: UUID,
+        user_id: UUID,
+        dispatcher: InstanceDispatcher,
+        message_template: str,
+        recipients: List[str],
+        sent: int = 0,
+        delivered: int = 0,
+        failed: int = 0,
+        generation: int = 0
+    ):
+        self.campaign_id = campaign_id
+        self.generation = generation
+        self.user_id = user_id
+        self.dispatcher = dispatcher
+        self.message_template = message_template
+        self.recipients = list(dict.fromkeys(recipients))
+        self.total = len(self.recipients)
+        self.sent = sent
+        self.delivered = delivered
+        self.failed = failed
+        self.suppressed = 0
+        # Outcomes not yet stored: written with the counters, in one transaction
+        self.unpersisted: List[Outcome] = []
+        self.started_at = time.monotonic()
+        self.finished = False
+        self.stopped = False
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.failed
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters as they are right now"""
+        return {
+            "campaign_id": str(self.campaign_id),
+            "total": self.total,
+            "sent": self.sent,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "suppressed": self.suppressed,
+            "running": not (self.finished or self.stopped),
+            "finished": self.finished,
+            "instances": [
+                {
+                    "instance_id": str(instance_id),
+                    "active": self.dispatcher.is_active(instance_id),
+                    "sent": self.dispatcher.sent[instance_id],
+                    "failed": self.dispatcher.failed[instance_id],
+                }
+                for instance_id in self.dispatcher.sessions
+            ],
+        }
+
+class CampaignEngine:
+    """Sends active campaigns in background tasks and keeps their counters in memory.
+
+    A campaign may be spread over a pool of instances: recipients are sharded
+    by consistent hashing and every instance sends its share of a batch in
+    parallel at its own safe rate (``campaign_send_interval``).
+
+    Only one worker sends a campaign at a time. A run starts by taking the
+    campaign's lease in one conditional write, which fails while another
+    worker renews it. The lease is renewed every third of
+    ``campaign_lease_ttl`` and released when the run ends. A run whose lease
+    was lost, or whose campaign is no longer ACTIVE, stops at its next
+    renewal, even if the stop event never reached it.
+
+    A resumed run restores its counters from storage and skips every
+    recipient that has a message stored for the campaign. That includes
+    FAILED ones, on purpose: a send that errored (a timeout, say) may still
+    have reached the phone, and a campaign sends at most one message per
+    recipient. Failures stay visible in ``failed_count`` and the message
+    export, for a follow-up campaign to target.
+    """
+
+    def __init__(self):
+        self._runs: Dict[UUID, CampaignRun] = {}
+
+    def get_run(self, campaign_id: UUID) -> Optional[CampaignRun]:
+        return self._runs.get(campaign_id)
+
+    async def start(self, campaign: models.Campaign, instances: List[models.WhatsAppInstance]) -> Optional[CampaignRun]:
+        """Start (or resume) sending a campaign through the given instances and mark it ACTIVE.
+
+        Returns None if another worker's run still holds the campaign.
+        """
+        existing = self._runs.get(campaign.id)
+        if existing and not existing.stopped and not existing.finished:
+            return existing
+
+        if existing and existing.task:
+            # A stopped run may still be sleeping between sends or have sends in
+            # flight. Let it finish and persist them, so the new run starts from
+            # its final counters and skips the recipients it reached.
+            await asyncio.wait([existing.task])
+            existing = self._runs.get(campaign.id)
+            if existing and not existing.stopped and not existing.finished:
+                # Another request resumed it while we waited
+                return existing
+
+        # Counters come back from the lease, as persisted by the previous run
+        stale_before = utcnow() - timedelta(seconds=settings.campaign_lease_ttl)
+        async with open_storage() as storage:
+            leased = await storage.campaigns.acquire_run(campaign.id, WORKER_ID, stale_before)
+            await storage.commit()
+        if leased is None:
+            return None
+        campaign = leased
+
+        run = CampaignRun(
+            campaign_id=campaign.id,
+            user_id=campaign.user_id,
+            dispatcher=InstanceDispatcher([(i.id, i.session_id) for i in instances]),
+            message_template=campaign.message_template,
+            recipients=campaign.target_contacts or [],
+            sent=campaign.sent_count or 0,
+            delivered=campaign.delivered_count or 0,
+            failed=campaign.failed_count or 0,
+            generation=campaign.run_generation or 0
+        )
+        run.task = asyncio.create_task(self._run(run))
+        self._runs[campaign.id] = run
+        logger.info(f"Campaign {campaign.id} started with {run.total} recipients on {len(instances)} instance(s)")
+        return run
+
+    def stop(self, campaign_id: UUID, generation: Optional[int] = None) -> bool:
+        """Stop sending after the messages currently in flight.
+
+        With ``generation`` only that run is stopped, not one started since.
+        """
+        run = self._runs.get(campaign_id)
+        if not run or run.finished:
+            return False
+        if generation is not None and run.generation != generation:
+            return False
+        run.stopped = True
+        return True
+
+    def set_delivered(self, campaign_id: UUID, delivered: int):
+        """Reflect a delivered_count written by receipt ingestion"""
+        run = self._runs.get(campaign_id)
+        if run:
+            run.delivered = delivered
+
+    def instance_offline(self, instance_id: UUID):
+        """Rebalance every run that was sending through an instance that went offline"""
+        for run in self._runs.values():
+            if run.dispatcher.mark_offline(instance_id):
+                logger.info(f"Campaign {run.campaign_id}: instance {instance_id} offline, rebalancing")
+
+    def instance_online(self, instance_id: UUID):
+        """Give a reconnected pool instance its recipients back"""
+        for run in self._runs.values():
+            if run.dispatcher.mark_online(instance_id):
+                logger.info(f"Campaign {run.campaign_id}: instance {instance_id} back online")
+
+    async def shutdown(self):
+        """Stop every run and wait for counters to be persisted"""
+        runs = list(self._runs.values())
+        for run in runs:
+            run.stopped = True
+        tasks = [run.task for run in runs if run.task]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, run: CampaignRun):
+        batch_size = max(1, settings.campaign_batch_size)
+        heartbeat = asyncio.create_task(self._heartbeat(run))
+        try:
+            # Resume where a paused run left off
+            done = await self._load_done_phones(run.campaign_id)
+            pending = [phone for phone in run.recipients if phone not in done]
+            # Not persisted: recounted on every start as the suppressed recipients
+            # without a message, which is what earlier runs skipped
+            pending = await self._drop_suppressed(run, pending)
+
+            for index in range(0, len(pending), batch_size):
+                if run.stopped:
+                    break
+                # Numbers suppressed since the run started
+                batch = await self._drop_suppressed(run, pending[index:index + batch_size])
+                unsent = await self._send_batch(run, batch, run.unpersisted)
+                await self._persist(run)
+                if unsent and not run.stopped:
+                    logger.warning(f"Campaign {run.campaign_id} paused: no active instance left in its pool")
+                    run.stopped = True
+                    await self._persist(run, status=models.CampaignStatus.PAUSED)
+
+            if not run.stopped:
+                run.finished = True
+                await self._persist(run, status=models.CampaignStatus.COMPLETED)
+                logger.info(f"Campaign {run.campaign_id} completed: {run.sent} sent, {run.failed} failed")
+        except asyncio.CancelledError:
+            await self._persist_final(run)
+            raise
+        except Exception as e:
+            logger.error(f"Campaign {run.campaign_id} aborted: {e}")
+            run.stopped = True
+            await self._persist_final(run, status=models.CampaignStatus.PAUSED)
+        finally:
+            heartbeat.cancel()
+            await self._release(run)
+            if self._runs.get(run.campaign_id) is run:
+                del self._runs[run.campaign_id]
+
+    async def _heartbeat(self, run: CampaignRun):
+        """Renew the run's lease; stop the run if it was lost or the campaign left ACTIVE"""
+        interval = settings.campaign_lease_ttl / 3
+        while not run.stopped:
+            await asyncio.sleep(interval)
+            try:
+                async with open_storage() as storage:
+                    status = await storage.campaigns.renew_run(run.campaign_id, WORKER_ID, run.generation)
+                    await storage.commit()
+            except Exception as e:
+                logger.error(f"Failed to renew the lease of campaign {run.campaign_id}: {e}")
+                continue
+            if status is None:
+                logger.warning(f"Campaign {run.campaign_id}: lease taken over by another worker, stopping")
+                run.stopped = True
+            elif status != models.CampaignStatus.ACTIVE:
+                logger.info(f"Campaign {run.campaign_id} is {status.value}, stopping")
+                run.stopped = True
+
+    async def _release(self, run: CampaignRun):
+        try:
+            async with open_storage() as storage:
+                await storage.campaigns.release_run(run.campaign_id, WORKER_ID, run.generation)
+                await storage.commit()
+        except Exception as e:
+            # The lease expires after campaign_lease_ttl anyway
+            logger.error(f"Failed to release the lease of campaign {run.campaign_id}: {e}")
+
+    async def _load_done_phones(self, campaign_id: UUID) -> Set[str]:
+        """Phones that already have a message stored for this campaign"""
+        async with open_storage() as storage:
+            return await storage.messages.campaign_phones(campaign_id)
+
+    async def _drop_suppressed(self, run: CampaignRun, batch: List[str]) -> List[str]:
+        """Remove opted-out and blocked numbers from a batch before sending"""
+        async with open_storage() as storage:
+            suppressed = await suppression_registry.filter_suppressed(storage, run.user_id, batch)
+        if not suppressed:
+            return batch
+        run.suppressed += len(suppressed)
+        return [phone for phone in batch if phone not in suppressed]
+
+    async def _send_batch(self, run: CampaignRun, batch: List[str], outcomes: List[Outcome]) -> List[str]:
+        """Send one batch across the pool; returns phones no instance could take"""
+        remaining = batch
+        while remaining and not run.stopped:
+            shards = run.dispatcher.shard(remaining)
+            if not shards:
+                return remaining
+            # Shares of instances that went offline mid-batch come back here
+            # and are re-sharded over the instances that are left.
+            leftovers = await asyncio.gather(*(
+                self._send_shard(run, instance_id, phones, outcomes)
+                for instance_id, phones in shards.items()
+            ))
+            remaining = [phone for chunk in leftovers for phone in chunk]
+        return []
+
+    async def _send_shard(
+        self,
+        run: CampaignRun,
+        instance_id: UUID,
+        phones: List[str],
+        outcomes: List[Outcome]
+    ) -> List[str]:
+        session_id = run.dispatcher.sessions[instance_id]
+        for index, phone in enumerate(phones):
+            if run.stopped:
+                return []
+            if not run.dispatcher.is_active(instance_id):
+                return phones[index:]
+            if index and settings.campaign_send_interval > 0:
+                await asyncio.sleep(settings.campaign_send_interval)
+                if run.stopped:
+                    return []
+            message_id = await self._send_one(run, session_id, phone)
+            run.dispatcher.record(instance_id, message_id is not None)
+            outcomes.append((phone, instance_id, message_id))
+        return []
+
+    async def _send_one(self, run: CampaignRun, session_id: str, phone: str) -> Optional[str]:
+        """Send to one recipient and return the WhatsApp message id, or None on failure"""
+        try:
+            result = await whatsapp_service.send_message(session_id, phone, run.message_template)
+            run.sent += 1
+            return (result or {}).get('messageId') or ""
+        except Exception as e:
+            logger.warning(f"Campaign {run.campaign_id} failed to send to {phone}: {e}")
+            run.failed += 1
+            return None
+
+    async def _record_messages(self, storage: Storage, run: CampaignRun, outcomes: List[Outcome]):
+        """Store one batch of sent messages so delivery receipts can find them"""
+        by_instance: Dict[UUID, List[str]] = {}
+        for phone, instance_id, _ in outcomes:
+            by_instance.setdefault(instance_id, []).append(phone)
+
+        conversations: Dict[Tuple[UUID, str], UUID] = {}
+        for instance_id, phones in by_instance.items():
+            resolved = await storage.conversations.get_or_create_for_phones(run.user_id, instance_id, phones)
+            conversations.update(((instance_id, phone), conversation_id) for phone, conversation_id in resolved.items())
+
+        now = datetime.now(timezone.utc)
+        await storage.messages.add_many(
+            [
+                {
+                    "conversation_id": conversations[(instance_id, phone)],
+                    "instance_id": instance_id,
+                    "campaign_id": run.campaign_id,
+                    "whatsapp_message_id": message_id or None,
+                    "content": run.message_template,
+                    "message_type": "text",
+                    "is_from_me": True,
+                    "status": models.MessageStatus.FAILED if message_id is None else models.MessageStatus.SENT,
+                    "timestamp": now
+                }
+                for phone, instance_id, message_id in outcomes
+            ]
+        )
+        await storage.conversations.record_activity_many(
+            [(conversation_id, 0, now) for conversation_id in conversations.values()]
+        )
+
+    async def _persist(self, run: CampaignRun, status: Optional[models.CampaignStatus] = None):
+        """Write the counters and the unpersisted messages back to the database.
+
+        Retried with backoff; raises once ``campaign_persist_attempts`` fail,
+        which stops the run before it sends to anyone else.
+        """
+        delay = 0.5
+        for attempt in range(1, max(1, settings.campaign_persist_attempts) + 1):
+            # Counters and messages match whenever this is taken: nothing awaits in between
+            outcomes = list(run.unpersisted)
+            values = {"sent_count": run.sent, "failed_count": run.failed}
+            if status is not None:
+                values["status"] = status
+            try:
+                async with open_storage() as storage:
+                    if outcomes:
+                        await self._record_messages(storage, run, outcomes)
+                    await storage.campaigns.set_fields(run.campaign_id, **values)
+                    await storage.commit()
+            except Exception as e:
+                if attempt >= settings.campaign_persist_attempts:
+                    raise
+                logger.warning(f"Failed to persist campaign {run.campaign_id} (attempt {attempt}), retrying: {e}")
+                await asyncio.sleep(delay)
+                delay *= 2
+                continue
+            del run.unpersisted[:len(outcomes)]
+            return
+
+    async def _persist_final(self, run: CampaignRun, status: Optional[models.CampaignStatus] = None):
+        """Last persist of an ending run; what still fails here is lost"""
+        try:
+            await self._persist(run, status=status)
+        except Exception as e:
+            logger.error(
+                f"Failed to persist campaign {run.campaign_id}: {len(run.unpersisted)} sent message(s) "
+                f"were not recorded and will be sent again if it resumes: {e}"
+            )
+
+class ProgressHub:
+    """Fans out coalesced progress snapshots of running campaigns.
+
+    One producer task per campaign samples the engine's in-memory counters at
+    most once per ``campaign_progress_interval`` and offers the snapshot to every
+    subscriber. Subscriber queues hold a single item, so a slow reader only
+    ever sees the latest snapshot instead of a growing backlog.
+
+    A campaign runs on one worker only. Subscribers on other workers ask for
+    its progress over the event bus; the owning worker then also publishes
+    its snapshots there until the campaign stops.
+    """
+
+    def __init__(self, engine: CampaignEngine):
+        self.engine = engine
+        self._subscribers: Dict[UUID, Set[asyncio.Queue]] = {}
+        self._producers: Dict[UUID, asyncio.Task] = {}
+        # Campaigns running here that subscribers on other workers are watching
+        self._remote: Set[UUID] = set()
+        self._resend: Set[UUID] = set()
+
+    def subscribe(self, campaign_id: UUID, remote: bool = False) -> Optional[asyncio.Queue]:
+        """Subscribe to a running campaign, or return None if it isn't running.
+
+        With ``remote`` a campaign that is not running on this worker is
+        assumed to run on another one and followed through the event bus.
+        """
+        run = self.engine.get_run(campaign_id)
+        if run is None and not remote:
+            return None
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._subscribers.setdefault(campaign_id, set()).add(queue)
+        if run is None:
+            event_bus.publish("campaign.progress_wanted", {"campaign_id": campaign_id})
+        elif campaign_id not in self._producers:
+            self._producers[campaign_id] = asyncio.create_task(self._produce(run))
+        return queue
+
+    def unsubscribe(self, campaign_id: UUID, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(campaign_id)
+        if not subscribers:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[campaign_id]
+            if campaign_id not in self._remote:
+                producer = self._producers.pop(campaign_id, None)
+                if producer:
+                    producer.cancel()
+
+    def _publish(self, campaign_id: UUID, snapshot: Dict[str, Any]):
+        for queue in self._subscribers.get(campaign_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(snapshot)
+        if campaign_id in self._remote:
+            event_bus.publish("campaign.progress", snapshot)
+
+    def watch_remote(self, campaign_id: UUID):
+        """Start publishing a local campaign's progress for other workers"""
+        run = self.engine.get_run(campaign_id)
+        if run is None or campaign_id in self._remote:
+            return
+        self._remote.add(campaign_id)
+        producer = self._producers.get(campaign_id)
+        if producer is None:
+            self._producers[campaign_id] = asyncio.create_task(self._produce(run))
+        else:
+            # Force the next sample out so the new watcher gets a snapshot promptly
+            self._resend.add(campaign_id)
+
+    def deliver_remote(self, snapshot: Dict[str, Any]):
+        """Hand a snapshot published by another worker to local subscribers"""
+        campaign_id = UUID(snapshot["campaign_id"])
+        if self.engine.get_run(campaign_id) is None:
+            self._publish(campaign_id, snapshot)
+
+    async def _produce(self, run: CampaignRun):
+        interval = max(0.1, settings.campaign_progress_interval)
+        overall = RateMeter(run.processed)
+        per_instance = {
+            instance_id: RateMeter(run.dispatcher.sent[instance_id] + run.dispatcher.failed[instance_id])
+            for instance_id in run.dispatcher.sessions
+        }
+        last_counters = None
+        loop = asyncio.get_running_loop()
+        # Unchanged snapshots still go out this often, so watchers can tell a
+        # quiet run from a dead one (routers/campaigns.py ends silent streams)
+        alive_interval = settings.campaign_lease_ttl / 3
+        last_published = loop.time()
+        try:
+            while True:
+                snapshot = run.snapshot()
+                snapshot["throughput"] = round(overall.update(run.processed), 2)
+                for instance in snapshot["instances"]:
+                    meter = per_instance[UUID(instance["instance_id"])]
+                    instance["throughput"] = round(meter.update(instance["sent"] + instance["failed"]), 2)
+
+                counters = (
+                    snapshot["sent"], snapshot["delivered"], snapshot["failed"],
+                    snapshot["suppressed"], snapshot["running"],
+                    tuple(i["active"] for i in snapshot["instances"])
+                )
+                if (
+                    counters != last_counters
+                    or run.campaign_id in self._resend
+                    or loop.time() - last_published >= alive_interval
+                ):
+                    self._resend.discard(run.campaign_id)
+                    self._publish(run.campaign_id, snapshot)
+                    last_counters = counters
+                    last_published = loop.time()
+
+                if not snapshot["running"]:
+                    break
+                await asyncio.sleep(interval)
+        finally:
+            if self._producers.get(run.campaign_id) is asyncio.current_task():
+                del self._producers[run.campaign_id]
+                self._remote.discard(run.campaign_id)
+
+# Global instances
+campaign_engine = CampaignEngine()
+progress_hub = ProgressHub(campaign_engine)
+
+# Campaign control and instance status may come from any worker
+
+def _on_instance_status(data: Dict[str, Any], local: bool):
+    instance_id = UUID(data["instance_id"])
+    if data["status"] == "connected":
+        campaign_engine.instance_online(instance_id)
+    elif data["status"] == "disconnected":
+        campaign_engine.instance_offline(instance_id)
+
+def _on_campaign_delivered(data: Dict[str, Any], local: bool):
+    campaign_engine.set_delivered(UUID(data["campaign_id"]), data["delivered"])
+
+def _on_campaign_stop(data: Dict[str, Any], local: bool):
+    # The publishing worker stopped its own run before publishing; a late
+    # delivery here could otherwise stop a run started since
+    if not local:
+        campaign_engine.stop(UUID(data["campaign_id"]), data.get("generation"))
+
+def _on_progress_wanted(data: Dict[str, Any], local: bool):
+    progress_hub.watch_remote(UUID(data["campaign_id"]))
+
+def _on_progress(data: Dict[str, Any], local: bool):
+    if not local:
+        progress_hub.deliver_remote(data)
+
+event_bus.subscribe("instance.status", _on_instance_status)
+event_bus.subscribe("campaign.delivered", _on_campaign_delivered)
+event_bus.subscribe("campaign.stop", _on_campaign_stop)
+event_bus.subscribe("campaign.progress_wanted", _on_progress_wanted)
+event_bus.subscribe("campaign.progress", _on_progress)
+
+# Scheduled campaigns are started by the one worker holding the singleton jobs lock
+
+SCHEDULABLE_STATUSES = [models.CampaignStatus.DRAFT, models.CampaignStatus.SCHEDULED]
+
+@singleton_jobs.register("campaign_scheduler", interval=settings.campaign_schedule_interval)
+async def start_due_campaigns():
+    """Start campaigns whose scheduled_at has passed"""
+    async with open_storage() as storage:
+        due = await storage.campaigns.due(
+            datetime.now(timezone.utc), SCHEDULABLE_STATUSES, settings.campaign_batch_size
+        )
+        for campaign in due:
+            pool = [campaign.instance_id] + [UUID(str(i)) for i in campaign.instance_pool or []]
+            instances = await storage.instances.get_many(list(dict.fromkeys(pool)), campaign.user_id)
+            if campaign.instance_pool:
+                instances = [i for i in instances if i.status == models.InstanceStatus.ACTIVE]
+            if not instances:
+                logger.info(f"Scheduled campaign {campaign.id} is waiting for an active instance")
+                continue
+
+            # Claim it, unless it was started by hand in the meantime
+            claimed = await storage.campaigns.claim(
+                campaign.id, SCHEDULABLE_STATUSES, models.CampaignStatus.ACTIVE
+            )
+            await storage.commit()
+            if claimed and await campaign_engine.start(campaign, instances) is None:
+                # Left ACTIVE; it can be resumed by hand once the old run lets go
+                logger.warning(f"Scheduled campaign {campaign.id} is still held by a stopping run")
@@ -0,0 +1,105 @@
+import bisect
+import hashlib
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+# Virtual nodes per instance; more nodes give a more even spread
+DEFAULT_REPLICAS = 160
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+class HashRing:
+    """Consistent hash ring mapping keys (phone numbers) to nodes (instance ids).
+
+    Removing a node only moves the keys that node owned; every other key keeps
+    its node, so recipients stay on a stable sender across rebalances.
+    """
+
+    def __init__(self, nodes: Optional[List[str]] = None, replicas: int = DEFAULT_REPLICAS):
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        self._nodes: set = set()
+        for node in nodes or []:
+            self.add(node)
+
+    def __contains__(self, node: str) -> bool:
+        return node in self._nodes
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def add(self, node: str):
+        if node in self._nodes:
+            return
+        self._nodes.add(node)
+        for i in range(self.replicas):
+            point = _hash(f"{node}#{i}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove(self, node: str):
+        if node not in self._nodes:
+            return
+        self._nodes.discard(node)
+        kept = [(p, o) for p, o in zip(self._points, self._owners) if o != node]
+        self._points = [p for p, _ in kept]
+        self._owners = [o for _, o in kept]
+
+    def get(self, key: str) -> Optional[str]:
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
+
+class InstanceDispatcher:
+    """Shards a campaign's recipients across a pool of WhatsApp instances"""
+
+    def __init__(self, instances: List[Tuple[UUID, str]]):
+        # instance id -> session id, for every instance in the pool
+        self.sessions: Dict[UUID, str] = dict(instances)
+        self.ring = HashRing([str(instance_id) for instance_id in self.sessions])
+        self.sent: Dict[UUID, int] = {instance_id: 0 for instance_id in self.sessions}
+        self.failed: Dict[UUID, int] = {instance_id: 0 for instance_id in self.sessions}
+
+    @property
+    def active(self) -> List[UUID]:
+        return [instance_id for instance_id in self.sessions if str(instance_id) in self.ring]
+
+    def is_active(self, instance_id: UUID) -> bool:
+        return str(instance_id) in self.ring
+
+    def mark_offline(self, instance_id: UUID) -> bool:
+        """Take an instance out of rotation; its recipients move to the others"""
+        if not self.is_active(instance_id):
+            return False
+        self.ring.remove(str(instance_id))
+        return True
+
+    def mark_online(self, instance_id: UUID) -> bool:
+        """Put a pool instance back; only the recipients it owned move back"""
+        if instance_id not in self.sessions or self.is_active(instance_id):
+            return False
+        self.ring.add(str(instance_id))
+        return True
+
+    def route(self, phone: str) -> Optional[UUID]:
+        node = self.ring.get(phone)
+        return UUID(node) if node else None
+
+    def shard(self, phones: List[str]) -> Dict[UUID, List[str]]:
+        """Group phones by the instance that should send to them"""
+        shards: Dict[UUID, List[str]] = {}
+        for phone in phones:
+            instance_id = self.route(phone)
+            if instance_id is not None:
+                shards.setdefault(instance_id, []).append(phone)
+        return shards
+
+    def record(self, instance_id: UUID, success: bool):
+        if success:
+            self.sent[instance_id] += 1
+        else:
+            self.failed[instance_id] += 1
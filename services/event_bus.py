@@ -0,0 +1,318 @@
+"""Cross-worker domain events.
+
+Every uvicorn worker keeps its own in-memory state (WebSocket connections,
+campaign runs, suppression Bloom filters). The event bus lets a worker that
+handled a request tell all the others about it: events are published with
+``event_bus.publish(type, data)`` and delivered to the handlers registered with
+``event_bus.subscribe(type, handler)`` on every worker, including the
+publishing one.
+
+Small events are coalesced: publishing only appends to a buffer, which is
+sent as a single transport message every ``event_bus_flush_interval`` or once
+``event_bus_batch_size`` events are waiting.
+
+Backends (``settings.event_bus_backend``):
+
+* ``memory``   - single process only; delivers straight to local handlers
+* ``redis``    - Redis pub/sub on ``settings.redis_url``
+* ``postgres`` - LISTEN/NOTIFY on the application database
+
+The redis and postgres backends reconnect on their own after losing their
+connection, backing off from ``event_bus_reconnect_delay`` up to
+``event_bus_reconnect_max``. Events sent while a worker is disconnected are
+not redelivered to it, so handlers must not be the only way state converges.
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from uuid import uuid4
+
+from config import settings
+from services.metrics import EVENT_BUS_PENDING, gauge_function
+
+logger = logging.getLogger(__name__)
+
+# handler(data, local): local is True when the event was published by this worker
+EventHandler = Callable[[Dict[str, Any], bool], Optional[Awaitable[None]]]
+MessageCallback = Callable[[str], Awaitable[None]]
+
+def backoff(delay: float) -> float:
+    """The next reconnect delay"""
+    return min(delay * 2, settings.event_bus_reconnect_max)
+
+class InMemoryBackend:
+    """Loops messages back into the same process"""
+
+    max_payload = None
+
+    async def connect(self, on_message: MessageCallback):
+        self._on_message = on_message
+
+    async def send(self, payload: str):
+        await self._on_message(payload)
+
+    async def close(self):
+        pass
+
+class RedisBackend:
+    """Redis pub/sub on a single channel"""
+
+    max_payload = None
+
+    def __init__(self, url: str, channel: str):
+        self.url = url
+        self.channel = channel
+        self._client = None
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def connect(self, on_message: MessageCallback):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(self.url)
+        await self._subscribe()
+        self._listener = asyncio.create_task(self._listen(on_message))
+
+    async def _subscribe(self):
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self.channel)
+
+    async def _listen(self, on_message: MessageCallback):
+        delay = settings.event_bus_reconnect_delay
+        while True:
+            try:
+                if self._pubsub is None:
+                    await self._subscribe()
+                    logger.info("Event bus resubscribed to Redis")
+                    delay = settings.event_bus_reconnect_delay
+                async for message in self._pubsub.listen():
+                    if message["type"] == "message":
+                        await on_message(message["data"].decode())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Event bus lost its Redis subscription, retrying in {delay:.1f}s: {e}")
+            pubsub, self._pubsub = self._pubsub, None
+            if pubsub is not None:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(delay)
+            delay = backoff(delay)
+
+    async def send(self, payload: str):
+        await self._client.publish(self.channel, payload)
+
+    async def close(self):
+        if self._listener:
+            self._listener.cancel()
+        if self._pubsub:
+            try:
+                await self._pubsub.unsubscribe(self.channel)
+                await self._pubsub.close()
+            except Exception as e:
+                logger.warning(f"Event bus failed to unsubscribe from Redis: {e}")
+        if self._client:
+            await self._client.close()
+
+class PostgresBackend:
+    """LISTEN/NOTIFY on dedicated asyncpg connections (outside the SQLAlchemy pool)
+
+    The listening connection is watched: it is replaced when the server
+    closes it, or when it stops answering a ping sent every
+    ``event_bus_reconnect_max`` seconds (a dropped network doesn't close it).
+    """
+
+    # NOTIFY payloads must stay below 8000 bytes
+    max_payload = 7900
+
+    def __init__(self, dsn: str, channel: str):
+        self.dsn = dsn
+        self.channel = channel
+        self._listen_conn = None
+        self._notify_conn = None
+        self._notify_lock = asyncio.Lock()
+        self._lost = asyncio.Event()
+        self._watcher: Optional[asyncio.Task] = None
+
+    async def connect(self, on_message: MessageCallback):
+        import asyncpg
+
+        def listener(connection, pid, channel, payload):
+            asyncio.create_task(on_message(payload))
+
+        self._listener = listener
+        await self._listen()
+        self._notify_conn = await asyncpg.connect(self.dsn)
+        self._watcher = asyncio.create_task(self._watch())
+
+    async def _listen(self):
+        import asyncpg
+
+        def terminated(closed):
+            # Not for a connection that was already replaced
+            if closed is self._listen_conn:
+                self._lost.set()
+
+        connection = await asyncpg.connect(self.dsn)
+        connection.add_termination_listener(terminated)
+        await connection.add_listener(self.channel, self._listener)
+        self._listen_conn = connection
+
+    async def _watch(self):
+        delay = settings.event_bus_reconnect_delay
+        while True:
+            try:
+                await asyncio.wait_for(self._lost.wait(), timeout=settings.event_bus_reconnect_max)
+            except asyncio.TimeoutError:
+                try:
+                    await self._listen_conn.execute("SELECT 1", timeout=settings.event_bus_reconnect_max)
+                    continue
+                except Exception as e:
+                    logger.error(f"Event bus LISTEN connection stopped answering: {e}")
+            self._lost.clear()
+            connection, self._listen_conn = self._listen_conn, None
+            connection.terminate()
+
+            while True:
+                try:
+                    await self._listen()
+                    logger.info("Event bus reconnected to Postgres")
+                    delay = settings.event_bus_reconnect_delay
+                    break
+                except Exception as e:
+                    logger.error(f"Event bus failed to reconnect to Postgres, retrying in {delay:.1f}s: {e}")
+                    await asyncio.sleep(delay)
+                    delay = backoff(delay)
+
+    async def send(self, payload: str):
+        import asyncpg
+
+        async with self._notify_lock:
+            if self._notify_conn.is_closed():
+                self._notify_conn = await asyncpg.connect(self.dsn)
+            await self._notify_conn.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+
+    async def close(self):
+        if self._watcher:
+            self._watcher.cancel()
+        for connection in (self._listen_conn, self._notify_conn):
+            if connection is not None and not connection.is_closed():
+                await connection.close()
+
+def create_backend(name: str):
+    if name == "memory":
+        return InMemoryBackend()
+    if name == "redis":
+        return RedisBackend(settings.redis_url, settings.event_bus_channel)
+    if name == "postgres":
+        return PostgresBackend(settings.database_url, settings.event_bus_channel)
+    raise ValueError(f"Unknown event bus backend: {name}")
+
+class EventBus:
+    """Batches domain events and dispatches them to handlers on every worker"""
+
+    def __init__(self):
+        self.worker_id = uuid4().hex
+        self.backend = None
+        self._handlers: Dict[str, List[EventHandler]] = {}
+        self._pending: List[Dict[str, Any]] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._start_lock = asyncio.Lock()
+
+    def subscribe(self, event_type: str, handler: EventHandler):
+        self._handlers.setdefault(event_type, []).append(handler)
+
+    def publish(self, event_type: str, data: Dict[str, Any]):
+        """Queue an event; never blocks the caller"""
+        self._pending.append({"type": event_type, "data": data})
+        if len(self._pending) >= settings.event_bus_batch_size:
+            self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def start(self):
+        async with self._start_lock:
+            if self.backend is not None:
+                return
+            backend = create_backend(settings.event_bus_backend)
+            await backend.connect(self._receive)
+            self.backend = backend
+            logger.info(f"Event bus started with {settings.event_bus_backend} backend")
+
+    def _encode(self, events: List[Dict[str, Any]]) -> List[str]:
+        """Serialize events into as few transport messages as the backend allows"""
+        def encode(batch):
+            return json.dumps({"origin": self.worker_id, "events": batch}, default=str)
+
+        limit = self.backend.max_payload
+        payload = encode(events)
+        if limit is None or len(payload.encode()) <= limit:
+            return [payload]
+        if len(events) == 1:
+            logger.error(f"Dropping {events[0]['type']} event larger than {limit} bytes")
+            return []
+        middle = len(events) // 2
+        return self._encode(events[:middle]) + self._encode(events[middle:])
+
+    async def flush(self):
+        """Send everything that is pending"""
+        if not self._pending:
+            return
+        await self.start()
+        batch, self._pending = self._pending, []
+
+        for payload in self._encode(batch):
+            try:
+                await self.backend.send(payload)
+            except Exception as e:
+                logger.error(f"Failed to publish {len(batch)} events: {e}")
+
+    async def _flush_loop(self):
+        while self._pending:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.event_bus_flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def _receive(self, payload: str):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignoring malformed event bus message")
+            return
+
+        local = message.get("origin") == self.worker_id
+        for event in message.get("events", []):
+            for handler in self._handlers.get(event["type"], ()):
+                try:
+                    result = handler(event["data"], local)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception as e:
+                    logger.error(f"Event handler for {event['type']} failed: {e}")
+
+    async def close(self):
+        """Send what is pending and disconnect; the bus may be started again, on any loop"""
+        if self._task and not self._task.done():
+            self._wakeup.set()
+            await self._task
+        await self.flush()
+        if self.backend is not None:
+            await self.backend.close()
+            self.backend = None
+        # asyncio primitives belong to the loop that first waited on them
+        self._task = None
+        self._wakeup = asyncio.Event()
+        self._start_lock = asyncio.Lock()
+
+# Global instance
+event_bus = EventBus()
+gauge_function(EVENT_BUS_PENDING, lambda: len(event_bus._pending))
@@ -0,0 +1,41 @@
+"""Thumbnail rendering, run in the thumbnail process pool.
+
+Imports nothing from the application so spawned pool processes start fast
+and don't load settings, metrics or database modules.
+"""
+
+import os
+import uuid
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+def render_thumbnail(source: str, target: str, size: int, quality: int, max_pixels: int) -> bool:
+    """Write a JPEG of at most ``size``x``size`` pixels to ``target``.
+
+    Images that can't be decoded (or are too large to try) get an empty
+    ``target`` instead, so they are recognized without being decoded again.
+    Returns whether a thumbnail was written.
+    """
+    temporary = f"{target}.{uuid.uuid4().hex}"
+    try:
+        with Image.open(source) as image:
+            if image.width * image.height > max_pixels:
+                raise ValueError(f"{image.width}x{image.height} is over the pixel limit")
+            # JPEG: let the decoder scale down by up to 8x, far cheaper than a full decode
+            image.draft("RGB", (size, size))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+            if image.mode in ("RGBA", "LA", "P"):
+                image = image.convert("RGBA")
+                background = Image.new("RGB", image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel("A"))
+                image = background
+            elif image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            image.save(temporary, "JPEG", quality=quality, optimize=True)
+        rendered = True
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+        open(temporary, "wb").close()
+        rendered = False
+    os.replace(temporary, target)
+    return rendered
@@ -0,0 +1,225 @@
+"""Content-addressed media storage on disk.
+
+Uploads are streamed to a temporary file while being hashed, then renamed to
+``<media_dir>/<sha256[:2]>/<sha256[2:4]>/<sha256>``; a file that is already
+there is simply kept, so identical media is stored once whatever its name
+or sender. A small ``.json`` sidecar records the content type of the first
+upload. Nothing is ever held in memory beyond one write buffer.
+
+A blob is addressed as ``/api/media/<sha256>`` (``MediaStore.url``). The
+256-bit hash is the capability: only someone who has seen the content or
+the URL can fetch it, which is what lets ``<img src>`` tags and the Baileys
+service download media without a bearer token.
+
+Blobs are served from the application's own origin, so only the passive
+image, video and audio types in ``INLINE_CONTENT_TYPES`` are displayed in
+the browser; everything else (HTML, SVG, PDF, ...) is downloaded as an
+attachment and can never run script next to the app.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import uuid
+from pathlib import Path
+from typing import AsyncIterator, NamedTuple, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+URL_PREFIX = "/api/media/"
+THUMBNAIL_SUFFIX = "/thumbnail"
+SHA256 = re.compile(r"^[0-9a-f]{64}$")
+WRITE_BUFFER = 1024 * 1024
+READ_CHUNK = 64 * 1024
+DEFAULT_CONTENT_TYPE = "application/octet-stream"
+CONTENT_TYPE = re.compile(r"^[a-z0-9][a-z0-9!#$&^_.+-]*/[a-z0-9][a-z0-9!#$&^_.+-]*$")
+
+# Served inline by GET /api/media/<sha256>; no script can run in any of them
+INLINE_CONTENT_TYPES = frozenset({
+    "image/jpeg", "image/png", "image/gif", "image/webp",
+    "video/mp4", "video/3gpp", "video/webm",
+    "audio/ogg", "audio/mpeg", "audio/mp4", "audio/aac", "audio/amr", "audio/wav",
+})
+
+class MediaTooLarge(ValueError):
+    pass
+
+class InvalidContentType(ValueError):
+    pass
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+class MediaBlob(NamedTuple):
+    sha256: str
+    size: int
+    content_type: str
+
+    @property
+    def url(self) -> str:
+        return URL_PREFIX + self.sha256
+
+    @property
+    def message_type(self) -> str:
+        """The WhatsApp message type this media is sent as"""
+        kind = self.content_type.split("/", 1)[0]
+        return kind if kind in ("image", "video", "audio") else "document"
+
+    @property
+    def inline(self) -> bool:
+        """Whether browsers may display it rather than download it"""
+        return self.content_type in INLINE_CONTENT_TYPES
+
+def clean_content_type(value: Optional[str]) -> str:
+    """The bare, lower-case media type of a ``Content-Type`` header; raises InvalidContentType"""
+    content_type = (value or DEFAULT_CONTENT_TYPE).split(";", 1)[0].strip().lower()
+    if not CONTENT_TYPE.match(content_type):
+        raise InvalidContentType(f"Invalid content type {content_type!r}")
+    return content_type
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (first, last) byte positions of a ``Range`` header, or None to send everything.
+
+    Only single byte ranges are honoured; multipart ranges are answered with
+    the whole file, which RFC 9110 allows.
+    """
+    if not header or size == 0:
+        return None
+    unit, _, ranges = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    first, _, last = ranges.strip().partition("-")
+    try:
+        if not first:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiable(header)
+            return max(0, size - length), size - 1
+        first = int(first)
+        last = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if first >= size:
+        raise RangeNotSatisfiable(header)
+    if first > last:
+        return None
+    return first, min(last, size - 1)
+
+def thumbnail_url(media_url: Optional[str], message_type: Optional[str]) -> Optional[str]:
+    """Thumbnail of an image message's media (services/thumbnails.py), if it is in the store"""
+    if message_type != "image":
+        return None
+    sha256 = MediaStore.parse_url(media_url)
+    return URL_PREFIX + sha256 + THUMBNAIL_SUFFIX if sha256 else None
+
+class MediaStore:
+    """Blobs keyed by SHA-256 under one directory"""
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+
+    def path(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256[2:4] / sha256
+
+    @staticmethod
+    def parse_url(url: Optional[str]) -> Optional[str]:
+        """The hash behind a media URL (absolute or not), or None if it isn't one"""
+        if not url:
+            return None
+        _, found, sha256 = url.partition(URL_PREFIX)
+        sha256 = sha256.split("?", 1)[0]
+        return sha256 if found and SHA256.match(sha256) else None
+
+    def stat(self, sha256: str) -> Optional[MediaBlob]:
+        if not SHA256.match(sha256):
+            return None
+        path = self.path(sha256)
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            return None
+        try:
+            content_type = json.loads(path.with_suffix(".json").read_text())["content_type"]
+        except (OSError, ValueError, KeyError):
+            content_type = DEFAULT_CONTENT_TYPE
+        return MediaBlob(sha256, size, content_type)
+
+    async def save(self, chunks: AsyncIterator[bytes], content_type: Optional[str] = None) -> MediaBlob:
+        """Store a stream; raises MediaTooLarge past ``max_bytes`` and InvalidContentType"""
+        content_type = clean_content_type(content_type)
+        incoming = self.root / "incoming"
+        await asyncio.to_thread(incoming.mkdir, parents=True, exist_ok=True)
+        temporary = incoming / uuid.uuid4().hex
+        digest = hashlib.sha256()
+        size = 0
+        file = await asyncio.to_thread(open, temporary, "wb")
+        try:
+            buffer = bytearray()
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise MediaTooLarge(f"Media is larger than {self.max_bytes} bytes")
+                digest.update(chunk)
+                buffer += chunk
+                if len(buffer) >= WRITE_BUFFER:
+                    await asyncio.to_thread(file.write, bytes(buffer))
+                    buffer.clear()
+            if buffer:
+                await asyncio.to_thread(file.write, bytes(buffer))
+            await asyncio.to_thread(file.close)
+            blob = MediaBlob(digest.hexdigest(), size, content_type)
+            await asyncio.to_thread(self._commit, temporary, blob)
+        except BaseException:
+            file.close()
+            await asyncio.to_thread(temporary.unlink, missing_ok=True)
+            raise
+        return blob
+
+    def _commit(self, temporary: Path, blob: MediaBlob):
+        path = self.path(blob.sha256)
+        if path.exists():
+            temporary.unlink()
+            logger.debug(f"Media {blob.sha256} already stored")
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        sidecar = path.with_suffix(".json")
+        if not sidecar.exists():
+            sidecar_temporary = temporary.with_suffix(".json")
+            sidecar_temporary.write_text(json.dumps({"content_type": blob.content_type, "size": blob.size}))
+            os.replace(sidecar_temporary, sidecar)
+        # Atomic: readers never see a partial file, and a concurrent upload of
+        # the same content just replaces it with identical bytes
+        os.replace(temporary, path)
+
+    async def read(self, sha256: str, first: int = 0, last: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Bytes ``first``..``last`` (inclusive) of a blob, one chunk at a time"""
+        file = await asyncio.to_thread(open, self.path(sha256), "rb")
+        try:
+            await asyncio.to_thread(file.seek, first)
+            remaining = (last - first + 1) if last is not None else None
+            while remaining is None or remaining > 0:
+                chunk = await asyncio.to_thread(file.read, READ_CHUNK if remaining is None else min(READ_CHUNK, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+        finally:
+            await asyncio.to_thread(file.close)
+
+    def absolute_url(self, blob_or_url) -> str:
+        """Where the Baileys service downloads a blob from"""
+        path = blob_or_url.url if isinstance(blob_or_url, MediaBlob) else blob_or_url
+        if path.startswith(("http://", "https://")):
+            return path
+        return (settings.media_base_url or settings.frontend_url).rstrip("/") + path
+
+# Global instance
+media_store = MediaStore(Path(settings.media_dir), settings.media_max_bytes)
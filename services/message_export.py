@@ -0,0 +1,180 @@
+"""Streaming export of a user's message history.
+
+Rows come from ``MessageRepository.export_page`` in keyset order,
+``(timestamp, id)``, one page at a time, so memory stays bounded whatever the
+export size. Every page is read in its own short storage session, closed
+before the page is sent: a slow client or the rate limit never keeps a
+transaction (or a pooled connection) open. A per-export rate limit keeps a
+big export from monopolising the database.
+
+Every exported row carries a ``cursor`` token (its keyset position, signed
+and bound to the export's filters); passing the last one received as
+``?cursor=`` resumes an interrupted download after that row.
+"""
+
+import asyncio
+import base64
+import csv
+import hashlib
+import hmac
+import io
+import logging
+import struct
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from config import settings
+from services.fast_json import dumps
+from storage.interface import EXPORT_FIELDS, ExportPosition
+from storage.provider import open_storage
+import models
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+SIGNATURE_BYTES = 8
+
+FIELDS = EXPORT_FIELDS + ("cursor",)
+
+class InvalidCursor(ValueError):
+    pass
+
+class ExportCursor:
+    """Keyset position (timestamp, id) as an opaque, signed token"""
+
+    @staticmethod
+    def _signature(payload: bytes, scope: str) -> bytes:
+        key = settings.secret_key.encode()
+        return hmac.new(key, payload + scope.encode(), hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+    @staticmethod
+    def encode(timestamp: datetime, message_id: UUID, scope: str) -> str:
+        delta = timestamp - EPOCH
+        micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+        payload = struct.pack(">q", micros) + message_id.bytes
+        token = payload + ExportCursor._signature(payload, scope)
+        return base64.urlsafe_b64encode(token).rstrip(b"=").decode()
+
+    @staticmethod
+    def decode(token: str, scope: str) -> Tuple[datetime, UUID]:
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        except (ValueError, TypeError):
+            raise InvalidCursor("Malformed cursor")
+        payload, signature = raw[:-SIGNATURE_BYTES], raw[-SIGNATURE_BYTES:]
+        if len(payload) != 24 or not hmac.compare_digest(signature, ExportCursor._signature(payload, scope)):
+            raise InvalidCursor("Cursor does not belong to this export")
+        (micros,) = struct.unpack(">q", payload[:8])
+        return EPOCH + timedelta(microseconds=micros), uuid.UUID(bytes=payload[8:])
+
+class RowThrottle:
+    """Token bucket: at most ``rate`` rows per second, bursting one second's worth"""
+
+    def __init__(self, rate: int):
+        self.rate = rate
+        self.allowance = float(rate)
+        self.updated = time.monotonic()
+
+    async def consume(self, rows: int):
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        self.allowance = min(self.rate, self.allowance + (now - self.updated) * self.rate)
+        self.updated = now
+        self.allowance -= rows
+        if self.allowance < 0:
+            await asyncio.sleep(-self.allowance / self.rate)
+
+class MessageExport:
+    def __init__(
+        self,
+        user_id: UUID,
+        instance_id: Optional[UUID] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ):
+        self.user_id = user_id
+        self.instance_id = instance_id
+        self.start = start
+        self.end = end
+        # Cursor tokens only resume an export with the same filters
+        self.scope = f"{user_id}|{instance_id or ''}|{start.isoformat() if start else ''}|{end.isoformat() if end else ''}"
+
+    def resume_position(self, cursor: Optional[str]) -> Optional[ExportPosition]:
+        return ExportCursor.decode(cursor, self.scope) if cursor else None
+
+    async def batches(self, after: Optional[ExportPosition] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Rows after the ``after`` position in keyset order, ``export_batch_size`` at a time"""
+        throttle = RowThrottle(settings.export_rows_per_second)
+        exported = 0
+        started = time.monotonic()
+        while True:
+            # Its own storage per page: the request's session is closed before the body streams
+            async with open_storage() as storage:
+                batch = await storage.messages.export_page(
+                    self.user_id, self.instance_id, self.start, self.end, after, settings.export_batch_size
+                )
+            if not batch:
+                break
+            for record in batch:
+                record["cursor"] = ExportCursor.encode(record["timestamp"], record["id"], self.scope)
+            after = (batch[-1]["timestamp"], batch[-1]["id"])
+            exported += len(batch)
+            yield batch
+            if len(batch) < settings.export_batch_size:
+                break
+            await throttle.consume(len(batch))
+        logger.info(f"Exported {exported} messages for user {self.user_id} in {time.monotonic() - started:.1f}s")
+
+    async def ndjson_stream(self, after=None) -> AsyncIterator[bytes]:
+        async for batch in self.batches(after):
+            yield b"".join(dumps(record) + b"\n" for record in batch)
+
+    async def csv_stream(self, after=None) -> AsyncIterator[str]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        # A resumed export is appended to the partial file: no second header
+        if after is None:
+            writer.writerow(FIELDS)
+        async for batch in self.batches(after):
+            for record in batch:
+                writer.writerow(_csv_value(record[field]) for field in FIELDS)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        # Header only (empty export)
+        if buffer.tell():
+            yield buffer.getvalue()
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, models.MessageStatus):
+        return value.value
+    return value
+
+class ExportSlots:
+    """Concurrent exports per worker; taken without waiting, so requests beyond it get 429"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+
+    def try_acquire(self) -> bool:
+        # No await between the check and the increment: atomic on the event loop
+        if self.used >= self.limit:
+            return False
+        self.used += 1
+        return True
+
+    def release(self):
+        self.used -= 1
+
+export_slots = ExportSlots(settings.export_max_concurrent)
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Callable, List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+
+logger = logging.getLogger(__name__)
+
+# Set by supervisor.py: workers write samples to files there and /metrics on
+# any worker reports all of them (histograms summed, gauges per pid)
+MULTIPROCESS_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+# Label used for requests that matched no route, so scanners can't blow up cardinality
+UNMATCHED_ROUTE = "<unmatched>"
+
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling HTTP requests",
+    ["method", "route", "status"]
+)
+WHATSAPP_REQUEST_DURATION = Histogram(
+    "whatsapp_api_request_duration_seconds",
+    "Time spent in calls to the Baileys service",
+    ["operation", "status"]
+)
+DB_STATEMENT_DURATION = Histogram(
+    "db_statement_duration_seconds",
+    "Time spent executing SQL statements",
+    ["operation"],
+    buckets=DB_BUCKETS
+)
+
+DB_POOL_SIZE = Gauge("db_pool_size", "Connections the pool keeps open", multiprocess_mode="liveall")
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Pool connections currently in use", multiprocess_mode="liveall")
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "Connections opened beyond the pool size", multiprocess_mode="liveall")
+WEBHOOK_QUEUE_DEPTH = Gauge(
+    "webhook_receipt_queue_depth", "Delivery receipts waiting to be applied", multiprocess_mode="liveall"
+)
+EVENT_BUS_PENDING = Gauge(
+    "event_bus_pending_events", "Events waiting to be published on the event bus", multiprocess_mode="liveall"
+)
+THUMBNAIL_PENDING = Gauge(
+    "thumbnail_pending_renders", "Thumbnails queued or rendering in the process pool", multiprocess_mode="liveall"
+)
+THUMBNAILS_SKIPPED = Counter("thumbnails_skipped_total", "Thumbnail renders not attempted", ["reason"])
+WEBSOCKET_CONNECTIONS = Gauge("websocket_connections", "Open realtime WebSocket connections", multiprocess_mode="liveall")
+EVENT_LOOP_LAG = Gauge(
+    "event_loop_lag_seconds", "How late the event loop ran a timer, last sample", multiprocess_mode="liveall"
+)
+STARTUP_PHASE_SECONDS = Gauge(
+    "startup_phase_seconds", "Time spent in each phase of the last startup", ["phase"], multiprocess_mode="liveall"
+)
+WORKER_RESTARTS = Counter("worker_restarts_total", "Workers replaced by the supervisor", ["reason"])
+
+_sampled_gauges: List[Tuple[Gauge, Callable[[], float]]] = []
+
+def gauge_function(gauge: Gauge, f: Callable[[], float]):
+    """Back a gauge by a function.
+
+    Function gauges only exist in the process that registered them, so under
+    the supervisor the value is sampled into the shared files instead.
+    """
+    if MULTIPROCESS_DIR:
+        _sampled_gauges.append((gauge, f))
+    else:
+        gauge.set_function(f)
+
+def sample_gauges():
+    for gauge, f in _sampled_gauges:
+        try:
+            gauge.set(f())
+        except Exception as e:
+            logger.debug(f"Failed to sample gauge {gauge._name}: {e}")
+
+def statement_operation(statement: str) -> str:
+    """SELECT/INSERT/UPDATE/... from a SQL statement, cheaply"""
+    head = statement.lstrip()[:10].split(None, 1)
+    return head[0].upper() if head else "OTHER"
+
+def render_metrics() -> tuple:
+    """Exposition body and content type for the /metrics endpoint"""
+    if not MULTIPROCESS_DIR:
+        return generate_latest(), CONTENT_TYPE_LATEST
+
+    from prometheus_client import CollectorRegistry, multiprocess
+    sample_gauges()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=MULTIPROCESS_DIR)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by route template.
+
+    Plain ASGI rather than BaseHTTPMiddleware: it adds no task or body
+    buffering per request, and streaming responses (SSE, exports) pass
+    straight through. Streams are timed until their last byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the scope
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"],
+                getattr(route, "path", UNMATCHED_ROUTE),
+                str(status_code)
+            ).observe(time.perf_counter() - start)
+
+class LoopLagMonitor:
+    """Samples event-loop lag: how much later than requested a sleep wakes up"""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            EVENT_LOOP_LAG.set(max(0.0, loop.time() - expected))
+            sample_gauges()
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+# Global instance
+loop_lag_monitor = LoopLagMonitor()
@@ -0,0 +1,174 @@
+"""Phone number normalization to canonical E.164 digits.
+
+Numbers are stored the way WhatsApp addresses them: the E.164 number without
+the leading ``+`` (``5511987654321``), which is also what Baileys JIDs carry
+before ``@s.whatsapp.net``.
+
+Normalization works on whole batches at once: the input strings are joined
+into one byte buffer and every rule is a numpy operation over that buffer or
+over per-number vectors, so a list of a million numbers costs a handful of
+array passes rather than a million regex calls.
+"""
+
+import re
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from config import settings
+
+# E.164 allows at most 15 digits including the country code
+E164_MAX_DIGITS = 15
+E164_MIN_DIGITS = 8
+
+# Longest national number (area code + subscriber) written without a country code
+NATIONAL_MAX_DIGITS = 11
+
+# Group JIDs: new-style ids, or "<creator>-<timestamp>" for old groups
+GROUP_JID = re.compile(r"^[0-9]+(-[0-9]+)?@g\.us$")
+
+_ZERO, _NINE, _PLUS, _SEP = ord("0"), ord("9"), ord("+"), ord("\n")
+
+def _first_per_row(positions: np.ndarray, rows: np.ndarray, n: int, missing: int) -> np.ndarray:
+    """First position for every row, given positions sorted in buffer order"""
+    first = np.full(n, missing, dtype=np.int64)
+    if len(positions):
+        leading = np.empty(len(rows), dtype=bool)
+        leading[0] = True
+        np.not_equal(rows[1:], rows[:-1], out=leading[1:])
+        first[rows[leading]] = positions[leading]
+    return first
+
+def normalize_phones(
+    phones: Sequence[Optional[str]],
+    default_country_code: Optional[str] = settings.default_country_code
+) -> List[Optional[str]]:
+    """Normalize many phone numbers; invalid entries come back as None.
+
+    Accepts free-form input ("+55 (11) 98765-4321", "011 98765 4321",
+    "5511987654321@s.whatsapp.net", "tel:+55...", "0055 11 ..."); extensions
+    ("ext 3", "x3", "#3") are dropped. Group JIDs are not numbers and come
+    back as None (see is_group_jid), as does anything spanning several lines. Numbers written without ``+`` or ``00`` and with at
+    most NATIONAL_MAX_DIGITS digits are treated as national and get
+    ``default_country_code``; pass None when every input is already
+    international (e.g. WhatsApp JIDs).
+    """
+    n = len(phones)
+    if n == 0:
+        return []
+
+    joined = "\n".join("" if p is None else p for p in phones)
+    multiline = None
+    if joined.count("\n") != n - 1 or "\r" in joined:
+        # Two numbers on two lines are not one number: such entries are invalid
+        multiline = np.array([p is not None and ("\n" in p or "\r" in p) for p in phones])
+        joined = "\n".join("" if p is None or bad else p for p, bad in zip(phones, multiline))
+    buffer = np.frombuffer(joined.encode("ascii", "replace"), dtype=np.uint8)
+    separators = buffer == _SEP
+    row = np.cumsum(separators, dtype=np.int32)
+    row_end = np.append(np.flatnonzero(separators), len(buffer))
+
+    digits = (buffer >= _ZERO) & (buffer <= _NINE)
+
+    # Drop JID suffixes and extensions: everything from the first '@', ':',
+    # '#' or letter after a digit on ("...@s.whatsapp.net", "ext 3", "x3",
+    # "ramal 3"); before the first digit they are labels ("tel:", "Tel ").
+    # Mark [first cut, end of number) with +1/-1 and integrate.
+    letters = ((buffer | 0x20) >= ord("a")) & ((buffer | 0x20) <= ord("z"))
+    cuts = (buffer == ord("@")) | (buffer == ord(":")) | (buffer == ord("#")) | letters
+    cut_positions = np.flatnonzero(cuts)
+    if len(cut_positions):
+        all_digits = np.flatnonzero(digits)
+        first_any_digit = _first_per_row(all_digits, row[all_digits], n, len(buffer))
+        cut_positions = cut_positions[cut_positions > first_any_digit[row[cut_positions]]]
+    if len(cut_positions):
+        cut_rows = row[cut_positions]
+        leading = np.append(True, cut_rows[1:] != cut_rows[:-1])
+        cut_rows = cut_rows[leading]
+        delta = np.zeros(len(buffer) + 1, dtype=np.int8)
+        delta[cut_positions[leading]] = 1
+        delta[row_end[cut_rows]] = -1
+        digits &= np.cumsum(delta[:-1], dtype=np.int8) == 0
+
+    digit_positions = np.flatnonzero(digits)
+    digit_rows = row[digit_positions]
+    digit_count = np.bincount(digit_rows, minlength=n)
+    row_start = np.cumsum(digit_count) - digit_count
+    rank = np.arange(len(digit_positions)) - row_start[digit_rows]
+
+    # '+' counts only before the first digit
+    first_digit = _first_per_row(digit_positions, digit_rows, n, len(buffer))
+    plus_positions = np.flatnonzero(buffer == _PLUS)
+    plus_rows = row[plus_positions]
+    has_plus = np.zeros(n, dtype=bool)
+    has_plus[plus_rows[plus_positions < first_digit[plus_rows]]] = True
+
+    def nth_digit(i: int) -> np.ndarray:
+        values = np.zeros(n, dtype=np.uint8)
+        rows = digit_count > i
+        values[rows] = buffer[digit_positions[row_start[rows] + i]]
+        return values
+
+    first, second = nth_digit(0), nth_digit(1)
+
+    # International prefix "00" means the same as '+'
+    double_zero = ~has_plus & (first == _ZERO) & (second == _ZERO)
+    international = has_plus | double_zero
+    skip = np.where(double_zero, 2, 0)
+
+    prefix = (default_country_code or "").encode()
+    if prefix:
+        # National numbers may carry a trunk '0' ("011 9876...")
+        trunk_zero = ~international & (first == _ZERO)
+        skip = np.where(trunk_zero, 1, skip)
+        national = ~international & (digit_count - skip <= NATIONAL_MAX_DIGITS)
+    else:
+        national = np.zeros(n, dtype=bool)
+
+    prefix_length = np.where(national, len(prefix), 0)
+    length = digit_count - skip + prefix_length
+
+    # Scatter digits into a fixed-width output, after the country code if any
+    out = np.zeros((n, E164_MAX_DIGITS), dtype=np.uint8)
+    column = rank - skip[digit_rows] + prefix_length[digit_rows]
+    placed = (column >= prefix_length[digit_rows]) & (column < E164_MAX_DIGITS)
+    out[digit_rows[placed], column[placed]] = buffer[digit_positions[placed]]
+    if prefix:
+        out[national, :len(prefix)] = np.frombuffer(prefix, dtype=np.uint8)
+
+    valid = (length >= E164_MIN_DIGITS) & (length <= E164_MAX_DIGITS) & (out[:, 0] != _ZERO)
+    if multiline is not None:
+        valid &= ~multiline
+
+    # Back to Python strings in one decode: invalid rows become empty lines
+    framed = np.zeros((n, E164_MAX_DIGITS + 1), dtype=np.uint8)
+    framed[valid, :E164_MAX_DIGITS] = out[valid]
+    framed[:, E164_MAX_DIGITS] = _SEP
+    flat = framed.ravel()
+    lines = flat[flat != 0].tobytes().decode("ascii").split("\n")
+    return [line or None for line in lines[:n]]
+
+def is_group_jid(jid: Optional[str]) -> bool:
+    """Whether a JID addresses a WhatsApp group ("120363...@g.us") rather than a number"""
+    return bool(jid) and GROUP_JID.match(jid) is not None
+
+def normalize_phone(
+    phone: Optional[str],
+    default_country_code: Optional[str] = settings.default_country_code
+) -> Optional[str]:
+    """Normalize a single phone number (see normalize_phones)"""
+    return normalize_phones([phone], default_country_code)[0]
+
+def normalize_phone_list(
+    phones: Sequence[str],
+    default_country_code: Optional[str] = settings.default_country_code
+) -> tuple:
+    """Normalize and de-duplicate a list, keeping order.
+
+    Returns ``(normalized, invalid)`` where ``invalid`` holds the original
+    entries that could not be normalized.
+    """
+    results = normalize_phones(phones, default_country_code)
+    invalid = [original for original, value in zip(phones, results) if value is None]
+    normalized = list(dict.fromkeys(value for value in results if value is not None))
+    return normalized, invalid
@@ -0,0 +1,185 @@
+import asyncio
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Set
+from uuid import UUID
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from config import settings
+from services.event_bus import event_bus
+from services.metrics import WEBSOCKET_CONNECTIONS, gauge_function
+from storage.provider import open_storage
+
+logger = logging.getLogger(__name__)
+
+# Close code sent to clients dropped for not keeping up (RFC 6455 "try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+class RealtimeConnection:
+    """One open WebSocket with its own bounded send queue.
+
+    Publishers only ever ``put_nowait`` into the queue; a sender task drains it
+    onto the socket. When the queue is full the connection is marked dropped
+    and closed, so a slow browser never holds up webhook ingestion.
+    """
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = asyncio.Event()
+
+    def offer(self, message: str) -> bool:
+        if self.dropped.is_set():
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.dropped.set()
+            return False
+
+    async def _send_loop(self):
+        while True:
+            message = await self.queue.get()
+            await self.websocket.send_text(message)
+
+    async def _receive_loop(self):
+        # Clients don't send anything meaningful; reading detects disconnects
+        while True:
+            message = await self.websocket.receive_text()
+            if message == "ping":
+                self.offer(json.dumps({"type": "pong"}))
+
+    async def serve(self):
+        """Pump events until the client goes away or falls too far behind"""
+        tasks = [
+            asyncio.create_task(self._send_loop()),
+            asyncio.create_task(self._receive_loop()),
+            asyncio.create_task(self.dropped.wait())
+        ]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if self.dropped.is_set():
+            try:
+                await self.websocket.close(code=SLOW_CONSUMER_CLOSE_CODE)
+            except (RuntimeError, WebSocketDisconnect):
+                pass
+
+class RealtimeHub:
+    """Per-user fan-out of UI events to open WebSocket connections"""
+
+    def __init__(self):
+        self._connections: Dict[UUID, Set[RealtimeConnection]] = {}
+
+    @property
+    def connection_count(self) -> int:
+        return sum(len(connections) for connections in self._connections.values())
+
+    def has_connections(self, user_id: UUID) -> bool:
+        return bool(self._connections.get(user_id))
+
+    def connect(self, user_id: UUID, websocket: WebSocket) -> RealtimeConnection:
+        connection = RealtimeConnection(websocket, settings.ws_queue_size)
+        self._connections.setdefault(user_id, set()).add(connection)
+        return connection
+
+    def disconnect(self, user_id: UUID, connection: RealtimeConnection):
+        connections = self._connections.get(user_id)
+        if not connections:
+            return
+        connections.discard(connection)
+        if not connections:
+            del self._connections[user_id]
+
+    def publish(self, user_id: UUID, event_type: str, data: Dict[str, Any]) -> int:
+        """Queue an event for every connection of the user; returns how many accepted it"""
+        connections = self._connections.get(user_id)
+        if not connections:
+            return 0
+
+        # Serialize once, however many tabs the user has open
+        message = json.dumps(
+            {"type": event_type, "data": data, "at": datetime.now(timezone.utc).isoformat()},
+            default=str
+        )
+        delivered = 0
+        for connection in list(connections):
+            if connection.offer(message):
+                delivered += 1
+            else:
+                logger.warning(f"Dropping slow WebSocket client of user {user_id}")
+                self.disconnect(user_id, connection)
+        return delivered
+
+class UnreadPusher:
+    """Pushes unread counts with the user's total, coalesced per user.
+
+    The total is a SUM over all of the user's conversations. Rather than run
+    it for every inbound message, changes are collected for
+    ``ws_unread_debounce`` seconds and pushed after one query, in a task of
+    their own instead of the event bus receive loop.
+    """
+
+    def __init__(self, hub: RealtimeHub):
+        self.hub = hub
+        # user -> conversation id -> latest unread count
+        self._pending: Dict[UUID, Dict[str, int]] = {}
+        self._tasks: Dict[UUID, asyncio.Task] = {}
+
+    def offer(self, user_id: UUID, conversation_id: str, unread_count: int):
+        if not self.hub.has_connections(user_id):
+            return
+        self._pending.setdefault(user_id, {})[conversation_id] = unread_count
+        if user_id not in self._tasks:
+            self._tasks[user_id] = asyncio.create_task(self._push(user_id))
+
+    async def _push(self, user_id: UUID):
+        try:
+            await asyncio.sleep(settings.ws_unread_debounce)
+        finally:
+            # Changes from here on are the next push's
+            del self._tasks[user_id]
+            changed = self._pending.pop(user_id, {})
+        if not self.hub.has_connections(user_id):
+            return
+        try:
+            async with open_storage() as storage:
+                total = await storage.conversations.unread_total(user_id)
+        except Exception as e:
+            logger.error(f"Failed to count unread messages of user {user_id}: {e}")
+            return
+        for conversation_id, unread_count in changed.items():
+            self.hub.publish(user_id, "unread", {
+                "conversation_id": conversation_id,
+                "unread_count": unread_count,
+                "total": total
+            })
+
+# Global instances
+realtime_hub = RealtimeHub()
+unread_pusher = UnreadPusher(realtime_hub)
+gauge_function(WEBSOCKET_CONNECTIONS, lambda: realtime_hub.connection_count)
+
+# Domain events from any worker become pushes to the connections held by this one
+
+def _push_instance_status(data: Dict[str, Any], local: bool):
+    payload = {key: value for key, value in data.items() if key not in ("user_id", "status")}
+    realtime_hub.publish(UUID(data["user_id"]), data["status"], payload)
+
+def _push_message(data: Dict[str, Any], local: bool):
+    payload = {key: value for key, value in data.items() if key != "user_id"}
+    realtime_hub.publish(UUID(data["user_id"]), "message", payload)
+
+def _push_unread(data: Dict[str, Any], local: bool):
+    unread_pusher.offer(UUID(data["user_id"]), str(data["conversation_id"]), data["unread_count"])
+
+event_bus.subscribe("instance.status", _push_instance_status)
+event_bus.subscribe("message.received", _push_message)
+event_bus.subscribe("conversation.unread", _push_unread)
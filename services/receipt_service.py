@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import time
+from typing import Optional, Dict, List, Tuple, Any
+
+from config import settings
+from services.event_bus import event_bus
+from services.metrics import WEBHOOK_QUEUE_DEPTH, gauge_function
+from storage.provider import open_storage
+import models
+
+logger = logging.getLogger(__name__)
+
+# Receipt status names sent by the Baileys bridge
+RECEIPT_STATUSES = {
+    "delivered": models.MessageStatus.DELIVERED,
+    "read": models.MessageStatus.READ,
+    "failed": models.MessageStatus.FAILED,
+}
+
+# A later receipt for the same message only wins if it ranks higher
+STATUS_RANK = {
+    models.MessageStatus.FAILED: 0,
+    models.MessageStatus.DELIVERED: 1,
+    models.MessageStatus.READ: 2,
+}
+
+class ReceiptBatcher:
+    """Coalesces receipts from many webhook calls and applies them in batches.
+
+    Receipts are keyed by whatsapp_message_id, so repeated receipts for one
+    message collapse into its highest status before hitting the database.
+    Receipts for messages that aren't stored yet (the campaign engine stores
+    messages once per batch) are retried until ``receipt_retry_window``
+    expires; receipts for messages already at or past their status are done.
+    """
+
+    def __init__(self):
+        self._pending: Dict[str, Tuple[models.MessageStatus, float]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._closing = False
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def enqueue(self, receipts: List[Dict[str, Any]]) -> int:
+        """Queue receipts from one webhook call; returns how many were accepted"""
+        now = time.monotonic()
+        accepted = 0
+        for receipt in receipts:
+            message_id = receipt.get('id')
+            new_status = RECEIPT_STATUSES.get(receipt.get('status'))
+            if not message_id or new_status is None:
+                continue
+            self._merge(message_id, new_status, now)
+            accepted += 1
+
+        if accepted:
+            if self._task is None or self._task.done():
+                self._task = asyncio.create_task(self._flush_loop())
+            if self.depth >= settings.receipt_batch_size:
+                self._wakeup.set()
+        return accepted
+
+    def _merge(self, message_id: str, new_status: models.MessageStatus, first_seen: float):
+        current = self._pending.get(message_id)
+        if current is None:
+            self._pending[message_id] = (new_status, first_seen)
+        elif STATUS_RANK[new_status] > STATUS_RANK[current[0]]:
+            self._pending[message_id] = (new_status, min(first_seen, current[1]))
+
+    async def flush(self):
+        """Apply everything that is pending in a single transaction"""
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+
+        try:
+            async with open_storage() as storage:
+                matched, delivered_counts = await storage.messages.apply_receipts(
+                    {message_id: status for message_id, (status, _) in batch.items()}
+                )
+                await storage.commit()
+        except Exception as e:
+            logger.error(f"Failed to apply {len(batch)} receipts: {e}")
+            matched, delivered_counts = set(), {}
+
+        for campaign_id, delivered in delivered_counts.items():
+            event_bus.publish("campaign.delivered", {"campaign_id": campaign_id, "delivered": delivered})
+
+        if self._closing:
+            return
+        deadline = time.monotonic() - settings.receipt_retry_window
+        for message_id, (status, first_seen) in batch.items():
+            if message_id not in matched and first_seen > deadline:
+                self._merge(message_id, status, first_seen)
+
+    async def _flush_loop(self):
+        while self._pending:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.receipt_flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def shutdown(self):
+        """Apply what is pending once more, without retrying unmatched receipts"""
+        self._closing = True
+        self._wakeup.set()
+        if self._task and not self._task.done():
+            await self._task
+        await self.flush()
+
+# Global instance
+receipt_batcher = ReceiptBatcher()
+gauge_function(WEBHOOK_QUEUE_DEPTH, lambda: receipt_batcher.depth)
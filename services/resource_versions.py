@@ -0,0 +1,71 @@
+"""Conditional GET for list resources.
+
+Every write to a user's instances, campaigns, groups or finances bumps a
+per-user version counter (database triggers, migration 005, on Postgres; the
+other backends count their own writes). A list endpoint's ETag is derived
+from the versions of the resources its response depends on
+(``Storage.resource_versions``), so checking ``If-None-Match`` costs one
+primary-key lookup and a match returns 304 before the list query runs:
+
+    @router.get("/")
+    async def get_groups(..., validators: dict = Depends(conditional_get("groups"))):
+
+Conversations change on every inbound message and receipt, so they have no
+counter: a shared per-user row would serialize ingestion (migration 009
+dropped it). Endpoints depending on them pass ``state``, a cheap query whose
+result goes into the ETag instead.
+"""
+
+import hashlib
+from typing import Awaitable, Callable, Dict, Optional
+from uuid import UUID
+
+from fastapi import Depends, HTTPException, Request, Response, status
+
+from auth import get_current_active_user
+from storage.interface import Storage
+from storage.provider import get_storage
+import models
+
+# Bump when the JSON shape of the cached resources changes, invalidating old ETags
+REPRESENTATION_VERSION = "1"
+
+class ResourceVersions:
+    @staticmethod
+    def etag(user_id: UUID, versions: Dict[str, int], variant: str = "") -> str:
+        """Strong validator: same user, versions and query string -> same bytes"""
+        key = ";".join(f"{resource}={version}" for resource, version in sorted(versions.items()))
+        digest = hashlib.sha1(f"{REPRESENTATION_VERSION}|{user_id}|{key}|{variant}".encode()).hexdigest()
+        return f'"{digest[:32]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    candidates = (candidate.strip() for candidate in if_none_match.split(","))
+    return etag in (candidate[2:] if candidate.startswith("W/") else candidate for candidate in candidates)
+
+def conditional_get(*resources: str, state: Optional[Callable[[Storage, UUID], Awaitable[str]]] = None):
+    """Dependency answering 304 when the client's ETag is current; returns the validator headers"""
+    async def check(
+        request: Request,
+        response: Response,
+        current_user: models.User = Depends(get_current_active_user),
+        storage: Storage = Depends(get_storage)
+    ) -> Dict[str, str]:
+        versions = await storage.resource_versions(current_user.id, resources)
+        variant = request.url.query
+        if state is not None:
+            variant = f"{await state(storage, current_user.id)}|{variant}"
+        headers = {
+            "ETag": ResourceVersions.etag(current_user.id, versions, variant),
+            # Per-user data: the browser may keep it but must revalidate every time
+            "Cache-Control": "private, no-cache",
+        }
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+        return headers
+    return check
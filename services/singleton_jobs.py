@@ -0,0 +1,179 @@
+"""Background jobs that must run on exactly one worker.
+
+Every worker competes for one lock, matching the storage backend:
+
+* postgres - an advisory lock taken at session level on a dedicated asyncpg
+  connection (outside the SQLAlchemy pool). If the leader dies or its
+  connection drops, Postgres releases the lock.
+* mongo    - a lease document, renewed by the leader every third of
+  ``singleton_lease_ttl`` and taken over once it has expired.
+* memory   - single-process, so the jobs just run, lock-free.
+
+The worker holding the lock runs every registered job on its interval; the
+others retry every ``singleton_lock_retry`` seconds and a standby takes over
+when the leader goes away.
+
+Jobs register with a decorator and must tolerate being retried:
+
+    @singleton_jobs.register("campaign_scheduler", interval=30)
+    async def start_due_campaigns(): ...
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+JobFunc = Callable[[], Awaitable[None]]
+
+# 64-bit key for pg_try_advisory_lock, stable across deploys
+LOCK_KEY = int.from_bytes(hashlib.sha1(b"whatsapp-bot:singleton-jobs").digest()[:8], "big", signed=True)
+# _id of the Mongo lease document
+LEASE_ID = "whatsapp-bot:singleton-jobs"
+LEASE_COLLECTION = "singleton_locks"
+
+class LockLost(Exception):
+    pass
+
+class AdvisoryLock:
+    """Postgres session-level advisory lock on a dedicated connection"""
+
+    def __init__(self):
+        self._connection = None
+
+    async def acquire(self) -> bool:
+        import asyncpg
+
+        if self._connection is None:
+            self._connection = await asyncpg.connect(settings.database_url)
+        return await self._connection.fetchval("SELECT pg_try_advisory_lock($1)", LOCK_KEY)
+
+    async def check(self):
+        # Raises if the session (and with it the lock) is gone
+        await self._connection.fetchval("SELECT 1")
+
+    async def release(self):
+        if self._connection is None:
+            return
+        connection, self._connection = self._connection, None
+        try:
+            # Closing the session releases the lock for the other workers
+            await connection.close(timeout=5)
+        except Exception as e:
+            logger.warning(f"Failed to close the singleton jobs connection: {e}")
+
+class MongoLease:
+    """Lease document in the application's Mongo database"""
+
+    def __init__(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    @staticmethod
+    def _collection():
+        from storage.provider import get_backend
+
+        return get_backend().db[LEASE_COLLECTION]
+
+    async def acquire(self) -> bool:
+        """Take the lease if it is free or expired, or renew it if held"""
+        from pymongo.errors import DuplicateKeyError
+
+        now = datetime.now(timezone.utc)
+        try:
+            # No match means another worker holds it: the upsert then hits the _id
+            await self._collection().update_one(
+                {"_id": LEASE_ID, "$or": [{"owner": self.owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=settings.singleton_lease_ttl)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def check(self):
+        if not await self.acquire():
+            raise LockLost("Singleton jobs lease was taken over by another worker")
+
+    async def release(self):
+        try:
+            await self._collection().delete_one({"_id": LEASE_ID, "owner": self.owner})
+        except Exception as e:
+            logger.warning(f"Failed to release the singleton jobs lease: {e}")
+
+class SingletonJobs:
+    """Leader election over a storage backend lock plus the jobs the leader runs"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Tuple[float, JobFunc]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.is_leader = False
+
+    def register(self, name: str, interval: float):
+        def decorator(func: JobFunc) -> JobFunc:
+            self._jobs[name] = (interval, func)
+            return func
+        return decorator
+
+    def start(self):
+        if not settings.singleton_jobs_enabled or not self._jobs:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        if settings.storage_backend == "memory":
+            self.is_leader = True
+            await self._run_jobs(None)
+            return
+
+        while True:
+            lock = MongoLease() if settings.storage_backend == "mongo" else AdvisoryLock()
+            try:
+                while not await lock.acquire():
+                    await asyncio.sleep(settings.singleton_lock_retry)
+                self.is_leader = True
+                logger.info(f"Singleton jobs running on this worker (pid {os.getpid()}): {', '.join(self._jobs)}")
+                await self._run_jobs(lock)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Singleton jobs lock failed: {e}")
+            finally:
+                self.is_leader = False
+                await asyncio.shield(lock.release())
+            await asyncio.sleep(settings.singleton_lock_retry)
+
+    async def _run_jobs(self, lock):
+        loop = asyncio.get_running_loop()
+        next_run = {name: loop.time() for name in self._jobs}
+        # Wake up often enough to renew a Mongo lease
+        max_sleep = settings.singleton_lease_ttl / 3
+        while True:
+            if lock is not None:
+                await lock.check()
+            for name, (interval, func) in self._jobs.items():
+                if loop.time() < next_run[name]:
+                    continue
+                try:
+                    await func()
+                except Exception as e:
+                    logger.error(f"Singleton job {name} failed: {e}")
+                next_run[name] = loop.time() + interval
+            await asyncio.sleep(min(max_sleep, max(0.0, min(next_run.values()) - loop.time())))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+# Global instance
+singleton_jobs = SingletonJobs()
@@ -0,0 +1,151 @@
+import logging
+import random
+import re
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-sql-profile"
+
+_QUOTED = re.compile(r"'(?:[^']|'')*'")
+_CAST = re.compile(r"::\w+(?:\[\])?")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|\$\d+|\?")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+@lru_cache(maxsize=1024)
+def normalize_statement(statement: str) -> str:
+    """Statement shape: literals and bind parameters become '?', IN lists collapse"""
+    shape = _QUOTED.sub("?", statement)
+    shape = _CAST.sub("", shape)
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _IN_LIST.sub("IN (...)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+class RequestProfile:
+    """Statements executed while handling one request, grouped by shape"""
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.count = 0
+        self.total_time = 0.0
+        self.closed = False
+        # shape -> [executions, total seconds]
+        self.shapes: Dict[str, List] = {}
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.total_time += elapsed
+        entry = self.shapes.get(statement)
+        if entry is None:
+            self.shapes[statement] = [1, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def normalized(self) -> Dict[str, List]:
+        """Merge raw statements that only differ in literals"""
+        merged: Dict[str, List] = {}
+        for statement, (count, elapsed) in self.shapes.items():
+            entry = merged.setdefault(normalize_statement(statement), [0, 0.0])
+            entry[0] += count
+            entry[1] += elapsed
+        return merged
+
+    def suspects(self, shapes: Dict[str, List]) -> List[Tuple[str, int, float]]:
+        """Shapes run often enough in one request to look like N+1 queries"""
+        threshold = settings.sql_profile_repeat_threshold
+        return sorted(
+            ((shape, count, elapsed) for shape, (count, elapsed) in shapes.items() if count >= threshold),
+            key=lambda item: -item[1]
+        )
+
+    def summary(self, shapes: Dict[str, List]) -> str:
+        return (
+            f"statements={self.count}; db_ms={self.total_time * 1000:.1f}; "
+            f"shapes={len(shapes)}; n_plus_one={len(self.suspects(shapes))}"
+        )
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("sql_profile", default=None)
+
+def record_statement(statement: str, elapsed: float):
+    """Called for every executed statement; a no-op unless the request is profiled"""
+    profile = _current_profile.get()
+    # Tasks spawned during a request inherit its context; stop counting once it's done
+    if profile is not None and not profile.closed:
+        profile.record(statement, elapsed)
+
+class SQLProfilerMiddleware:
+    """Opt-in per-request SQL profiling.
+
+    A request is profiled when it carries ``X-SQL-Profile: 1`` (and
+    ``sql_profile_allow_header`` is on: off by default, as the header is
+    honoured before authentication and the summary reveals the queries a
+    route runs) or is picked by
+    ``sql_profile_sample_rate``. The response then gets an ``X-SQL-Profile``
+    summary header and one log line lists the statement shapes, with N+1
+    suspects (a shape repeated ``sql_profile_repeat_threshold`` times or more)
+    logged as a warning. Unprofiled requests only pay a context variable read
+    per statement.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _wants_profile(self, scope) -> bool:
+        if settings.sql_profile_allow_header:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER.encode() and value not in (b"", b"0"):
+                    return True
+        rate = settings.sql_profile_sample_rate
+        return rate > 0 and random.random() < rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        token = _current_profile.set(profile)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # Statements of streamed bodies run later and only show in the log
+                headers = list(message.get("headers", []))
+                headers.append((PROFILE_HEADER.encode(), profile.summary(profile.normalized()).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_profile.reset(token)
+            profile.closed = True
+            self._log(profile)
+
+    def _log(self, profile: RequestProfile):
+        shapes = profile.normalized()
+        suspects = profile.suspects(shapes)
+        elapsed = (time.perf_counter() - profile.started) * 1000
+        line = f"SQL profile {profile.method} {profile.path} ({elapsed:.1f} ms): {profile.summary(shapes)}"
+
+        top = sorted(shapes.items(), key=lambda item: -item[1][1])[:5]
+        details = "".join(
+            f"\n  {count}x {total * 1000:.1f} ms  {shape[:300]}" for shape, (count, total) in top
+        )
+        if suspects:
+            details += "".join(
+                f"\n  N+1 suspect: {count}x {shape[:300]}" for shape, count, _ in suspects
+            )
+            logger.warning(line + details)
+        else:
+            logger.info(line + details)
@@ -0,0 +1,102 @@
+"""Content-hashed static assets.
+
+``StaticAssets`` hashes every file under ``static/`` at startup, so templates
+can link ``{{ static_url('app.js') }}`` -> ``/static/app.3f2a9c1b07de.js``.
+``HashedStaticFiles`` serves those URLs with ``Cache-Control: immutable``
+(a new deploy changes the URL, not the content behind it) and plain or stale
+URLs with ``no-cache``. It also serves ``app.js.br`` / ``app.js.gz`` when they
+exist and the client accepts them (scripts/compress_static.py builds them).
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+from pathlib import Path
+from typing import Dict, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from services.compression import negotiate_encoding
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+PRECOMPRESSED = {"br": ".br", "gzip": ".gz"}
+HASH_LENGTH = 12
+HASHED_NAME = re.compile(rf"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{{{HASH_LENGTH}}})(?P<suffix>\.[^./]+)$")
+
+class StaticAssets:
+    """Manifest of the static directory: name -> content hash and precompressed variants"""
+
+    def __init__(self, directory: Path, url_prefix: str = "/static"):
+        self.directory = Path(directory)
+        self.url_prefix = url_prefix
+        self.hashes: Dict[str, str] = {}
+        self.variants: Dict[str, Tuple[str, ...]] = {}
+        self.scan()
+
+    def scan(self):
+        if not self.directory.is_dir():
+            return
+        for path in sorted(self.directory.rglob("*")):
+            if not path.is_file() or path.suffix in PRECOMPRESSED.values():
+                continue
+            name = path.relative_to(self.directory).as_posix()
+            self.hashes[name] = hashlib.sha256(path.read_bytes()).hexdigest()[:HASH_LENGTH]
+            self.variants[name] = tuple(
+                encoding for encoding, suffix in PRECOMPRESSED.items()
+                if path.with_name(path.name + suffix).is_file()
+            )
+
+    def url(self, name: str) -> str:
+        """Hashed URL of a static file (plain URL for files the manifest doesn't know)"""
+        digest = self.hashes.get(name)
+        if digest is None:
+            return f"{self.url_prefix}/{name}"
+        stem, dot, suffix = name.rpartition(".")
+        hashed = f"{stem}.{digest}.{suffix}" if dot else f"{name}.{digest}"
+        return f"{self.url_prefix}/{hashed}"
+
+    def resolve(self, path: str) -> Tuple[str, bool]:
+        """Request path -> (file name, whether the URL pins the current content)"""
+        match = HASHED_NAME.match(path)
+        if match:
+            name = match["stem"] + match["suffix"]
+            if name in self.hashes:
+                return name, self.hashes[name] == match["hash"]
+        return path, False
+
+class HashedStaticFiles(StaticFiles):
+    def __init__(self, *, assets: StaticAssets, **kwargs):
+        super().__init__(directory=str(assets.directory), **kwargs)
+        self.assets = assets
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        name, pinned = self.assets.resolve(path)
+        scope["static_asset"] = name
+        response = await super().get_response(name, scope)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = IMMUTABLE if pinned else REVALIDATE
+        return response
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        media_type = mimetypes.guess_type(str(full_path))[0] or "text/plain"
+        available = self.assets.variants.get(scope.get("static_asset"), ())
+        encoding = negotiate_encoding(request_headers.get("accept-encoding", ""), available) if available else None
+        if encoding:
+            full_path = f"{full_path}{PRECOMPRESSED[encoding]}"
+            stat_result = os.stat(full_path)
+
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, media_type=media_type)
+        if available:
+            response.headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,224 @@
+"""Non-blocking, structured logging.
+
+``configure_logging()`` routes every log record through a queue: the calling
+code (usually the event loop) only pays for creating the record and putting
+it on an in-memory queue, and a listener thread formats it and writes it to
+stdout. Records are emitted as one JSON object per line with:
+
+* ``request_id`` - from the ``X-Request-ID`` header or generated per request
+  by ``CorrelationIdMiddleware`` (and echoed back in the response)
+* ``instance_id`` - bound with ``bind_instance()`` by code handling one
+  WhatsApp instance, e.g. the webhook
+* ``worker`` - the supervisor's worker index, when there is one
+* any ``extra={...}`` fields passed to the logging call
+
+High-volume lines can be sampled per logger: ``sampling={"routers.webhooks":
+0.1}`` keeps a tenth of that logger's (and its children's) DEBUG and INFO
+records. Warnings and errors are never dropped.
+
+Standalone on purpose (no ``config`` import), so the legacy backend can use it;
+the defaults come from LOG_LEVEL, LOG_JSON and LOG_SAMPLING.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+REQUEST_ID_HEADER = "x-request-id"
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+instance_id_var: ContextVar[Optional[str]] = ContextVar("instance_id", default=None)
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+_CORRELATION_FIELDS = ("request_id", "instance_id")
+_CONTEXT_FIELDS = _CORRELATION_FIELDS + ("worker", "context")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def bind_instance(instance_id) -> None:
+    """Tag the current request's (task's) log records with a WhatsApp instance"""
+    instance_id_var.set(str(instance_id) if instance_id is not None else None)
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    """``"routers.webhooks=0.1,uvicorn.access=0.05"`` -> {logger: rate}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+class ContextFilter(logging.Filter):
+    """Stamps correlation IDs on records in the calling task, before they are queued"""
+
+    def __init__(self):
+        super().__init__()
+        self.worker = os.environ.get("WORKER_ID")
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        record.instance_id = instance_id_var.get()
+        record.worker = self.worker
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Keeps a share of DEBUG/INFO records per logger (longest configured prefix wins)"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._resolved: Dict[str, float] = {}
+
+    def rate_for(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            candidate = name
+            while candidate:
+                if candidate in self.rates:
+                    rate = self.rates[candidate]
+                    break
+                candidate = candidate.rpartition(".")[0]
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in _CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in _CONTEXT_FIELDS:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for development, still showing the correlation IDs"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s%(context)s %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        ids = [f"{field}={getattr(record, field)}" for field in _CORRELATION_FIELDS if getattr(record, field, None)]
+        record.context = f" [{' '.join(ids)}]" if ids else ""
+        return super().format(record)
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """Queues records without pre-formatting them, so extras and tracebacks stay separate"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def configure_logging(
+    level: Optional[str] = None,
+    json_format: Optional[bool] = None,
+    sampling: Optional[Dict[str, float]] = None
+):
+    """Install the queue handler on the root logger (once per process)"""
+    global _listener
+    # uvicorn installs its own synchronous handlers; send its records through the queue too
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+    if _listener is not None:
+        return
+
+    level = (level or os.environ.get("LOG_LEVEL", "INFO")).upper()
+    if json_format is None:
+        json_format = os.environ.get("LOG_JSON", "true").lower() not in ("0", "false", "no")
+    if sampling is None:
+        sampling = parse_sampling(os.environ.get("LOG_SAMPLING", ""))
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JSONFormatter() if json_format else TextFormatter())
+
+    handler = StructuredQueueHandler(queue.SimpleQueue())
+    handler.addFilter(ContextFilter())
+    if sampling:
+        handler.addFilter(SamplingFilter(sampling))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+class CorrelationIdMiddleware:
+    """Assigns every HTTP/WebSocket request an ID for its log records.
+
+    An incoming ``X-Request-ID`` (e.g. from a proxy or the Baileys service) is
+    kept, otherwise one is generated; HTTP responses carry it back.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER.encode():
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex[:16]
+        request_token = request_id_var.set(request_id)
+        instance_token = instance_id_var.set(None)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER.encode(), request_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(request_token)
+            instance_id_var.reset(instance_token)
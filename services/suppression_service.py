@@ -0,0 +1,133 @@
+import hashlib
+import logging
+import math
+from typing import Dict, Iterable, List, Set
+from uuid import UUID
+
+from services.event_bus import event_bus
+from storage.interface import Storage
+
+logger = logging.getLogger(__name__)
+
+# Replies that put the sender on the suppression list
+OPT_OUT_KEYWORDS = {"STOP", "PARAR", "SAIR", "CANCELAR", "DESCADASTRAR", "UNSUBSCRIBE"}
+
+def is_opt_out(content: str) -> bool:
+    return content.strip().strip(".!").upper() in OPT_OUT_KEYWORDS
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings.
+
+    Membership tests never give false negatives, so a miss proves a phone is
+    not suppressed; hits still have to be confirmed against the table.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(capacity, 1024)
+        self.capacity = capacity
+        self.size = int(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterable[int]:
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class SuppressionRegistry:
+    """Per-user suppression lists with an in-memory Bloom filter in front of the table.
+
+    Filters are built lazily from the table the first time a user's list is
+    consulted. Removals cannot be taken out of a Bloom filter, so the filter
+    is rebuilt once enough entries were removed (or added beyond capacity).
+    """
+
+    def __init__(self):
+        self._filters: Dict[UUID, BloomFilter] = {}
+        self._removed: Dict[UUID, int] = {}
+
+    def invalidate(self, user_id: UUID):
+        self._filters.pop(user_id, None)
+        self._removed.pop(user_id, None)
+
+    async def _get_filter(self, storage: Storage, user_id: UUID) -> BloomFilter:
+        bloom = self._filters.get(user_id)
+        if bloom is not None:
+            return bloom
+
+        phones = await storage.suppressions.phones(user_id)
+        bloom = BloomFilter(capacity=len(phones) * 2)
+        for phone in phones:
+            bloom.add(phone)
+        self._filters[user_id] = bloom
+        self._removed[user_id] = 0
+        return bloom
+
+    async def filter_suppressed(self, storage: Storage, user_id: UUID, phones: List[str]) -> Set[str]:
+        """Return the subset of phones that are on the user's suppression list"""
+        bloom = await self._get_filter(storage, user_id)
+        candidates = list({phone for phone in phones if phone in bloom})
+        if not candidates:
+            return set()
+
+        # Confirm Bloom hits (which may be false positives) with one lookup
+        return await storage.suppressions.filter(user_id, candidates)
+
+    async def add(self, storage: Storage, user_id: UUID, phones: List[str], reason: str = "manual") -> int:
+        """Suppress phones; returns how many were not suppressed before"""
+        phones = list(dict.fromkeys(p for p in phones if p))
+        if not phones:
+            return 0
+
+        added = await storage.suppressions.add(user_id, phones, reason)
+        await storage.commit()
+        if added:
+            event_bus.publish("cache.invalidate", {"cache": "suppressions", "user_id": user_id})
+
+        bloom = self._filters.get(user_id)
+        if bloom is not None:
+            for phone in added:
+                bloom.add(phone)
+            if bloom.count > bloom.capacity:
+                self.invalidate(user_id)
+        return len(added)
+
+    async def remove(self, storage: Storage, user_id: UUID, phones: List[str]) -> int:
+        """Take phones off the suppression list; returns how many were removed"""
+        phones = list(dict.fromkeys(phones))
+        if not phones:
+            return 0
+
+        removed = await storage.suppressions.remove(user_id, phones)
+        await storage.commit()
+        if removed:
+            event_bus.publish("cache.invalidate", {"cache": "suppressions", "user_id": user_id})
+
+        bloom = self._filters.get(user_id)
+        if bloom is not None and removed:
+            # Stale bits only cost extra confirmation lookups; rebuild when they pile up
+            self._removed[user_id] = self._removed.get(user_id, 0) + removed
+            if self._removed[user_id] * 4 > max(bloom.count, 1):
+                self.invalidate(user_id)
+        return removed
+
+# Global instance
+suppression_registry = SuppressionRegistry()
+
+def _on_cache_invalidate(data: Dict, local: bool):
+    # This worker already updated its own filter; others rebuild theirs lazily
+    if data["cache"] == "suppressions" and not local:
+        suppression_registry.invalidate(UUID(data["user_id"]))
+
+event_bus.subscribe("cache.invalidate", _on_cache_invalidate)
@@ -0,0 +1,148 @@
+"""Image thumbnails, rendered off the event loop.
+
+Decoding and resizing is CPU-bound, so it runs in a small process pool
+(``thumbnail_workers`` per API worker; spawned rather than forked, as the
+parent has logging and tracing threads running). A thumbnail is rendered
+once per content hash and kept next to its blob in the media store, so
+every message carrying the same image shares it. Renders start as soon as
+an image is uploaded and again on demand when a thumbnail is requested.
+
+At most ``thumbnail_max_pending`` renders are queued or running. Past that,
+and whenever a render takes longer than ``thumbnail_wait``, the thumbnail
+endpoint answers with an uncached placeholder and the client simply asks
+again later, so a burst of images never piles work onto the pool.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Optional
+
+from config import settings
+from services.image_resize import render_thumbnail
+from services.media_store import MediaBlob, MediaStore, media_store
+from services.metrics import THUMBNAIL_PENDING, THUMBNAILS_SKIPPED, gauge_function
+
+logger = logging.getLogger(__name__)
+
+# Shown while a thumbnail isn't ready, and for images that can't be rendered
+PLACEHOLDER = (
+    b'<svg xmlns="http://www.w3.org/2000/svg" width="320" height="320" viewBox="0 0 320 320">'
+    b'<rect width="320" height="320" fill="#e5e7eb"/>'
+    b'<path d="M96 224l48-64 36 44 24-30 40 50z" fill="#9ca3af"/>'
+    b'<circle cx="208" cy="120" r="16" fill="#9ca3af"/></svg>'
+)
+PLACEHOLDER_TYPE = "image/svg+xml"
+
+class Thumbnailer:
+    """Renders and caches thumbnails in a bounded process pool"""
+
+    def __init__(self, store: MediaStore):
+        self.store = store
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def path(self, sha256: str) -> Path:
+        return self.store.path(sha256).with_name(f"{sha256}.thumb{settings.thumbnail_size}.jpg")
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=settings.thumbnail_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def render(self, blob: MediaBlob) -> Optional[asyncio.Future]:
+        """Start rendering (or join the render already running); None if the pool is backlogged"""
+        pending = self._pending.get(blob.sha256)
+        if pending is not None:
+            return pending
+        if self.depth >= settings.thumbnail_max_pending:
+            THUMBNAILS_SKIPPED.labels("backlog").inc()
+            return None
+
+        try:
+            future = asyncio.wrap_future(self._executor().submit(
+                render_thumbnail,
+                str(self.store.path(blob.sha256)),
+                str(self.path(blob.sha256)),
+                settings.thumbnail_size,
+                settings.thumbnail_quality,
+                settings.thumbnail_max_pixels
+            ))
+        except (BrokenProcessPool, OSError, RuntimeError) as e:
+            # Uploads and pages still work without thumbnails
+            logger.error(f"Could not queue thumbnail of {blob.sha256}: {e}")
+            self._pool = None
+            return None
+        self._pending[blob.sha256] = future
+        future.add_done_callback(lambda done: self._finished(blob.sha256, done))
+        return future
+
+    def _finished(self, sha256: str, future: asyncio.Future):
+        self._pending.pop(sha256, None)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if isinstance(error, BrokenProcessPool):
+            # A pool process died (e.g. killed for memory); start a fresh pool next time
+            logger.error(f"Thumbnail pool broke while rendering {sha256}")
+            self._pool = None
+        elif error is not None:
+            logger.warning(f"Failed to render thumbnail of {sha256}: {error}")
+        elif not future.result():
+            logger.info(f"Media {sha256} is not a renderable image")
+
+    def prefetch(self, blob: MediaBlob):
+        """Render the thumbnail of a new upload in the background"""
+        if blob.message_type == "image" and not self.path(blob.sha256).exists():
+            self.render(blob)
+
+    async def get(self, blob: MediaBlob) -> Optional[Path]:
+        """The thumbnail file, rendering it if needed; None means serve the placeholder"""
+        path = self.path(blob.sha256)
+        if not path.exists():
+            if blob.message_type != "image":
+                return None
+            future = self.render(blob)
+            if future is None:
+                return None
+            try:
+                # Shielded: a request giving up doesn't cancel the render
+                await asyncio.wait_for(asyncio.shield(future), settings.thumbnail_wait)
+            except asyncio.TimeoutError:
+                THUMBNAILS_SKIPPED.labels("timeout").inc()
+                return None
+            except Exception:
+                return None
+        try:
+            # Empty: the image couldn't be decoded
+            return path if path.stat().st_size else None
+        except FileNotFoundError:
+            return None
+
+    def is_final(self, blob: MediaBlob) -> bool:
+        """Whether the placeholder is the permanent answer for a blob (not an image, or undecodable)"""
+        if blob.message_type != "image":
+            return True
+        try:
+            return self.path(blob.sha256).stat().st_size == 0
+        except FileNotFoundError:
+            return False
+
+    async def close(self):
+        if self._pool is not None:
+            await asyncio.to_thread(self._pool.shutdown, wait=True, cancel_futures=True)
+            self._pool = None
+
+# Global instance
+thumbnailer = Thumbnailer(media_store)
+gauge_function(THUMBNAIL_PENDING, lambda: thumbnailer.depth)
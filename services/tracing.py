@@ -0,0 +1,319 @@
+"""Distributed tracing for routes, SQL statements and Baileys calls.
+
+A small W3C-trace-context tracer that exports OTLP/JSON, without pulling in
+the OpenTelemetry SDK:
+
+* ``TracingMiddleware`` opens a server span per request, continuing the
+  caller's trace when a ``traceparent`` header is present.
+* database.py opens a client span per statement, WhatsAppService one per
+  Baileys call and sends ``traceparent`` along, so the Baileys service can
+  hand it back in webhook payloads (receipts carry the trace of their send).
+* Finished spans are queued and written by a background thread, either as
+  one OTLP ``ExportTraceServiceRequest`` per line to ``tracing_file`` or
+  POSTed to an OTLP/HTTP collector (``tracing_otlp_endpoint``).
+
+Sampling is head-based: a trace is kept with probability
+``tracing_sample_rate`` unless the incoming ``traceparent`` already decided.
+Unsampled requests still propagate IDs but record nothing.
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+# OTLP status codes
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+MAX_QUEUED_SPANS = 10000
+EXPORT_BATCH_SIZE = 512
+EXPORT_INTERVAL = 1.0
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "sampled",
+                 "start_ns", "end_ns", "attributes", "status", "status_message")
+
+    def __init__(self, name: str, kind: int, trace_id: str, parent_id: Optional[str], sampled: bool):
+        self.trace_id = trace_id
+        self.span_id = random_id(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes: Dict[str, Any] = {}
+        self.status = STATUS_UNSET
+        self.status_message = ""
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def set_attribute(self, key: str, value: Any):
+        if self.sampled:
+            self.attributes[key] = value
+
+    def set_error(self, error: BaseException):
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"[:500]
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [otlp_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": self.status, "message": self.status_message} if self.status else {},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+def random_id(size: int) -> str:
+    return random.getrandbits(size * 8).to_bytes(size, "big").hex()
+
+def otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+def parse_traceparent(header: Optional[str]):
+    """``00-<trace id>-<span id>-<flags>`` -> (trace_id, span_id, sampled), or None"""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    trace_id, span_id, flags = parts[1].lower(), parts[2].lower(), parts[3]
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    try:
+        sampled = bool(int(flags, 16) & 1)
+        int(trace_id, 16), int(span_id, 16)
+    except ValueError:
+        return None
+    return trace_id, span_id, sampled
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+class Tracer:
+    """Creates spans and hands finished, sampled ones to the export thread"""
+
+    def __init__(self):
+        self.enabled = bool(settings.tracing_exporter)
+        self.sample_rate = settings.tracing_sample_rate
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(MAX_QUEUED_SPANS)
+        self._thread: Optional[threading.Thread] = None
+        self.dropped = 0
+
+    @property
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def current_traceparent(self) -> Optional[str]:
+        span = _current_span.get()
+        return span.traceparent if span is not None else None
+
+    def start_span(self, name: str, kind: int = KIND_INTERNAL, parent: Optional[str] = None) -> Optional[Span]:
+        """New span under ``parent`` (a traceparent) or the current span; None when disabled"""
+        if not self.enabled:
+            return None
+        context = parse_traceparent(parent) if parent else None
+        if context is not None:
+            trace_id, parent_id, sampled = context
+        else:
+            current = _current_span.get()
+            if current is not None:
+                trace_id, parent_id, sampled = current.trace_id, current.span_id, current.sampled
+            else:
+                trace_id, parent_id, sampled = random_id(16), None, random.random() < self.sample_rate
+        return Span(name, kind, trace_id, parent_id, sampled)
+
+    def start_child(self, name: str, kind: int = KIND_INTERNAL) -> Optional[Span]:
+        """Span under the current one, only if there is a sampled trace to add it to"""
+        current = _current_span.get()
+        if current is None or not current.sampled:
+            return None
+        return Span(name, kind, current.trace_id, current.span_id, True)
+
+    def end_span(self, span: Optional[Span]):
+        if span is None or not span.sampled:
+            return
+        span.end_ns = time.time_ns()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    @contextmanager
+    def span(self, name: str, kind: int = KIND_INTERNAL, parent: Optional[str] = None, **attributes):
+        """Run a block inside a span that becomes the current one"""
+        span = self.start_span(name, kind, parent)
+        if span is None:
+            yield None
+            return
+        for key, value in attributes.items():
+            span.set_attribute(key, value)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span)
+
+    def start(self):
+        if self.enabled and self._thread is None:
+            self._thread = threading.Thread(target=self._export_loop, name="span-exporter", daemon=True)
+            self._thread.start()
+            logger.info(f"Tracing enabled: {settings.tracing_exporter} exporter, sample rate {self.sample_rate}")
+
+    def shutdown(self):
+        """Export what's queued and stop the export thread"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=10)
+            self._thread = None
+        if self.dropped:
+            logger.warning(f"Dropped {self.dropped} spans because the export queue was full")
+
+    def _export_loop(self):
+        exporter = OTLPHttpExporter() if settings.tracing_exporter == "otlp" else FileExporter()
+        running = True
+        while running:
+            batch: List[Span] = []
+            deadline = time.monotonic() + EXPORT_INTERVAL
+            while len(batch) < EXPORT_BATCH_SIZE:
+                try:
+                    span = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if span is None:
+                    running = False
+                    break
+                batch.append(span)
+            if batch:
+                try:
+                    exporter.export(export_request(batch))
+                except Exception as e:
+                    logger.warning(f"Failed to export {len(batch)} spans: {e}")
+        exporter.close()
+
+def export_request(spans: List[Span]) -> bytes:
+    """OTLP/JSON ExportTraceServiceRequest for a batch of spans"""
+    resource = [otlp_attribute("service.name", settings.tracing_service_name)]
+    worker = os.environ.get("WORKER_ID")
+    if worker is not None:
+        resource.append(otlp_attribute("service.instance.id", f"{os.getpid()}-{worker}"))
+    return json.dumps({
+        "resourceSpans": [{
+            "resource": {"attributes": resource},
+            "scopeSpans": [{
+                "scope": {"name": "whatsapp-bot"},
+                "spans": [span.to_otlp() for span in spans],
+            }],
+        }]
+    }, separators=(",", ":")).encode()
+
+class FileExporter:
+    """One export request per line; a single O_APPEND write keeps workers' lines whole"""
+
+    def __init__(self):
+        self.fd = os.open(settings.tracing_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def export(self, body: bytes):
+        os.write(self.fd, body + b"\n")
+
+    def close(self):
+        os.close(self.fd)
+
+class OTLPHttpExporter:
+    """POSTs OTLP/JSON to a collector's /v1/traces endpoint"""
+
+    def __init__(self):
+        import httpx
+        self.client = httpx.Client(timeout=5.0)
+
+    def export(self, body: bytes):
+        response = self.client.post(
+            settings.tracing_otlp_endpoint, content=body, headers={"Content-Type": "application/json"}
+        )
+        response.raise_for_status()
+
+    def close(self):
+        self.client.close()
+
+class TracingMiddleware:
+    """ASGI middleware opening a server span per HTTP request.
+
+    The span is named after the route template once routing has happened, and
+    its traceparent is returned to the caller in the response headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        parent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                parent = value.decode("latin-1")
+                break
+        span = tracer.start_span(scope["method"], KIND_SERVER, parent)
+        span.set_attribute("http.method", scope["method"])
+        span.set_attribute("http.target", scope["path"])
+        token = _current_span.set(span)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.status_code", message["status"])
+                if message["status"] >= 500:
+                    span.status = STATUS_ERROR
+                headers = list(message.get("headers", []))
+                headers.append((b"traceparent", span.traceparent.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            span.set_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                span.name = f"{scope['method']} {route}"
+                span.set_attribute("http.route", route)
+            tracer.end_span(span)
+
+# Global instance
+tracer = Tracer()
@@ -1,7 +1,12 @@
 import httpx
 import logging
+import mimetypes
+import time
 from typing import Optional, Dict, Any, List
 from config import settings
+from services.media_store import MediaBlob, media_store
+from services.metrics import WHATSAPP_REQUEST_DURATION
+from services.tracing import tracer, KIND_CLIENT
 from uuid import UUID
 
 logger = logging.getLogger(__name__)
@@ -9,21 +14,62 @@ logger = logging.getLogger(__name__)
 class WhatsAppService:
     def __init__(self):
         self.baileys_url = settings.baileys_api_url
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared client, so calls reuse keep-alive connections to Baileys"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.baileys_url,
+                limits=httpx.Limits(max_connections=settings.baileys_max_connections)
+            )
+        return self._client
+    
+    async def start(self):
+        """Create the client and open a first connection before traffic arrives"""
+        try:
+            await self.client.get("/health", timeout=2.0)
+        except httpx.HTTPError as e:
+            logger.warning(f"Baileys API not reachable at startup: {e}")
+    
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def _request(self, operation: str, method: str, path: str, **kwargs) -> httpx.Response:
+        """Call the Baileys API, recording latency by operation and response status"""
+        start = time.perf_counter()
+        status = "error"
+        with tracer.span(f"baileys {operation}", KIND_CLIENT) as span:
+            # The Baileys service returns the traceparent in webhooks about this call
+            if span is not None:
+                span.set_attribute("http.method", method)
+                span.set_attribute("http.target", path)
+                kwargs["headers"] = {**kwargs.get("headers", {}), "traceparent": span.traceparent}
+            try:
+                response = await self.client.request(method, path, **kwargs)
+                status = str(response.status_code)
+                if span is not None:
+                    span.set_attribute("http.status_code", response.status_code)
+                return response
+            finally:
+                WHATSAPP_REQUEST_DURATION.labels(operation, status).observe(time.perf_counter() - start)
         
     async def create_session(self, session_id: str, webhook_url: Optional[str] = None) -> Dict[str, Any]:
         """Create a new WhatsApp session"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.baileys_url}/create-session",
-                    json={
-                        "sessionId": session_id,
-                        "webhookUrl": webhook_url
-                    },
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                return response.json()
+            response = await self._request(
+                "create_session", "POST", "/create-session",
+                json={
+                    "sessionId": session_id,
+                    "webhookUrl": webhook_url
+                },
+                timeout=30.0
+            )
+            response.raise_for_status()
+            return response.json()
         except httpx.HTTPError as e:
             logger.error(f"Failed to create session {session_id}: {e}")
             raise Exception(f"Failed to create WhatsApp session: {str(e)}")
@@ -31,16 +77,15 @@ class WhatsAppService:
     async def get_qr_code(self, session_id: str) -> Optional[str]:
         """Get QR code for session"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.baileys_url}/qr-code/{session_id}",
-                    timeout=10.0
-                )
-                if response.status_code == 404:
-                    return None
-                response.raise_for_status()
-                data = response.json()
-                return data.get("qrCode")
+            response = await self._request(
+                "get_qr_code", "GET", f"/qr-code/{session_id}",
+                timeout=10.0
+            )
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            data = response.json()
+            return data.get("qrCode")
         except httpx.HTTPError as e:
             logger.error(f"Failed to get QR code for {session_id}: {e}")
             return None
@@ -48,15 +93,14 @@ class WhatsAppService:
     async def get_session_status(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Get session status"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.baileys_url}/status/{session_id}",
-                    timeout=10.0
-                )
-                if response.status_code == 404:
-                    return None
-                response.raise_for_status()
-                return response.json()
+            response = await self._request(
+                "get_session_status", "GET", f"/status/{session_id}",
+                timeout=10.0
+            )
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            return response.json()
         except httpx.HTTPError as e:
             logger.error(f"Failed to get status for {session_id}: {e}")
             return None
@@ -66,23 +110,31 @@ class WhatsAppService:
         session_id: str, 
         to: str, 
         message: str, 
-        message_type: str = "text"
+        message_type: str = "text",
+        media: Optional[MediaBlob] = None
     ) -> Optional[Dict[str, Any]]:
-        """Send a message through WhatsApp"""
+        """Send a message through WhatsApp; ``message`` is the caption of media"""
+        payload = {
+            "sessionId": session_id,
+            "to": to,
+            "message": message,
+            "messageType": message_type
+        }
+        if media is not None:
+            # A URL the Baileys service streams from, never the bytes themselves
+            payload.update(
+                mediaUrl=media_store.absolute_url(media),
+                mimetype=media.content_type,
+                fileName=media.sha256[:12] + (mimetypes.guess_extension(media.content_type) or "")
+            )
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.baileys_url}/send-message",
-                    json={
-                        "sessionId": session_id,
-                        "to": to,
-                        "message": message,
-                        "messageType": message_type
-                    },
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                return response.json()
+            response = await self._request(
+                "send_message", "POST", "/send-message",
+                json=payload,
+                timeout=30.0
+            )
+            response.raise_for_status()
+            return response.json()
         except httpx.HTTPError as e:
             logger.error(f"Failed to send message via {session_id}: {e}")
             raise Exception(f"Failed to send message: {str(e)}")
@@ -90,13 +142,12 @@ class WhatsAppService:
     async def delete_session(self, session_id: str) -> bool:
         """Delete a WhatsApp session"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.delete(
-                    f"{self.baileys_url}/session/{session_id}",
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                return True
+            response = await self._request(
+                "delete_session", "DELETE", f"/session/{session_id}",
+                timeout=30.0
+            )
+            response.raise_for_status()
+            return True
         except httpx.HTTPError as e:
             logger.error(f"Failed to delete session {session_id}: {e}")
             return False
@@ -104,14 +155,13 @@ class WhatsAppService:
     async def list_sessions(self) -> List[Dict[str, Any]]:
         """List all active sessions"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.baileys_url}/sessions",
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                data = response.json()
-                return data.get("sessions", [])
+            response = await self._request(
+                "list_sessions", "GET", "/sessions",
+                timeout=10.0
+            )
+            response.raise_for_status()
+            data = response.json()
+            return data.get("sessions", [])
         except httpx.HTTPError as e:
             logger.error(f"Failed to list sessions: {e}")
             return []
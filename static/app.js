@@ -1,11 +1,34 @@
 // Global variables
 let currentUser = null;
 let authToken = null;
+let currentTab = 'dashboard';
+let realtimeSocket = null;
+let realtimeRetryDelay = 1000;
+let realtimeRefreshTimer = null;
 
 // API configuration
 const API_BASE = '/api';
 const DOMAIN = '78.46.250.112';
 
+// Last response and ETag per URL: list endpoints answer 304 when nothing changed
+const responseCache = new Map();
+
+async function cachedGet(url) {
+  const cached = responseCache.get(url);
+  const response = await axios.get(url, {
+    headers: cached ? { 'If-None-Match': cached.etag } : {},
+    validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+  });
+  if (response.status === 304 && cached) {
+    return cached.data;
+  }
+  const etag = response.headers['etag'];
+  if (etag) {
+    responseCache.set(url, { etag, data: response.data });
+  }
+  return response.data;
+}
+
 // Initialize app
 document.addEventListener('DOMContentLoaded', function() {
   checkAuth();
@@ -31,7 +54,9 @@ function showLoginScreen() {
 function showMainApp() {
   document.getElementById('loginScreen').style.display = 'none';
   document.getElementById('mainApp').style.display = 'block';
+  currentTab = 'dashboard';
   loadDashboard();
+  connectRealtime();
 }
 
 async function loadUserData() {
@@ -73,9 +98,11 @@ document.getElementById('loginForm').addEventListener('submit', async function(e
 });
 
 function logout() {
+  disconnectRealtime();
   localStorage.removeItem('authToken');
   authToken = null;
   currentUser = null;
+  responseCache.clear();
   delete axios.defaults.headers.common['Authorization'];
   showLoginScreen();
 }
@@ -92,6 +119,7 @@ function toggleSidebar(force) {
 function changeTab(tabName, element) {
   document.querySelectorAll('.nav-item').forEach(i => i.classList.remove('active'));
   if (element) element.classList.add('active');
+  currentTab = tabName;
   
   switch (tabName) {
     case 'dashboard':
@@ -124,8 +152,7 @@ async function loadDashboard() {
   const container = document.getElementById('mainContainer');
   
   try {
-    const response = await axios.get(`${API_BASE}/dashboard/stats`);
-    const stats = response.data;
+    const stats = await cachedGet(`${API_BASE}/dashboard/stats`);
     
     container.innerHTML = `
       <div class="header">
@@ -171,27 +198,96 @@ async function loadDashboard() {
       </div>
     `;
     
-    // Update unread badge
-    const badge = document.getElementById('unreadBadge');
-    if (stats.unread_messages > 0) {
-      badge.textContent = stats.unread_messages;
-      badge.style.display = 'inline';
-    } else {
-      badge.style.display = 'none';
-    }
+    updateUnreadBadge(stats.unread_messages);
     
   } catch (error) {
     container.innerHTML = '<div class="header"><h1>Erro ao carregar dashboard</h1></div>';
   }
 }
 
+function updateUnreadBadge(count) {
+  const badge = document.getElementById('unreadBadge');
+  if (count > 0) {
+    badge.textContent = count;
+    badge.style.display = 'inline';
+  } else {
+    badge.style.display = 'none';
+  }
+}
+
+// Realtime events (WebSocket push from webhooks)
+function connectRealtime() {
+  if (!authToken || realtimeSocket) return;
+  
+  const scheme = window.location.protocol === 'https:' ? 'wss' : 'ws';
+  const socket = new WebSocket(`${scheme}://${window.location.host}/ws?token=${encodeURIComponent(authToken)}`);
+  realtimeSocket = socket;
+  
+  socket.onopen = () => { realtimeRetryDelay = 1000; };
+  socket.onmessage = (event) => handleRealtimeEvent(JSON.parse(event.data));
+  socket.onclose = (event) => {
+    if (realtimeSocket !== socket) return;
+    realtimeSocket = null;
+    // 1008: token rejected, reconnecting would not help
+    if (!authToken || event.code === 1008) return;
+    setTimeout(connectRealtime, realtimeRetryDelay);
+    realtimeRetryDelay = Math.min(realtimeRetryDelay * 2, 30000);
+  };
+}
+
+function disconnectRealtime() {
+  const socket = realtimeSocket;
+  realtimeSocket = null;
+  if (socket) socket.close();
+}
+
+function refreshCurrentTab() {
+  // Coalesce bursts of events into one reload
+  clearTimeout(realtimeRefreshTimer);
+  realtimeRefreshTimer = setTimeout(() => {
+    if (currentTab === 'dashboard') loadDashboard();
+    else if (currentTab === 'numbers' && !document.querySelector('.modal-overlay')) loadNumbers();
+  }, 500);
+}
+
+function handleRealtimeEvent(event) {
+  const data = event.data || {};
+  
+  switch (event.type) {
+    case 'message':
+      if (currentTab === 'dashboard') refreshCurrentTab();
+      break;
+    case 'unread':
+      updateUnreadBadge(data.total);
+      break;
+    case 'qr_code': {
+      const image = document.getElementById(`qrImage-${data.instance_id}`);
+      if (image) {
+        axios.get(`${API_BASE}/instances/${data.instance_id}/qr-code`)
+          .then(response => { image.src = response.data.qr_code; })
+          .catch(() => {});
+      }
+      refreshCurrentTab();
+      break;
+    }
+    case 'connected': {
+      const image = document.getElementById(`qrImage-${data.instance_id}`);
+      if (image) closeModal(image);
+      refreshCurrentTab();
+      break;
+    }
+    case 'disconnected':
+      refreshCurrentTab();
+      break;
+  }
+}
+
 // WhatsApp Numbers functions
 async function loadNumbers() {
   const container = document.getElementById('mainContainer');
   
   try {
-    const response = await axios.get(`${API_BASE}/instances`);
-    const instances = response.data;
+    const instances = await cachedGet(`${API_BASE}/instances`);
     
     let content = `
       <div class="header">
@@ -335,7 +431,7 @@ async function showQRCode(instanceId) {
       <div style="text-align: center;">
         <p style="margin-bottom: 20px;">Escaneie este QR Code com seu WhatsApp:</p>
         <div style="background: white; padding: 20px; border-radius: 10px; display: inline-block;">
-          <img src="${qr_code}" alt="QR Code" style="max-width: 300px;">
+          <img id="qrImage-${instanceId}" src="${qr_code}" alt="QR Code" style="max-width: 300px;">
         </div>
         <p style="margin-top: 20px; font-size: 12px; color: #666;">
           Abra o WhatsApp > Menu > Dispositivos conectados > Conectar dispositivo
@@ -0,0 +1,374 @@
+"""Storage interface shared by the Postgres, Mongo and in-memory backends.
+
+Routers and services only talk to a ``Storage`` (see storage/provider.py for
+how one is obtained). Entities are instances of the classes in models.py
+whatever the backend, so response models and the code reading them don't
+change; only the Postgres backend attaches them to a SQLAlchemy session.
+
+Writes made through a repository become visible to others once
+``Storage.commit()`` returns.
+"""
+
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Type
+from uuid import UUID
+
+from sqlalchemy.orm.attributes import set_committed_value
+
+import models
+
+# (conversation id, unread messages to add, message time)
+ConversationActivity = Tuple[UUID, int, datetime]
+
+# Keyset position of message exports: (timestamp, message id)
+ExportPosition = Tuple[datetime, UUID]
+
+# Keys of the rows returned by MessageRepository.export_page
+EXPORT_FIELDS = (
+    "id", "conversation_id", "instance_id", "contact_phone", "contact_name", "is_group", "group_name",
+    "whatsapp_message_id", "is_from_me", "message_type", "content", "media_url", "status", "timestamp",
+)
+
+# Model -> resource whose version every write to it bumps (the tables with
+# triggers from migration 005, less conversations after 009)
+VERSIONED = {
+    models.WhatsAppInstance: "instances",
+    models.Campaign: "campaigns",
+    models.Group: "groups",
+    models.FinanceEntry: "finances",
+}
+
+# Parent model -> (child model, foreign key, on delete): "cascade" or "set_null"
+CASCADES = {
+    models.User: [
+        (models.WhatsAppInstance, "user_id", "cascade"),
+        (models.Conversation, "user_id", "cascade"),
+        (models.Campaign, "user_id", "cascade"),
+        (models.FinanceEntry, "user_id", "cascade"),
+        (models.Group, "user_id", "cascade"),
+        (models.SuppressionEntry, "user_id", "cascade"),
+    ],
+    models.WhatsAppInstance: [
+        (models.Conversation, "instance_id", "cascade"),
+        (models.Message, "instance_id", "cascade"),
+        (models.Campaign, "instance_id", "cascade"),
+    ],
+    models.Conversation: [(models.Message, "conversation_id", "cascade")],
+    models.Campaign: [(models.Message, "campaign_id", "set_null")],
+}
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+def aware(value):
+    """timestamptz semantics: naive datetimes are UTC"""
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+def column_keys(model) -> List[str]:
+    return [attribute.key for attribute in model.__mapper__.column_attrs]
+
+def new_row(model, values: Dict[str, Any]) -> Dict[str, Any]:
+    """Column values of a new row: ``values`` plus the model's column defaults.
+
+    Rejects what Postgres would: keys that aren't columns (TypeError, as the
+    model's constructor does) and NOT NULL columns left empty (ValueError).
+    """
+    unknown = set(values) - set(column_keys(model))
+    if unknown:
+        raise TypeError(f"{', '.join(sorted(unknown))} not a column of {model.__name__}")
+
+    row = {}
+    for attribute in model.__mapper__.column_attrs:
+        key = attribute.key
+        column = attribute.columns[0]
+        if key in values:
+            if values[key] is None and not column.nullable:
+                raise ValueError(f"{model.__name__}.{key} can't be null")
+            row[key] = values[key]
+            continue
+        if column.default is not None:
+            default = column.default.arg
+            row[key] = default(None) if column.default.is_callable else default
+        elif column.server_default is not None:
+            # Every server default in models.py is now()
+            row[key] = utcnow()
+        elif not column.nullable:
+            raise ValueError(f"{model.__name__}.{key} is required")
+        else:
+            row[key] = None
+    return row
+
+def to_entity(model, row: Dict[str, Any]):
+    return model(**row)
+
+def entity_row(entity) -> Dict[str, Any]:
+    return {key: getattr(entity, key) for key in column_keys(type(entity))}
+
+def attach(entity, **related):
+    """Set relationship attributes on a detached entity without cascading"""
+    for key, value in related.items():
+        set_committed_value(entity, key, value)
+    return entity
+
+class Repository(ABC):
+    """Per-user CRUD shared by most resources"""
+
+    model: Type = None
+
+    @abstractmethod
+    async def get(self, entity_id: UUID, user_id: Optional[UUID] = None):
+        """The entity, or None if it doesn't exist (or belongs to another user)"""
+
+    @abstractmethod
+    async def add(self, **values):
+        """Create an entity; column defaults apply to omitted fields"""
+
+    @abstractmethod
+    async def update(self, entity, **changes):
+        """Change fields of an entity returned by this repository"""
+
+    @abstractmethod
+    async def delete(self, entity):
+        """Delete an entity returned by this repository"""
+
+    async def list_rows(self, schema, *args, **kwargs) -> List[Dict[str, Any]]:
+        """``list_for_user`` as plain dicts shaped like ``schema`` (fast_list_responses)"""
+        entities = await self.list_for_user(*args, **kwargs)
+        return [schema.model_validate(entity).model_dump() for entity in entities]
+
+class UserRepository(Repository):
+    model = models.User
+
+    @abstractmethod
+    async def get_by_username(self, username: str) -> Optional[models.User]:
+        ...
+
+    @abstractmethod
+    async def get_by_email(self, email: str) -> Optional[models.User]:
+        ...
+
+class InstanceRepository(Repository):
+    model = models.WhatsAppInstance
+
+    @abstractmethod
+    async def list_for_user(self, user_id: UUID) -> List[models.WhatsAppInstance]:
+        """Newest first"""
+
+    @abstractmethod
+    async def get_many(self, instance_ids: List[UUID], user_id: UUID) -> List[models.WhatsAppInstance]:
+        ...
+
+    @abstractmethod
+    async def count(self, user_id: UUID, status: Optional[models.InstanceStatus] = None) -> int:
+        ...
+
+class ContactRepository(Repository):
+    model = models.Contact
+
+    @abstractmethod
+    async def get_by_phone(self, phone: str) -> Optional[models.Contact]:
+        ...
+
+    @abstractmethod
+    async def existing_phones(self, phones: List[str]) -> Set[str]:
+        ...
+
+    @abstractmethod
+    async def add_many(self, rows: List[Dict[str, Any]]) -> int:
+        ...
+
+class ConversationRepository(Repository):
+    model = models.Conversation
+
+    @abstractmethod
+    async def get(
+        self,
+        conversation_id: UUID,
+        user_id: Optional[UUID] = None,
+        with_messages: bool = False
+    ) -> Optional[models.Conversation]:
+        """With ``with_messages``, ``contact`` and ``messages`` are loaded too"""
+
+    @abstractmethod
+    async def find(self, instance_id: UUID, contact_id: UUID) -> Optional[models.Conversation]:
+        ...
+
+    @abstractmethod
+    async def list_for_user(self, user_id: UUID, instance_id: Optional[UUID] = None) -> List[models.Conversation]:
+        """Most recent activity first, with ``contact`` and ``messages`` loaded"""
+
+    @abstractmethod
+    async def totals(self, user_id: UUID) -> Tuple[int, int]:
+        """(conversations, unread messages) of a user, in one query"""
+
+    @abstractmethod
+    async def unread_total(self, user_id: UUID) -> int:
+        """Unread messages across all of a user's conversations"""
+
+    @abstractmethod
+    async def record_activity(self, conversation_id: UUID, unread: int = 0, at: Optional[datetime] = None) -> int:
+        """Count new messages atomically; returns the new unread count.
+
+        ``last_message_at`` only ever moves forward.
+        """
+
+    @abstractmethod
+    async def record_activity_many(self, activity: Iterable[ConversationActivity]):
+        ...
+
+    @abstractmethod
+    async def get_or_create_for_phones(self, user_id: UUID, instance_id: UUID, phones: List[str]) -> Dict[str, UUID]:
+        """Conversation id per phone, creating contacts and conversations as needed"""
+
+class MessageRepository(Repository):
+    model = models.Message
+
+    @abstractmethod
+    async def add_many(self, rows: List[Dict[str, Any]]):
+        ...
+
+    @abstractmethod
+    async def apply_receipts(self, statuses: Dict[str, models.MessageStatus]) -> Tuple[Set[str], Dict[UUID, int]]:
+        """Apply receipts keyed by whatsapp_message_id; statuses only move forward.
+
+        Returns the WhatsApp ids that matched a stored message (including
+        messages already at or past the receipt's status, which are left
+        alone) and the new delivered_count of every campaign that gained
+        deliveries. Ids missing from the result aren't stored yet.
+        """
+
+    @abstractmethod
+    async def campaign_phones(self, campaign_id: UUID) -> Set[str]:
+        """Phones that already have a message stored for a campaign"""
+
+    @abstractmethod
+    async def export_page(
+        self,
+        user_id: UUID,
+        instance_id: Optional[UUID],
+        start: Optional[datetime],
+        end: Optional[datetime],
+        after: Optional[ExportPosition],
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """The next ``limit`` export rows (see services/message_export.py) after ``after``, in (timestamp, id) order"""
+
+class CampaignRepository(Repository):
+    model = models.Campaign
+
+    @abstractmethod
+    async def list_for_user(self, user_id: UUID) -> List[models.Campaign]:
+        """Newest first"""
+
+    @abstractmethod
+    async def count(self, user_id: UUID, status: Optional[models.CampaignStatus] = None) -> int:
+        ...
+
+    @abstractmethod
+    async def set_fields(self, campaign_id: UUID, **values):
+        """Update a campaign that isn't loaded (engine counters)"""
+
+    @abstractmethod
+    async def due(self, now: datetime, statuses: List[models.CampaignStatus], limit: int) -> List[models.Campaign]:
+        """Campaigns in ``statuses`` scheduled at or before ``now``, oldest first"""
+
+    @abstractmethod
+    async def claim(self, campaign_id: UUID, statuses: List[models.CampaignStatus], status: models.CampaignStatus) -> bool:
+        """Move a campaign to ``status`` unless it left ``statuses`` meanwhile"""
+
+    @abstractmethod
+    async def acquire_run(self, campaign_id: UUID, owner: str, stale_before: datetime) -> Optional[models.Campaign]:
+        """Make ``owner`` the campaign's sender and mark it ACTIVE, in one conditional write.
+
+        Fails (None) while another owner's lease was renewed after
+        ``stale_before``; otherwise returns the campaign with its new
+        run_generation and current counters.
+        """
+
+    @abstractmethod
+    async def renew_run(self, campaign_id: UUID, owner: str, generation: int) -> Optional[models.CampaignStatus]:
+        """Refresh a run's lease; returns the campaign's status, or None if the lease was lost"""
+
+    @abstractmethod
+    async def release_run(self, campaign_id: UUID, owner: str, generation: int):
+        """Give up a run's lease, if it is still held"""
+
+class FinanceRepository(Repository):
+    model = models.FinanceEntry
+
+    @abstractmethod
+    async def list_for_user(
+        self,
+        user_id: UUID,
+        year: Optional[int] = None,
+        month: Optional[int] = None,
+        entry_type: Optional[str] = None
+    ) -> List[models.FinanceEntry]:
+        """Most recent date first"""
+
+class GroupRepository(Repository):
+    model = models.Group
+
+    @abstractmethod
+    async def list_for_user(self, user_id: UUID) -> List[models.Group]:
+        """Newest first"""
+
+class SuppressionRepository(ABC):
+    @abstractmethod
+    async def list_for_user(self, user_id: UUID, skip: int = 0, limit: int = 100) -> List[models.SuppressionEntry]:
+        ...
+
+    @abstractmethod
+    async def phones(self, user_id: UUID) -> List[str]:
+        ...
+
+    @abstractmethod
+    async def filter(self, user_id: UUID, phones: List[str]) -> Set[str]:
+        """The subset of ``phones`` on the user's list"""
+
+    @abstractmethod
+    async def add(self, user_id: UUID, phones: List[str], reason: str) -> List[str]:
+        """Suppress phones; returns the ones that weren't suppressed before"""
+
+    @abstractmethod
+    async def remove(self, user_id: UUID, phones: List[str]) -> int:
+        ...
+
+class Storage(ABC):
+    """One unit of work against a backend"""
+
+    users: UserRepository
+    instances: InstanceRepository
+    contacts: ContactRepository
+    conversations: ConversationRepository
+    messages: MessageRepository
+    campaigns: CampaignRepository
+    finances: FinanceRepository
+    groups: GroupRepository
+    suppressions: SuppressionRepository
+
+    @abstractmethod
+    async def commit(self):
+        ...
+
+    @abstractmethod
+    async def resource_versions(self, user_id: UUID, resources: Iterable[str]) -> Dict[str, int]:
+        """Write counters behind list ETags (services/resource_versions.py)"""
+
+class StorageBackend(ABC):
+    """A configured backend; ``session()`` opens a Storage"""
+
+    name: str = ""
+
+    async def start(self):
+        """Warm up connections, create indexes"""
+
+    async def close(self):
+        ...
+
+    @abstractmethod
+    def session(self):
+        """Async context manager yielding a Storage"""
@@ -0,0 +1,537 @@
+"""In-memory backend: dicts of rows per table, with hash and ordered indexes.
+
+For development, tests and benchmarks (profiling the app without database
+noise). Everything lives in the process, so it only suits a single worker,
+and nothing survives a restart. Writes apply immediately; ``commit()`` has
+nothing left to do and there is no rollback. Every read builds fresh model
+instances, so callers can't change stored rows by mutating what they got
+back.
+
+Lookups go through the indexes below rather than scanning tables: hash
+indexes for equality (``MemoryTables.where``) and, for the two hot
+orderings, sorted per-parent lists (conversations by ``last_message_at``
+per user, messages by ``timestamp`` per conversation).
+"""
+
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from storage import interface
+from storage.interface import (
+    ConversationActivity, ExportPosition, EXPORT_FIELDS, VERSIONED, CASCADES, new_row, to_entity, attach, aware, utcnow
+)
+import models
+
+TABLES = (
+    models.User, models.WhatsAppInstance, models.Contact, models.Conversation, models.Message,
+    models.Campaign, models.FinanceEntry, models.Group, models.SuppressionEntry,
+)
+
+# Hash indexes per table: every foreign key (cascades) plus the lookups below
+INDEXES = {
+    models.User: [("username",), ("email",)],
+    models.WhatsAppInstance: [("user_id",)],
+    models.Contact: [("phone",)],
+    models.Conversation: [("user_id",), ("instance_id",), ("instance_id", "contact_id")],
+    models.Message: [("conversation_id",), ("instance_id",), ("campaign_id",), ("whatsapp_message_id",)],
+    models.Campaign: [("user_id",), ("instance_id",), ("status",)],
+    models.FinanceEntry: [("user_id",)],
+    models.Group: [("user_id",)],
+    models.SuppressionEntry: [("user_id",), ("user_id", "phone")],
+}
+
+# Ordered indexes: table -> (parent column, sort column)
+ORDERED = {
+    models.Conversation: ("user_id", "last_message_at"),
+    models.Message: ("conversation_id", "timestamp"),
+}
+
+SortKey = Tuple[bool, Any, UUID]
+
+def sort_key(row: Dict[str, Any], field: str) -> SortKey:
+    # Ascending with NULLs last, so reversed it is Postgres' DESC (NULLs first)
+    return (row[field] is None, row[field], row["id"])
+
+def newest_first(field: str) -> Callable[[Dict[str, Any]], Tuple]:
+    # Sorted with reverse=True; NULLs come first like Postgres' DESC
+    return lambda row: (row[field] is None, row[field])
+
+class MemoryTables:
+    """The backend's data: rows by table and id, their indexes and the resource version counters"""
+
+    def __init__(self):
+        self.rows: Dict[type, Dict[UUID, Dict[str, Any]]] = {model: {} for model in TABLES}
+        # table -> columns -> values -> ids (a dict, so insertion ordered)
+        self.indexes: Dict[type, Dict[Tuple[str, ...], Dict[Tuple, Dict[UUID, None]]]] = {
+            model: {columns: {} for columns in INDEXES.get(model, ())} for model in TABLES
+        }
+        # table -> parent id -> sorted keys
+        self.ordered: Dict[type, Dict[UUID, List[SortKey]]] = {model: {} for model in ORDERED}
+        self.indexed_columns: Dict[type, Set[str]] = {
+            model: {column for columns in INDEXES.get(model, ()) for column in columns} | set(ORDERED.get(model, ()))
+            for model in TABLES
+        }
+        self.versions: Counter = Counter()
+
+    def _index(self, model, row: Dict[str, Any]):
+        for columns, index in self.indexes[model].items():
+            values = tuple(row[column] for column in columns)
+            # NULLs are never looked up
+            if None not in values:
+                index.setdefault(values, {})[row["id"]] = None
+        if model in ORDERED:
+            parent, field = ORDERED[model]
+            insort(self.ordered[model].setdefault(row[parent], []), sort_key(row, field))
+
+    def _unindex(self, model, row: Dict[str, Any]):
+        for columns, index in self.indexes[model].items():
+            values = tuple(row[column] for column in columns)
+            ids = index.get(values)
+            if ids is not None:
+                ids.pop(row["id"], None)
+                if not ids:
+                    del index[values]
+        if model in ORDERED:
+            parent, field = ORDERED[model]
+            keys = self.ordered[model].get(row[parent])
+            if keys is not None:
+                key = sort_key(row, field)
+                position = bisect_left(keys, key)
+                if position < len(keys) and keys[position] == key:
+                    del keys[position]
+                if not keys:
+                    del self.ordered[model][row[parent]]
+
+    def where(self, model, **values) -> List[Dict[str, Any]]:
+        """Rows equal to ``values`` on the columns of one of the table's hash indexes"""
+        ids = self.indexes[model][tuple(values)].get(tuple(values.values()), ())
+        rows = self.rows[model]
+        return [rows[row_id] for row_id in ids]
+
+    def first(self, model, **values) -> Optional[Dict[str, Any]]:
+        ids = self.indexes[model][tuple(values)].get(tuple(values.values()))
+        return self.rows[model][next(iter(ids))] if ids else None
+
+    def in_order(self, model, parent_id: UUID) -> List[SortKey]:
+        """Sort keys of a parent's rows, ascending; the row id is the last item"""
+        return self.ordered[model].get(parent_id, [])
+
+    def bump(self, model, *rows: Dict[str, Any]):
+        resource = VERSIONED.get(model)
+        if resource is not None:
+            for user_id in {row["user_id"] for row in rows}:
+                self.versions[(user_id, resource)] += 1
+
+    def insert(self, model, values: Dict[str, Any]) -> Dict[str, Any]:
+        row = new_row(model, {key: aware(value) for key, value in values.items()})
+        self.rows[model][row["id"]] = row
+        self._index(model, row)
+        self.bump(model, row)
+        return row
+
+    def change(self, model, row: Dict[str, Any], changes: Dict[str, Any]) -> Dict[str, Any]:
+        reindex = not self.indexed_columns[model].isdisjoint(changes)
+        if reindex:
+            self._unindex(model, row)
+        row.update((key, aware(value)) for key, value in changes.items())
+        if "updated_at" in row:
+            row["updated_at"] = utcnow()
+        if reindex:
+            self._index(model, row)
+        self.bump(model, row)
+        return row
+
+    def remove(self, model, row: Dict[str, Any]):
+        for child, foreign_key, action in CASCADES.get(model, ()):
+            for child_row in self.where(child, **{foreign_key: row["id"]}):
+                if action == "cascade":
+                    self.remove(child, child_row)
+                else:
+                    self.change(child, child_row, {foreign_key: None})
+        self._unindex(model, row)
+        del self.rows[model][row["id"]]
+        self.bump(model, row)
+
+class MemoryRepository:
+    def __init__(self, tables: MemoryTables):
+        self.tables = tables
+
+    @property
+    def rows(self) -> Dict[UUID, Dict[str, Any]]:
+        return self.tables.rows[self.model]
+
+    def _entity(self, row: Dict[str, Any]):
+        return to_entity(self.model, dict(row))
+
+    def _where(self, **values) -> List[Dict[str, Any]]:
+        return self.tables.where(self.model, **values)
+
+    def _newest_first(self, rows: List[Dict[str, Any]], field: str = "created_at") -> List[Dict[str, Any]]:
+        return sorted(rows, key=newest_first(field), reverse=True)
+
+    async def get(self, entity_id: UUID, user_id: Optional[UUID] = None):
+        row = self.rows.get(entity_id)
+        if row is None or (user_id is not None and row["user_id"] != user_id):
+            return None
+        return self._entity(row)
+
+    async def add(self, **values):
+        return self._entity(self.tables.insert(self.model, values))
+
+    async def update(self, entity, **changes):
+        row = self.tables.change(self.model, self.rows[entity.id], changes)
+        for key in changes.keys() | {"updated_at"} & row.keys():
+            setattr(entity, key, row[key])
+        return entity
+
+    async def delete(self, entity):
+        row = self.rows.get(entity.id)
+        if row is not None:
+            self.tables.remove(self.model, row)
+
+class MemoryUsers(MemoryRepository, interface.UserRepository):
+    async def get_by_username(self, username: str) -> Optional[models.User]:
+        row = self.tables.first(models.User, username=username)
+        return self._entity(row) if row else None
+
+    async def get_by_email(self, email: str) -> Optional[models.User]:
+        row = self.tables.first(models.User, email=email)
+        return self._entity(row) if row else None
+
+class MemoryInstances(MemoryRepository, interface.InstanceRepository):
+    async def list_for_user(self, user_id: UUID) -> List[models.WhatsAppInstance]:
+        return [self._entity(row) for row in self._newest_first(self._where(user_id=user_id))]
+
+    async def get_many(self, instance_ids: List[UUID], user_id: UUID) -> List[models.WhatsAppInstance]:
+        rows = (self.rows.get(instance_id) for instance_id in dict.fromkeys(instance_ids))
+        return [self._entity(row) for row in rows if row is not None and row["user_id"] == user_id]
+
+    async def count(self, user_id: UUID, status: Optional[models.InstanceStatus] = None) -> int:
+        return sum(1 for row in self._where(user_id=user_id) if status in (None, row["status"]))
+
+def oldest_contact(tables: MemoryTables, phone: str) -> Optional[Dict[str, Any]]:
+    # Phones aren't unique; the Postgres backend also picks the oldest contact
+    rows = tables.where(models.Contact, phone=phone)
+    return min(rows, key=lambda row: row["created_at"]) if rows else None
+
+class MemoryContacts(MemoryRepository, interface.ContactRepository):
+    async def get_by_phone(self, phone: str) -> Optional[models.Contact]:
+        row = oldest_contact(self.tables, phone)
+        return self._entity(row) if row else None
+
+    async def existing_phones(self, phones: List[str]) -> Set[str]:
+        return {phone for phone in phones if self.tables.first(models.Contact, phone=phone)}
+
+    async def add_many(self, rows: List[Dict[str, Any]]) -> int:
+        for row in rows:
+            self.tables.insert(models.Contact, row)
+        return len(rows)
+
+class MemoryConversations(MemoryRepository, interface.ConversationRepository):
+    def _with_messages(self, rows: List[Dict[str, Any]]) -> List[models.Conversation]:
+        contacts = self.tables.rows[models.Contact]
+        messages = self.tables.rows[models.Message]
+
+        conversations = []
+        for row in rows:
+            contact = contacts.get(row["contact_id"])
+            conversations.append(attach(
+                self._entity(row),
+                contact=to_entity(models.Contact, dict(contact)) if contact else None,
+                messages=[
+                    to_entity(models.Message, dict(messages[key[-1]]))
+                    for key in self.tables.in_order(models.Message, row["id"])
+                ]
+            ))
+        return conversations
+
+    def _user_rows(self, user_id: UUID) -> List[Dict[str, Any]]:
+        """Most recent activity first"""
+        return [self.rows[key[-1]] for key in reversed(self.tables.in_order(models.Conversation, user_id))]
+
+    async def get(
+        self,
+        conversation_id: UUID,
+        user_id: Optional[UUID] = None,
+        with_messages: bool = False
+    ) -> Optional[models.Conversation]:
+        row = self.rows.get(conversation_id)
+        if row is None or (user_id is not None and row["user_id"] != user_id):
+            return None
+        return self._with_messages([row])[0] if with_messages else self._entity(row)
+
+    async def find(self, instance_id: UUID, contact_id: UUID) -> Optional[models.Conversation]:
+        row = self.tables.first(models.Conversation, instance_id=instance_id, contact_id=contact_id)
+        return self._entity(row) if row else None
+
+    async def list_for_user(self, user_id: UUID, instance_id: Optional[UUID] = None) -> List[models.Conversation]:
+        rows = self._user_rows(user_id)
+        if instance_id is not None:
+            rows = [row for row in rows if row["instance_id"] == instance_id]
+        return self._with_messages(rows)
+
+    async def totals(self, user_id: UUID) -> Tuple[int, int]:
+        rows = self._where(user_id=user_id)
+        return len(rows), sum(row["unread_count"] or 0 for row in rows)
+
+    async def unread_total(self, user_id: UUID) -> int:
+        return sum(row["unread_count"] or 0 for row in self._where(user_id=user_id))
+
+    async def record_activity(self, conversation_id: UUID, unread: int = 0, at: Optional[datetime] = None) -> int:
+        row = self.rows[conversation_id]
+        at = aware(at) if at is not None else utcnow()
+        self.tables.change(models.Conversation, row, {
+            "unread_count": (row["unread_count"] or 0) + unread,
+            "last_message_at": max(row["last_message_at"], at) if row["last_message_at"] else at,
+        })
+        return row["unread_count"]
+
+    async def record_activity_many(self, activity: Iterable[ConversationActivity]):
+        for conversation_id, unread, at in activity:
+            await self.record_activity(conversation_id, unread, at)
+
+    async def get_or_create_for_phones(self, user_id: UUID, instance_id: UUID, phones: List[str]) -> Dict[str, UUID]:
+        conversation_ids: Dict[str, UUID] = {}
+        for phone in dict.fromkeys(phones):
+            contact = oldest_contact(self.tables, phone)
+            if contact is None:
+                contact = self.tables.insert(models.Contact, {"phone": phone, "name": phone})
+            conversation = self.tables.first(models.Conversation, instance_id=instance_id, contact_id=contact["id"])
+            if conversation is None:
+                conversation = self.tables.insert(models.Conversation, {
+                    "user_id": user_id,
+                    "instance_id": instance_id,
+                    "contact_id": contact["id"],
+                    "is_group": False,
+                    "unread_count": 0
+                })
+            conversation_ids[phone] = conversation["id"]
+        return conversation_ids
+
+class MemoryMessages(MemoryRepository, interface.MessageRepository):
+    async def add_many(self, rows: List[Dict[str, Any]]):
+        for row in rows:
+            self.tables.insert(models.Message, row)
+
+    async def apply_receipts(self, statuses: Dict[str, models.MessageStatus]) -> Tuple[Set[str], Dict[UUID, int]]:
+        matched: Set[str] = set()
+        newly_delivered: Counter = Counter()
+        for message_id, new_status in statuses.items():
+            for row in self._where(whatsapp_message_id=message_id):
+                if not row["is_from_me"]:
+                    continue
+                # Known even if already at or past the receipt's status
+                matched.add(message_id)
+                # Same transitions as the Postgres backend's three UPDATEs
+                if row["status"] in (models.MessageStatus.PENDING, models.MessageStatus.SENT):
+                    if new_status == models.MessageStatus.FAILED:
+                        row["status"] = models.MessageStatus.FAILED
+                    else:
+                        row["status"] = models.MessageStatus.DELIVERED
+                        if row["campaign_id"]:
+                            newly_delivered[row["campaign_id"]] += 1
+                if row["status"] == models.MessageStatus.DELIVERED and new_status == models.MessageStatus.READ:
+                    row["status"] = models.MessageStatus.READ
+
+        delivered_counts: Dict[UUID, int] = {}
+        campaigns = self.tables.rows[models.Campaign]
+        for campaign_id, delivered in newly_delivered.items():
+            campaign = campaigns.get(campaign_id)
+            if campaign is not None:
+                self.tables.change(models.Campaign, campaign, {
+                    "delivered_count": (campaign["delivered_count"] or 0) + delivered
+                })
+                delivered_counts[campaign_id] = campaign["delivered_count"]
+        return matched, delivered_counts
+
+    async def campaign_phones(self, campaign_id: UUID) -> Set[str]:
+        conversations = self.tables.rows[models.Conversation]
+        contacts = self.tables.rows[models.Contact]
+        conversation_ids = {row["conversation_id"] for row in self._where(campaign_id=campaign_id)}
+        return {contacts[conversations[i]["contact_id"]]["phone"] for i in conversation_ids}
+
+    def _export_keys(self, conversation_id: UUID, start, end, after) -> List:
+        keys = self.tables.in_order(models.Message, conversation_id)
+        low, high = 0, bisect_left(keys, (True,))
+        if start is not None:
+            low = bisect_left(keys, (False, start), low, high)
+        if after is not None:
+            low = max(low, bisect_right(keys, (False, *after), low, high))
+        if end is not None:
+            high = bisect_left(keys, (False, end), low, high)
+        return keys[low:high]
+
+    async def export_page(
+        self,
+        user_id: UUID,
+        instance_id: Optional[UUID],
+        start: Optional[datetime],
+        end: Optional[datetime],
+        after: Optional[ExportPosition],
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        start, end = aware(start), aware(end)
+        if after is not None:
+            after = (aware(after[0]), after[1])
+        conversations = {row["id"]: row for row in self.tables.where(models.Conversation, user_id=user_id)}
+        contacts = self.tables.rows[models.Contact]
+        # Each conversation's keys are a sorted run; merged lazily, as only a page is taken
+        keys = heapq.merge(*(self._export_keys(conversation_id, start, end, after) for conversation_id in conversations))
+
+        page = []
+        for key in keys:
+            row = self.rows.get(key[-1])
+            if row is None or instance_id not in (None, row["instance_id"]):
+                continue
+            conversation = conversations[row["conversation_id"]]
+            contact = contacts[conversation["contact_id"]]
+            values = {
+                **row,
+                "contact_phone": contact["phone"],
+                "contact_name": contact["name"],
+                "is_group": conversation["is_group"],
+                "group_name": conversation["group_name"],
+            }
+            page.append({field: values[field] for field in EXPORT_FIELDS})
+            if len(page) == limit:
+                break
+        return page
+
+class MemoryCampaigns(MemoryRepository, interface.CampaignRepository):
+    async def list_for_user(self, user_id: UUID) -> List[models.Campaign]:
+        return [self._entity(row) for row in self._newest_first(self._where(user_id=user_id))]
+
+    async def count(self, user_id: UUID, status: Optional[models.CampaignStatus] = None) -> int:
+        return sum(1 for row in self._where(user_id=user_id) if status in (None, row["status"]))
+
+    async def set_fields(self, campaign_id: UUID, **values):
+        row = self.rows.get(campaign_id)
+        if row is not None:
+            self.tables.change(models.Campaign, row, values)
+
+    async def due(self, now: datetime, statuses: List[models.CampaignStatus], limit: int) -> List[models.Campaign]:
+        now = aware(now)
+        rows = sorted(
+            (
+                row for status in dict.fromkeys(statuses) for row in self._where(status=status)
+                if row["scheduled_at"] is not None and row["scheduled_at"] <= now
+            ),
+            key=lambda row: row["scheduled_at"]
+        )
+        return [self._entity(row) for row in rows[:limit]]
+
+    async def claim(self, campaign_id: UUID, statuses: List[models.CampaignStatus], status: models.CampaignStatus) -> bool:
+        row = self.rows.get(campaign_id)
+        if row is None or row["status"] not in statuses:
+            return False
+        self.tables.change(models.Campaign, row, {"status": status})
+        return True
+
+    async def acquire_run(self, campaign_id: UUID, owner: str, stale_before: datetime) -> Optional[models.Campaign]:
+        row = self.rows.get(campaign_id)
+        if row is None or (row["run_owner"] is not None and row["run_heartbeat_at"] >= aware(stale_before)):
+            return None
+        self.tables.change(models.Campaign, row, {
+            "run_owner": owner,
+            "run_generation": (row["run_generation"] or 0) + 1,
+            "run_heartbeat_at": utcnow(),
+            "status": models.CampaignStatus.ACTIVE,
+        })
+        return self._entity(row)
+
+    def _leased(self, campaign_id: UUID, owner: str, generation: int) -> Optional[Dict[str, Any]]:
+        row = self.rows.get(campaign_id)
+        if row is None or row["run_owner"] != owner or row["run_generation"] != generation:
+            return None
+        return row
+
+    async def renew_run(self, campaign_id: UUID, owner: str, generation: int) -> Optional[models.CampaignStatus]:
+        row = self._leased(campaign_id, owner, generation)
+        if row is None:
+            return None
+        row["run_heartbeat_at"] = utcnow()
+        return row["status"]
+
+    async def release_run(self, campaign_id: UUID, owner: str, generation: int):
+        row = self._leased(campaign_id, owner, generation)
+        if row is not None:
+            self.tables.change(models.Campaign, row, {"run_owner": None, "run_heartbeat_at": None})
+
+class MemoryFinances(MemoryRepository, interface.FinanceRepository):
+    async def list_for_user(
+        self,
+        user_id: UUID,
+        year: Optional[int] = None,
+        month: Optional[int] = None,
+        entry_type: Optional[str] = None
+    ) -> List[models.FinanceEntry]:
+        rows = [
+            row for row in self._where(user_id=user_id)
+            if (not year or row["date"].year == year)
+            and (not month or row["date"].month == month)
+            and (not entry_type or row["entry_type"] == entry_type)
+        ]
+        return [self._entity(row) for row in self._newest_first(rows, "date")]
+
+class MemoryGroups(MemoryRepository, interface.GroupRepository):
+    async def list_for_user(self, user_id: UUID) -> List[models.Group]:
+        return [self._entity(row) for row in self._newest_first(self._where(user_id=user_id))]
+
+class MemorySuppressions(MemoryRepository, interface.SuppressionRepository):
+    model = models.SuppressionEntry
+
+    async def list_for_user(self, user_id: UUID, skip: int = 0, limit: int = 100) -> List[models.SuppressionEntry]:
+        rows = self._newest_first(self._where(user_id=user_id))
+        return [self._entity(row) for row in rows[skip:skip + limit]]
+
+    async def phones(self, user_id: UUID) -> List[str]:
+        return [row["phone"] for row in self._where(user_id=user_id)]
+
+    async def filter(self, user_id: UUID, phones: List[str]) -> Set[str]:
+        return {phone for phone in phones if self.tables.first(self.model, user_id=user_id, phone=phone)}
+
+    async def add(self, user_id: UUID, phones: List[str], reason: str) -> List[str]:
+        added = [phone for phone in dict.fromkeys(phones) if not self.tables.first(self.model, user_id=user_id, phone=phone)]
+        for phone in added:
+            self.tables.insert(models.SuppressionEntry, {"user_id": user_id, "phone": phone, "reason": reason})
+        return added
+
+    async def remove(self, user_id: UUID, phones: List[str]) -> int:
+        rows = [row for phone in dict.fromkeys(phones) for row in self._where(user_id=user_id, phone=phone)]
+        for row in rows:
+            self.tables.remove(models.SuppressionEntry, row)
+        return len(rows)
+
+class MemoryStorage(interface.Storage):
+    def __init__(self, tables: MemoryTables):
+        self.tables = tables
+        self.users = MemoryUsers(tables)
+        self.instances = MemoryInstances(tables)
+        self.contacts = MemoryContacts(tables)
+        self.conversations = MemoryConversations(tables)
+        self.messages = MemoryMessages(tables)
+        self.campaigns = MemoryCampaigns(tables)
+        self.finances = MemoryFinances(tables)
+        self.groups = MemoryGroups(tables)
+        self.suppressions = MemorySuppressions(tables)
+
+    async def commit(self):
+        pass
+
+    async def resource_versions(self, user_id: UUID, resources: Iterable[str]) -> Dict[str, int]:
+        return {resource: self.tables.versions[(user_id, resource)] for resource in resources}
+
+class MemoryBackend(interface.StorageBackend):
+    name = "memory"
+
+    def __init__(self):
+        self.tables = MemoryTables()
+
+    @asynccontextmanager
+    async def session(self):
+        yield MemoryStorage(self.tables)
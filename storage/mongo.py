@@ -0,0 +1,640 @@
+"""MongoDB backend (motor).
+
+One collection per table, named like the table, with the row's UUID as
+``_id`` (standard binary representation, so ``(timestamp, _id)`` sorts the
+way Postgres sorts ``(timestamp, id)``). Enums are stored as their values and
+all datetimes as UTC; note that MongoDB keeps milliseconds only.
+
+There are no multi-document transactions: every write applies on its own and
+``commit()`` is a no-op. Counters (unread, delivered, resource versions) use
+atomic ``$inc``/pipeline updates, so concurrent writers can't lose updates.
+"""
+
+import enum
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from sqlalchemy import Enum
+
+from storage import interface
+from storage.interface import (
+    ConversationActivity, ExportPosition, EXPORT_FIELDS, VERSIONED, CASCADES, new_row, to_entity, attach, aware, utcnow
+)
+import models
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+INDEXES = {
+    models.User: [
+        IndexModel([("username", ASCENDING)], unique=True),
+        IndexModel([("email", ASCENDING)], unique=True, partialFilterExpression={"email": {"$type": "string"}}),
+    ],
+    models.WhatsAppInstance: [IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)])],
+    models.Contact: [IndexModel([("phone", ASCENDING), ("created_at", ASCENDING)])],
+    models.Conversation: [
+        IndexModel([("user_id", ASCENDING), ("last_message_at", DESCENDING)]),
+        IndexModel([("instance_id", ASCENDING), ("contact_id", ASCENDING)]),
+    ],
+    models.Message: [
+        IndexModel([("conversation_id", ASCENDING), ("timestamp", ASCENDING)]),
+        IndexModel([("whatsapp_message_id", ASCENDING)], sparse=True),
+        IndexModel([("campaign_id", ASCENDING)], sparse=True),
+        IndexModel([("timestamp", ASCENDING), ("_id", ASCENDING)]),
+    ],
+    models.Campaign: [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("status", ASCENDING), ("scheduled_at", ASCENDING)]),
+    ],
+    models.FinanceEntry: [IndexModel([("user_id", ASCENDING), ("date", DESCENDING)])],
+    models.Group: [IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)])],
+    models.SuppressionEntry: [IndexModel([("user_id", ASCENDING), ("phone", ASCENDING)], unique=True)],
+}
+
+VERSIONS_COLLECTION = "resource_versions"
+
+def _enum_classes(model) -> Dict[str, type]:
+    return {
+        attribute.key: attribute.columns[0].type.enum_class
+        for attribute in model.__mapper__.column_attrs
+        if isinstance(attribute.columns[0].type, Enum) and attribute.columns[0].type.enum_class
+    }
+
+ENUMS = {model: _enum_classes(model) for model in INDEXES}
+
+def encode_value(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    return aware(value)
+
+def encode(values: Dict[str, Any]) -> Dict[str, Any]:
+    document = {key: encode_value(value) for key, value in values.items()}
+    if "id" in document:
+        document["_id"] = document.pop("id")
+    return document
+
+def decode(model, document: Dict[str, Any]) -> Dict[str, Any]:
+    row = dict(document)
+    row["id"] = row.pop("_id")
+    for key, enum_class in ENUMS[model].items():
+        if row.get(key) is not None:
+            row[key] = enum_class(row[key])
+    return row
+
+class MongoRepository:
+    def __init__(self, storage: "MongoStorage"):
+        self.storage = storage
+        self.collection = storage.db[self.model.__tablename__]
+
+    def _entity(self, document: Dict[str, Any]):
+        return to_entity(self.model, decode(self.model, document))
+
+    async def _find(self, query: Dict[str, Any], sort=None, skip: int = 0, limit: int = 0) -> List[Dict[str, Any]]:
+        cursor = self.collection.find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        if skip:
+            cursor = cursor.skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=None)
+
+    async def _entities(self, query: Dict[str, Any], sort=None, skip: int = 0, limit: int = 0) -> List:
+        return [self._entity(document) for document in await self._find(query, sort, skip, limit)]
+
+    async def get(self, entity_id: UUID, user_id: Optional[UUID] = None):
+        query = {"_id": entity_id}
+        if user_id is not None:
+            query["user_id"] = user_id
+        document = await self.collection.find_one(query)
+        return self._entity(document) if document else None
+
+    async def add(self, **values):
+        row = {key: aware(value) for key, value in new_row(self.model, values).items()}
+        await self.collection.insert_one(encode(row))
+        await self.storage.bump(self.model, [row.get("user_id")])
+        return to_entity(self.model, row)
+
+    async def update(self, entity, **changes):
+        if "updated_at" in interface.column_keys(self.model):
+            changes["updated_at"] = utcnow()
+        await self.collection.update_one({"_id": entity.id}, {"$set": encode(changes)})
+        for key, value in changes.items():
+            setattr(entity, key, value)
+        await self.storage.bump(self.model, [getattr(entity, "user_id", None)])
+        return entity
+
+    async def delete(self, entity):
+        await self.storage.remove(self.model, [entity.id])
+
+class MongoUsers(MongoRepository, interface.UserRepository):
+    async def get_by_username(self, username: str) -> Optional[models.User]:
+        document = await self.collection.find_one({"username": username})
+        return self._entity(document) if document else None
+
+    async def get_by_email(self, email: str) -> Optional[models.User]:
+        document = await self.collection.find_one({"email": email})
+        return self._entity(document) if document else None
+
+class MongoInstances(MongoRepository, interface.InstanceRepository):
+    async def list_for_user(self, user_id: UUID) -> List[models.WhatsAppInstance]:
+        return await self._entities({"user_id": user_id}, [("created_at", DESCENDING)])
+
+    async def get_many(self, instance_ids: List[UUID], user_id: UUID) -> List[models.WhatsAppInstance]:
+        return await self._entities({"_id": {"$in": list(dict.fromkeys(instance_ids))}, "user_id": user_id})
+
+    async def count(self, user_id: UUID, status: Optional[models.InstanceStatus] = None) -> int:
+        query = {"user_id": user_id}
+        if status is not None:
+            query["status"] = status.value
+        return await self.collection.count_documents(query)
+
+class MongoContacts(MongoRepository, interface.ContactRepository):
+    async def get_by_phone(self, phone: str) -> Optional[models.Contact]:
+        documents = await self._find({"phone": phone}, [("created_at", ASCENDING)], limit=1)
+        return self._entity(documents[0]) if documents else None
+
+    async def existing_phones(self, phones: List[str]) -> Set[str]:
+        if not phones:
+            return set()
+        return set(await self.collection.distinct("phone", {"phone": {"$in": phones}}))
+
+    async def add_many(self, rows: List[Dict[str, Any]]) -> int:
+        if rows:
+            await self.collection.insert_many([encode(new_row(models.Contact, row)) for row in rows])
+        return len(rows)
+
+class MongoConversations(MongoRepository, interface.ConversationRepository):
+    async def _with_messages(self, documents: List[Dict[str, Any]]) -> List[models.Conversation]:
+        if not documents:
+            return []
+        db = self.storage.db
+        contact_ids = list({document["contact_id"] for document in documents})
+        contacts = {
+            document["_id"]: to_entity(models.Contact, decode(models.Contact, document))
+            async for document in db[models.Contact.__tablename__].find({"_id": {"$in": contact_ids}})
+        }
+        messages: Dict[UUID, List[models.Message]] = {document["_id"]: [] for document in documents}
+        cursor = db[models.Message.__tablename__].find(
+            {"conversation_id": {"$in": list(messages)}}
+        ).sort("timestamp", ASCENDING)
+        async for document in cursor:
+            messages[document["conversation_id"]].append(to_entity(models.Message, decode(models.Message, document)))
+        return [
+            attach(
+                self._entity(document),
+                contact=contacts.get(document["contact_id"]),
+                messages=messages[document["_id"]]
+            )
+            for document in documents
+        ]
+
+    async def get(
+        self,
+        conversation_id: UUID,
+        user_id: Optional[UUID] = None,
+        with_messages: bool = False
+    ) -> Optional[models.Conversation]:
+        query = {"_id": conversation_id}
+        if user_id is not None:
+            query["user_id"] = user_id
+        document = await self.collection.find_one(query)
+        if document is None:
+            return None
+        if with_messages:
+            return (await self._with_messages([document]))[0]
+        return self._entity(document)
+
+    async def find(self, instance_id: UUID, contact_id: UUID) -> Optional[models.Conversation]:
+        document = await self.collection.find_one({"instance_id": instance_id, "contact_id": contact_id})
+        return self._entity(document) if document else None
+
+    async def list_for_user(self, user_id: UUID, instance_id: Optional[UUID] = None) -> List[models.Conversation]:
+        query = {"user_id": user_id}
+        if instance_id:
+            query["instance_id"] = instance_id
+        return await self._with_messages(await self._find(query, [("last_message_at", DESCENDING)]))
+
+    async def totals(self, user_id: UUID) -> Tuple[int, int]:
+        result = await self.collection.aggregate([
+            {"$match": {"user_id": user_id}},
+            {"$group": {"_id": None, "count": {"$sum": 1}, "unread": {"$sum": "$unread_count"}}},
+        ]).to_list(length=1)
+        return (result[0]["count"], int(result[0]["unread"])) if result else (0, 0)
+
+    async def unread_total(self, user_id: UUID) -> int:
+        result = await self.collection.aggregate([
+            {"$match": {"user_id": user_id}},
+            {"$group": {"_id": None, "total": {"$sum": "$unread_count"}}},
+        ]).to_list(length=1)
+        return int(result[0]["total"]) if result else 0
+
+    @staticmethod
+    def _activity(unread: int, at: datetime) -> List[Dict[str, Any]]:
+        # Pipeline update: evaluated on the server, atomically per document
+        return [{"$set": {
+            "unread_count": {"$add": [{"$ifNull": ["$unread_count", 0]}, unread]},
+            "last_message_at": {"$max": ["$last_message_at", aware(at)]},
+        }}]
+
+    async def record_activity(self, conversation_id: UUID, unread: int = 0, at: Optional[datetime] = None) -> int:
+        document = await self.collection.find_one_and_update(
+            {"_id": conversation_id},
+            self._activity(unread, at or utcnow()),
+            projection={"unread_count": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        return document["unread_count"]
+
+    async def record_activity_many(self, activity: Iterable[ConversationActivity]):
+        totals: Dict[UUID, List] = {}
+        for conversation_id, unread, at in activity:
+            current = totals.setdefault(conversation_id, [0, at])
+            current[0] += unread
+            current[1] = max(current[1], at)
+        if not totals:
+            return
+        await self.collection.bulk_write(
+            [UpdateOne({"_id": i}, self._activity(unread, at)) for i, (unread, at) in totals.items()],
+            ordered=False
+        )
+
+    async def get_or_create_for_phones(self, user_id: UUID, instance_id: UUID, phones: List[str]) -> Dict[str, UUID]:
+        phones = list(dict.fromkeys(phones))
+        if not phones:
+            return {}
+        db = self.storage.db
+
+        contact_ids: Dict[str, UUID] = {}
+        cursor = db[models.Contact.__tablename__].find(
+            {"phone": {"$in": phones}}, {"phone": 1}
+        ).sort("created_at", ASCENDING)
+        async for document in cursor:
+            contact_ids.setdefault(document["phone"], document["_id"])
+        new_contacts = [
+            new_row(models.Contact, {"phone": phone, "name": phone})
+            for phone in phones if phone not in contact_ids
+        ]
+        if new_contacts:
+            await db[models.Contact.__tablename__].insert_many([encode(row) for row in new_contacts])
+            contact_ids.update((row["phone"], row["id"]) for row in new_contacts)
+
+        conversation_ids: Dict[UUID, UUID] = {}
+        cursor = self.collection.find(
+            {"instance_id": instance_id, "contact_id": {"$in": list(contact_ids.values())}}, {"contact_id": 1}
+        )
+        async for document in cursor:
+            conversation_ids.setdefault(document["contact_id"], document["_id"])
+        new_conversations = [
+            new_row(models.Conversation, {
+                "user_id": user_id,
+                "instance_id": instance_id,
+                "contact_id": contact_id,
+                "is_group": False,
+                "unread_count": 0
+            })
+            for contact_id in contact_ids.values() if contact_id not in conversation_ids
+        ]
+        if new_conversations:
+            await self.collection.insert_many([encode(row) for row in new_conversations])
+            conversation_ids.update((row["contact_id"], row["id"]) for row in new_conversations)
+
+        return {phone: conversation_ids[contact_ids[phone]] for phone in phones}
+
+PENDING_OR_SENT = [models.MessageStatus.PENDING.value, models.MessageStatus.SENT.value]
+
+class MongoMessages(MongoRepository, interface.MessageRepository):
+    async def add_many(self, rows: List[Dict[str, Any]]):
+        if rows:
+            await self.collection.insert_many([encode(new_row(models.Message, row)) for row in rows])
+
+    async def _advance(
+        self, ids: List[str], statuses: List[str], status: models.MessageStatus
+    ) -> Tuple[List[Dict[str, Any]], Dict[Optional[UUID], int]]:
+        """Move matching messages to ``status``.
+
+        Returns the documents found and how many of them this call moved, per
+        campaign (None for messages outside campaigns). The update re-checks
+        the status on the server, so a message another worker moved between
+        the read and the update is not counted twice.
+        """
+        query = {"whatsapp_message_id": {"$in": ids}, "is_from_me": True, "status": {"$in": statuses}}
+        documents = await self._find(query)
+        by_campaign: Dict[Optional[UUID], List[UUID]] = {}
+        for document in documents:
+            by_campaign.setdefault(document.get("campaign_id"), []).append(document["_id"])
+        moved: Dict[Optional[UUID], int] = {}
+        for campaign_id, document_ids in by_campaign.items():
+            result = await self.collection.update_many(
+                {"_id": {"$in": document_ids}, "status": {"$in": statuses}},
+                {"$set": {"status": status.value}}
+            )
+            moved[campaign_id] = result.modified_count
+        return documents, moved
+
+    async def apply_receipts(self, statuses: Dict[str, models.MessageStatus]) -> Tuple[Set[str], Dict[UUID, int]]:
+        delivered_ids = [i for i, s in statuses.items() if s in (models.MessageStatus.DELIVERED, models.MessageStatus.READ)]
+        read_ids = [i for i, s in statuses.items() if s == models.MessageStatus.READ]
+        failed_ids = [i for i, s in statuses.items() if s == models.MessageStatus.FAILED]
+
+        matched: Set[str] = set()
+        newly_delivered: Dict[UUID, int] = {}
+        if delivered_ids:
+            documents, moved = await self._advance(delivered_ids, PENDING_OR_SENT, models.MessageStatus.DELIVERED)
+            matched.update(document["whatsapp_message_id"] for document in documents)
+            newly_delivered = {campaign_id: count for campaign_id, count in moved.items() if campaign_id and count}
+        if read_ids:
+            documents, _ = await self._advance(read_ids, [models.MessageStatus.DELIVERED.value], models.MessageStatus.READ)
+            matched.update(document["whatsapp_message_id"] for document in documents)
+        if failed_ids:
+            documents, _ = await self._advance(failed_ids, PENDING_OR_SENT, models.MessageStatus.FAILED)
+            matched.update(document["whatsapp_message_id"] for document in documents)
+
+        unmatched = [message_id for message_id in statuses if message_id not in matched]
+        if unmatched:
+            # Already at or past the receipt's status: nothing to change, but no reason to retry either
+            matched.update(await self.collection.distinct(
+                "whatsapp_message_id", {"whatsapp_message_id": {"$in": unmatched}, "is_from_me": True}
+            ))
+
+        delivered_counts: Dict[UUID, int] = {}
+        campaigns = self.storage.db[models.Campaign.__tablename__]
+        for campaign_id, delivered in newly_delivered.items():
+            document = await campaigns.find_one_and_update(
+                {"_id": campaign_id},
+                {"$inc": {"delivered_count": delivered}},
+                projection={"delivered_count": 1, "user_id": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            if document is not None:
+                delivered_counts[campaign_id] = document["delivered_count"]
+                await self.storage.bump(models.Campaign, [document["user_id"]])
+        return matched, delivered_counts
+
+    async def campaign_phones(self, campaign_id: UUID) -> Set[str]:
+        db = self.storage.db
+        conversation_ids = await self.collection.distinct("conversation_id", {"campaign_id": campaign_id})
+        if not conversation_ids:
+            return set()
+        contact_ids = await db[models.Conversation.__tablename__].distinct("contact_id", {"_id": {"$in": conversation_ids}})
+        return set(await db[models.Contact.__tablename__].distinct("phone", {"_id": {"$in": contact_ids}}))
+
+    async def export_page(
+        self,
+        user_id: UUID,
+        instance_id: Optional[UUID],
+        start: Optional[datetime],
+        end: Optional[datetime],
+        after: Optional[ExportPosition],
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """One keyset page; conversations and contacts are joined in the client"""
+        db = self.storage.db
+        conversations = {
+            document["_id"]: document
+            async for document in db[models.Conversation.__tablename__].find(
+                {"user_id": user_id}, {"contact_id": 1, "is_group": 1, "group_name": 1}
+            )
+        }
+        if not conversations:
+            return []
+
+        query: Dict[str, Any] = {"conversation_id": {"$in": list(conversations)}}
+        if instance_id:
+            query["instance_id"] = instance_id
+        if start or end:
+            query["timestamp"] = {}
+            if start:
+                query["timestamp"]["$gte"] = aware(start)
+            if end:
+                query["timestamp"]["$lt"] = aware(end)
+        if after:
+            timestamp, message_id = after
+            query = {"$and": [query, {"$or": [
+                {"timestamp": {"$gt": aware(timestamp)}},
+                {"timestamp": aware(timestamp), "_id": {"$gt": message_id}},
+            ]}]}
+        documents = await self._find(query, [("timestamp", ASCENDING), ("_id", ASCENDING)], limit=limit)
+
+        # Only the contacts of this page
+        contact_ids = list({conversations[document["conversation_id"]]["contact_id"] for document in documents})
+        contacts = {
+            document["_id"]: document
+            async for document in db[models.Contact.__tablename__].find({"_id": {"$in": contact_ids}}, {"phone": 1, "name": 1})
+        } if contact_ids else {}
+
+        page = []
+        for document in documents:
+            conversation = conversations[document["conversation_id"]]
+            contact = contacts.get(conversation["contact_id"], {})
+            values = {
+                **decode(models.Message, document),
+                "contact_phone": contact.get("phone"),
+                "contact_name": contact.get("name"),
+                "is_group": conversation.get("is_group"),
+                "group_name": conversation.get("group_name"),
+            }
+            page.append({field: values.get(field) for field in EXPORT_FIELDS})
+        return page
+
+class MongoCampaigns(MongoRepository, interface.CampaignRepository):
+    async def list_for_user(self, user_id: UUID) -> List[models.Campaign]:
+        return await self._entities({"user_id": user_id}, [("created_at", DESCENDING)])
+
+    async def count(self, user_id: UUID, status: Optional[models.CampaignStatus] = None) -> int:
+        query = {"user_id": user_id}
+        if status is not None:
+            query["status"] = status.value
+        return await self.collection.count_documents(query)
+
+    async def set_fields(self, campaign_id: UUID, **values):
+        document = await self.collection.find_one_and_update(
+            {"_id": campaign_id}, {"$set": encode({**values, "updated_at": utcnow()})}, projection={"user_id": 1}
+        )
+        if document is not None:
+            await self.storage.bump(models.Campaign, [document["user_id"]])
+
+    async def due(self, now: datetime, statuses: List[models.CampaignStatus], limit: int) -> List[models.Campaign]:
+        return await self._entities(
+            {"status": {"$in": [s.value for s in statuses]}, "scheduled_at": {"$ne": None, "$lte": aware(now)}},
+            [("scheduled_at", ASCENDING)],
+            limit=limit
+        )
+
+    async def claim(self, campaign_id: UUID, statuses: List[models.CampaignStatus], status: models.CampaignStatus) -> bool:
+        document = await self.collection.find_one_and_update(
+            {"_id": campaign_id, "status": {"$in": [s.value for s in statuses]}},
+            {"$set": {"status": status.value, "updated_at": utcnow()}},
+            projection={"user_id": 1}
+        )
+        if document is None:
+            return False
+        await self.storage.bump(models.Campaign, [document["user_id"]])
+        return True
+
+    async def acquire_run(self, campaign_id: UUID, owner: str, stale_before: datetime) -> Optional[models.Campaign]:
+        document = await self.collection.find_one_and_update(
+            {
+                "_id": campaign_id,
+                "$or": [{"run_owner": None}, {"run_heartbeat_at": {"$lt": aware(stale_before)}}]
+            },
+            {
+                "$set": {
+                    "run_owner": owner,
+                    "run_heartbeat_at": utcnow(),
+                    "status": models.CampaignStatus.ACTIVE.value,
+                    "updated_at": utcnow()
+                },
+                "$inc": {"run_generation": 1}
+            },
+            return_document=ReturnDocument.AFTER
+        )
+        if document is None:
+            return None
+        await self.storage.bump(models.Campaign, [document["user_id"]])
+        return self._entity(document)
+
+    async def renew_run(self, campaign_id: UUID, owner: str, generation: int) -> Optional[models.CampaignStatus]:
+        document = await self.collection.find_one_and_update(
+            {"_id": campaign_id, "run_owner": owner, "run_generation": generation},
+            {"$set": {"run_heartbeat_at": utcnow()}},
+            projection={"status": 1}
+        )
+        return models.CampaignStatus(document["status"]) if document else None
+
+    async def release_run(self, campaign_id: UUID, owner: str, generation: int):
+        await self.collection.update_one(
+            {"_id": campaign_id, "run_owner": owner, "run_generation": generation},
+            {"$set": {"run_owner": None, "run_heartbeat_at": None}}
+        )
+
+class MongoFinances(MongoRepository, interface.FinanceRepository):
+    async def list_for_user(
+        self,
+        user_id: UUID,
+        year: Optional[int] = None,
+        month: Optional[int] = None,
+        entry_type: Optional[str] = None
+    ) -> List[models.FinanceEntry]:
+        query: Dict[str, Any] = {"user_id": user_id}
+        parts = []
+        if year:
+            parts.append({"$eq": [{"$year": "$date"}, year]})
+        if month:
+            parts.append({"$eq": [{"$month": "$date"}, month]})
+        if parts:
+            query["$expr"] = {"$and": parts}
+        if entry_type:
+            query["entry_type"] = entry_type
+        return await self._entities(query, [("date", DESCENDING)])
+
+class MongoGroups(MongoRepository, interface.GroupRepository):
+    async def list_for_user(self, user_id: UUID) -> List[models.Group]:
+        return await self._entities({"user_id": user_id}, [("created_at", DESCENDING)])
+
+class MongoSuppressions(MongoRepository, interface.SuppressionRepository):
+    model = models.SuppressionEntry
+
+    async def list_for_user(self, user_id: UUID, skip: int = 0, limit: int = 100) -> List[models.SuppressionEntry]:
+        return await self._entities({"user_id": user_id}, [("created_at", DESCENDING)], skip=skip, limit=limit)
+
+    async def phones(self, user_id: UUID) -> List[str]:
+        return [document["phone"] async for document in self.collection.find({"user_id": user_id}, {"phone": 1})]
+
+    async def filter(self, user_id: UUID, phones: List[str]) -> Set[str]:
+        return set(await self.collection.distinct("phone", {"user_id": user_id, "phone": {"$in": phones}}))
+
+    async def add(self, user_id: UUID, phones: List[str], reason: str) -> List[str]:
+        phones = list(dict.fromkeys(phones))
+        rows = [new_row(models.SuppressionEntry, {"user_id": user_id, "phone": phone, "reason": reason}) for phone in phones]
+        try:
+            await self.collection.insert_many([encode(row) for row in rows], ordered=False)
+            return phones
+        except BulkWriteError as e:
+            # The unique (user_id, phone) index rejects phones already on the list
+            duplicates = {error["index"] for error in e.details["writeErrors"] if error["code"] == DUPLICATE_KEY}
+            if len(duplicates) != len(e.details["writeErrors"]):
+                raise
+            return [phone for index, phone in enumerate(phones) if index not in duplicates]
+
+    async def remove(self, user_id: UUID, phones: List[str]) -> int:
+        result = await self.collection.delete_many({"user_id": user_id, "phone": {"$in": phones}})
+        return result.deleted_count
+
+class MongoStorage(interface.Storage):
+    def __init__(self, db):
+        self.db = db
+        self.users = MongoUsers(self)
+        self.instances = MongoInstances(self)
+        self.contacts = MongoContacts(self)
+        self.conversations = MongoConversations(self)
+        self.messages = MongoMessages(self)
+        self.campaigns = MongoCampaigns(self)
+        self.finances = MongoFinances(self)
+        self.groups = MongoGroups(self)
+        self.suppressions = MongoSuppressions(self)
+
+    async def commit(self):
+        pass
+
+    async def bump(self, model, user_ids: Iterable[Optional[UUID]]):
+        resource = VERSIONED.get(model)
+        if resource is None:
+            return
+        for user_id in set(user_ids) - {None}:
+            await self.db[VERSIONS_COLLECTION].update_one(
+                {"_id": {"user_id": user_id, "resource": resource}},
+                {"$inc": {"version": 1}},
+                upsert=True
+            )
+
+    async def remove(self, model, ids: List[UUID]):
+        """Delete documents and, like the Postgres foreign keys, their children"""
+        collection = self.db[model.__tablename__]
+        user_ids = await collection.distinct("user_id", {"_id": {"$in": ids}}) if model in VERSIONED else []
+        for child, foreign_key, action in CASCADES.get(model, ()):
+            children = self.db[child.__tablename__]
+            if action == "cascade":
+                child_ids = await children.distinct("_id", {foreign_key: {"$in": ids}})
+                if child_ids:
+                    await self.remove(child, child_ids)
+            else:
+                await children.update_many({foreign_key: {"$in": ids}}, {"$set": {foreign_key: None}})
+        await collection.delete_many({"_id": {"$in": ids}})
+        await self.bump(model, user_ids)
+
+    async def resource_versions(self, user_id: UUID, resources: Iterable[str]) -> Dict[str, int]:
+        resources = tuple(resources)
+        versions = dict.fromkeys(resources, 0)
+        cursor = self.db[VERSIONS_COLLECTION].find(
+            {"_id": {"$in": [{"user_id": user_id, "resource": resource} for resource in resources]}}
+        )
+        async for document in cursor:
+            versions[document["_id"]["resource"]] = document["version"]
+        return versions
+
+class MongoBackend(interface.StorageBackend):
+    name = "mongo"
+
+    def __init__(self, url: str, database: str):
+        self.client = AsyncIOMotorClient(url, uuidRepresentation="standard", tz_aware=True, tzinfo=timezone.utc)
+        self.db = self.client[database]
+
+    async def start(self):
+        for model, indexes in INDEXES.items():
+            await self.db[model.__tablename__].create_indexes(indexes)
+        logger.info("MongoDB indexes ensured")
+
+    async def close(self):
+        self.client.close()
+
+    @asynccontextmanager
+    async def session(self):
+        yield MongoStorage(self.db)
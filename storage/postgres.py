@@ -0,0 +1,690 @@
+"""PostgreSQL backend (SQLAlchemy async + asyncpg).
+
+Each ``PostgresStorage`` wraps one ``AsyncSession``. Counters are updated
+with single atomic statements, receipts and campaign messages in batches,
+and list ETags come from the trigger-maintained ``resource_versions`` table
+(migrations 005 and 009).
+"""
+
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID, uuid4
+
+from sqlalchemy import and_, bindparam, case, delete, extract, func, insert, or_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from config import settings
+from database import AsyncSessionLocal, engine, warm_pool
+from services.fast_json import fast_rows, row_columns, rows_to_dicts
+from storage import interface
+from storage.interface import ConversationActivity, ExportPosition, utcnow
+import models
+import schemas
+
+class SessionRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get(self, entity_id: UUID, user_id: Optional[UUID] = None):
+        query = select(self.model).filter(self.model.id == entity_id)
+        if user_id is not None:
+            query = query.filter(self.model.user_id == user_id)
+        result = await self.db.execute(query)
+        return result.scalar_one_or_none()
+
+    async def add(self, **values):
+        entity = self.model(**values)
+        self.db.add(entity)
+        await self.db.flush()
+        # Loads server-side defaults (created_at)
+        await self.db.refresh(entity)
+        return entity
+
+    async def update(self, entity, **changes):
+        for key, value in changes.items():
+            setattr(entity, key, value)
+        await self.db.flush()
+        await self.db.refresh(entity)
+        return entity
+
+    async def delete(self, entity):
+        await self.db.delete(entity)
+        await self.db.flush()
+
+    async def _count(self, *criteria) -> int:
+        result = await self.db.execute(select(func.count()).select_from(self.model).filter(*criteria))
+        return result.scalar_one()
+
+class PostgresUsers(SessionRepository, interface.UserRepository):
+    async def get_by_username(self, username: str) -> Optional[models.User]:
+        result = await self.db.execute(select(models.User).filter(models.User.username == username))
+        return result.scalar_one_or_none()
+
+    async def get_by_email(self, email: str) -> Optional[models.User]:
+        result = await self.db.execute(select(models.User).filter(models.User.email == email))
+        return result.scalar_one_or_none()
+
+class PostgresInstances(SessionRepository, interface.InstanceRepository):
+    async def list_for_user(self, user_id: UUID) -> List[models.WhatsAppInstance]:
+        result = await self.db.execute(
+            select(models.WhatsAppInstance)
+            .filter(models.WhatsAppInstance.user_id == user_id)
+            .order_by(models.WhatsAppInstance.created_at.desc())
+        )
+        return result.scalars().all()
+
+    async def get_many(self, instance_ids: List[UUID], user_id: UUID) -> List[models.WhatsAppInstance]:
+        result = await self.db.execute(
+            select(models.WhatsAppInstance)
+            .filter(
+                and_(
+                    models.WhatsAppInstance.id.in_(instance_ids),
+                    models.WhatsAppInstance.user_id == user_id
+                )
+            )
+        )
+        return result.scalars().all()
+
+    async def count(self, user_id: UUID, status: Optional[models.InstanceStatus] = None) -> int:
+        criteria = [models.WhatsAppInstance.user_id == user_id]
+        if status is not None:
+            criteria.append(models.WhatsAppInstance.status == status)
+        return await self._count(*criteria)
+
+class PostgresContacts(SessionRepository, interface.ContactRepository):
+    async def get_by_phone(self, phone: str) -> Optional[models.Contact]:
+        result = await self.db.execute(
+            select(models.Contact).filter(models.Contact.phone == phone).order_by(models.Contact.created_at).limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    async def existing_phones(self, phones: List[str]) -> Set[str]:
+        if not phones:
+            return set()
+        result = await self.db.execute(select(models.Contact.phone).filter(models.Contact.phone.in_(phones)))
+        return set(result.scalars().all())
+
+    async def add_many(self, rows: List[Dict[str, Any]]) -> int:
+        if rows:
+            await self.db.execute(insert(models.Contact), [{"id": uuid4(), **row} for row in rows])
+        return len(rows)
+
+class PostgresConversations(SessionRepository, interface.ConversationRepository):
+    async def get(
+        self,
+        conversation_id: UUID,
+        user_id: Optional[UUID] = None,
+        with_messages: bool = False
+    ) -> Optional[models.Conversation]:
+        query = select(models.Conversation).filter(models.Conversation.id == conversation_id)
+        if user_id is not None:
+            query = query.filter(models.Conversation.user_id == user_id)
+        if with_messages:
+            query = query.options(
+                selectinload(models.Conversation.contact),
+                selectinload(models.Conversation.messages)
+            )
+        result = await self.db.execute(query)
+        return result.scalar_one_or_none()
+
+    async def find(self, instance_id: UUID, contact_id: UUID) -> Optional[models.Conversation]:
+        result = await self.db.execute(
+            select(models.Conversation)
+            .filter(
+                models.Conversation.instance_id == instance_id,
+                models.Conversation.contact_id == contact_id
+            )
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    def _user_query(self, user_id: UUID, instance_id: Optional[UUID]):
+        query = (
+            select(models.Conversation)
+            .filter(models.Conversation.user_id == user_id)
+            .order_by(models.Conversation.last_message_at.desc())
+        )
+        if instance_id:
+            query = query.filter(models.Conversation.instance_id == instance_id)
+        return query
+
+    async def list_for_user(self, user_id: UUID, instance_id: Optional[UUID] = None) -> List[models.Conversation]:
+        result = await self.db.execute(
+            self._user_query(user_id, instance_id).options(
+                selectinload(models.Conversation.contact),
+                selectinload(models.Conversation.messages)
+            )
+        )
+        return result.scalars().all()
+
+    async def list_rows(self, schema, user_id: UUID, instance_id: Optional[UUID] = None) -> List[Dict[str, Any]]:
+        """Conversations joined to contacts, then their messages, as row tuples"""
+        query = self._user_query(user_id, instance_id)
+        conversation_columns = row_columns(models.Conversation, schema)
+        contact_columns = row_columns(models.Contact, schemas.ContactResponse, prefix="contact__")
+        result = await self.db.execute(
+            query.with_only_columns(*conversation_columns, *contact_columns)
+            .join(models.Contact, models.Contact.id == models.Conversation.contact_id)
+        )
+        keys = list(result.keys())
+        split = len(conversation_columns)
+        contact_keys = [key[len("contact__"):] for key in keys[split:]]
+
+        conversations = {}
+        for row in result:
+            conversation = dict(zip(keys[:split], row[:split]))
+            conversation["contact"] = dict(zip(contact_keys, row[split:]))
+            conversation["messages"] = []
+            conversations[conversation["id"]] = conversation
+
+        if conversations:
+            # Same filters as a subquery, instead of one bound parameter per conversation
+            conversation_ids = query.with_only_columns(models.Conversation.id).order_by(None)
+            messages = await self.db.execute(
+                select(*row_columns(models.Message, schemas.MessageResponse))
+                .filter(models.Message.conversation_id.in_(conversation_ids))
+                .order_by(models.Message.timestamp)
+            )
+            for message in rows_to_dicts(messages):
+                conversations[message["conversation_id"]]["messages"].append(message)
+
+        return list(conversations.values())
+
+    async def totals(self, user_id: UUID) -> Tuple[int, int]:
+        result = await self.db.execute(
+            select(func.count(), func.coalesce(func.sum(models.Conversation.unread_count), 0))
+            .select_from(models.Conversation)
+            .filter(models.Conversation.user_id == user_id)
+        )
+        count, unread = result.one()
+        return count, int(unread)
+
+    async def unread_total(self, user_id: UUID) -> int:
+        result = await self.db.execute(
+            select(func.coalesce(func.sum(models.Conversation.unread_count), 0))
+            .filter(models.Conversation.user_id == user_id)
+        )
+        return int(result.scalar_one())
+
+    async def record_activity(self, conversation_id: UUID, unread: int = 0, at: Optional[datetime] = None) -> int:
+        # Incremented in SQL rather than read and written back, so concurrent
+        # deliveries to the same conversation can't lose updates
+        result = await self.db.execute(
+            update(models.Conversation)
+            .where(models.Conversation.id == conversation_id)
+            .values(
+                unread_count=func.coalesce(models.Conversation.unread_count, 0) + unread,
+                last_message_at=func.greatest(
+                    models.Conversation.last_message_at,
+                    at if at is not None else func.now()
+                )
+            )
+            .returning(models.Conversation.unread_count)
+            .execution_options(synchronize_session=False)
+        )
+        return result.scalar_one()
+
+    async def record_activity_many(self, activity: Iterable[ConversationActivity]):
+        """One UPDATE per conversation, in a single executemany"""
+        totals: Dict[UUID, List] = {}
+        for conversation_id, unread, at in activity:
+            current = totals.get(conversation_id)
+            if current is None:
+                totals[conversation_id] = [unread, at]
+            else:
+                current[0] += unread
+                current[1] = max(current[1], at)
+        if not totals:
+            return
+
+        conversations = models.Conversation.__table__
+        await self.db.execute(
+            update(conversations)
+            .where(conversations.c.id == bindparam("conversation_id"))
+            .values(
+                unread_count=func.coalesce(conversations.c.unread_count, 0) + bindparam("unread"),
+                last_message_at=func.greatest(conversations.c.last_message_at, bindparam("at"))
+            ),
+            # Sorted so concurrent batches lock shared rows in the same order
+            [
+                {"conversation_id": conversation_id, "unread": unread, "at": at}
+                for conversation_id, (unread, at) in sorted(totals.items())
+            ]
+        )
+
+    async def get_or_create_for_phones(self, user_id: UUID, instance_id: UUID, phones: List[str]) -> Dict[str, UUID]:
+        """A fixed number of statements however many phones"""
+        phones = list(dict.fromkeys(phones))
+        if not phones:
+            return {}
+
+        # Contacts
+        result = await self.db.execute(
+            select(models.Contact.phone, models.Contact.id)
+            .filter(models.Contact.phone.in_(phones))
+            .order_by(models.Contact.created_at)
+        )
+        contact_ids: Dict[str, UUID] = {}
+        for phone, contact_id in result.all():
+            contact_ids.setdefault(phone, contact_id)
+
+        new_contacts = [
+            {"id": uuid4(), "phone": phone, "name": phone}
+            for phone in phones if phone not in contact_ids
+        ]
+        if new_contacts:
+            await self.db.execute(insert(models.Contact), new_contacts)
+            contact_ids.update((c["phone"], c["id"]) for c in new_contacts)
+
+        # Conversations
+        result = await self.db.execute(
+            select(models.Conversation.contact_id, models.Conversation.id)
+            .filter(
+                and_(
+                    models.Conversation.instance_id == instance_id,
+                    models.Conversation.contact_id.in_(list(contact_ids.values()))
+                )
+            )
+        )
+        conversation_ids: Dict[UUID, UUID] = {}
+        for contact_id, conversation_id in result.all():
+            conversation_ids.setdefault(contact_id, conversation_id)
+
+        new_conversations = [
+            {
+                "id": uuid4(),
+                "user_id": user_id,
+                "instance_id": instance_id,
+                "contact_id": contact_id,
+                "is_group": False,
+                "unread_count": 0
+            }
+            for contact_id in contact_ids.values() if contact_id not in conversation_ids
+        ]
+        if new_conversations:
+            await self.db.execute(insert(models.Conversation), new_conversations)
+            conversation_ids.update((c["contact_id"], c["id"]) for c in new_conversations)
+
+        return {phone: conversation_ids[contact_ids[phone]] for phone in phones}
+
+EXPORT_COLUMNS = (
+    models.Message.id,
+    models.Message.conversation_id,
+    models.Message.instance_id,
+    models.Contact.phone.label("contact_phone"),
+    models.Contact.name.label("contact_name"),
+    models.Conversation.is_group,
+    models.Conversation.group_name,
+    models.Message.whatsapp_message_id,
+    models.Message.is_from_me,
+    models.Message.message_type,
+    models.Message.content,
+    models.Message.media_url,
+    models.Message.status,
+    models.Message.timestamp,
+)
+
+class PostgresMessages(SessionRepository, interface.MessageRepository):
+    async def add_many(self, rows: List[Dict[str, Any]]):
+        if rows:
+            await self.db.execute(insert(models.Message), rows)
+
+    async def apply_receipts(self, statuses: Dict[str, models.MessageStatus]) -> Tuple[Set[str], Dict[UUID, int]]:
+        delivered_ids = [i for i, s in statuses.items() if s in (models.MessageStatus.DELIVERED, models.MessageStatus.READ)]
+        read_ids = [i for i, s in statuses.items() if s == models.MessageStatus.READ]
+        failed_ids = [i for i, s in statuses.items() if s == models.MessageStatus.FAILED]
+
+        matched: Set[str] = set()
+        newly_delivered: Counter = Counter()
+
+        if delivered_ids:
+            result = await self.db.execute(
+                update(models.Message)
+                .where(
+                    models.Message.whatsapp_message_id.in_(delivered_ids),
+                    models.Message.is_from_me.is_(True),
+                    models.Message.status.in_([models.MessageStatus.PENDING, models.MessageStatus.SENT])
+                )
+                .values(status=models.MessageStatus.DELIVERED)
+                .returning(models.Message.whatsapp_message_id, models.Message.campaign_id)
+                .execution_options(synchronize_session=False)
+            )
+            for message_id, campaign_id in result.all():
+                matched.add(message_id)
+                if campaign_id:
+                    newly_delivered[campaign_id] += 1
+
+        if read_ids:
+            result = await self.db.execute(
+                update(models.Message)
+                .where(
+                    models.Message.whatsapp_message_id.in_(read_ids),
+                    models.Message.is_from_me.is_(True),
+                    models.Message.status == models.MessageStatus.DELIVERED
+                )
+                .values(status=models.MessageStatus.READ)
+                .returning(models.Message.whatsapp_message_id)
+                .execution_options(synchronize_session=False)
+            )
+            matched.update(result.scalars().all())
+
+        if failed_ids:
+            result = await self.db.execute(
+                update(models.Message)
+                .where(
+                    models.Message.whatsapp_message_id.in_(failed_ids),
+                    models.Message.is_from_me.is_(True),
+                    models.Message.status.in_([models.MessageStatus.PENDING, models.MessageStatus.SENT])
+                )
+                .values(status=models.MessageStatus.FAILED)
+                .returning(models.Message.whatsapp_message_id)
+                .execution_options(synchronize_session=False)
+            )
+            matched.update(result.scalars().all())
+
+        unmatched = [message_id for message_id in statuses if message_id not in matched]
+        if unmatched:
+            # Already at or past the receipt's status: nothing to change, but no reason to retry either
+            result = await self.db.execute(
+                select(models.Message.whatsapp_message_id)
+                .where(models.Message.whatsapp_message_id.in_(unmatched), models.Message.is_from_me.is_(True))
+            )
+            matched.update(result.scalars().all())
+
+        delivered_counts: Dict[UUID, int] = {}
+        if newly_delivered:
+            # One statement for every campaign touched by the batch
+            increment = case(dict(newly_delivered), value=models.Campaign.id, else_=0)
+            result = await self.db.execute(
+                update(models.Campaign)
+                .where(models.Campaign.id.in_(list(newly_delivered)))
+                .values(delivered_count=func.coalesce(models.Campaign.delivered_count, 0) + increment)
+                .returning(models.Campaign.id, models.Campaign.delivered_count)
+                .execution_options(synchronize_session=False)
+            )
+            delivered_counts = dict(result.all())
+
+        return matched, delivered_counts
+
+    async def campaign_phones(self, campaign_id: UUID) -> Set[str]:
+        result = await self.db.execute(
+            select(models.Contact.phone)
+            .join(models.Conversation, models.Conversation.contact_id == models.Contact.id)
+            .join(models.Message, models.Message.conversation_id == models.Conversation.id)
+            .filter(models.Message.campaign_id == campaign_id)
+            .distinct()
+        )
+        return set(result.scalars().all())
+
+    def _export_query(self, user_id, instance_id, start, end, after: Optional[ExportPosition], limit: int):
+        query = (
+            select(*EXPORT_COLUMNS)
+            .join(models.Conversation, models.Conversation.id == models.Message.conversation_id)
+            .join(models.Contact, models.Contact.id == models.Conversation.contact_id)
+            .filter(models.Conversation.user_id == user_id)
+            .order_by(models.Message.timestamp, models.Message.id)
+            .limit(limit)
+        )
+        if instance_id:
+            query = query.filter(models.Message.instance_id == instance_id)
+        if start:
+            query = query.filter(models.Message.timestamp >= start)
+        if end:
+            query = query.filter(models.Message.timestamp < end)
+        if after:
+            # Row comparison, so Postgres can start the index scan right after the position
+            query = query.filter(tuple_(models.Message.timestamp, models.Message.id) > tuple_(*after))
+        return query
+
+    async def export_page(
+        self,
+        user_id: UUID,
+        instance_id: Optional[UUID],
+        start: Optional[datetime],
+        end: Optional[datetime],
+        after: Optional[ExportPosition],
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        result = await self.db.execute(self._export_query(user_id, instance_id, start, end, after, limit))
+        return [dict(row) for row in result.mappings()]
+
+class PostgresCampaigns(SessionRepository, interface.CampaignRepository):
+    def _user_query(self, user_id: UUID):
+        return (
+            select(models.Campaign)
+            .filter(models.Campaign.user_id == user_id)
+            .order_by(models.Campaign.created_at.desc())
+        )
+
+    async def list_for_user(self, user_id: UUID) -> List[models.Campaign]:
+        result = await self.db.execute(self._user_query(user_id))
+        return result.scalars().all()
+
+    async def list_rows(self, schema, user_id: UUID) -> List[Dict[str, Any]]:
+        return await fast_rows(self.db, self._user_query(user_id), models.Campaign, schema)
+
+    async def count(self, user_id: UUID, status: Optional[models.CampaignStatus] = None) -> int:
+        criteria = [models.Campaign.user_id == user_id]
+        if status is not None:
+            criteria.append(models.Campaign.status == status)
+        return await self._count(*criteria)
+
+    async def set_fields(self, campaign_id: UUID, **values):
+        await self.db.execute(
+            update(models.Campaign)
+            .where(models.Campaign.id == campaign_id)
+            .values(**values)
+        )
+
+    async def due(self, now: datetime, statuses: List[models.CampaignStatus], limit: int) -> List[models.Campaign]:
+        result = await self.db.execute(
+            select(models.Campaign)
+            .filter(
+                models.Campaign.status.in_(statuses),
+                models.Campaign.scheduled_at.isnot(None),
+                models.Campaign.scheduled_at <= now
+            )
+            .order_by(models.Campaign.scheduled_at)
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+    async def claim(self, campaign_id: UUID, statuses: List[models.CampaignStatus], status: models.CampaignStatus) -> bool:
+        claimed = await self.db.execute(
+            update(models.Campaign)
+            .where(models.Campaign.id == campaign_id, models.Campaign.status.in_(statuses))
+            .values(status=status)
+            .returning(models.Campaign.id)
+            .execution_options(synchronize_session=False)
+        )
+        return claimed.scalar_one_or_none() is not None
+
+    async def acquire_run(self, campaign_id: UUID, owner: str, stale_before: datetime) -> Optional[models.Campaign]:
+        acquired = await self.db.execute(
+            update(models.Campaign)
+            .where(
+                models.Campaign.id == campaign_id,
+                or_(models.Campaign.run_owner.is_(None), models.Campaign.run_heartbeat_at < stale_before)
+            )
+            .values(
+                run_owner=owner,
+                run_generation=func.coalesce(models.Campaign.run_generation, 0) + 1,
+                run_heartbeat_at=utcnow(),
+                status=models.CampaignStatus.ACTIVE
+            )
+            .returning(models.Campaign.id)
+            .execution_options(synchronize_session=False)
+        )
+        if acquired.scalar_one_or_none() is None:
+            return None
+        return await self.db.get(models.Campaign, campaign_id, populate_existing=True)
+
+    async def renew_run(self, campaign_id: UUID, owner: str, generation: int) -> Optional[models.CampaignStatus]:
+        result = await self.db.execute(
+            update(models.Campaign)
+            .where(
+                models.Campaign.id == campaign_id,
+                models.Campaign.run_owner == owner,
+                models.Campaign.run_generation == generation
+            )
+            .values(run_heartbeat_at=utcnow())
+            .returning(models.Campaign.status)
+            .execution_options(synchronize_session=False)
+        )
+        return result.scalar_one_or_none()
+
+    async def release_run(self, campaign_id: UUID, owner: str, generation: int):
+        await self.db.execute(
+            update(models.Campaign)
+            .where(
+                models.Campaign.id == campaign_id,
+                models.Campaign.run_owner == owner,
+                models.Campaign.run_generation == generation
+            )
+            .values(run_owner=None, run_heartbeat_at=None)
+            .execution_options(synchronize_session=False)
+        )
+
+class PostgresFinances(SessionRepository, interface.FinanceRepository):
+    def _user_query(self, user_id, year, month, entry_type):
+        query = select(models.FinanceEntry).filter(models.FinanceEntry.user_id == user_id)
+        if year:
+            query = query.filter(extract('year', models.FinanceEntry.date) == year)
+        if month:
+            query = query.filter(extract('month', models.FinanceEntry.date) == month)
+        if entry_type:
+            query = query.filter(models.FinanceEntry.entry_type == entry_type)
+        return query.order_by(models.FinanceEntry.date.desc())
+
+    async def list_for_user(
+        self,
+        user_id: UUID,
+        year: Optional[int] = None,
+        month: Optional[int] = None,
+        entry_type: Optional[str] = None
+    ) -> List[models.FinanceEntry]:
+        result = await self.db.execute(self._user_query(user_id, year, month, entry_type))
+        return result.scalars().all()
+
+    async def list_rows(self, schema, user_id: UUID, year=None, month=None, entry_type=None) -> List[Dict[str, Any]]:
+        query = self._user_query(user_id, year, month, entry_type)
+        return await fast_rows(self.db, query, models.FinanceEntry, schema)
+
+class PostgresGroups(SessionRepository, interface.GroupRepository):
+    def _user_query(self, user_id: UUID):
+        return (
+            select(models.Group)
+            .filter(models.Group.user_id == user_id)
+            .order_by(models.Group.created_at.desc())
+        )
+
+    async def list_for_user(self, user_id: UUID) -> List[models.Group]:
+        result = await self.db.execute(self._user_query(user_id))
+        return result.scalars().all()
+
+    async def list_rows(self, schema, user_id: UUID) -> List[Dict[str, Any]]:
+        return await fast_rows(self.db, self._user_query(user_id), models.Group, schema)
+
+class PostgresSuppressions(interface.SuppressionRepository):
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def list_for_user(self, user_id: UUID, skip: int = 0, limit: int = 100) -> List[models.SuppressionEntry]:
+        result = await self.db.execute(
+            select(models.SuppressionEntry)
+            .filter(models.SuppressionEntry.user_id == user_id)
+            .order_by(models.SuppressionEntry.created_at.desc())
+            .offset(skip)
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+    async def phones(self, user_id: UUID) -> List[str]:
+        result = await self.db.execute(
+            select(models.SuppressionEntry.phone)
+            .filter(models.SuppressionEntry.user_id == user_id)
+        )
+        return result.scalars().all()
+
+    async def filter(self, user_id: UUID, phones: List[str]) -> Set[str]:
+        result = await self.db.execute(
+            select(models.SuppressionEntry.phone)
+            .filter(
+                and_(
+                    models.SuppressionEntry.user_id == user_id,
+                    models.SuppressionEntry.phone.in_(phones)
+                )
+            )
+        )
+        return set(result.scalars().all())
+
+    async def add(self, user_id: UUID, phones: List[str], reason: str) -> List[str]:
+        result = await self.db.execute(
+            pg_insert(models.SuppressionEntry)
+            .values([
+                {"id": uuid4(), "user_id": user_id, "phone": phone, "reason": reason}
+                for phone in phones
+            ])
+            .on_conflict_do_nothing(index_elements=["user_id", "phone"])
+            .returning(models.SuppressionEntry.phone)
+        )
+        return result.scalars().all()
+
+    async def remove(self, user_id: UUID, phones: List[str]) -> int:
+        result = await self.db.execute(
+            delete(models.SuppressionEntry)
+            .where(
+                and_(
+                    models.SuppressionEntry.user_id == user_id,
+                    models.SuppressionEntry.phone.in_(phones)
+                )
+            )
+        )
+        return result.rowcount or 0
+
+class PostgresStorage(interface.Storage):
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.users = PostgresUsers(db)
+        self.instances = PostgresInstances(db)
+        self.contacts = PostgresContacts(db)
+        self.conversations = PostgresConversations(db)
+        self.messages = PostgresMessages(db)
+        self.campaigns = PostgresCampaigns(db)
+        self.finances = PostgresFinances(db)
+        self.groups = PostgresGroups(db)
+        self.suppressions = PostgresSuppressions(db)
+
+    async def commit(self):
+        await self.db.commit()
+
+    async def resource_versions(self, user_id: UUID, resources: Iterable[str]) -> Dict[str, int]:
+        resources = tuple(resources)
+        result = await self.db.execute(
+            select(models.ResourceVersion.resource, models.ResourceVersion.version)
+            .filter(
+                models.ResourceVersion.user_id == user_id,
+                models.ResourceVersion.resource.in_(resources)
+            )
+        )
+        versions = dict.fromkeys(resources, 0)
+        versions.update(result.all())
+        return versions
+
+class PostgresBackend(interface.StorageBackend):
+    name = "postgres"
+
+    async def start(self):
+        await warm_pool()
+
+    async def close(self):
+        await engine.dispose()
+
+    @asynccontextmanager
+    async def session(self):
+        async with AsyncSessionLocal() as db:
+            yield PostgresStorage(db)
@@ -0,0 +1,44 @@
+"""Selects the storage backend (``settings.storage_backend``) and hands out sessions.
+
+    @router.get("/")
+    async def get_groups(..., storage: Storage = Depends(get_storage)):
+
+Background services that outlive a request use ``open_storage()``:
+
+    async with open_storage() as storage:
+        ...
+        await storage.commit()
+"""
+
+import logging
+from functools import lru_cache
+
+from config import settings
+from storage.interface import StorageBackend
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("postgres", "mongo", "memory")
+
+@lru_cache()
+def get_backend() -> StorageBackend:
+    """The process-wide backend; drivers of the other backends are never imported"""
+    name = settings.storage_backend
+    if name == "postgres":
+        from storage.postgres import PostgresBackend
+        return PostgresBackend()
+    if name == "mongo":
+        from storage.mongo import MongoBackend
+        return MongoBackend(settings.mongo_url, settings.mongo_db_name)
+    if name == "memory":
+        from storage.memory import MemoryBackend
+        return MemoryBackend()
+    raise ValueError(f"Unknown storage backend {name!r}, expected one of {', '.join(BACKENDS)}")
+
+def open_storage():
+    return get_backend().session()
+
+async def get_storage():
+    """FastAPI dependency: one Storage per request"""
+    async with open_storage() as storage:
+        yield storage
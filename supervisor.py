@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+WhatsApp Bot Management System - multi-process supervisor
+
+Runs N API workers (server:create_app) on one shared listening socket and
+keeps them healthy. Production entry point when one event loop isn't enough:
+
+    python supervisor.py --workers 4 --port 8000
+
+* N defaults to one worker per CPU (``WORKERS`` / ``--workers``).
+* Once serving, every worker writes a heartbeat from its event loop. A worker
+  that exits, or whose heartbeat is older than ``worker_health_timeout``, is
+  replaced (with backoff if it keeps failing).
+* SIGHUP reloads gracefully: workers are replaced one at a time and the old
+  one is only stopped once its replacement is serving.
+* SIGTTIN / SIGTTOU add or remove a worker.
+* SIGTERM / SIGINT stop everything, giving workers ``worker_graceful_timeout``
+  to finish in-flight requests.
+* Workers share a PROMETHEUS_MULTIPROC_DIR, so /metrics on any worker reports
+  histograms summed over all workers and gauges per worker (``pid`` label).
+* Singleton background jobs run on one worker only (services/singleton_jobs.py).
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import uvicorn
+
+from config import settings
+from services.structured_logging import configure_logging, parse_sampling
+
+logger = logging.getLogger("supervisor")
+
+spawn = multiprocessing.get_context("spawn")
+
+MAX_RESTART_DELAY = 30.0
+
+def serve_worker(index: int, sock: socket.socket, heartbeat, options: dict):
+    """Worker process: one uvicorn server on the inherited socket"""
+    os.environ["WORKER_ID"] = str(index)
+    configure_logging(level=options["log_level"], json_format=settings.log_json, sampling=parse_sampling(settings.log_sampling))
+    server = uvicorn.Server(uvicorn.Config("server:create_app", factory=True, log_config=None, **options))
+    asyncio.run(_serve(server, sock, heartbeat))
+
+async def _serve(server: uvicorn.Server, sock: socket.socket, heartbeat):
+    async def beat():
+        # Only beats while the loop is responsive and the app is serving
+        while True:
+            if server.started:
+                heartbeat.value = time.time()
+            await asyncio.sleep(settings.worker_heartbeat_interval)
+
+    task = asyncio.create_task(beat())
+    try:
+        await server.serve(sockets=[sock])
+    finally:
+        task.cancel()
+
+class Worker:
+    def __init__(self, index: int, process, heartbeat):
+        self.index = index
+        self.process = process
+        self.heartbeat = heartbeat
+        self.spawned = time.monotonic()
+
+    @property
+    def ready(self) -> bool:
+        return self.heartbeat.value > 0
+
+    @property
+    def heartbeat_age(self) -> float:
+        return time.time() - self.heartbeat.value
+
+class Supervisor:
+    """Spawns, watches, reloads and stops the worker processes"""
+
+    def __init__(self, workers: int, options: dict):
+        self.count = workers
+        self.options = options
+        self.sock: socket.socket = None
+        self.workers: Dict[int, Worker] = {}
+        self.failures: Dict[int, int] = {}
+        self.respawn_at: Dict[int, float] = {}
+        self.signals: List[int] = []
+        self.should_exit = False
+
+    def spawn_worker(self, index: int) -> Worker:
+        heartbeat = spawn.Value("d", 0.0, lock=False)
+        process = spawn.Process(
+            target=serve_worker,
+            args=(index, self.sock, heartbeat, self.options),
+            name=f"worker-{index}"
+        )
+        process.start()
+        logger.info(f"Started worker {index} (pid {process.pid})")
+        return Worker(index, process, heartbeat)
+
+    def stop_workers(self, workers: List[Worker]):
+        """SIGTERM, then SIGKILL whatever is still running after the grace period"""
+        from prometheus_client import multiprocess
+
+        for worker in workers:
+            if worker.process.is_alive():
+                worker.process.terminate()
+        deadline = time.monotonic() + settings.worker_graceful_timeout + 5
+        for worker in workers:
+            worker.process.join(max(0.0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                logger.warning(f"Worker {worker.index} (pid {worker.process.pid}) did not stop in time, killing it")
+                worker.process.kill()
+                worker.process.join()
+            multiprocess.mark_process_dead(worker.process.pid)
+
+    def handle_signal(self, signum, frame):
+        self.signals.append(signum)
+
+    def run(self):
+        config = uvicorn.Config("server:create_app", factory=True, log_config=None, **self.options)
+        self.sock = config.bind_socket()
+        for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(signum, self.handle_signal)
+
+        logger.info(f"Supervisor pid {os.getpid()} starting {self.count} workers")
+        for index in range(self.count):
+            self.workers[index] = self.spawn_worker(index)
+
+        while not self.should_exit:
+            self.process_signals()
+            if not self.should_exit:
+                self.check_workers()
+                time.sleep(0.5)
+
+        logger.info("Stopping workers")
+        self.stop_workers(list(self.workers.values()))
+        self.sock.close()
+
+    def process_signals(self):
+        while self.signals:
+            signum = self.signals.pop(0)
+            if signum in (signal.SIGINT, signal.SIGTERM):
+                self.should_exit = True
+                return
+            if signum == signal.SIGHUP:
+                self.reload()
+            elif signum == signal.SIGTTIN:
+                self.count += 1
+                logger.info(f"Scaling up to {self.count} workers")
+            elif signum == signal.SIGTTOU and self.count > 1:
+                self.count -= 1
+                logger.info(f"Scaling down to {self.count} workers")
+                worker = self.workers.pop(self.count, None)
+                if worker:
+                    self.stop_workers([worker])
+
+    def check_workers(self):
+        from services.metrics import WORKER_RESTARTS
+
+        now = time.monotonic()
+        for index, worker in list(self.workers.items()):
+            if not worker.process.is_alive():
+                reason, detail = "exited", f"exited with code {worker.process.exitcode}"
+            elif worker.ready and worker.heartbeat_age > settings.worker_health_timeout:
+                reason, detail = "unresponsive", f"unresponsive for {worker.heartbeat_age:.0f}s"
+            elif not worker.ready and now - worker.spawned > settings.worker_startup_timeout:
+                reason, detail = "startup_timeout", f"not serving after {settings.worker_startup_timeout:.0f}s"
+            else:
+                if worker.ready:
+                    self.failures[index] = 0
+                continue
+
+            logger.error(f"Worker {index} (pid {worker.process.pid}) {detail}, replacing it")
+            WORKER_RESTARTS.labels(reason).inc()
+            del self.workers[index]
+            self.stop_workers([worker])
+            self.failures[index] = self.failures.get(index, 0) + 1
+            # Back off when a worker keeps dying (e.g. the database is down)
+            self.respawn_at[index] = now + min(MAX_RESTART_DELAY, 2 ** (self.failures[index] - 1) - 1)
+
+        for index in range(self.count):
+            if index not in self.workers and self.respawn_at.get(index, 0) <= now:
+                self.workers[index] = self.spawn_worker(index)
+
+    def reload(self):
+        """Replace workers one by one, keeping the old one until the new one serves"""
+        logger.info("Reloading workers")
+        for index in sorted(self.workers):
+            old = self.workers[index]
+            new = self.spawn_worker(index)
+            deadline = time.monotonic() + settings.worker_startup_timeout
+            while not new.ready and new.process.is_alive() and time.monotonic() < deadline:
+                time.sleep(0.1)
+            if not new.ready:
+                logger.error(f"Replacement for worker {index} did not start, keeping the running workers")
+                self.stop_workers([new])
+                return
+            self.workers[index] = new
+            self.stop_workers([old])
+        logger.info("Reload complete")
+
+def prepare_metrics_dir():
+    """Fresh shared directory for the workers' Prometheus samples"""
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or os.path.join(tempfile.gettempdir(), "whatsapp-bot-metrics")
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with several supervised worker processes")
+    parser.add_argument("--workers", type=int, default=settings.workers or os.cpu_count() or 1)
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8000")))
+    parser.add_argument("--log-level", default=settings.log_level.lower())
+    args = parser.parse_args()
+
+    configure_logging(level=args.log_level, json_format=settings.log_json)
+    # Must happen before prometheus_client is imported here or in a worker
+    prepare_metrics_dir()
+    from prometheus_client import multiprocess
+    import services.metrics  # noqa: F401 - the restart counter lives there
+    # The supervisor never sets gauges; don't report its zeroes as a worker
+    multiprocess.mark_process_dead(os.getpid())
+
+    supervisor = Supervisor(args.workers, {
+        "host": args.host,
+        "port": args.port,
+        "log_level": args.log_level,
+        "timeout_graceful_shutdown": int(settings.worker_graceful_timeout),
+    })
+    supervisor.run()
+
+if __name__ == "__main__":
+    sys.exit(main())
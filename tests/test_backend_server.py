@@ -0,0 +1,40 @@
+import pytest
+
+@pytest.fixture
+def backend_client():
+    from fastapi.testclient import TestClient
+    from backend.server import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+def test_messages_page_through_shared_storage(backend_client):
+    instance = backend_client.post("/api/instances", json={"name": "demo"}).json()
+    for number in range(5):
+        response = backend_client.post("/api/messages/send", json={
+            "instance_id": instance["id"], "to": f"1198888000{number}", "message": f"hello {number}"
+        })
+        assert response.status_code == 200, response.text
+
+    seen, cursor = [], None
+    while True:
+        params = {"instance_id": instance["id"], "limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = backend_client.get("/api/messages", params=params)
+        seen += response.json()
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+    assert sorted(message["content"] for message in seen) == [f"hello {number}" for number in range(5)]
+    assert [message["timestamp"] for message in seen] == sorted((message["timestamp"] for message in seen), reverse=True)
+
+    [message] = backend_client.get("/api/messages", params={"contact_phone": "11988880003"}).json()
+    assert message["contact_phone"] == "5511988880003"
+
+def test_invalid_cursor_is_rejected(backend_client):
+    assert backend_client.get("/api/campaigns", params={"cursor": "not-a-cursor"}).status_code == 400
+
+def test_finance_summary_groups_by_month(backend_client):
+    backend_client.post("/api/finances", json={"description": "a", "amount": 10, "type": "income", "date": "2025-03-02"})
+    backend_client.post("/api/finances", json={"description": "b", "amount": 4, "type": "expense", "date": "2025-03-20"})
+    [march] = backend_client.get("/api/finances/summary", params={"from": "2025-03-01", "to": "2025-04-01"}).json()
+    assert (march["month"], march["income"], march["expenses"], march["balance"]) == ("2025-03", 10.0, 4.0, 6.0)
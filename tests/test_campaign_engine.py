@@ -0,0 +1,99 @@
+import models
+from config import settings
+from services.campaign_engine import campaign_engine
+from services.suppression_service import suppression_registry
+from services.whatsapp_service import whatsapp_service
+from storage.provider import open_storage
+
+PHONES = [f"55119876543{number:02d}" for number in range(6)]
+
+def run_campaign(client, instance, phones=PHONES):
+    """Create a campaign and send it to completion (or until it stops); returns it as stored"""
+    async def run():
+        async with open_storage() as storage:
+            campaign = await storage.campaigns.add(
+                user_id=instance.user_id, instance_id=instance.id, name="engine", message_template="hi",
+                target_contacts=phones, status=models.CampaignStatus.PAUSED, instance_pool=[]
+            )
+            await storage.commit()
+        started = await campaign_engine.start(campaign, [instance])
+        await started.task
+        async with open_storage() as storage:
+            return (
+                await storage.campaigns.get(campaign.id),
+                await storage.messages.campaign_phones(campaign.id),
+                started.suppressed
+            )
+
+    return client.portal.call(run)
+
+def fake_sends(monkeypatch):
+    sent = []
+
+    async def send_message(session_id, to, message, **kwargs):
+        sent.append(to)
+        return {"messageId": f"M{len(sent)}"}
+
+    monkeypatch.setattr(whatsapp_service, "send_message", send_message)
+    monkeypatch.setattr(settings, "campaign_send_interval", 0)
+    monkeypatch.setattr(settings, "campaign_batch_size", 2)
+    return sent
+
+def test_failed_persist_is_retried(client, instance, monkeypatch):
+    sent = fake_sends(monkeypatch)
+    record_messages = campaign_engine._record_messages
+    failures = [RuntimeError("database went away")]
+
+    async def flaky(storage, run, outcomes):
+        if failures:
+            raise failures.pop()
+        await record_messages(storage, run, outcomes)
+
+    monkeypatch.setattr(campaign_engine, "_record_messages", flaky)
+    campaign, stored, _ = run_campaign(client, instance)
+
+    assert campaign.status == models.CampaignStatus.COMPLETED
+    assert sorted(sent) == PHONES
+    assert stored == set(PHONES)
+    assert campaign.sent_count == len(PHONES)
+
+def test_run_stops_when_a_batch_cannot_be_stored(client, instance, monkeypatch):
+    sent = fake_sends(monkeypatch)
+    monkeypatch.setattr(settings, "campaign_persist_attempts", 2)
+
+    async def broken(storage, run, outcomes):
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr(campaign_engine, "_record_messages", broken)
+    campaign, stored, _ = run_campaign(client, instance)
+
+    # Nobody past the first batch; its recipients aren't recorded, nor counted
+    assert len(sent) == settings.campaign_batch_size
+    assert not stored
+    assert campaign.sent_count == 0
+
+def test_resumed_run_counts_suppressed_again(client, instance, monkeypatch):
+    sent = fake_sends(monkeypatch)
+
+    async def suppress():
+        async with open_storage() as storage:
+            await suppression_registry.add(storage, instance.user_id, PHONES[:2])
+
+    client.portal.call(suppress)
+    campaign, stored, suppressed = run_campaign(client, instance)
+    assert suppressed == 2
+    assert stored == set(PHONES[2:])
+
+    async def resume():
+        async with open_storage() as storage:
+            campaign_row = await storage.campaigns.get(campaign.id)
+        run = await campaign_engine.start(campaign_row, [instance])
+        # Before its first batch: the counters are what storage says
+        campaign_engine.stop(campaign.id)
+        await run.task
+        return run
+
+    resumed = client.portal.call(resume)
+    assert resumed.suppressed == 2
+    assert resumed.sent == len(PHONES) - 2
+    assert sorted(sent) == PHONES[2:]
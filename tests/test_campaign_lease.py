@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+import models
+from services.campaign_engine import campaign_engine
+from storage.interface import utcnow
+from storage.provider import open_storage
+
+def create_campaign(client, instance):
+    async def create():
+        async with open_storage() as storage:
+            campaign = await storage.campaigns.add(
+                user_id=instance.user_id, instance_id=instance.id, name="lease", message_template="hi",
+                target_contacts=["5511987654321"], status=models.CampaignStatus.PAUSED, instance_pool=[]
+            )
+            await storage.commit()
+            return campaign
+
+    return client.portal.call(create)
+
+def acquire(client, campaign, owner):
+    async def run():
+        async with open_storage() as storage:
+            leased = await storage.campaigns.acquire_run(campaign.id, owner, utcnow() - timedelta(seconds=60))
+            await storage.commit()
+            return leased
+
+    return client.portal.call(run)
+
+def test_only_one_worker_holds_a_run(client, instance):
+    campaign = create_campaign(client, instance)
+
+    first = acquire(client, campaign, "worker-a")
+    assert first.run_owner == "worker-a"
+    assert first.status == models.CampaignStatus.ACTIVE
+    assert acquire(client, campaign, "worker-b") is None
+
+    async def release():
+        async with open_storage() as storage:
+            await storage.campaigns.release_run(campaign.id, "worker-a", first.run_generation)
+            await storage.commit()
+
+    client.portal.call(release)
+    second = acquire(client, campaign, "worker-b")
+    assert second.run_owner == "worker-b"
+    assert second.run_generation == first.run_generation + 1
+
+def test_stale_stop_leaves_newer_run_alone(client, instance):
+    campaign = create_campaign(client, instance)
+
+    async def start():
+        return await campaign_engine.start(campaign, [instance])
+
+    run = client.portal.call(start)
+    assert run is not None
+    assert not campaign_engine.stop(campaign.id, run.generation - 1)
+    assert not run.stopped
+    assert campaign_engine.stop(campaign.id, run.generation)
+
+def test_progress_of_a_run_nobody_holds_ends(client, instance, auth_headers, monkeypatch):
+    import routers.campaigns
+    from config import settings
+    from services.campaign_engine import progress_hub
+
+    monkeypatch.setattr(settings, "campaign_lease_ttl", 0.2)
+    monkeypatch.setattr(routers.campaigns, "SSE_KEEPALIVE_SECONDS", 0.05)
+    campaign = create_campaign(client, instance)
+    # ACTIVE, as a crashed worker leaves it
+    acquire(client, campaign, "worker-gone")
+
+    response = client.get(f"/api/campaigns/{campaign.id}/progress", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.text.count("event: progress") == 1
+    assert '"running":true' in response.text
+    assert campaign.id not in progress_hub._subscribers
@@ -0,0 +1,48 @@
+import gzip
+import re
+from pathlib import Path
+
+from services.compression import negotiate_encoding
+
+def test_encoding_negotiation():
+    available = ("br", "gzip")
+    assert negotiate_encoding("gzip, deflate, br", available) == "br"
+    assert negotiate_encoding("br;q=0.5, gzip", available) == "gzip"
+    assert negotiate_encoding("*", available) == "br"
+    assert negotiate_encoding("*, br;q=0", available) == "gzip"
+    assert negotiate_encoding("gzip;q=0", available) is None
+    assert negotiate_encoding("identity", available) is None
+    assert negotiate_encoding("", available) is None
+
+def stylesheet_url(client):
+    page = client.get("/")
+    assert page.status_code == 200
+    match = re.search(r'href="(/static/styles\.[0-9a-f]{12}\.css)"', page.text)
+    assert match, "index.html should link the hashed stylesheet"
+    return match.group(1)
+
+def test_stylesheet_is_hashed_compressed_and_immutable(client):
+    url = stylesheet_url(client)
+    css = (Path(__file__).parent.parent / "static" / "styles.css").read_bytes()
+
+    compressed = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in compressed.headers["Vary"]
+    # httpx decodes the body; the wire bytes were gzip
+    assert compressed.content == css
+
+    plain = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.content == css
+
+def test_small_responses_are_not_compressed(client):
+    response = client.get("/api/auth/me", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+
+def test_gzip_stream_is_valid():
+    from services.compression import GzipCompressor
+
+    compressor = GzipCompressor(6)
+    data = compressor.compress(b"a" * 5000) + compressor.flush() + compressor.compress(b"b" * 10) + compressor.finish()
+    assert gzip.decompress(data) == b"a" * 5000 + b"b" * 10
@@ -0,0 +1,64 @@
+from storage.provider import open_storage
+from tests.conftest import create_owner, delete_owner
+from tests.test_webhooks import conversations, post_message
+
+def test_list_answers_304_until_a_write(client, instance, auth_headers):
+    first = client.get("/api/instances/", headers=auth_headers)
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    cached = client.get("/api/instances/", headers={**auth_headers, "If-None-Match": f'W/{etag}'})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert not cached.content
+
+    async def rename():
+        async with open_storage() as storage:
+            await storage.instances.update(await storage.instances.get(instance.id), name="renamed")
+            await storage.commit()
+
+    client.portal.call(rename)
+    changed = client.get("/api/instances/", headers={**auth_headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+def test_dashboard_etag_follows_conversations(client, instance, auth_headers):
+    def stats(etag=None):
+        headers = {**auth_headers, "If-None-Match": etag} if etag else auth_headers
+        return client.get("/api/dashboard/stats", headers=headers)
+
+    empty = stats()
+    assert stats(empty.headers["ETag"]).status_code == 304
+
+    post_message(client, instance, "5511987654321", "E1")
+    unread = stats(empty.headers["ETag"])
+    assert unread.status_code == 200
+    assert unread.json()["unread_messages"] == 1
+    assert stats(unread.headers["ETag"]).status_code == 304
+
+    # Reading changes neither the conversation count nor last_message_at
+    conversation = conversations(client, instance)[0]
+    client.post(f"/api/messages/conversations/{conversation.id}/mark-read", headers=auth_headers)
+    read = stats(unread.headers["ETag"])
+    assert read.status_code == 200
+    assert read.json()["unread_messages"] == 0
+
+def test_conversation_writes_leave_resource_versions_alone(postgres):
+    async def test(backend):
+        async with backend.session() as storage:
+            user, instance = await create_owner(storage)
+            try:
+                ids = await storage.conversations.get_or_create_for_phones(user.id, instance.id, ["5511987654321"])
+                await storage.commit()
+                before = await storage.resource_versions(user.id, ["instances", "conversations"])
+                await storage.conversations.record_activity(ids["5511987654321"], unread=1)
+                await storage.commit()
+                return before, await storage.resource_versions(user.id, ["instances", "conversations"]), \
+                    await storage.conversations.totals(user.id)
+            finally:
+                await delete_owner(backend, user, ["5511987654321"])
+
+    before, after, totals = postgres(test)
+    assert before == after
+    assert after["conversations"] == 0
+    assert totals == (1, 1)
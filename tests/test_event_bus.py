@@ -0,0 +1,112 @@
+import asyncio
+import os
+
+import pytest
+
+from config import settings
+from services.event_bus import EventBus, InMemoryBackend
+
+def collect(bus, event_type):
+    received = []
+    bus.subscribe(event_type, lambda data, local: received.append((data, local)))
+    return received
+
+def test_events_are_batched_and_delivered_locally(monkeypatch):
+    monkeypatch.setattr(settings, "event_bus_backend", "memory")
+    monkeypatch.setattr(settings, "event_bus_flush_interval", 0.01)
+    sends = []
+    send = InMemoryBackend.send
+
+    async def counted(self, payload):
+        sends.append(payload)
+        await send(self, payload)
+
+    monkeypatch.setattr(InMemoryBackend, "send", counted)
+    bus = EventBus()
+    received = collect(bus, "thing.happened")
+
+    async def main():
+        for number in range(5):
+            bus.publish("thing.happened", {"number": number})
+        bus.publish("nobody.listens", {})
+        await asyncio.sleep(0.1)
+        await bus.close()
+
+    asyncio.run(main())
+    assert received == [({"number": number}, True) for number in range(5)]
+    assert len(sends) == 1
+
+def test_bus_restarts_on_a_new_loop(monkeypatch):
+    monkeypatch.setattr(settings, "event_bus_backend", "memory")
+    monkeypatch.setattr(settings, "event_bus_flush_interval", 0.01)
+    bus = EventBus()
+    received = collect(bus, "thing.happened")
+
+    async def run(number):
+        await bus.start()
+        bus.publish("thing.happened", {"number": number})
+        await asyncio.sleep(0.05)
+        await bus.close()
+
+    # One loop per app, as in tests or after a reload
+    asyncio.run(run(1))
+    asyncio.run(run(2))
+    assert [data["number"] for data, _ in received] == [1, 2]
+
+def test_large_batches_are_split_under_the_payload_limit(monkeypatch):
+    monkeypatch.setattr(settings, "event_bus_backend", "memory")
+    monkeypatch.setattr(InMemoryBackend, "max_payload", 2000)
+    bus = EventBus()
+    received = collect(bus, "thing.happened")
+
+    async def main():
+        await bus.start()
+        payloads = bus._encode([{"type": "thing.happened", "data": {"text": "x" * 500}}] * 10)
+        for payload in payloads:
+            await bus.backend.send(payload)
+        await bus.close()
+        return payloads
+
+    payloads = asyncio.run(main())
+    assert len(payloads) > 1
+    assert all(len(payload.encode()) <= 2000 for payload in payloads)
+    assert len(received) == 10
+
+def test_postgres_bus_reaches_other_workers(monkeypatch):
+    if not os.environ.get("DATABASE_URL"):
+        pytest.skip("DATABASE_URL is not set")
+    monkeypatch.setattr(settings, "database_url", os.environ["DATABASE_URL"])
+    monkeypatch.setattr(settings, "event_bus_backend", "postgres")
+    monkeypatch.setattr(settings, "event_bus_channel", "test_events")
+    monkeypatch.setattr(settings, "event_bus_flush_interval", 0.01)
+    monkeypatch.setattr(settings, "event_bus_reconnect_delay", 0.05)
+    publisher, listener = EventBus(), EventBus()
+    received = collect(listener, "thing.happened")
+
+    async def wait_for(count):
+        for _ in range(100):
+            if len(received) >= count:
+                return
+            await asyncio.sleep(0.05)
+
+    async def main():
+        await publisher.start()
+        await listener.start()
+        try:
+            publisher.publish("thing.happened", {"number": 1})
+            await wait_for(1)
+            # The server drops the LISTEN connection; the listener reconnects
+            lost = listener.backend._listen_conn
+            await publisher.backend._notify_conn.execute("SELECT pg_terminate_backend($1)", lost.get_server_pid())
+            for _ in range(100):
+                if listener.backend._listen_conn not in (None, lost):
+                    break
+                await asyncio.sleep(0.05)
+            publisher.publish("thing.happened", {"number": 2})
+            await wait_for(2)
+        finally:
+            await publisher.close()
+            await listener.close()
+
+    asyncio.run(main())
+    assert received == [({"number": 1}, False), ({"number": 2}, False)]
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from config import settings
+from services.message_export import export_slots
+from tests.test_webhooks import post_message
+
+def export(client, headers, **params):
+    response = client.get("/api/exports/messages", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return [json.loads(line) for line in response.text.splitlines()]
+
+def test_export_pages_and_resumes(client, instance, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "export_batch_size", 3)
+    for number in range(7):
+        post_message(client, instance, f"551198765432{number}@s.whatsapp.net", f"M{number}")
+    headers = auth_headers
+
+    rows = export(client, headers)
+    assert sorted(row["whatsapp_message_id"] for row in rows) == [f"M{number}" for number in range(7)]
+    assert [(row["timestamp"], row["id"]) for row in rows] == sorted((row["timestamp"], row["id"]) for row in rows)
+    assert export_slots.used == 0
+
+    resumed = export(client, headers, cursor=rows[2]["cursor"])
+    assert resumed == rows[3:]
+
+def test_export_beyond_the_slots_is_refused(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(export_slots, "limit", 0)
+    response = client.get("/api/exports/messages", headers=auth_headers)
+    assert response.status_code == 429
+    assert export_slots.used == 0
+
+def test_slot_is_released_when_the_body_never_runs():
+    import asyncio
+
+    from routers.exports import ExportResponse
+
+    started = []
+
+    async def rows():
+        started.append(True)
+        yield b"{}\n"
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        raise OSError("client went away")
+
+    assert export_slots.try_acquire()
+    response = ExportResponse(rows(), media_type="application/x-ndjson")
+    # Starlette re-raises the send error from its task group
+    with pytest.raises(Exception):
+        asyncio.run(response({"type": "http", "method": "GET"}, receive, send))
+    assert not started
+    assert export_slots.used == 0
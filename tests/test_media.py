@@ -0,0 +1,67 @@
+import hashlib
+
+def upload(client, headers, body, content_type):
+    response = client.post("/api/media/", content=body, headers={**headers, "Content-Type": content_type})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_identical_uploads_are_stored_once(client, auth_headers):
+    body = b"\x89PNG\r\n\x1a\n" + b"same bytes" * 100
+    first = upload(client, auth_headers, body, "image/png")
+    second = upload(client, auth_headers, body, "image/png; charset=binary")
+    assert first["sha256"] == second["sha256"] == hashlib.sha256(body).hexdigest()
+    assert first["url"] == second["url"] == f"/api/media/{first['sha256']}"
+    assert first["message_type"] == "image"
+
+def test_download_supports_ranges_and_revalidation(client, auth_headers):
+    body = bytes(range(256)) * 40
+    media = upload(client, auth_headers, body, "audio/ogg")
+    url = media["url"]
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.content == body
+    assert response.headers["content-type"] == "audio/ogg"
+    assert "content-disposition" not in response.headers
+
+    partial = client.get(url, headers={"Range": "bytes=100-199"})
+    assert partial.status_code == 206
+    assert partial.content == body[100:200]
+    assert partial.headers["content-range"] == f"bytes 100-199/{len(body)}"
+
+    suffix = client.get(url, headers={"Range": "bytes=-10"})
+    assert suffix.content == body[-10:]
+
+    stale = client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"other"'})
+    assert stale.status_code == 200
+    assert stale.content == body
+
+    beyond = client.get(url, headers={"Range": f"bytes={len(body)}-"})
+    assert beyond.status_code == 416
+    assert beyond.headers["content-range"] == f"bytes */{len(body)}"
+
+    cached = client.get(url, headers={"If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+def test_active_content_is_downloaded_not_rendered(client, auth_headers):
+    for content_type in ("text/html", "image/svg+xml"):
+        media = upload(client, auth_headers, b"<svg onload=alert(1)><script>alert(1)</script></svg>", content_type)
+        response = client.get(media["url"])
+        assert response.headers["content-type"] == "application/octet-stream"
+        assert response.headers["content-disposition"].startswith("attachment")
+        assert response.headers["x-content-type-options"] == "nosniff"
+        assert "sandbox" in response.headers["content-security-policy"]
+
+def test_inline_media_is_sandboxed(client, auth_headers):
+    media = upload(client, auth_headers, b"GIF89a" + b"\x00" * 20, "image/gif")
+    response = client.get(media["url"])
+    assert response.headers["content-type"] == "image/gif"
+    assert response.headers["x-content-type-options"] == "nosniff"
+    assert "sandbox" in response.headers["content-security-policy"]
+
+def test_malformed_content_type_is_refused(client, auth_headers):
+    response = client.post(
+        "/api/media/", content=b"x", headers={**auth_headers, "Content-Type": "text/html<script>"}
+    )
+    assert response.status_code == 415
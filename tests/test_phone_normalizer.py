@@ -0,0 +1,50 @@
+import pytest
+
+from services.phone_normalizer import is_group_jid, normalize_phone, normalize_phones
+
+@pytest.mark.parametrize("raw, expected", [
+    ("+55 (11) 98765-4321", "5511987654321"),
+    ("011 98765 4321", "5511987654321"),
+    ("0055 11 98765 4321", "5511987654321"),
+    ("5511987654321@s.whatsapp.net", "5511987654321"),
+    ("5511987654321:12@s.whatsapp.net", "5511987654321"),
+    ("Tel +55 11 98765-4321", "5511987654321"),
+    ("tel:+5511987654321", "5511987654321"),
+    ("@5511987654321", "5511987654321"),
+    ("+55 11 98765 4321\n+1 2", None),
+    ("+55 11 98765 4321\r\n", None),
+    ("invalid", None),
+    ("", None),
+    (None, None),
+])
+def test_normalize_phone(raw, expected):
+    assert normalize_phone(raw, default_country_code="55") == expected
+
+@pytest.mark.parametrize("raw", [
+    "+1 415 555 2671 ext 3",
+    "+1 415 555 2671 ext. 3",
+    "+1 415 555 2671 x3",
+    "+1 (415) 555-2671 #12",
+    "+1 415 555 2671 extension 300",
+])
+def test_extensions_are_dropped(raw):
+    assert normalize_phone(raw, default_country_code="55") == "14155552671"
+
+def test_batch_keeps_positions():
+    phones = ["+1 415 555 2671 ext 3", None, "120363025246125486@g.us", "(11) 98765-4321"]
+    assert normalize_phones(phones, default_country_code="55") == ["14155552671", None, None, "5511987654321"]
+
+def test_multiline_entries_do_not_shift_the_batch():
+    phones = ["+55 11 98765 4321\n+1 2", "tel:+14155552671", "11 98765-4321"]
+    assert normalize_phones(phones, default_country_code="55") == [None, "14155552671", "5511987654321"]
+
+@pytest.mark.parametrize("jid, expected", [
+    ("120363025246125486@g.us", True),
+    ("5511987654321-1589212345@g.us", True),
+    ("5511987654321@s.whatsapp.net", False),
+    ("120363025246125486@g.us.evil", False),
+    ("", False),
+    (None, False),
+])
+def test_is_group_jid(jid, expected):
+    assert is_group_jid(jid) is expected
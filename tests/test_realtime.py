@@ -0,0 +1,33 @@
+import asyncio
+
+from config import settings
+from services.realtime import realtime_hub
+from storage.memory import MemoryConversations
+from tests.test_webhooks import conversations, post_message
+
+def test_unread_pushes_are_coalesced_per_user(client, instance, monkeypatch):
+    monkeypatch.setattr(settings, "ws_unread_debounce", 0.05)
+    queries = []
+    unread_total = MemoryConversations.unread_total
+
+    async def counted(self, user_id):
+        queries.append(user_id)
+        return await unread_total(self, user_id)
+
+    monkeypatch.setattr(MemoryConversations, "unread_total", counted)
+    monkeypatch.setattr(realtime_hub, "has_connections", lambda user_id: True)
+    pushed = []
+    monkeypatch.setattr(
+        realtime_hub, "publish",
+        lambda user_id, event_type, data: event_type == "unread" and pushed.append(data)
+    )
+
+    for number in range(5):
+        post_message(client, instance, "5511987654321", f"U{number}")
+    post_message(client, instance, "5511912345678", "U5")
+    client.portal.call(asyncio.sleep, 0.2)
+
+    assert len(queries) == 1
+    by_conversation = {str(c.id): c.unread_count for c in conversations(client, instance)}
+    assert {data["conversation_id"]: data["unread_count"] for data in pushed} == by_conversation
+    assert {data["total"] for data in pushed} == {6}
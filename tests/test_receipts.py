@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime, timezone
+
+import models
+from tests.conftest import create_owner, delete_owner
+
+PHONES = [f"55119876543{number:02d}" for number in range(10)]
+
+async def sent_campaign(storage):
+    """A campaign whose messages M0..M9 were sent"""
+    user, instance = await create_owner(storage)
+    campaign = await storage.campaigns.add(
+        user_id=user.id, instance_id=instance.id, name="receipts", message_template="hi",
+        target_contacts=PHONES, status=models.CampaignStatus.ACTIVE, instance_pool=[]
+    )
+    conversations = await storage.conversations.get_or_create_for_phones(user.id, instance.id, PHONES)
+    await storage.messages.add_many([
+        {
+            "conversation_id": conversations[phone], "instance_id": instance.id, "campaign_id": campaign.id,
+            "whatsapp_message_id": f"M{number}", "content": "hi", "message_type": "text", "is_from_me": True,
+            "status": models.MessageStatus.SENT, "timestamp": datetime.now(timezone.utc)
+        }
+        for number, phone in enumerate(PHONES)
+    ])
+    await storage.commit()
+    return user, campaign
+
+def test_concurrent_receipts_count_each_delivery_once(storage_backend):
+    async def test(backend):
+        async with backend.session() as storage:
+            user, campaign = await sent_campaign(storage)
+
+        async def deliver(ids):
+            async with backend.session() as storage:
+                result = await storage.messages.apply_receipts(
+                    {message_id: models.MessageStatus.DELIVERED for message_id in ids}
+                )
+                await storage.commit()
+                return result
+
+        try:
+            # Two workers get overlapping batches of the same receipts
+            results = await asyncio.gather(
+                deliver([f"M{number}" for number in range(8)]),
+                deliver([f"M{number}" for number in range(2, 10)]),
+                deliver([f"M{number}" for number in range(10)]),
+            )
+            async with backend.session() as storage:
+                stored = await storage.campaigns.get(campaign.id)
+            return results, stored
+        finally:
+            await delete_owner(backend, user, PHONES)
+
+    results, campaign = storage_backend(test)
+    assert campaign.delivered_count == len(PHONES)
+    assert set().union(*(matched for matched, _ in results)) == {f"M{number}" for number in range(10)}
+
+def test_receipt_transitions(storage_backend):
+    async def test(backend):
+        async with backend.session() as storage:
+            user, campaign = await sent_campaign(storage)
+        try:
+            async with backend.session() as storage:
+                matched, delivered = await storage.messages.apply_receipts({
+                    "M0": models.MessageStatus.READ,
+                    "M1": models.MessageStatus.FAILED,
+                    "unknown": models.MessageStatus.DELIVERED,
+                })
+                await storage.commit()
+            async with backend.session() as storage:
+                # Late receipts never move a message backwards, but are known
+                late, _ = await storage.messages.apply_receipts({
+                    "M0": models.MessageStatus.DELIVERED, "M1": models.MessageStatus.DELIVERED
+                })
+                await storage.commit()
+            return matched, delivered, late, campaign.id
+        finally:
+            await delete_owner(backend, user, PHONES)
+
+    matched, delivered, late, campaign_id = storage_backend(test)
+    assert matched == {"M0", "M1"}
+    assert delivered == {campaign_id: 1}
+    assert late == {"M0", "M1"}
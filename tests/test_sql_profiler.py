@@ -0,0 +1,8 @@
+from config import settings
+
+def test_profile_header_is_ignored_unless_allowed(client, auth_headers, monkeypatch):
+    headers = {**auth_headers, "X-SQL-Profile": "1"}
+    assert "X-SQL-Profile" not in client.get("/api/instances/", headers=headers).headers
+
+    monkeypatch.setattr(settings, "sql_profile_allow_header", True)
+    assert "X-SQL-Profile" in client.get("/api/instances/", headers=headers).headers
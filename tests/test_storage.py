@@ -0,0 +1,21 @@
+import pytest
+
+import models
+from storage.interface import new_row
+
+def test_new_row_fills_defaults():
+    row = new_row(models.User, {"name": "Ana", "username": "ana", "password_hash": "x"})
+    assert row["role"] == models.UserRole.USER
+    assert row["is_active"] is True
+    assert row["email"] is None
+    assert row["id"] is not None
+
+def test_new_row_rejects_unknown_columns():
+    with pytest.raises(TypeError):
+        new_row(models.User, {"name": "Ana", "username": "ana", "hashed_password": "x"})
+
+def test_new_row_rejects_missing_required_columns():
+    with pytest.raises(ValueError):
+        new_row(models.User, {"name": "Ana", "username": "ana"})
+    with pytest.raises(ValueError):
+        new_row(models.User, {"name": "Ana", "username": "ana", "password_hash": None})
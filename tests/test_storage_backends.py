@@ -0,0 +1,164 @@
+"""The same behavior from every storage backend (memory, Postgres, Mongo)"""
+
+from datetime import datetime, timedelta, timezone
+
+import models
+from storage.interface import utcnow
+from tests.conftest import create_owner, delete_owner
+
+PHONES = ["5511987654321", "5511912345678", "14155552671"]
+
+def test_entities_are_scoped_to_their_owner(storage_backend):
+    async def test(backend):
+        async with backend.session() as storage:
+            user, instance = await create_owner(storage)
+            other, _ = await create_owner(storage)
+        try:
+            async with backend.session() as storage:
+                assert (await storage.instances.get(instance.id, user.id)).name == "test"
+                assert await storage.instances.get(instance.id, other.id) is None
+                await storage.instances.update(await storage.instances.get(instance.id), name="renamed")
+                await storage.commit()
+            async with backend.session() as storage:
+                assert (await storage.instances.get(instance.id)).name == "renamed"
+                assert await storage.instances.count(user.id, models.InstanceStatus.ACTIVE) == 1
+                assert await storage.instances.count(other.id, models.InstanceStatus.PENDING) == 0
+        finally:
+            await delete_owner(backend, other)
+            await delete_owner(backend, user)
+        async with backend.session() as storage:
+            # Deleting the user took its instances along
+            assert await storage.instances.get(instance.id) is None
+
+    storage_backend(test)
+
+def test_conversations_are_created_once_per_phone(storage_backend):
+    async def test(backend):
+        async with backend.session() as storage:
+            user, instance = await create_owner(storage)
+        try:
+            async with backend.session() as storage:
+                first = await storage.conversations.get_or_create_for_phones(user.id, instance.id, PHONES[:2])
+                await storage.commit()
+            async with backend.session() as storage:
+                second = await storage.conversations.get_or_create_for_phones(user.id, instance.id, PHONES)
+                await storage.commit()
+                assert await storage.contacts.existing_phones(PHONES + ["5511900000000"]) == set(PHONES)
+
+                base = datetime.now(timezone.utc).replace(microsecond=0)
+                await storage.conversations.record_activity(second[PHONES[0]], unread=2, at=base)
+                # An older message doesn't move last_message_at back
+                await storage.conversations.record_activity(second[PHONES[0]], unread=1, at=base - timedelta(hours=1))
+                await storage.conversations.record_activity_many([(second[PHONES[1]], 1, base)])
+                await storage.commit()
+            async with backend.session() as storage:
+                conversation = await storage.conversations.get(second[PHONES[0]])
+                totals = await storage.conversations.totals(user.id)
+            return first, second, conversation, totals, base
+        finally:
+            await delete_owner(backend, user, PHONES)
+
+    first, second, conversation, totals, base = storage_backend(test)
+    assert {phone: second[phone] for phone in first} == first
+    assert len(set(second.values())) == len(PHONES)
+    assert conversation.unread_count == 3
+    assert conversation.last_message_at == base
+    assert totals == (3, 4)
+
+def test_export_pages_in_keyset_order(storage_backend):
+    async def test(backend):
+        async with backend.session() as storage:
+            user, instance = await create_owner(storage)
+            conversations = await storage.conversations.get_or_create_for_phones(user.id, instance.id, PHONES)
+            base = datetime.now(timezone.utc).replace(microsecond=0)
+            await storage.messages.add_many([
+                {
+                    "conversation_id": conversations[PHONES[number % 3]], "instance_id": instance.id,
+                    "whatsapp_message_id": f"X{number}", "content": str(number), "message_type": "text",
+                    "is_from_me": False, "status": models.MessageStatus.DELIVERED,
+                    # Pairs share a timestamp: the id breaks the tie
+                    "timestamp": base + timedelta(seconds=number // 2)
+                }
+                for number in range(7)
+            ])
+            await storage.commit()
+        try:
+            pages, after = [], None
+            while True:
+                async with backend.session() as storage:
+                    page = await storage.messages.export_page(user.id, None, None, None, after, 3)
+                if not page:
+                    return pages
+                pages.append(page)
+                after = (page[-1]["timestamp"], page[-1]["id"])
+        finally:
+            await delete_owner(backend, user, PHONES)
+
+    pages = storage_backend(test)
+    rows = [row for page in pages for row in page]
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert sorted(row["whatsapp_message_id"] for row in rows) == [f"X{number}" for number in range(7)]
+    assert [(row["timestamp"], row["id"]) for row in rows] == sorted((row["timestamp"], row["id"]) for row in rows)
+    assert {row["contact_phone"] for row in rows} == set(PHONES)
+
+def test_campaign_lease(storage_backend):
+    async def test(backend):
+        async with backend.session() as storage:
+            user, instance = await create_owner(storage)
+            campaign = await storage.campaigns.add(
+                user_id=user.id, instance_id=instance.id, name="lease", message_template="hi",
+                target_contacts=PHONES, status=models.CampaignStatus.PAUSED, instance_pool=[]
+            )
+            await storage.commit()
+        try:
+            recent = utcnow() - timedelta(seconds=60)
+            async with backend.session() as storage:
+                first = await storage.campaigns.acquire_run(campaign.id, "a", recent)
+                await storage.commit()
+            async with backend.session() as storage:
+                refused = await storage.campaigns.acquire_run(campaign.id, "b", recent)
+                renewed = await storage.campaigns.renew_run(campaign.id, "a", first.run_generation)
+                # A lease nobody renewed since stale_before is taken over
+                taken = await storage.campaigns.acquire_run(campaign.id, "b", utcnow() + timedelta(seconds=1))
+                lost = await storage.campaigns.renew_run(campaign.id, "a", first.run_generation)
+                await storage.commit()
+            return first, refused, renewed, taken, lost
+        finally:
+            await delete_owner(backend, user, PHONES)
+
+    first, refused, renewed, taken, lost = storage_backend(test)
+    assert first.run_owner == "a" and first.status == models.CampaignStatus.ACTIVE
+    assert refused is None
+    assert renewed == models.CampaignStatus.ACTIVE
+    assert taken.run_owner == "b" and taken.run_generation == first.run_generation + 1
+    assert lost is None
+
+def test_versions_and_suppressions(storage_backend):
+    async def test(backend):
+        async with backend.session() as storage:
+            user, instance = await create_owner(storage)
+            before = await storage.resource_versions(user.id, ["instances", "groups"])
+            await storage.instances.update(await storage.instances.get(instance.id), name="renamed")
+            await storage.commit()
+            after = await storage.resource_versions(user.id, ["instances", "groups"])
+
+            added = await storage.suppressions.add(user.id, PHONES[:2], "manual")
+            again = await storage.suppressions.add(user.id, PHONES[1:], "opt_out")
+            await storage.commit()
+            suppressed = await storage.suppressions.filter(user.id, PHONES)
+            removed = await storage.suppressions.remove(user.id, [PHONES[0]])
+            await storage.commit()
+            left = await storage.suppressions.phones(user.id)
+        try:
+            return before, after, added, again, suppressed, removed, left
+        finally:
+            await delete_owner(backend, user)
+
+    before, after, added, again, suppressed, removed, left = storage_backend(test)
+    assert after["instances"] > before["instances"]
+    assert after["groups"] == before["groups"]
+    assert sorted(added) == sorted(PHONES[:2])
+    assert again == [PHONES[2]]
+    assert suppressed == set(PHONES)
+    assert removed == 1
+    assert sorted(left) == sorted(PHONES[1:])
@@ -0,0 +1,90 @@
+import signal
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from config import settings
+from supervisor import Supervisor, Worker
+
+class FakeProcess:
+    """Stands in for a worker process: alive until told otherwise"""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.exitcode = None
+        self.alive = True
+
+    def is_alive(self) -> bool:
+        return self.alive
+
+@pytest.fixture
+def supervisor(monkeypatch):
+    supervisor = Supervisor(2, {})
+    pids = iter(range(1000, 2000))
+
+    def spawn_worker(index):
+        return Worker(index, FakeProcess(next(pids)), SimpleNamespace(value=0.0))
+
+    supervisor.spawned = []
+    supervisor.stopped = []
+    monkeypatch.setattr(supervisor, "spawn_worker", lambda index: supervisor.spawned.append(index) or spawn_worker(index))
+    monkeypatch.setattr(supervisor, "stop_workers", lambda workers: supervisor.stopped.extend(workers))
+    for index in range(supervisor.count):
+        supervisor.workers[index] = spawn_worker(index)
+    return supervisor
+
+def serving(worker, age: float = 0.0):
+    worker.heartbeat.value = time.time() - age
+
+def test_exited_worker_is_replaced_with_backoff(supervisor):
+    first = supervisor.workers[0]
+    first.process.alive = False
+    supervisor.check_workers()
+    # First failure: replaced at once
+    assert supervisor.stopped == [first]
+    assert supervisor.spawned == [0]
+
+    supervisor.workers[0].process.alive = False
+    supervisor.check_workers()
+    # Second failure in a row: waits a second
+    assert supervisor.spawned == [0]
+    assert 0 not in supervisor.workers
+    supervisor.respawn_at[0] = 0
+    supervisor.check_workers()
+    assert supervisor.spawned == [0, 0]
+
+def test_serving_worker_resets_the_backoff(supervisor):
+    supervisor.failures[1] = 3
+    serving(supervisor.workers[1])
+    supervisor.check_workers()
+    assert supervisor.failures[1] == 0
+    assert not supervisor.stopped
+
+def test_stalled_and_unstarted_workers_are_replaced(supervisor, monkeypatch):
+    monkeypatch.setattr(settings, "worker_startup_timeout", 10.0)
+    stalled, unstarted = supervisor.workers[0], supervisor.workers[1]
+    serving(stalled, age=settings.worker_health_timeout + 1)
+    unstarted.spawned -= 11
+    supervisor.check_workers()
+    assert supervisor.stopped == [stalled, unstarted]
+    assert sorted(supervisor.spawned) == [0, 1]
+
+def test_signals_scale_and_stop(supervisor):
+    supervisor.signals += [signal.SIGTTIN, signal.SIGTTOU, signal.SIGTTOU]
+    supervisor.process_signals()
+    assert supervisor.count == 1
+    # Scaling down stops the highest index; the up-scaled one was never spawned
+    assert [worker.index for worker in supervisor.stopped] == [1]
+
+    supervisor.signals.append(signal.SIGTERM)
+    supervisor.process_signals()
+    assert supervisor.should_exit
+
+def test_reload_keeps_old_workers_when_the_new_one_fails(supervisor, monkeypatch):
+    monkeypatch.setattr(settings, "worker_startup_timeout", 0.2)
+    old = dict(supervisor.workers)
+    supervisor.reload()
+    # The replacement for worker 0 never served: it is stopped, the old ones stay
+    assert supervisor.workers == old
+    assert len(supervisor.stopped) == 1 and supervisor.stopped[0] not in old.values()
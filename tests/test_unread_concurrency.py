@@ -0,0 +1,37 @@
+"""Concurrent inbound messages must not lose unread increments (the atomic UPDATE in storage/postgres.py)."""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from tests.conftest import create_owner, delete_owner
+
+MESSAGES = 200
+PHONE = "5511987654321"
+
+def test_concurrent_activity_loses_no_unread_increment(postgres):
+    async def test(backend):
+        async with backend.session() as storage:
+            user, instance = await create_owner(storage)
+            ids = await storage.conversations.get_or_create_for_phones(user.id, instance.id, [PHONE])
+            await storage.commit()
+        conversation_id = ids[PHONE]
+        base = datetime.now(timezone.utc)
+
+        async def incoming(index):
+            # Its own session and transaction, like a webhook request; times arrive out of order
+            async with backend.session() as storage:
+                at = base + timedelta(seconds=(index * 7919) % MESSAGES)
+                await storage.conversations.record_activity(conversation_id, unread=1, at=at)
+                await storage.commit()
+
+        try:
+            await asyncio.gather(*(incoming(index) for index in range(MESSAGES)))
+            async with backend.session() as storage:
+                conversation = await storage.conversations.get(conversation_id)
+            return conversation, base + timedelta(seconds=MESSAGES - 1)
+        finally:
+            await delete_owner(backend, user, [PHONE])
+
+    conversation, newest = postgres(test)
+    assert conversation.unread_count == MESSAGES
+    assert conversation.last_message_at == newest
@@ -0,0 +1,34 @@
+import time
+
+from storage.provider import open_storage
+
+def post_message(client, instance, sender, message_id, content="hello"):
+    return client.post(f"/api/webhook/whatsapp/{instance.id}", json={
+        "type": "message",
+        "sessionId": instance.session_id,
+        "message": {"id": message_id, "from": sender, "content": content, "timestamp": int(time.time())},
+    })
+
+def conversations(client, instance):
+    async def load():
+        async with open_storage() as storage:
+            return await storage.conversations.list_for_user(instance.user_id)
+
+    return client.portal.call(load)
+
+def test_group_message_is_stored_in_group_conversation(client, instance):
+    response = post_message(client, instance, "120363025246125486@g.us", "G1", content="STOP")
+    assert response.status_code == 200
+
+    [conversation] = conversations(client, instance)
+    assert conversation.is_group
+    assert conversation.contact.phone == "120363025246125486@g.us"
+    assert conversation.unread_count == 1
+
+def test_direct_message_is_normalized(client, instance):
+    response = post_message(client, instance, "5511987654321:7@s.whatsapp.net", "D1")
+    assert response.status_code == 200
+
+    [conversation] = conversations(client, instance)
+    assert not conversation.is_group
+    assert conversation.contact.phone == "5511987654321"